@@ -4,6 +4,8 @@ Market Perception Agent Background Process
 """
 from django.core.management.base import BaseCommand
 from services.agents.perception import PerceptionAgent
+from services.data_collectors.market_data_collector import MarketDataCollector
+from services.data_collectors.bar_events import BarsUpdatedSubscriber
 import time
 import logging
 from django.conf import settings
@@ -26,10 +28,22 @@ class Command(BaseCommand):
             action='store_true',
             help='仅执行一次，不持续运行'
         )
+        parser.add_argument(
+            '--snapshot',
+            action='store_true',
+            help='每个周期先刷新A股全市场快照'
+        )
+        parser.add_argument(
+            '--on-update',
+            action='store_true',
+            help='订阅 collect_market_data --follow 的K线更新通知，收到通知即运行（--interval 为最长等待时间）'
+        )
 
     def handle(self, *args, **options):
         interval = options['interval']
         run_once = options['once']
+        collector = MarketDataCollector() if options['snapshot'] else None
+        subscriber = BarsUpdatedSubscriber() if options['on_update'] else None
         
         self.stdout.write(self.style.SUCCESS('Starting Perception Agent...'))
         
@@ -38,6 +52,7 @@ class Command(BaseCommand):
         try:
             if run_once:
                 # 仅执行一次
+                self._refresh_snapshot(collector)
                 result = agent.run()
                 self.stdout.write(
                     self.style.SUCCESS(
@@ -49,6 +64,7 @@ class Command(BaseCommand):
                 while True:
                     try:
                         self.stdout.write(f'Running perception cycle...')
+                        self._refresh_snapshot(collector)
                         result = agent.run()
                         
                         self.stdout.write(
@@ -61,8 +77,7 @@ class Command(BaseCommand):
                         )
                         
                         # 等待下一个周期
-                        self.stdout.write(f'Waiting {interval} seconds...')
-                        time.sleep(interval)
+                        self._wait_next_cycle(subscriber, interval)
                         
                     except KeyboardInterrupt:
                         self.stdout.write(self.style.WARNING('Stopping Perception Agent...'))
@@ -78,4 +93,26 @@ class Command(BaseCommand):
             logger.error(f'Perception Agent failed: {e}')
             self.stdout.write(self.style.ERROR(f'Perception Agent failed: {e}'))
             raise
-
+    
+    def _wait_next_cycle(self, subscriber, interval: int):
+        """等待下一个周期：订阅模式下收到K线更新通知即返回"""
+        if subscriber is None:
+            self.stdout.write(f'Waiting {interval} seconds...')
+            time.sleep(interval)
+            return
+        self.stdout.write(f'Waiting for bar updates (up to {interval} seconds)...')
+        bars = subscriber.wait(interval)
+        if bars:
+            self.stdout.write(f'Received {len(bars)} bar updates')
+    
+    def _refresh_snapshot(self, collector):
+        """刷新A股全市场快照"""
+        if collector is None:
+            return
+        result = collector.collect_a_stock_snapshot()
+        if result.get('skipped'):
+            self.stdout.write('Snapshot skipped: A-share market is not in session')
+        elif result.get('success'):
+            self.stdout.write(f'Snapshot refreshed: {result["symbols"]} symbols in {result["elapsed"]}s')
+        else:
+            self.stdout.write(self.style.WARNING(f'Snapshot refresh failed: {result.get("error", "no data")}'))
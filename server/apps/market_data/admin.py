@@ -1,7 +1,10 @@
 from django.contrib import admin
 from .models import (
     MarketDataModel, MarketIndexModel, MarketSentimentModel, 
-    NewsEventModel, StockInfoModel
+    NewsEventModel, StockInfoModel, CollectionWatermarkModel, IntradayBarModel,
+    DataQualityReportModel, QuarantinedBarModel, MarketDataRollupModel,
+    MarketIndexLatestModel, AdjustmentFactorModel, CollectionShardModel, MarketDataRawModel,
+    IndicatorFeatureModel
 )
 
 
@@ -85,3 +88,93 @@ class StockInfoAdmin(admin.ModelAdmin):
     search_fields = ['symbol', 'name', 'industry']
     ordering = ['symbol']
     readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(CollectionWatermarkModel)
+class CollectionWatermarkAdmin(admin.ModelAdmin):
+    """采集水位线管理"""
+    list_display = ['symbol', 'market', 'data_source', 'last_timestamp', 'updated_at']
+    list_filter = ['market', 'data_source']
+    search_fields = ['symbol']
+    ordering = ['symbol']
+
+
+@admin.register(IntradayBarModel)
+class IntradayBarAdmin(admin.ModelAdmin):
+    """分钟K线管理"""
+    list_display = ['symbol', 'market', 'interval', 'timestamp', 'close', 'volume', 'data_source']
+    list_filter = ['market', 'interval', 'data_source']
+    search_fields = ['symbol']
+    ordering = ['-timestamp']
+
+
+@admin.register(DataQualityReportModel)
+class DataQualityReportAdmin(admin.ModelAdmin):
+    """数据质量报告管理"""
+    list_display = ['scope', 'rows_checked', 'rows_quarantined', 'elapsed', 'created_at']
+    list_filter = ['scope']
+    ordering = ['-created_at']
+    readonly_fields = ['created_at']
+
+
+@admin.register(QuarantinedBarModel)
+class QuarantinedBarAdmin(admin.ModelAdmin):
+    """隔离K线管理"""
+    list_display = ['symbol', 'market', 'timestamp', 'data_source', 'reasons', 'created_at']
+    list_filter = ['market', 'data_source']
+    search_fields = ['symbol']
+    ordering = ['-created_at']
+
+
+@admin.register(MarketDataRollupModel)
+class MarketDataRollupAdmin(admin.ModelAdmin):
+    """行情周/月聚合管理"""
+    list_display = ['symbol', 'market', 'period', 'period_start', 'close', 'volume', 'bar_count']
+    list_filter = ['market', 'period']
+    search_fields = ['symbol']
+    ordering = ['-period_start']
+
+
+@admin.register(MarketIndexLatestModel)
+class MarketIndexLatestAdmin(admin.ModelAdmin):
+    """指数最新数据管理"""
+    list_display = ['index_code', 'index_name', 'market', 'value', 'change_pct', 'rise_count', 'fall_count', 'timestamp']
+    list_filter = ['market']
+    search_fields = ['index_code', 'index_name']
+    ordering = ['market', 'index_code']
+
+
+@admin.register(AdjustmentFactorModel)
+class AdjustmentFactorAdmin(admin.ModelAdmin):
+    """复权因子管理"""
+    list_display = ['symbol', 'market', 'ex_date', 'ratio', 'source', 'created_at']
+    list_filter = ['market', 'source']
+    search_fields = ['symbol']
+    ordering = ['symbol', 'ex_date']
+
+
+@admin.register(CollectionShardModel)
+class CollectionShardAdmin(admin.ModelAdmin):
+    """采集分片租约管理"""
+    list_display = ['job', 'shard', 'owner', 'lease_expires_at', 'heartbeat_at', 'last_completed_at', 'last_symbols', 'last_failed']
+    list_filter = ['job']
+    search_fields = ['owner']
+    ordering = ['job', 'shard']
+
+
+@admin.register(MarketDataRawModel)
+class MarketDataRawAdmin(admin.ModelAdmin):
+    """行情原始数据管理"""
+    list_display = ['market_data', 'market_data_id']
+    search_fields = ['market_data__symbol']
+    raw_id_fields = ['market_data']
+
+
+@admin.register(IndicatorFeatureModel)
+class IndicatorFeatureAdmin(admin.ModelAdmin):
+    """技术指标特征管理"""
+    list_display = ['symbol', 'market', 'timestamp', 'close', 'rsi', 'macd_hist', 'atr', 'bars', 'updated_at']
+    list_filter = ['market']
+    search_fields = ['symbol']
+    ordering = ['market', 'symbol']
+    exclude = ['state']
@@ -0,0 +1,21 @@
+"""
+市场数据 WebSocket 推送
+Market data WebSocket consumers
+"""
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from services.data_collectors.bar_events import BARS_UPDATED_GROUP
+
+
+class MarketBarsConsumer(AsyncJsonWebsocketConsumer):
+    """K线更新推送：转发 collect_market_data --follow 广播的更新通知"""
+
+    async def connect(self):
+        await self.channel_layer.group_add(BARS_UPDATED_GROUP, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        await self.channel_layer.group_discard(BARS_UPDATED_GROUP, self.channel_name)
+
+    async def bars_updated(self, event):
+        await self.send_json({'type': 'bars_updated', 'bars': event['bars']})
@@ -0,0 +1,57 @@
+"""
+列式存储回填命令
+Backfill the columnar OHLCV store from market_data
+"""
+from django.core.management.base import BaseCommand
+from apps.market_data.models import MarketDataModel
+from services.data_collectors.columnar_store import get_columnar_store
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = '从 market_data 表回填列式行情存储'
+
+    COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'amount', 'change_pct', 'turnover_rate']
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--market',
+            type=str,
+            help='仅回填指定市场（默认全部）'
+        )
+        parser.add_argument(
+            '--symbols',
+            type=str,
+            help='仅回填指定标的，逗号分隔'
+        )
+
+    def handle(self, *args, **options):
+        queryset = MarketDataModel.objects.all()
+        if options.get('market'):
+            queryset = queryset.filter(market=options['market'])
+        if options.get('symbols'):
+            queryset = queryset.filter(symbol__in=[s.strip() for s in options['symbols'].split(',')])
+
+        store = get_columnar_store()
+        pairs = queryset.values_list('symbol', 'market').distinct().order_by('market', 'symbol')
+
+        total_rows = 0
+        total_symbols = 0
+        for symbol, market in pairs:
+            rows = queryset.filter(symbol=symbol, market=market).order_by('timestamp').values_list(*self.COLUMNS)
+            frame = pd.DataFrame.from_records(list(rows), columns=self.COLUMNS)
+            if frame.empty:
+                continue
+            try:
+                total_rows += store.write(symbol, market, frame)
+                total_symbols += 1
+            except Exception as e:
+                logger.error(f'Failed to backfill {symbol} ({market}): {e}')
+                self.stdout.write(self.style.ERROR(f'  ✗ {symbol}: {e}'))
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Backfilled {total_rows} rows for {total_symbols} symbols into {store.root}')
+        )
@@ -2,8 +2,15 @@
 市场数据采集命令
 Collect Market Data Command
 """
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
 from services.data_collectors.market_data_collector import MarketDataCollector
+from services.data_collectors.data_sources import DATA_SOURCES, get_data_source
+from services.data_collectors.bar_events import publish_bars_updated
+from services.data_collectors.market_overview import MarketOverviewCollector
+from services.data_collectors.sharding import ShardLeaseManager, partition_symbols
+from django.utils import timezone
+import time
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,9 +28,9 @@ class Command(BaseCommand):
         parser.add_argument(
             '--market',
             type=str,
-            choices=['A_STOCK', 'US_STOCK', 'ALPHAVANTAGE'],
+            choices=['A_STOCK', 'US_STOCK', 'ALPHAVANTAGE', *DATA_SOURCES],
             default='US_STOCK',
-            help='市场类型'
+            help='市场类型，LOCAL/SYNTHETIC 为离线数据源（未指定标的时采集数据源内全部标的）'
         )
         parser.add_argument(
             '--days',
@@ -31,65 +38,232 @@ class Command(BaseCommand):
             default=30,
             help='采集天数，默认30天'
         )
+        parser.add_argument(
+            '--interval',
+            type=str,
+            choices=['1d', '1m', '5m'],
+            default='1d',
+            help='K线周期：1d 日线；1m/5m 采集当日分钟K线并滚动更新日线（仅 A_STOCK/US_STOCK）'
+        )
         parser.add_argument(
             '--file',
             type=str,
             help='从文件读取股票代码列表（每行一个代码）'
         )
+        parser.add_argument(
+            '--source-dir',
+            type=str,
+            help='LOCAL 数据源的夹具目录（<symbol>.csv/.parquet），默认读取 DATA_SOURCE_OPTIONS'
+        )
+        parser.add_argument(
+            '--synthetic-symbols',
+            type=int,
+            help='SYNTHETIC 数据源生成的标的数量，默认读取 DATA_SOURCE_OPTIONS'
+        )
+        parser.add_argument(
+            '--snapshot',
+            action='store_true',
+            help='采集A股全市场快照（一次请求，更新每个标的当日K线），无需 --symbols'
+        )
+        parser.add_argument(
+            '--indices',
+            action='store_true',
+            help='采集主要指数、市场宽度（涨跌/涨停/跌停家数）与情绪指标，无需 --symbols'
+        )
+        parser.add_argument(
+            '--bulk',
+            action='store_true',
+            help='使用批量 upsert 写入（适合历史数据回填）'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='批量写入每块行数，默认1000'
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='按水位线增量采集，仅首次采集的标的使用 --days 窗口'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.AI_TRADER_CONFIG.get('COLLECT_WORKERS', 1),
+            help='并发采集线程数，默认读取 COLLECT_WORKERS'
+        )
+        parser.add_argument(
+            '--us-batch-size',
+            type=int,
+            default=settings.AI_TRADER_CONFIG.get('YFINANCE_BATCH_SIZE', 1),
+            help='美股批量下载时每次请求的标的数，<=1 逐个请求，默认读取 YFINANCE_BATCH_SIZE'
+        )
+        parser.add_argument(
+            '--rate-limit',
+            type=str,
+            help='各数据源每秒请求数，逗号分隔（如 akshare=5,yfinance=2）'
+        )
+        parser.add_argument(
+            '--max-concurrency',
+            type=str,
+            help='各数据源最大并发请求数，逗号分隔（如 akshare=4,alphavantage=1）'
+        )
+        parser.add_argument(
+            '--follow',
+            action='store_true',
+            help='持续采集：按 --cadence 周期刷新，只写入有变化的K线并广播更新通知（隐含 --incremental）'
+        )
+        parser.add_argument(
+            '--cadence',
+            type=int,
+            default=60,
+            help='持续采集的刷新周期（秒），默认60秒'
+        )
+        parser.add_argument(
+            '--universe-refresh',
+            type=int,
+            default=600,
+            help='持续采集时重新读取标的列表（--file 或数据源）的周期（秒），默认600秒'
+        )
+
+        parser.add_argument(
+            '--no-failover',
+            action='store_true',
+            help='只使用默认数据源，不按 SOURCE_ROUTING 自动切换'
+        )
+        parser.add_argument(
+            '--worker',
+            action='store_true',
+            help='分片采集进程：按代码哈希分片，通过租约表抢占分片并心跳续约，每个分片按 --cadence 周期采集（隐含 --incremental），可在多个进程/节点上同时运行'
+        )
+        parser.add_argument(
+            '--shards',
+            type=int,
+            default=settings.AI_TRADER_CONFIG.get('COLLECT_SHARDS', 16),
+            help='分片数，同一市场与K线周期的所有进程须一致，默认读取 COLLECT_SHARDS'
+        )
+        parser.add_argument(
+            '--lease',
+            type=int,
+            default=settings.AI_TRADER_CONFIG.get('SHARD_LEASE_SECONDS', 120),
+            help='分片租约时长（秒），超时未续约的分片由其他进程接管，默认读取 SHARD_LEASE_SECONDS'
+        )
+        parser.add_argument(
+            '--worker-id',
+            type=str,
+            help='租约持有者标识，默认 主机名:进程号:随机后缀'
+        )
 
     def handle(self, *args, **options):
-        symbols_str = options.get('symbols')
         market = options['market']
         days = options['days']
-        file_path = options.get('file')
+        follow = options['follow']
+        worker = options['worker']
         
-        # 获取股票代码列表
-        symbols = []
-        if symbols_str:
-            symbols = [s.strip() for s in symbols_str.split(',')]
-        elif file_path:
-            try:
-                with open(file_path, 'r') as f:
-                    symbols = [line.strip() for line in f if line.strip()]
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f'Failed to read file: {e}'))
-                return
-        else:
-            self.stdout.write(self.style.ERROR('Please provide --symbols or --file'))
-            return
+        if worker and (options['snapshot'] or options['indices']):
+            raise CommandError('--worker collects symbol shards and cannot be combined with --snapshot/--indices')
+        if worker and options['shards'] < 1:
+            raise CommandError('--shards must be >= 1')
         
-        if not symbols:
-            self.stdout.write(self.style.ERROR('No symbols provided'))
+        if options['snapshot'] and not follow:
+            self._collect_snapshot()
+            return
+        if options['indices'] and not follow:
+            self._collect_indices(MarketOverviewCollector())
             return
         
-        self.stdout.write(
-            self.style.SUCCESS(
-                f'Starting data collection for {len(symbols)} symbols in {market} market'
+        sources = self._build_sources(options)
+        symbols = []
+        if not options['snapshot'] and not options['indices']:
+            symbols = self._load_symbols(options, sources)
+            if not symbols:
+                return
+            
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'Starting data collection for {len(symbols)} symbols in {market} market'
+                )
             )
-        )
+        
+        # 数据源限流配置
+        source_limits = {}
+        for option, key in (('rate_limit', 'rate'), ('max_concurrency', 'max_concurrency')):
+            for source, value in self._parse_source_values(options.get(option)).items():
+                source_limits.setdefault(source, {})[key] = value
         
         # 执行采集
-        collector = MarketDataCollector()
+        collector = MarketDataCollector(
+            bulk=options['bulk'],
+            chunk_size=options['chunk_size'],
+            source_limits=source_limits,
+            incremental=options['incremental'] or follow or worker,
+            us_batch_size=options['us_batch_size'],
+            sources=sources,
+            skip_unchanged=follow or worker,
+            failover=not options['no_failover']
+        )
+        
+        if worker:
+            self._work(collector, symbols, sources, options)
+            return
+        if follow:
+            self._follow(collector, symbols, sources, options)
+            return
         
         try:
-            results = collector.batch_collect(symbols, market)
+            results = collector.batch_collect(
+                symbols, market, days=days, workers=options['workers'], interval=options['interval']
+            )
+            write_stats = results.get('write_stats', {})
             
             self.stdout.write(
                 self.style.SUCCESS(
                     f'\nCollection completed!\n'
                     f'Success: {results["success_count"]}\n'
                     f'Failed: {results["fail_count"]}\n'
-                    f'Total records: {results["total_records"]}'
+                    f'Up to date (skipped): {results["skipped_count"]}\n'
+                    f'Total records: {results["total_records"]}\n'
+                    f'Inserted: {write_stats.get("inserted", 0)}, '
+                    f'Updated: {write_stats.get("updated", 0)}\n'
+                    f'Throughput: {results["rows_per_sec"]} rows/sec '
+                    f'(write only: {write_stats.get("rows_per_sec", 0)} rows/sec)'
                 )
             )
             
+            for source, stats in results.get('source_stats', {}).items():
+                self.stdout.write(
+                    f'  [{source}] {stats["requests"]} requests, '
+                    f'throttled {stats["total_wait"]}s'
+                )
+            
+            for host, stats in results.get('http_stats', {}).items():
+                self.stdout.write(
+                    f'  [{host}] {stats["requests"]} requests over {stats["connections"]} connections '
+                    f'({stats["reused"]} reused), retries {stats["retries"]}, '
+                    f'rate limited {stats["rate_limited"]}, avg {stats["avg_latency"]}s'
+                )
+            
+            for source, stats in results.get('route_stats', {}).items():
+                self.stdout.write(
+                    f'  [route {source}] served {stats["served"]}, failures {stats["failures"]}, '
+                    f'throttled {stats["throttled"]}, avg {stats["avg_latency"]}s, '
+                    f'error rate {stats["error_rate"]}, disagreement {stats["disagreement"]}'
+                    f'{", cooling " + str(stats["cooling"]) + "s" if stats["cooling"] else ""}'
+                )
+            
+            self._write_quality(results.get('quality'))
+
             # 显示详细结果
             for detail in results['details']:
                 symbol = detail['symbol']
                 result = detail['result']
                 if result.get('success'):
+                    source = f' via {result["source"]}' if result.get('source') else ''
                     self.stdout.write(
-                        self.style.SUCCESS(f'  ✓ {symbol}: {result.get("count", 0)} records')
+                        self.style.SUCCESS(
+                            f'  ✓ {symbol}: {result.get("count", 0)} records '
+                            f'(inserted {result.get("inserted", 0)}, updated {result.get("updated", 0)}){source}'
+                        )
                     )
                 else:
                     error = result.get('error', 'Unknown error')
@@ -101,4 +275,244 @@ class Command(BaseCommand):
             logger.error(f'Data collection failed: {e}')
             self.stdout.write(self.style.ERROR(f'Data collection failed: {e}'))
             raise
-
+    
+    def _build_sources(self, options) -> dict:
+        """构建离线数据源（--market LOCAL/SYNTHETIC）"""
+        market = options['market']
+        if market not in DATA_SOURCES:
+            return {}
+        source_options = {}
+        if market == 'LOCAL' and options.get('source_dir'):
+            source_options['root'] = options['source_dir']
+        if market == 'SYNTHETIC' and options.get('synthetic_symbols'):
+            source_options['symbols'] = options['synthetic_symbols']
+        return {market: get_data_source(market, **source_options)}
+    
+    def _load_symbols(self, options, sources: dict) -> list:
+        """读取标的列表（--symbols / --file / 离线数据源），失败时返回空列表"""
+        symbols_str = options.get('symbols')
+        file_path = options.get('file')
+        
+        symbols = []
+        if symbols_str:
+            symbols = [s.strip() for s in symbols_str.split(',')]
+        elif file_path:
+            try:
+                with open(file_path, 'r') as f:
+                    symbols = [line.strip() for line in f if line.strip()]
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'Failed to read file: {e}'))
+                return []
+        elif sources:
+            symbols = sources[options['market']].list_symbols()
+        else:
+            self.stdout.write(self.style.ERROR('Please provide --symbols or --file'))
+            return []
+        
+        if not symbols:
+            self.stdout.write(self.style.ERROR('No symbols provided'))
+        return symbols
+    
+    def _follow(self, collector: MarketDataCollector, symbols: list, sources: dict, options):
+        """持续采集：复用同一个采集器（HTTP 连接池、数据源会话保持），每周期广播更新的K线"""
+        market = options['market']
+        cadence = options['cadence']
+        if options['indices']:
+            target = 'market indices'
+        elif options['snapshot']:
+            target = 'A-stock snapshot'
+        else:
+            target = f'{len(symbols)} symbols in {market} market'
+        overview = MarketOverviewCollector(limiters=collector.limiters) if options['indices'] else None
+        self.stdout.write(self.style.SUCCESS(f'Following {target} every {cadence}s (Ctrl+C to stop)'))
+        
+        refreshed_at = time.monotonic()
+        try:
+            while True:
+                started = time.monotonic()
+                try:
+                    # 定期刷新标的列表（文件或数据源可能已变化），读取失败时沿用旧列表
+                    if symbols and started - refreshed_at >= options['universe_refresh']:
+                        symbols = self._load_symbols(options, sources) or symbols
+                        refreshed_at = started
+                    
+                    if overview is not None:
+                        self._collect_indices(overview)
+                    else:
+                        self._follow_bars(collector, symbols, options, started)
+                except Exception as e:
+                    logger.error(f'Follow cycle failed: {e}')
+                    self.stdout.write(self.style.ERROR(f'Follow cycle failed: {e}'))
+                
+                time.sleep(max(0, cadence - (time.monotonic() - started)))
+                
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\nFollow mode stopped'))
+    
+    def _follow_bars(self, collector: MarketDataCollector, symbols: list, options, started: float):
+        """持续采集的一个周期：采集K线并广播更新通知"""
+        if options['snapshot']:
+            result = collector.collect_a_stock_snapshot()
+            updated_bars = result.get('updated_bars', [])
+            failed = 0 if result.get('success') else 1
+        else:
+            results = collector.batch_collect(
+                symbols, options['market'], days=options['days'],
+                workers=options['workers'], interval=options['interval']
+            )
+            updated_bars = results['updated_bars']
+            failed = results['fail_count']
+        
+        published = publish_bars_updated(updated_bars)
+        self.stdout.write(
+            f'[{timezone.localtime():%H:%M:%S}] {len(updated_bars)} bars updated'
+            f'{" (published)" if published else ""}, {failed} failed, '
+            f'{time.monotonic() - started:.1f}s'
+        )
+    
+    def _work(self, collector: MarketDataCollector, symbols: list, sources: dict, options):
+        """分片采集进程：循环抢占到期分片，采集其中的标的后释放租约"""
+        market = options['market']
+        leases = ShardLeaseManager(
+            f'{market}:{options["interval"]}',
+            options['shards'],
+            lease_seconds=options['lease'],
+            cadence=options['cadence'],
+            worker_id=options['worker_id']
+        )
+        leases.ensure_shards()
+        shards = partition_symbols(symbols, options['shards'])
+        # 没有到期分片时的轮询间隔
+        idle = max(1, min(options['cadence'], 5))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Worker {leases.worker_id} collecting {len(symbols)} symbols in {market} market '
+                f'across {options["shards"]} shards every {options["cadence"]}s (Ctrl+C to stop)'
+            )
+        )
+        
+        refreshed_at = time.monotonic()
+        try:
+            while True:
+                now = time.monotonic()
+                if now - refreshed_at >= options['universe_refresh']:
+                    symbols = self._load_symbols(options, sources) or symbols
+                    shards = partition_symbols(symbols, options['shards'])
+                    refreshed_at = now
+                
+                try:
+                    shard = leases.claim()
+                except Exception as e:
+                    logger.error(f'Failed to claim shard: {e}')
+                    shard = None
+                if shard is None:
+                    time.sleep(idle)
+                    continue
+                
+                self._collect_shard(collector, leases, shard, shards[shard], options)
+                
+        except KeyboardInterrupt:
+            leases.release_all()
+            self.stdout.write(self.style.WARNING('\nWorker stopped, leases released'))
+    
+    def _collect_shard(self, collector: MarketDataCollector, leases: ShardLeaseManager, shard: int, symbols: list, options):
+        """采集一个分片并释放租约；失去租约时不记录完成状态，由接管的进程完成本轮"""
+        started = time.monotonic()
+        stats = {'symbols': len(symbols), 'records': 0, 'failed': 0}
+        updated_bars = []
+        try:
+            if symbols:
+                with leases.heartbeat(shard) as lost:
+                    results = collector.batch_collect(
+                        symbols, options['market'], days=options['days'],
+                        workers=options['workers'], interval=options['interval']
+                    )
+                stats.update(records=results['total_records'], failed=results['fail_count'])
+                updated_bars = results['updated_bars']
+                if lost.is_set():
+                    stats = None
+        except Exception as e:
+            # 整个分片失败时仍记录完成状态，按 cadence 重试而不是立即被反复抢占
+            logger.error(f'Shard {leases.job}#{shard} failed: {e}')
+            self.stdout.write(self.style.ERROR(f'Shard {shard} failed: {e}'))
+            stats['failed'] = len(symbols)
+        
+        if stats is not None:
+            stats['elapsed'] = round(time.monotonic() - started, 2)
+        released = leases.release(shard, stats)
+        published = publish_bars_updated(updated_bars)
+        lease_note = '' if released else ', lease lost'
+        self.stdout.write(
+            f'[{timezone.localtime():%H:%M:%S}] shard {shard}: {len(symbols)} symbols, '
+            f'{len(updated_bars)} bars updated{" (published)" if published else ""}, '
+            f'{stats["failed"] if stats else "-"} failed, {time.monotonic() - started:.1f}s{lease_note}'
+        )
+    
+    def _collect_snapshot(self):
+        """采集A股全市场快照"""
+        result = MarketDataCollector().collect_a_stock_snapshot()
+        if result.get('skipped'):
+            self.stdout.write(self.style.WARNING('Snapshot skipped: A-share market is not in session'))
+        elif result.get('success'):
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'Snapshot completed: {result["symbols"]} symbols, '
+                    f'inserted {result["inserted"]}, updated {result["updated"]}, '
+                    f'{result["rows_per_sec"]} rows/sec'
+                )
+            )
+            self._write_quality(result.get('quality'))
+        else:
+            self.stdout.write(self.style.ERROR(f'Snapshot failed: {result.get("error", "no data")}'))
+    
+    def _write_quality(self, quality):
+        """输出数据质量摘要"""
+        if not quality:
+            return
+        issues = ', '.join(f'{check} {count}' for check, count in quality['issues'].items()) or 'none'
+        style = self.style.WARNING if quality['rows_quarantined'] else self.style.SUCCESS
+        self.stdout.write(
+            style(
+                f'Data quality: {quality["rows_checked"]} rows checked, '
+                f'{quality["rows_quarantined"]} quarantined, issues: {issues} '
+                f'({quality["elapsed"]}s)'
+            )
+        )
+    
+    def _collect_indices(self, overview: MarketOverviewCollector):
+        """采集主要指数、市场宽度与情绪指标"""
+        result = overview.collect()
+        for error in result['errors']:
+            self.stdout.write(self.style.WARNING(f'  ! {error}'))
+        if result['success'] and result['session'] is None:
+            self.stdout.write(
+                f'A-stock market is not in session, skipping A-stock indices and sentiment '
+                f'({result["indices"]} US indices collected)'
+            )
+        elif result['success']:
+            breadth = result['breadth']
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'Indices collected: {result["indices"]} indices, '
+                    f'breadth up {breadth.get("rise_count", "-")} / down {breadth.get("fall_count", "-")} '
+                    f'(limit up {breadth.get("limit_up_count", "-")}, limit down {breadth.get("limit_down_count", "-")}), '
+                    f'sentiment {"saved" if result["sentiment"] else "unavailable"}'
+                )
+            )
+        else:
+            self.stdout.write(self.style.ERROR('Index collection failed'))
+    
+    def _parse_source_values(self, value: str) -> dict:
+        """解析 'akshare=5,yfinance=2' 形式的数据源参数"""
+        parsed = {}
+        if not value:
+            return parsed
+        for item in value.split(','):
+            source, sep, number = item.partition('=')
+            if not sep or not source.strip():
+                raise CommandError(f'Invalid source setting: {item}')
+            try:
+                parsed[source.strip()] = float(number)
+            except ValueError:
+                raise CommandError(f'Invalid source setting: {item}')
+        return parsed
@@ -0,0 +1,74 @@
+"""
+原始数据压缩命令
+Compact market_data raw payloads according to RAW_PAYLOAD_POLICY
+"""
+from django.core.management.base import BaseCommand
+from services.data_collectors.raw_payload import RAW_POLICIES
+from services.maintenance.raw_compaction import RawPayloadCompactor
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = '按 RAW_PAYLOAD_POLICY 迁移已有行情的原始数据（丢弃/压缩/移至旁路表）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--policy',
+            type=str,
+            choices=RAW_POLICIES,
+            help='目标策略，默认读取 RAW_PAYLOAD_POLICY'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='每个事务处理的行数，默认2000'
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.0,
+            help='每块之间的停顿秒数，降低对在线读写的影响'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='只统计需要迁移的行数，不做修改'
+        )
+
+    def handle(self, *args, **options):
+        compactor = RawPayloadCompactor(
+            policy=options['policy'],
+            chunk_size=options['chunk_size'],
+            pause=options['pause'],
+            dry_run=options['dry_run']
+        )
+
+        try:
+            report = compactor.run()
+        except Exception as e:
+            logger.error(f'Raw payload compaction failed: {e}')
+            self.stdout.write(self.style.ERROR(f'Raw payload compaction failed: {e}'))
+            raise
+
+        verb = 'Would compact' if options['dry_run'] else 'Compacted'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{verb} {report["rows"]} rows to policy "{report["policy"]}" in {report["elapsed"]}s; '
+                f'market_data payload ~{self._format_bytes(report["heap_bytes_before"])} '
+                f'-> ~{self._format_bytes(report["heap_bytes_after"])}'
+            )
+        )
+        if report['rows'] and not options['dry_run']:
+            self.stdout.write('Run VACUUM FULL market_data (PostgreSQL) or VACUUM (SQLite) to return freed pages to the operating system.')
+
+    @staticmethod
+    def _format_bytes(size) -> str:
+        size = float(size or 0)
+        for unit in ('B', 'KB', 'MB', 'GB'):
+            if size < 1024:
+                return f'{size:.1f}{unit}'
+            size /= 1024
+        return f'{size:.1f}TB'
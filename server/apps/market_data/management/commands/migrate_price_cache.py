@@ -0,0 +1,66 @@
+"""
+价格缓存迁移命令
+Migrate daily_prices_{symbol}.json files into the columnar price cache
+"""
+from django.core.management.base import BaseCommand
+from services.data_collectors.market_data_collector import MarketDataCollector
+from services.data_collectors.normalizers import normalize_alphavantage_daily
+import glob
+import json
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = '将 daily_prices_{symbol}.json 缓存一次性迁移为列式价格缓存'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--delete',
+            action='store_true',
+            help='迁移成功后删除原 JSON 文件'
+        )
+
+    def handle(self, *args, **options):
+        collector = MarketDataCollector()
+        pattern = os.path.join(collector.data_dir, 'daily_prices_*.json')
+        files = sorted(glob.glob(pattern))
+
+        if not files:
+            self.stdout.write(self.style.WARNING(f'No JSON cache files found in {collector.data_dir}'))
+            return
+
+        migrated = 0
+        total_rows = 0
+        for filepath in files:
+            symbol = os.path.basename(filepath)[len('daily_prices_'):-len('.json')]
+            try:
+                with open(filepath, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+
+                time_series = data.get('Time Series (Daily)', {})
+                if not time_series:
+                    self.stdout.write(self.style.WARNING(f'  - {symbol}: empty time series, skipped'))
+                    continue
+
+                frame = normalize_alphavantage_daily(time_series)
+                rows = collector.price_cache.write(symbol, collector._determine_market(symbol), frame)
+                total_rows += rows
+                migrated += 1
+
+                if options['delete']:
+                    os.remove(filepath)
+
+                self.stdout.write(self.style.SUCCESS(f'  ✓ {symbol}: {rows} rows'))
+
+            except Exception as e:
+                logger.error(f'Failed to migrate {filepath}: {e}')
+                self.stdout.write(self.style.ERROR(f'  ✗ {symbol}: {e}'))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Migrated {migrated}/{len(files)} files, {total_rows} rows into {collector.price_cache.root}'
+            )
+        )
@@ -0,0 +1,94 @@
+"""
+标的池同步命令
+Sync StockInfoModel with per-market universe metadata
+"""
+from django.core.management.base import BaseCommand, CommandError
+from services.data_collectors.universe import UniverseFetcher, sync_universe
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = '同步标的池（名称、行业、板块、上市日期、估值）到 stock_info，只写入有变化的行'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--market',
+            type=str,
+            choices=['A_STOCK', 'US_STOCK'],
+            default='A_STOCK',
+            help='市场类型，默认 A_STOCK（全市场）；US_STOCK 需提供 --symbols 或 --file'
+        )
+        parser.add_argument(
+            '--symbols',
+            type=str,
+            help='美股代码列表，逗号分隔'
+        )
+        parser.add_argument(
+            '--file',
+            type=str,
+            help='从文件读取美股代码列表（每行一个代码）'
+        )
+        parser.add_argument(
+            '--csv',
+            type=str,
+            help='从本地 CSV 导入标的元数据（symbol,name[,industry,sector,list_date,market_cap,pe_ratio,pb_ratio]），不请求数据源'
+        )
+        parser.add_argument(
+            '--skip-industries',
+            action='store_true',
+            help='A股不拉取行业板块成分（节省约90次请求）'
+        )
+        parser.add_argument(
+            '--deactivate-missing',
+            action='store_true',
+            help='将该市场中本次未出现的标的标记为不活跃（A股全市场同步时默认开启）'
+        )
+
+    def handle(self, *args, **options):
+        market = options['market']
+        fetcher = UniverseFetcher()
+        deactivate = options['deactivate_missing']
+        
+        try:
+            if options['csv']:
+                frame = fetcher.read_csv(options['csv'], market)
+            elif market == 'A_STOCK':
+                frame = fetcher.fetch_a_stock(industries=not options['skip_industries'])
+                deactivate = True
+            else:
+                frame = fetcher.fetch_us_stock(self._load_symbols(options))
+        except CommandError:
+            raise
+        except Exception as e:
+            logger.error(f'Universe fetch failed: {e}')
+            self.stdout.write(self.style.ERROR(f'Universe fetch failed: {e}'))
+            raise
+        
+        for error in fetcher.errors:
+            self.stdout.write(self.style.WARNING(f'  ! {error}'))
+        if frame.empty:
+            self.stdout.write(self.style.ERROR('No universe data fetched'))
+            return
+        
+        stats = sync_universe(frame, market, deactivate_missing=deactivate)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Universe synced for {market}: {stats["fetched"]} symbols, '
+                f'created {stats["created"]}, updated {stats["updated"]}, unchanged {stats["unchanged"]}, '
+                f'deactivated {stats["deactivated"]} ({stats["elapsed"]}s)'
+            )
+        )
+    
+    def _load_symbols(self, options) -> list:
+        """读取美股代码列表"""
+        if options.get('symbols'):
+            return [s.strip() for s in options['symbols'].split(',') if s.strip()]
+        if options.get('file'):
+            try:
+                with open(options['file'], 'r') as f:
+                    return [line.strip() for line in f if line.strip()]
+            except OSError as e:
+                raise CommandError(f'Failed to read file: {e}')
+        raise CommandError('US_STOCK universe sync requires --symbols, --file or --csv')
@@ -0,0 +1,56 @@
+"""
+技术指标更新命令
+Update the indicator feature table incrementally or recompute it in batch
+"""
+from django.core.management.base import BaseCommand
+from apps.market_data.models import MarketDataModel
+from services.analysis.indicators import IndicatorEngine
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = '更新技术指标特征表（默认只处理新K线；--recompute 向量化重算历史）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--market',
+            type=str,
+            choices=[market for market, _ in MarketDataModel.MARKET_CHOICES],
+            help='市场类型，默认全部'
+        )
+        parser.add_argument(
+            '--recompute',
+            action='store_true',
+            help='按最近 history_bars 根前复权K线批量重算（回补历史、修改指标参数或补录除权事件后使用）'
+        )
+        parser.add_argument(
+            '--symbols',
+            type=str,
+            help='只重算这些标的，逗号分隔（配合 --recompute）'
+        )
+
+    def handle(self, *args, **options):
+        engine = IndicatorEngine()
+        markets = [options['market']] if options['market'] else None
+        symbols = [s.strip() for s in options['symbols'].split(',') if s.strip()] if options['symbols'] else None
+        
+        try:
+            if options['recompute'] or symbols:
+                report = engine.recompute(symbols, markets=markets)
+                self.stdout.write(
+                    self.style.SUCCESS(f'Recomputed indicators for {report["symbols"]} symbols in {report["elapsed"]}s')
+                )
+            else:
+                report = engine.update(options['market'])
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f'Updated indicators for {report["symbols"]} symbols from {report.get("bars", 0)} bars, '
+                        f'{report["recomputed"]} recomputed in {report["elapsed"]}s'
+                    )
+                )
+        except Exception as e:
+            logger.error(f'Indicator update failed: {e}')
+            self.stdout.write(self.style.ERROR(f'Indicator update failed: {e}'))
+            raise
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-17 04:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market_data', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CollectionWatermarkModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=50, verbose_name='标的代码')),
+                ('market', models.CharField(max_length=20, verbose_name='市场类型')),
+                ('data_source', models.CharField(max_length=50, verbose_name='数据源')),
+                ('last_timestamp', models.DateTimeField(verbose_name='最后入库时间戳')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '采集水位线',
+                'verbose_name_plural': '采集水位线',
+                'db_table': 'collection_watermark',
+                'unique_together': {('symbol', 'market', 'data_source')},
+            },
+        ),
+    ]
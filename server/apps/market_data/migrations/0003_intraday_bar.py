@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-17 04:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market_data', '0002_collection_watermark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IntradayBarModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=50, verbose_name='标的代码')),
+                ('market', models.CharField(max_length=20, verbose_name='市场类型')),
+                ('interval', models.CharField(choices=[('1m', '1分钟'), ('5m', '5分钟')], max_length=4, verbose_name='周期')),
+                ('timestamp', models.DateTimeField(verbose_name='K线开始时间')),
+                ('open', models.FloatField(verbose_name='开盘价')),
+                ('high', models.FloatField(verbose_name='最高价')),
+                ('low', models.FloatField(verbose_name='最低价')),
+                ('close', models.FloatField(verbose_name='收盘价')),
+                ('volume', models.BigIntegerField(verbose_name='成交量')),
+                ('amount', models.FloatField(blank=True, null=True, verbose_name='成交额')),
+                ('data_source', models.CharField(default='unknown', max_length=50, verbose_name='数据源')),
+            ],
+            options={
+                'verbose_name': '分钟K线',
+                'verbose_name_plural': '分钟K线',
+                'db_table': 'intraday_bar',
+                'indexes': [models.Index(fields=['symbol', 'interval', '-timestamp'], name='intraday_ba_symbol_5fa183_idx'), models.Index(fields=['interval', '-timestamp'], name='intraday_ba_interva_9c499f_idx')],
+                'unique_together': {('symbol', 'market', 'interval', 'timestamp')},
+            },
+        ),
+    ]
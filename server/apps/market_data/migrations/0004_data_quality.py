@@ -0,0 +1,52 @@
+# Generated by Django 4.2.30 on 2026-10-17 04:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market_data', '0003_intraday_bar'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataQualityReportModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(db_index=True, max_length=50, verbose_name='采集范围')),
+                ('rows_checked', models.IntegerField(default=0, verbose_name='检查行数')),
+                ('rows_quarantined', models.IntegerField(default=0, verbose_name='隔离行数')),
+                ('issues', models.JSONField(blank=True, default=dict, verbose_name='各检查项问题数')),
+                ('symbols', models.JSONField(blank=True, default=dict, verbose_name='问题标的明细')),
+                ('elapsed', models.FloatField(default=0, verbose_name='校验耗时(秒)')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='创建时间')),
+            ],
+            options={
+                'verbose_name': '数据质量报告',
+                'verbose_name_plural': '数据质量报告',
+                'db_table': 'data_quality_report',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='QuarantinedBarModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=50, verbose_name='标的代码')),
+                ('market', models.CharField(max_length=20, verbose_name='市场类型')),
+                ('timestamp', models.DateTimeField(verbose_name='时间戳')),
+                ('data_source', models.CharField(max_length=50, verbose_name='数据源')),
+                ('reasons', models.JSONField(default=list, verbose_name='未通过的检查项')),
+                ('payload', models.JSONField(default=dict, verbose_name='原始K线')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+            ],
+            options={
+                'verbose_name': '隔离K线',
+                'verbose_name_plural': '隔离K线',
+                'db_table': 'quarantined_bar',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['symbol', 'market', '-timestamp'], name='quarantined_symbol_477fc2_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-17 04:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market_data', '0004_data_quality'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarketDataRollupModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=50, verbose_name='标的代码')),
+                ('market', models.CharField(max_length=20, verbose_name='市场类型')),
+                ('period', models.CharField(choices=[('week', '周'), ('month', '月')], max_length=10, verbose_name='聚合周期')),
+                ('period_start', models.DateTimeField(verbose_name='周期开始日期')),
+                ('open', models.DecimalField(decimal_places=6, max_digits=20, verbose_name='开盘价')),
+                ('high', models.DecimalField(decimal_places=6, max_digits=20, verbose_name='最高价')),
+                ('low', models.DecimalField(decimal_places=6, max_digits=20, verbose_name='最低价')),
+                ('close', models.DecimalField(decimal_places=6, max_digits=20, verbose_name='收盘价')),
+                ('volume', models.BigIntegerField(verbose_name='成交量')),
+                ('amount', models.DecimalField(blank=True, decimal_places=2, max_digits=30, null=True, verbose_name='成交额')),
+                ('bar_count', models.IntegerField(default=0, verbose_name='日线数量')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '行情周/月聚合',
+                'verbose_name_plural': '行情周/月聚合',
+                'db_table': 'market_data_rollup',
+                'ordering': ['-period_start'],
+                'indexes': [models.Index(fields=['period', 'period_start'], name='market_data_period_9b5ca0_idx')],
+                'unique_together': {('symbol', 'market', 'period', 'period_start')},
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-17 04:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market_data', '0005_market_data_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarketIndexLatestModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index_code', models.CharField(max_length=50, unique=True, verbose_name='指数代码')),
+                ('index_name', models.CharField(max_length=100, verbose_name='指数名称')),
+                ('market', models.CharField(max_length=20, verbose_name='市场类型')),
+                ('timestamp', models.DateTimeField(verbose_name='时间戳')),
+                ('value', models.DecimalField(decimal_places=4, max_digits=20, verbose_name='指数值')),
+                ('change_pct', models.DecimalField(decimal_places=4, max_digits=10, verbose_name='涨跌幅')),
+                ('rise_count', models.IntegerField(blank=True, null=True, verbose_name='上涨家数')),
+                ('fall_count', models.IntegerField(blank=True, null=True, verbose_name='下跌家数')),
+                ('limit_up_count', models.IntegerField(blank=True, null=True, verbose_name='涨停家数')),
+                ('limit_down_count', models.IntegerField(blank=True, null=True, verbose_name='跌停家数')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '指数最新数据',
+                'verbose_name_plural': '指数最新数据',
+                'db_table': 'market_index_latest',
+                'ordering': ['market', 'index_code'],
+            },
+        ),
+    ]
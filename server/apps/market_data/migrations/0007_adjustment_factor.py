@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-17 04:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market_data', '0006_market_index_latest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdjustmentFactorModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=50, verbose_name='标的代码')),
+                ('market', models.CharField(max_length=20, verbose_name='市场类型')),
+                ('ex_date', models.DateTimeField(verbose_name='除权除息日')),
+                ('ratio', models.FloatField(verbose_name='复权比例')),
+                ('source', models.CharField(default='derived', max_length=50, verbose_name='来源')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+            ],
+            options={
+                'verbose_name': '复权因子',
+                'verbose_name_plural': '复权因子',
+                'db_table': 'adjustment_factor',
+                'ordering': ['symbol', 'ex_date'],
+                'unique_together': {('symbol', 'market', 'ex_date')},
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-17 04:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market_data', '0007_adjustment_factor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CollectionShardModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job', models.CharField(max_length=50, verbose_name='采集任务')),
+                ('shard', models.IntegerField(verbose_name='分片序号')),
+                ('owner', models.CharField(blank=True, max_length=200, null=True, verbose_name='租约持有者')),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True, verbose_name='租约到期时间')),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True, verbose_name='最后心跳时间')),
+                ('last_completed_at', models.DateTimeField(blank=True, null=True, verbose_name='最后完成时间')),
+                ('last_symbols', models.IntegerField(default=0, verbose_name='最后一轮标的数')),
+                ('last_records', models.IntegerField(default=0, verbose_name='最后一轮记录数')),
+                ('last_failed', models.IntegerField(default=0, verbose_name='最后一轮失败数')),
+                ('last_elapsed', models.FloatField(blank=True, null=True, verbose_name='最后一轮耗时(秒)')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '采集分片',
+                'verbose_name_plural': '采集分片',
+                'db_table': 'collection_shard',
+                'ordering': ['job', 'shard'],
+                'unique_together': {('job', 'shard')},
+            },
+        ),
+    ]
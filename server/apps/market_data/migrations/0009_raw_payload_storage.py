@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-17 04:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market_data', '0008_collection_shard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarketDataRawModel',
+            fields=[
+                ('market_data', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='raw_payload', serialize=False, to='market_data.marketdatamodel', verbose_name='行情数据')),
+                ('payload', models.JSONField(default=dict, verbose_name='原始数据')),
+            ],
+            options={
+                'verbose_name': '行情原始数据',
+                'verbose_name_plural': '行情原始数据',
+                'db_table': 'market_data_raw',
+            },
+        ),
+        migrations.AddField(
+            model_name='marketdatamodel',
+            name='raw_blob',
+            field=models.BinaryField(blank=True, null=True, verbose_name='原始数据（压缩）'),
+        ),
+    ]
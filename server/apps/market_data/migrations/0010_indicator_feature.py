@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-17 04:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market_data', '0009_raw_payload_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndicatorFeatureModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=50, verbose_name='标的代码')),
+                ('market', models.CharField(db_index=True, max_length=20, verbose_name='市场类型')),
+                ('timestamp', models.DateTimeField(db_index=True, verbose_name='K线时间戳')),
+                ('bars', models.IntegerField(default=0, verbose_name='参与计算的K线数')),
+                ('close', models.FloatField(verbose_name='收盘价')),
+                ('ema_fast', models.FloatField(blank=True, null=True, verbose_name='快速EMA')),
+                ('ema_slow', models.FloatField(blank=True, null=True, verbose_name='慢速EMA')),
+                ('macd', models.FloatField(blank=True, null=True, verbose_name='MACD')),
+                ('macd_signal', models.FloatField(blank=True, null=True, verbose_name='MACD信号线')),
+                ('macd_hist', models.FloatField(blank=True, null=True, verbose_name='MACD柱')),
+                ('rsi', models.FloatField(blank=True, null=True, verbose_name='RSI')),
+                ('atr', models.FloatField(blank=True, null=True, verbose_name='ATR')),
+                ('boll_mid', models.FloatField(blank=True, null=True, verbose_name='布林中轨')),
+                ('boll_upper', models.FloatField(blank=True, null=True, verbose_name='布林上轨')),
+                ('boll_lower', models.FloatField(blank=True, null=True, verbose_name='布林下轨')),
+                ('state', models.JSONField(blank=True, default=dict, verbose_name='流式状态')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '技术指标特征',
+                'verbose_name_plural': '技术指标特征',
+                'db_table': 'indicator_feature',
+                'ordering': ['market', 'symbol'],
+                'unique_together': {('symbol', 'market')},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-17 05:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market_data', '0010_indicator_feature'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='marketdatamodel',
+            index=models.Index(fields=['market', 'updated_at'], name='market_data_market_b55074_idx'),
+        ),
+    ]
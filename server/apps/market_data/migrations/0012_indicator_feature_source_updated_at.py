@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 05:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market_data', '0011_market_data_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='indicatorfeaturemodel',
+            name='source_updated_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='已消费行情的更新时间'),
+        ),
+    ]
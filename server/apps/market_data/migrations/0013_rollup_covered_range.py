@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-17 05:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market_data', '0012_indicator_feature_source_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='marketdatarollupmodel',
+            name='first_bar',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='已并入的首根日线'),
+        ),
+        migrations.AddField(
+            model_name='marketdatarollupmodel',
+            name='last_bar',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='已并入的末根日线'),
+        ),
+    ]
@@ -33,6 +33,8 @@ class MarketDataModel(models.Model):
     # 元数据
     data_source = models.CharField(max_length=50, default='unknown', verbose_name='数据源')
     raw_data = JSONField(default=dict, blank=True, verbose_name='原始数据')
+    # RAW_PAYLOAD_POLICY=compress 时原始数据以 zlib 压缩 JSON 保存在此列，raw_data 置空
+    raw_blob = models.BinaryField(null=True, blank=True, verbose_name='原始数据（压缩）')
     
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
@@ -44,6 +46,8 @@ class MarketDataModel(models.Model):
         indexes = [
             models.Index(fields=['symbol', 'market', '-timestamp']),
             models.Index(fields=['market', '-timestamp']),
+            # 增量消费者（异常检测、技术指标）按市场读取更新时间游标之后的行
+            models.Index(fields=['market', 'updated_at']),
         ]
         verbose_name = '市场行情数据'
         verbose_name_plural = verbose_name
@@ -81,6 +85,39 @@ class MarketIndexModel(models.Model):
         return f"{self.index_name} - {self.timestamp}"
 
 
+class MarketIndexLatestModel(models.Model):
+    """
+    各指数最新一条数据
+    
+    指数采集器在写入 market_index 历史的同时 upsert 本表，每个指数一行，
+    感知层直接读取，无需在历史表上按 index_code 去重扫描。
+    """
+    
+    index_code = models.CharField(max_length=50, unique=True, verbose_name='指数代码')
+    index_name = models.CharField(max_length=100, verbose_name='指数名称')
+    market = models.CharField(max_length=20, verbose_name='市场类型')
+    timestamp = models.DateTimeField(verbose_name='时间戳')
+    
+    value = models.DecimalField(max_digits=20, decimal_places=4, verbose_name='指数值')
+    change_pct = models.DecimalField(max_digits=10, decimal_places=4, verbose_name='涨跌幅')
+    
+    rise_count = models.IntegerField(null=True, blank=True, verbose_name='上涨家数')
+    fall_count = models.IntegerField(null=True, blank=True, verbose_name='下跌家数')
+    limit_up_count = models.IntegerField(null=True, blank=True, verbose_name='涨停家数')
+    limit_down_count = models.IntegerField(null=True, blank=True, verbose_name='跌停家数')
+    
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+    
+    class Meta:
+        db_table = 'market_index_latest'
+        ordering = ['market', 'index_code']
+        verbose_name = '指数最新数据'
+        verbose_name_plural = verbose_name
+    
+    def __str__(self):
+        return f"{self.index_name} - {self.timestamp}"
+
+
 class MarketSentimentModel(models.Model):
     """市场情绪指标"""
     
@@ -191,3 +228,279 @@ class StockInfoModel(models.Model):
     
     def __str__(self):
         return f"{self.symbol} - {self.name}"
+
+
+class CollectionWatermarkModel(models.Model):
+    """采集水位线：记录每个标的在各数据源上最后入库的时间戳，用于增量采集"""
+    
+    symbol = models.CharField(max_length=50, verbose_name='标的代码')
+    market = models.CharField(max_length=20, verbose_name='市场类型')
+    data_source = models.CharField(max_length=50, verbose_name='数据源')
+    last_timestamp = models.DateTimeField(verbose_name='最后入库时间戳')
+    
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+    
+    class Meta:
+        db_table = 'collection_watermark'
+        unique_together = [['symbol', 'market', 'data_source']]
+        verbose_name = '采集水位线'
+        verbose_name_plural = verbose_name
+    
+    def __str__(self):
+        return f"{self.symbol}@{self.data_source} - {self.last_timestamp}"
+
+
+class IntradayBarModel(models.Model):
+    """
+    分钟级K线（1m/5m）
+    
+    与日线分表存储：价格使用 float 而非 Decimal(20,6)，行更紧凑，
+    (symbol, interval, timestamp) 索引支撑"最近 N 分钟"查询。
+    """
+    
+    INTERVAL_CHOICES = [
+        ('1m', '1分钟'),
+        ('5m', '5分钟'),
+    ]
+    
+    symbol = models.CharField(max_length=50, verbose_name='标的代码')
+    market = models.CharField(max_length=20, verbose_name='市场类型')
+    interval = models.CharField(max_length=4, choices=INTERVAL_CHOICES, verbose_name='周期')
+    timestamp = models.DateTimeField(verbose_name='K线开始时间')
+    
+    open = models.FloatField(verbose_name='开盘价')
+    high = models.FloatField(verbose_name='最高价')
+    low = models.FloatField(verbose_name='最低价')
+    close = models.FloatField(verbose_name='收盘价')
+    volume = models.BigIntegerField(verbose_name='成交量')
+    amount = models.FloatField(null=True, blank=True, verbose_name='成交额')
+    
+    data_source = models.CharField(max_length=50, default='unknown', verbose_name='数据源')
+    
+    class Meta:
+        db_table = 'intraday_bar'
+        unique_together = [['symbol', 'market', 'interval', 'timestamp']]
+        indexes = [
+            models.Index(fields=['symbol', 'interval', '-timestamp']),
+            models.Index(fields=['interval', '-timestamp']),
+        ]
+        verbose_name = '分钟K线'
+        verbose_name_plural = verbose_name
+    
+    def __str__(self):
+        return f"{self.symbol} {self.interval} - {self.timestamp}"
+
+
+class DataQualityReportModel(models.Model):
+    """数据质量报告：每次采集运行汇总一条"""
+    
+    scope = models.CharField(max_length=50, db_index=True, verbose_name='采集范围')
+    rows_checked = models.IntegerField(default=0, verbose_name='检查行数')
+    rows_quarantined = models.IntegerField(default=0, verbose_name='隔离行数')
+    issues = JSONField(default=dict, blank=True, verbose_name='各检查项问题数')
+    symbols = JSONField(default=dict, blank=True, verbose_name='问题标的明细')
+    elapsed = models.FloatField(default=0, verbose_name='校验耗时(秒)')
+    
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='创建时间')
+    
+    class Meta:
+        db_table = 'data_quality_report'
+        ordering = ['-created_at']
+        verbose_name = '数据质量报告'
+        verbose_name_plural = verbose_name
+    
+    def __str__(self):
+        return f"{self.scope} - {self.created_at}"
+
+
+class QuarantinedBarModel(models.Model):
+    """未通过质量校验、未写入 market_data 的K线"""
+    
+    symbol = models.CharField(max_length=50, verbose_name='标的代码')
+    market = models.CharField(max_length=20, verbose_name='市场类型')
+    timestamp = models.DateTimeField(verbose_name='时间戳')
+    data_source = models.CharField(max_length=50, verbose_name='数据源')
+    reasons = JSONField(default=list, verbose_name='未通过的检查项')
+    payload = JSONField(default=dict, verbose_name='原始K线')
+    
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    
+    class Meta:
+        db_table = 'quarantined_bar'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['symbol', 'market', '-timestamp']),
+        ]
+        verbose_name = '隔离K线'
+        verbose_name_plural = verbose_name
+    
+    def __str__(self):
+        return f"{self.symbol} - {self.timestamp} ({', '.join(self.reasons)})"
+
+
+class MarketDataRollupModel(models.Model):
+    """
+    行情周/月聚合
+    
+    数据保留任务把超过 daily_agg 期限的日线聚合到这里后再删除日线。
+    first_bar/last_bar 记录已并入的日线区间，区间内的日线被重新采集后不会重复计入。
+    """
+    
+    PERIOD_CHOICES = [
+        ('week', '周'),
+        ('month', '月'),
+    ]
+    
+    symbol = models.CharField(max_length=50, verbose_name='标的代码')
+    market = models.CharField(max_length=20, verbose_name='市场类型')
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES, verbose_name='聚合周期')
+    period_start = models.DateTimeField(verbose_name='周期开始日期')
+    
+    open = models.DecimalField(max_digits=20, decimal_places=6, verbose_name='开盘价')
+    high = models.DecimalField(max_digits=20, decimal_places=6, verbose_name='最高价')
+    low = models.DecimalField(max_digits=20, decimal_places=6, verbose_name='最低价')
+    close = models.DecimalField(max_digits=20, decimal_places=6, verbose_name='收盘价')
+    volume = models.BigIntegerField(verbose_name='成交量')
+    amount = models.DecimalField(max_digits=30, decimal_places=2, null=True, blank=True, verbose_name='成交额')
+    bar_count = models.IntegerField(default=0, verbose_name='日线数量')
+    first_bar = models.DateTimeField(null=True, blank=True, verbose_name='已并入的首根日线')
+    last_bar = models.DateTimeField(null=True, blank=True, verbose_name='已并入的末根日线')
+    
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+    
+    class Meta:
+        db_table = 'market_data_rollup'
+        ordering = ['-period_start']
+        unique_together = [['symbol', 'market', 'period', 'period_start']]
+        indexes = [
+            models.Index(fields=['period', 'period_start']),
+        ]
+        verbose_name = '行情周/月聚合'
+        verbose_name_plural = verbose_name
+    
+    def __str__(self):
+        return f"{self.symbol} {self.period} - {self.period_start}"
+
+
+class AdjustmentFactorModel(models.Model):
+    """
+    复权因子（除权除息事件）
+    
+    market_data 保存不复权价格；每次除权除息记录一行 ratio = 除权参考价 / 前收盘价，
+    读取时按事件日期向量化相乘得到前复权/后复权价格，历史行不会因除权而改变。
+    """
+    
+    symbol = models.CharField(max_length=50, verbose_name='标的代码')
+    market = models.CharField(max_length=20, verbose_name='市场类型')
+    ex_date = models.DateTimeField(verbose_name='除权除息日')
+    ratio = models.FloatField(verbose_name='复权比例')
+    source = models.CharField(max_length=50, default='derived', verbose_name='来源')
+    
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    
+    class Meta:
+        db_table = 'adjustment_factor'
+        ordering = ['symbol', 'ex_date']
+        unique_together = [['symbol', 'market', 'ex_date']]
+        verbose_name = '复权因子'
+        verbose_name_plural = verbose_name
+    
+    def __str__(self):
+        return f"{self.symbol} {self.ex_date:%Y-%m-%d} x{self.ratio:.6f}"
+
+
+class CollectionShardModel(models.Model):
+    """
+    采集分片租约
+    
+    标的按代码哈希划分到 shard_count 个分片；采集进程（collect_market_data --worker）
+    通过条件更新抢占到期分片的租约并定期续约，进程停止心跳后租约过期，分片由其他进程接管。
+    """
+    
+    job = models.CharField(max_length=50, verbose_name='采集任务')  # 市场:K线周期，如 A_STOCK:1d
+    shard = models.IntegerField(verbose_name='分片序号')
+    owner = models.CharField(max_length=200, null=True, blank=True, verbose_name='租约持有者')
+    lease_expires_at = models.DateTimeField(null=True, blank=True, verbose_name='租约到期时间')
+    heartbeat_at = models.DateTimeField(null=True, blank=True, verbose_name='最后心跳时间')
+    
+    last_completed_at = models.DateTimeField(null=True, blank=True, verbose_name='最后完成时间')
+    last_symbols = models.IntegerField(default=0, verbose_name='最后一轮标的数')
+    last_records = models.IntegerField(default=0, verbose_name='最后一轮记录数')
+    last_failed = models.IntegerField(default=0, verbose_name='最后一轮失败数')
+    last_elapsed = models.FloatField(null=True, blank=True, verbose_name='最后一轮耗时(秒)')
+    
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+    
+    class Meta:
+        db_table = 'collection_shard'
+        ordering = ['job', 'shard']
+        unique_together = [['job', 'shard']]
+        verbose_name = '采集分片'
+        verbose_name_plural = verbose_name
+    
+    def __str__(self):
+        return f"{self.job}#{self.shard} - {self.owner or 'free'}"
+
+
+class MarketDataRawModel(models.Model):
+    """
+    行情原始数据旁路表
+    
+    RAW_PAYLOAD_POLICY=offload 时数据源原始返回按 market_data 行主键保存在此表，
+    market_data 行及其索引只保留解析后的列；删除行情时级联删除。
+    """
+    
+    market_data = models.OneToOneField(
+        MarketDataModel, on_delete=models.CASCADE, primary_key=True,
+        related_name='raw_payload', verbose_name='行情数据'
+    )
+    payload = JSONField(default=dict, verbose_name='原始数据')
+    
+    class Meta:
+        db_table = 'market_data_raw'
+        verbose_name = '行情原始数据'
+        verbose_name_plural = verbose_name
+    
+    def __str__(self):
+        return f"raw payload of market_data#{self.market_data_id}"
+
+
+class IndicatorFeatureModel(models.Model):
+    """
+    技术指标特征表
+    
+    每个标的一行，保存最新一根K线（前复权）上的 EMA/MACD/RSI/ATR/布林带，
+    智能体直接读取；state 为指标引擎的流式状态，新K线到达时 O(1) 更新。
+    """
+    
+    symbol = models.CharField(max_length=50, verbose_name='标的代码')
+    market = models.CharField(max_length=20, db_index=True, verbose_name='市场类型')
+    timestamp = models.DateTimeField(db_index=True, verbose_name='K线时间戳')
+    bars = models.IntegerField(default=0, verbose_name='参与计算的K线数')
+    
+    close = models.FloatField(verbose_name='收盘价')
+    ema_fast = models.FloatField(null=True, blank=True, verbose_name='快速EMA')
+    ema_slow = models.FloatField(null=True, blank=True, verbose_name='慢速EMA')
+    macd = models.FloatField(null=True, blank=True, verbose_name='MACD')
+    macd_signal = models.FloatField(null=True, blank=True, verbose_name='MACD信号线')
+    macd_hist = models.FloatField(null=True, blank=True, verbose_name='MACD柱')
+    rsi = models.FloatField(null=True, blank=True, verbose_name='RSI')
+    atr = models.FloatField(null=True, blank=True, verbose_name='ATR')
+    boll_mid = models.FloatField(null=True, blank=True, verbose_name='布林中轨')
+    boll_upper = models.FloatField(null=True, blank=True, verbose_name='布林上轨')
+    boll_lower = models.FloatField(null=True, blank=True, verbose_name='布林下轨')
+    
+    state = JSONField(default=dict, blank=True, verbose_name='流式状态')
+    # 该标的已消费的 market_data 行的最大 updated_at，各市场的最大值即增量更新的游标
+    source_updated_at = models.DateTimeField(null=True, blank=True, verbose_name='已消费行情的更新时间')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+    
+    class Meta:
+        db_table = 'indicator_feature'
+        ordering = ['market', 'symbol']
+        unique_together = [['symbol', 'market']]
+        verbose_name = '技术指标特征'
+        verbose_name_plural = verbose_name
+    
+    def __str__(self):
+        return f"{self.symbol} indicators @ {self.timestamp}"
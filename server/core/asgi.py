@@ -19,11 +19,13 @@ django_asgi_app = get_asgi_application()
 # 导入 Channels 组件（在 Django 初始化之后）
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
+from django.urls import path
+from apps.market_data.consumers import MarketBarsConsumer
 
-# WebSocket 路由配置（待实现）
+# WebSocket 路由配置
 websocket_urlpatterns = [
-    # 示例：实时市场数据推送
-    # path('ws/market/', MarketConsumer.as_asgi()),
+    # 实时K线更新推送
+    path('ws/market/', MarketBarsConsumer.as_asgi()),
     # path('ws/alerts/', AlertConsumer.as_asgi()),
 ]
 
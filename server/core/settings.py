@@ -214,7 +214,7 @@ DATATRACEHUB_CONFIG = {
     # 数据保留策略
     'DATA_RETENTION': {
         'raw_events': 90,  # 原始事件保留90天
-        'daily_agg': 90,  # 日级聚合保留90天
+        'daily_agg': 400,  # 日级聚合保留400天（不短于技术指标 history_bars 等分析模块读取的历史）
         'weekly_agg': 365,  # 周级聚合保留1年
         'monthly_agg': -1,  # 月级聚合永久保留
     },
@@ -284,9 +284,80 @@ AI_TRADER_CONFIG = {
     
     # 市场数据配置
     'MARKET_DATA_DIR': os.path.join(BASE_DIR, 'data', 'market_data'),
+    # 列式行情存储（采集器旁路写入，供智能体以内存映射方式读取）
+    'COLUMNAR_STORE_ENABLED': os.environ.get('COLUMNAR_STORE_ENABLED', 'true').lower() == 'true',
+    'COLUMNAR_STORE_DIR': os.path.join(BASE_DIR, 'data', 'columnar'),
+    # 感知层成交量/波动率异常检测的滚动基线快照
+    'ANOMALY_STATE_PATH': os.path.join(BASE_DIR, 'data', 'anomaly_state.npz'),
     'ALPHAVANTAGE_API_KEY': os.environ.get('ALPHAVANTAGE_API_KEY', ''),
     'TUSHARE_TOKEN': os.environ.get('TUSHARE_TOKEN', ''),
     
+    # 数据源限流配置（rate: 每秒请求数，max_concurrency: 最大并发请求数，0 表示不限制）
+    'DATA_SOURCE_LIMITS': {
+        'akshare': {'rate': 5, 'max_concurrency': 4},
+        'yfinance': {'rate': 2, 'max_concurrency': 4},
+        'alphavantage': {'rate': 5 / 60, 'max_concurrency': 1},  # 免费版每分钟5次
+        'sina': {'rate': 2, 'max_concurrency': 2},
+    },
+    # 数据源自动切换：市场 -> 按优先级排列的日线数据源，按实测延迟/错误率/分歧率为每个标的选择
+    'SOURCE_ROUTING': {
+        'A_STOCK': ['akshare', 'sina'],
+        'US_STOCK': ['yfinance', 'alphavantage'],  # alphavantage 需配置 ALPHAVANTAGE_API_KEY
+    },
+    'SOURCE_ROUTER': {
+        'half_life': 600,  # 错误率/分歧率衰减半衰期（秒）
+        'cooldown': 30,  # 限流或连续失败后的冷却基数（秒），连续触发翻倍
+        'max_cooldown': 600,
+        'audit_rate': 0.1,  # 写入时与其他数据源核对收盘价的抽样比例
+        'disagreement_tolerance': 0.005,
+    },
+    'HTTP_TRANSPORT': {
+        'connect_timeout': float(os.environ.get('HTTP_CONNECT_TIMEOUT', '5')),
+        'read_timeout': float(os.environ.get('HTTP_READ_TIMEOUT', '30')),
+        'max_retries': int(os.environ.get('HTTP_MAX_RETRIES', '3')),
+        'backoff_base': 1.0,
+        'backoff_max': 30.0,
+        'rate_limit_backoff': 20.0,  # Alpha Vantage 分钟级限流的退避基数
+        'pool_size': 10,
+    },
+    # 离线数据源（collect_market_data --market LOCAL/SYNTHETIC）
+    'DATA_SOURCE_OPTIONS': {
+        'LOCAL': {'root': os.environ.get('LOCAL_DATA_DIR', os.path.join(BASE_DIR, 'data', 'fixtures'))},
+        'SYNTHETIC': {'symbols': int(os.environ.get('SYNTHETIC_SYMBOLS', '100')), 'seed': 42},
+    },
+    # 入库前数据质量校验（quarantine_checks 中的检查项未通过时隔离该行），默认关闭，
+    # 启用前可将 quarantine_checks 设为 [] 只生成报告、不隔离
+    'DATA_QUALITY': {
+        'enabled': os.environ.get('DATA_QUALITY_ENABLED', 'false').lower() == 'true',
+        'zscore_threshold': 8.0,
+        'zscore_window': 60,
+        'min_history': 20,
+        'quarantine_checks': ['ohlc', 'volume', 'duplicate'],
+    },
+    'RAW_PAYLOAD_POLICY': os.environ.get('RAW_PAYLOAD_POLICY', 'keep'),  # 数据源原始返回的存储方式：keep/drop/compress/offload
+    'ADJUSTMENT_TOLERANCE': 0.001,  # 涨跌幅反推的参考价与前收盘价偏差超过该比例视为除权除息
+    # 指数采集范围：代码 -> 名称（A股代码对应东方财富"沪深重要指数"，美股为 yfinance 代码）
+    'MARKET_INDICES': {
+        'A_STOCK': {
+            '000001': '上证指数', '399001': '深证成指', '399006': '创业板指',
+            '000300': '沪深300', '000905': '中证500', '000688': '科创50',
+        },
+        'US_STOCK': {'^GSPC': 'S&P 500', '^IXIC': 'NASDAQ Composite', '^DJI': 'Dow Jones'},
+    },
+    'UNIVERSE_CACHE_TTL': int(os.environ.get('UNIVERSE_CACHE_TTL', '600')),  # 标的池（行业/板块）进程内缓存时长（秒）
+    # 感知层全市场扫描阈值（breakout: 收盘价高于前 breakout_bars-1 根最高价的比例；new_high: high_bars 日新高；gap: 跳空幅度）
+    'BREAKOUT_SCANNER': {'breakout_bars': 5, 'breakout_pct': 0.02, 'high_bars': 20, 'gap_pct': 0.02, 'max_age_days': 1},
+    # 成交量/波动率异常检测（z 值阈值；基线样本数 min_samples 起打分，max_samples 后指数遗忘）
+    'ANOMALY_DETECTOR': {'min_samples': 20, 'max_samples': 60, 'volume_z': 3.0, 'volatility_z': 3.0, 'high_z': 5.0, 'seed_days': 120, 'cursor_overlap': 60},
+    # 技术指标引擎参数（修改后运行 update_indicators --recompute）
+    'INDICATOR_ENGINE': {'ema_fast': 12, 'ema_slow': 26, 'macd_signal': 9, 'rsi': 14, 'atr': 14, 'boll': 20, 'boll_k': 2.0, 'history_bars': 250, 'cursor_overlap': 60},
+    'SENTIMENT_INTERPRETATION_TTL': int(os.environ.get('SENTIMENT_INTERPRETATION_TTL', '3600')),  # 情绪解读缓存时长（秒），情绪数据未变化时不重复调用模型
+    'PERCEPTION_INTRADAY_MINUTES': int(os.environ.get('PERCEPTION_INTRADAY_MINUTES', '15')),  # 感知层盘中动量观察窗口
+    'COLLECT_WORKERS': int(os.environ.get('COLLECT_WORKERS', '1')),  # 批量采集并发数
+    'COLLECT_SHARDS': int(os.environ.get('COLLECT_SHARDS', '16')),  # 分片采集（--worker）的分片数，同一任务的所有进程须一致
+    'SHARD_LEASE_SECONDS': int(os.environ.get('SHARD_LEASE_SECONDS', '120')),  # 分片租约时长，超时未续约的分片由其他进程接管
+    'YFINANCE_BATCH_SIZE': int(os.environ.get('YFINANCE_BATCH_SIZE', '1')),  # 美股单次请求标的数，默认 1 逐个请求；设为 50 左右启用 yf.download 批量下载
+    
     # 交易配置
     'INITIAL_CAPITAL': float(os.environ.get('INITIAL_CAPITAL', '1000000')),  # 初始资金100万
     'MAX_POSITION_PCT': float(os.environ.get('MAX_POSITION_PCT', '0.3')),  # 单标的最大仓位30%
@@ -4,6 +4,7 @@ Multi-Agent Debate and Decision Making
 """
 import logging
 import json
+import numpy as np
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 from decimal import Decimal
@@ -15,6 +16,8 @@ from apps.agents.models import (
 )
 from apps.market_data.models import MarketDataModel
 from apps.strategies.models import StrategyModel
+from services.analysis.indicators import load_features
+from services.data_collectors.columnar_store import read_recent_bars
 from utils.ai.openai_client import get_openai_client
 
 logger = logging.getLogger(__name__)
@@ -132,12 +135,10 @@ class MultiAgentDebate:
     def quant_validation(self, symbol: str, market_data: Dict) -> Dict:
         """量化派验证 - 数据驱动"""
         try:
-            # 获取历史数据
-            recent_data = MarketDataModel.objects.filter(
-                symbol=symbol
-            ).order_by('-timestamp')[:20]
+            # 获取历史数据（按时间升序，前复权避免除权缺口）
+            closes = read_recent_bars(symbol, 20, adjust='qfq')['close']
             
-            if not recent_data:
+            if not len(closes):
                 return {
                     "validation": "insufficient_data",
                     "win_rate": 0,
@@ -146,13 +147,14 @@ class MultiAgentDebate:
                 }
             
             # 简单的统计分析
-            prices = [float(d.close) for d in recent_data]
-            returns = [(prices[i] - prices[i+1]) / prices[i+1] * 100 
-                      for i in range(len(prices)-1)]
+            returns = np.diff(closes) / closes[:-1] * 100
+            
+            win_rate = float((returns > 0).mean() * 100) if len(returns) else 0
+            avg_return = float(returns.mean()) if len(returns) else 0
             
-            positive_returns = [r for r in returns if r > 0]
-            win_rate = len(positive_returns) / len(returns) * 100 if returns else 0
-            avg_return = sum(returns) / len(returns) if returns else 0
+            # 技术指标直接读取特征表（由指标引擎增量维护）
+            indicators = load_features([symbol]).get(symbol)
+            indicator_text = self._format_indicators(indicators) if indicators else '- 暂无'
             
             prompt = f"""
             量化数据验证：
@@ -163,6 +165,8 @@ class MultiAgentDebate:
             - 平均收益: {avg_return:.2f}%
             - 当前价格: {market_data.get('current_price')}
             - 近期趋势: {"上涨" if avg_return > 0 else "下跌"}
+            技术指标:
+            {indicator_text}
             
             请从量化角度评估：
             1. 这个标的的历史表现如何？
@@ -205,7 +209,20 @@ class MultiAgentDebate:
                 "statistical_significance": False,
                 "error": str(e)
             }
-    
+
+    @staticmethod
+    def _format_indicators(indicators: Dict) -> str:
+        """格式化特征表中的技术指标"""
+        def fmt(value, digits=2):
+            return '-' if value is None else f'{value:.{digits}f}'
+
+        return '\n            '.join([
+            f"- RSI: {fmt(indicators['rsi'], 1)}",
+            f"- MACD: {fmt(indicators['macd'], 3)} / 信号线 {fmt(indicators['macd_signal'], 3)} / 柱 {fmt(indicators['macd_hist'], 3)}",
+            f"- ATR: {fmt(indicators['atr'], 3)}",
+            f"- 布林带: {fmt(indicators['boll_lower'])} ~ {fmt(indicators['boll_upper'])}（中轨 {fmt(indicators['boll_mid'])}）",
+        ])
+
     def judge_decision(
         self, 
         symbol: str,
@@ -12,6 +12,7 @@ from django.db import transaction
 from apps.agents.models import AgentStatusModel, DecisionRecordModel
 from apps.trades.models import TradeModel, PositionModel, PortfolioModel, RiskControlLogModel
 from apps.market_data.models import MarketDataModel
+from services.data_collectors.columnar_store import read_recent_bars
 
 logger = logging.getLogger(__name__)
 
@@ -401,12 +402,10 @@ class ExecutionAgent:
             
             for position in positions:
                 # 更新当前价格
-                latest_data = MarketDataModel.objects.filter(
-                    symbol=position.symbol
-                ).order_by('-timestamp').first()
+                latest_close = read_recent_bars(position.symbol, 1)['close']
                 
-                if latest_data:
-                    position.current_price = latest_data.close
+                if len(latest_close):
+                    position.current_price = Decimal(str(latest_close[-1]))
                     position.market_value = position.current_price * position.quantity
                     position.unrealized_pnl = position.market_value - position.total_cost
                     position.unrealized_pnl_pct = (position.unrealized_pnl / position.total_cost) * 100
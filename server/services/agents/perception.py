@@ -2,15 +2,25 @@
 感知层：市场数据采集和实时监控
 Market Perception and Real-time Monitoring
 """
+import hashlib
 import logging
+import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, CharField, Q, Value, When
+from django.db.models.functions import Abs
 from django.utils import timezone
 from apps.market_data.models import (
-    MarketDataModel, MarketIndexModel, 
+    MarketDataModel, MarketIndexLatestModel, 
     MarketSentimentModel, NewsEventModel
 )
 from apps.agents.models import AgentStatusModel
+from services.analysis.anomaly_detector import get_anomaly_detector
+from services.analysis.breakout_scanner import BreakoutScanner
+from services.analysis.indicators import get_indicator_engine, load_features
+from services.data_collectors.universe import get_universe
 from utils.ai.openai_client import get_openai_client
 import json
 
@@ -22,6 +32,14 @@ class PerceptionAgent:
     
     def __init__(self):
         self.agent_type = 'perception'
+        # 盘中动量的观察窗口（分钟）
+        self.intraday_minutes = settings.AI_TRADER_CONFIG.get('PERCEPTION_INTRADAY_MINUTES', 15)
+        self.scanner = BreakoutScanner()
+        self.anomaly_detector = get_anomaly_detector()
+        self.indicator_engine = get_indicator_engine()
+        # 情绪解读缓存时长（秒）与进程内最近一次解读 (缓存键, 解读, 过期时间)
+        self.sentiment_ttl = settings.AI_TRADER_CONFIG.get('SENTIMENT_INTERPRETATION_TTL', 3600)
+        self._sentiment_interpretation = None
         self.openai_client = get_openai_client()
         self._update_status('running', 'Perception agent initialized')
     
@@ -49,6 +67,7 @@ class PerceptionAgent:
         """
         try:
             self._update_status('running', 'Perceiving market', 'Market state analysis')
+            self._refresh_indicators()
             
             perception_result = {
                 'timestamp': timezone.now().isoformat(),
@@ -70,10 +89,10 @@ class PerceptionAgent:
     def _get_market_overview(self) -> Dict[str, Any]:
         """获取市场概览"""
         try:
-            # 获取主要指数最新数据
-            recent_indices = MarketIndexModel.objects.filter(
-                timestamp__gte=timezone.now() - timedelta(days=1)
-            ).order_by('index_code', '-timestamp').distinct('index_code')[:5]
+            # 获取主要指数最新数据（market_index_latest 每个指数一行）
+            latest_indices = list(MarketIndexLatestModel.objects.filter(
+                updated_at__gte=timezone.now() - timedelta(days=1)
+            ))
             
             overview = {
                 'indices': [],
@@ -81,7 +100,7 @@ class PerceptionAgent:
                 'volume_profile': {}
             }
             
-            for index in recent_indices:
+            for index in latest_indices:
                 overview['indices'].append({
                     'code': index.index_code,
                     'name': index.index_name,
@@ -91,6 +110,16 @@ class PerceptionAgent:
                     'fall_count': index.fall_count,
                 })
             
+            # 市场宽度为全市场统计，取任一带宽度数据的指数即可
+            breadth_source = next((index for index in latest_indices if index.rise_count is not None), None)
+            if breadth_source:
+                overview['market_breadth'] = {
+                    'rise_count': breadth_source.rise_count,
+                    'fall_count': breadth_source.fall_count,
+                    'limit_up_count': breadth_source.limit_up_count,
+                    'limit_down_count': breadth_source.limit_down_count,
+                }
+            
             return overview
             
         except Exception as e:
@@ -124,12 +153,33 @@ class PerceptionAgent:
         """
         使用AI解读市场情绪
         
+        解读只按参与解读的指标值（及模型）缓存 SENTIMENT_INTERPRETATION_TTL 秒，指标值未变化时
+        不调用模型。先查进程内缓存，再查 Django 缓存（Redis，多个进程共享）；Django 缓存中与解读
+        一起保存过期时刻，命中时进程内缓存沿用剩余有效期。缓存不可用时直接调用模型。
+        
         Args:
             sentiment: 市场情绪数据
             
         Returns:
             str: 情绪解读
         """
+        cache_key = self._sentiment_cache_key(sentiment)
+        now = time.monotonic()
+        if self._sentiment_interpretation and self._sentiment_interpretation[0] == cache_key \
+                and self._sentiment_interpretation[2] > now:
+            return self._sentiment_interpretation[1]
+        try:
+            cached = cache.get(cache_key)
+        except Exception as e:
+            logger.warning(f"Sentiment interpretation cache unavailable: {e}")
+            cached = None
+        if isinstance(cached, tuple):
+            interpretation, expires_at = cached
+            remaining = expires_at - time.time()
+            if remaining > 0:
+                self._sentiment_interpretation = (cache_key, interpretation, now + remaining)
+                return interpretation
+        
         try:
             prompt = f"""
             请分析以下市场情绪指标，给出简洁的解读（50字以内）：
@@ -147,35 +197,73 @@ class PerceptionAgent:
                 {"role": "user", "content": prompt}
             ]
             
-            interpretation = self.openai_client.fast_completion(messages, temperature=0.3)
-            return interpretation.strip()
+            interpretation = self.openai_client.fast_completion(messages, temperature=0.3).strip()
             
         except Exception as e:
             logger.error(f"Failed to interpret sentiment: {e}")
             return "情绪解读失败"
+        
+        # 失败结果不缓存，下个周期重试
+        self._sentiment_interpretation = (cache_key, interpretation, now + self.sentiment_ttl)
+        try:
+            cache.set(cache_key, (interpretation, time.time() + self.sentiment_ttl), timeout=self.sentiment_ttl)
+        except Exception as e:
+            logger.warning(f"Sentiment interpretation cache unavailable: {e}")
+        return interpretation
+    
+    @staticmethod
+    def _sentiment_cache_key(sentiment: MarketSentimentModel) -> str:
+        """
+        情绪解读缓存键：参与解读的指标值 + 模型
+
+        不含行 id：不同的情绪行（如相邻交易日）指标值相同时应命中同一条解读。
+        """
+        inputs = json.dumps([
+            str(sentiment.vix), str(sentiment.fear_greed_index),
+            str(sentiment.put_call_ratio), str(sentiment.social_sentiment_score),
+            settings.AI_TRADER_CONFIG.get('OPENAI_FAST_MODEL'),
+        ])
+        return f"sentiment_interpretation:{hashlib.sha1(inputs.encode('utf-8')).hexdigest()}"
+    
+    def _refresh_indicators(self):
+        """增量更新技术指标特征表（只处理新K线）"""
+        try:
+            self.indicator_engine.update()
+        except Exception as e:
+            logger.error(f"Failed to update indicators: {e}")
     
     def _detect_anomalies(self) -> List[Dict[str, Any]]:
         """检测市场异常"""
         anomalies = []
         
         try:
-            # 检测价格异常波动
-            recent_data = MarketDataModel.objects.filter(
-                timestamp__gte=timezone.now() - timedelta(hours=1)
-            ).select_related('symbol')
-            
-            for data in recent_data:
-                if data.change_pct and abs(float(data.change_pct)) > 5:  # 涨跌幅超过5%
-                    anomalies.append({
-                        'type': 'price_spike',
-                        'symbol': data.symbol,
-                        'change_pct': float(data.change_pct),
-                        'timestamp': data.timestamp.isoformat(),
-                        'severity': 'high' if abs(float(data.change_pct)) > 10 else 'medium'
-                    })
+            # 检测价格异常波动：涨跌幅超过5%，超过10%为 high
+            # 过滤写成两个区间条件（不对列套 ABS），严重程度在查询中分档，只取回命中的行
+            spikes = MarketDataModel.objects.filter(
+                Q(change_pct__gt=5) | Q(change_pct__lt=-5),
+                timestamp__gte=timezone.now() - timedelta(hours=1),
+            ).annotate(
+                abs_change=Abs('change_pct')
+            ).annotate(
+                severity=Case(
+                    When(abs_change__gt=10, then=Value('high')),
+                    default=Value('medium'),
+                    output_field=CharField(),
+                )
+            ).order_by().values('symbol', 'market', 'change_pct', 'timestamp', 'severity')
+            
+            for spike in spikes.iterator():
+                anomalies.append({
+                    'type': 'price_spike',
+                    'symbol': spike['symbol'],
+                    'market': spike['market'],
+                    'change_pct': float(spike['change_pct']),
+                    'timestamp': spike['timestamp'].isoformat(),
+                    'severity': spike['severity']
+                })
             
-            # 检测成交量异常
-            # TODO: 实现成交量异常检测逻辑
+            # 检测成交量/波动率异常（增量基线，只读取新K线）
+            anomalies.extend(self.anomaly_detector.detect())
             
             logger.info(f"Detected {len(anomalies)} anomalies")
             return anomalies
@@ -185,31 +273,26 @@ class PerceptionAgent:
             return []
     
     def _scan_opportunities(self) -> List[Dict[str, Any]]:
-        """扫描交易机会"""
-        opportunities = []
-        
+        """扫描交易机会：全市场日线突破/新高/跳空与盘中动量（向量化，不逐标的查询）"""
         try:
-            # 获取最近价格数据
-            symbols = MarketDataModel.objects.filter(
-                timestamp__gte=timezone.now() - timedelta(days=1)
-            ).values_list('symbol', flat=True).distinct()[:20]  # 限制扫描数量
-            
-            for symbol in symbols:
-                # 简单的机会识别逻辑（实际应该更复杂）
-                recent_data = MarketDataModel.objects.filter(
-                    symbol=symbol,
-                    timestamp__gte=timezone.now() - timedelta(days=5)
-                ).order_by('-timestamp')[:5]
-                
-                if len(recent_data) >= 5:
-                    # 检测趋势突破
-                    if self._check_breakout(recent_data):
-                        opportunities.append({
-                            'type': 'breakout',
-                            'symbol': symbol,
-                            'description': f'{symbol} 价格突破关键阻力位',
-                            'confidence': 0.7
-                        })
+            universe = get_universe()
+            active = set(universe.symbols())
+            stored = self.scanner.stored_universe()
+            if active:
+                # 标的池已同步时只扫描活跃标的
+                stored = {market: [s for s in symbols if s in active] for market, symbols in stored.items()}
+            
+            opportunities = self.scanner.scan(stored)
+            opportunities.extend(self.scanner.scan_intraday_momentum(self.intraday_minutes))
+            if active:
+                opportunities = [opp for opp in opportunities if opp['symbol'] in active]
+            features = load_features({opp['symbol'] for opp in opportunities}) if opportunities else {}
+            for opp in opportunities:
+                opp['sector'] = universe.sector_of(opp['symbol'])
+                feature = features.get(opp['symbol'])
+                if feature:
+                    opp['rsi'] = feature['rsi']
+                    opp['macd_hist'] = feature['macd_hist']
             
             logger.info(f"Found {len(opportunities)} opportunities")
             return opportunities
@@ -218,17 +301,6 @@ class PerceptionAgent:
             logger.error(f"Failed to scan opportunities: {e}")
             return []
     
-    def _check_breakout(self, data_list) -> bool:
-        """检查是否突破（简化版）"""
-        if len(data_list) < 5:
-            return False
-        
-        # 简单逻辑：最新价格高于过去4天最高价
-        latest = data_list[0]
-        past_high = max([float(d.high) for d in data_list[1:]])
-        
-        return float(latest.close) > past_high * 1.02  # 超过2%视为突破
-    
     def _detect_risk_signals(self) -> List[Dict[str, Any]]:
         """检测风险信号"""
         risk_signals = []
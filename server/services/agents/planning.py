@@ -14,6 +14,7 @@ from apps.agents.models import AgentStatusModel, TradingPlanModel, MarketOpportu
 from apps.strategies.models import StrategyModel, StrategyBacktestModel
 from apps.trades.models import PortfolioModel, PositionModel
 from apps.market_data.models import MarketDataModel, MarketSentimentModel
+from services.data_collectors.universe import get_universe
 from utils.ai.openai_client import get_openai_client
 
 logger = logging.getLogger(__name__)
@@ -287,13 +288,14 @@ class PlanningAgent:
             }
     
     def _extract_sectors(self, opportunities: List[MarketOpportunityModel]) -> List[str]:
-        """提取行业分布"""
-        sectors = set()
+        """提取行业分布（标的池缓存中查不到的标的跳过）"""
+        universe = get_universe()
+        sectors = []
         for opp in opportunities:
-            if opp.reason:
-                # 简单提取，实际应该从股票信息中获取
-                sectors.add('technology')  # 占位
-        return list(sectors)
+            sector = universe.sector_of(opp.symbol)
+            if sector and sector not in sectors:
+                sectors.append(sector)
+        return sectors
     
     def _calculate_plan_end(self, time_horizon: str) -> datetime:
         """计算计划结束时间"""
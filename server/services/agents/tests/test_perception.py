@@ -0,0 +1,90 @@
+"""
+感知智能体测试
+"""
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from apps.market_data.models import MarketDataModel, MarketSentimentModel
+from services.agents import perception
+from services.agents.perception import PerceptionAgent
+
+
+class Clock:
+    """同时替换 time.time 与 time.monotonic 的可调时钟"""
+
+    def __init__(self, start: float):
+        self.now = start
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+
+class SentimentInterpretationCacheTest(SimpleTestCase):
+
+    def setUp(self):
+        self.clock = Clock(1000.0)
+        for patcher in (
+            mock.patch.object(perception, 'cache', LocMemCache('sentiment-test', {})),
+            mock.patch.object(perception, 'time', self.clock),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def agent(self):
+        """不经 __init__ 构建（避免状态表写入与模型客户端初始化）"""
+        agent = PerceptionAgent.__new__(PerceptionAgent)
+        agent.sentiment_ttl = 3600
+        agent._sentiment_interpretation = None
+        agent.openai_client = mock.Mock()
+        agent.openai_client.fast_completion.return_value = '情绪中性'
+        return agent
+
+    def test_rows_with_same_values_share_one_interpretation(self):
+        agent = self.agent()
+        first = MarketSentimentModel(id=1, vix=18, fear_greed_index=55)
+        second = MarketSentimentModel(id=2, vix=18, fear_greed_index=55)
+        self.assertEqual(agent._interpret_sentiment(first), '情绪中性')
+        self.assertEqual(agent._interpret_sentiment(second), '情绪中性')
+        agent.openai_client.fast_completion.assert_called_once()
+
+    def test_shared_cache_hit_keeps_remaining_ttl(self):
+        sentiment = MarketSentimentModel(vix=18, fear_greed_index=55)
+        writer = self.agent()
+        writer._interpret_sentiment(sentiment)
+
+        # 另一个进程在 3000 秒后命中共享缓存，只剩 600 秒有效期
+        self.clock.now += 3000
+        reader = self.agent()
+        self.assertEqual(reader._interpret_sentiment(sentiment), '情绪中性')
+        reader.openai_client.fast_completion.assert_not_called()
+
+        self.clock.now += 700
+        reader._interpret_sentiment(sentiment)
+        reader.openai_client.fast_completion.assert_called_once()
+
+
+class PriceSpikeTest(TestCase):
+
+    def test_spikes_are_filtered_and_bucketed_in_the_query(self):
+        now = timezone.now()
+        for symbol, change_pct, age in (
+            ('CALM', 3, 10), ('UP', 7, 10), ('EDGE', -5, 10), ('CRASH', -12, 10), ('OLD', -20, 120),
+        ):
+            MarketDataModel.objects.create(
+                symbol=symbol, market='A_STOCK', timestamp=now - timedelta(minutes=age),
+                open=10, high=10, low=10, close=10, volume=100, change_pct=change_pct,
+            )
+        agent = PerceptionAgent.__new__(PerceptionAgent)
+        agent.anomaly_detector = mock.Mock()
+        agent.anomaly_detector.detect.return_value = []
+
+        spikes = {a['symbol']: (a['change_pct'], a['severity']) for a in agent._detect_anomalies()}
+
+        self.assertEqual(spikes, {'UP': (7.0, 'medium'), 'CRASH': (-12.0, 'high')})
@@ -0,0 +1,276 @@
+"""
+增量成交量/波动率异常检测
+Incremental volume / volatility anomaly detection with Welford running statistics
+
+每个标的维护两组滚动均值/方差（Welford 算法，样本数达到 max_samples 后转为
+权重 1/max_samples 的指数遗忘，使基线跟随近期行情）：
+    成交量    log(1 + volume)
+    波动率    对数收益率 log(close / 前收)
+
+每次检测只读取各市场更新时间游标（market_data.updated_at）之后写入或改写的行
+（一次查询），迟到的K线、补录和新标的都会被读到；每根K线 O(1) 更新状态，不回查
+历史窗口。早于标的已并入基线的K线无法回溯并入，直接忽略。标的最新一根K线视为
+未定（日线在盘中会被反复改写），只用于打分；更新的K线到达后才并入基线，异常K线
+不会污染自己的基线。
+
+状态保存在一个小的 npz 快照中（ANOMALY_STATE_PATH），重启后从游标处继续；
+没有游标的市场按 seed_days 读取一次历史作为初始基线。
+"""
+import logging
+import math
+import os
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.market_data.models import MarketDataModel
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OPTIONS = {
+    'min_samples': 20,  # 基线样本数不足时不打分
+    'max_samples': 60,  # 超过后按 1/max_samples 指数遗忘
+    'volume_z': 3.0,  # 成交量 z 值阈值
+    'volatility_z': 3.0,  # 收益率 |z| 阈值
+    'high_z': 5.0,  # |z| 超过该值为 high，否则为 medium
+    'seed_days': 120,  # 没有游标的市场读取的历史天数
+    'cursor_overlap': 60,  # 游标回退秒数，覆盖读取时尚未提交的写入事务
+}
+
+# 每个标的的状态向量：基线（已并入的K线）+ 待定的最新一根K线
+STATE_FIELDS = (
+    'vol_n', 'vol_mean', 'vol_m2',
+    'ret_n', 'ret_mean', 'ret_m2',
+    'last_close', 'last_ts',
+    'pending_ts', 'pending_close', 'pending_volume',
+)
+F = {name: i for i, name in enumerate(STATE_FIELDS)}
+
+
+def welford_push(n: float, mean: float, m2: float, x: float, max_samples: int) -> Tuple[float, float, float]:
+    """
+    并入一个样本
+
+    Returns:
+        Tuple: (n, mean, m2)，m2 为离差平方和
+    """
+    delta = x - mean
+    if n < max_samples:
+        n += 1
+        mean += delta / n
+        return n, mean, m2 + delta * (x - mean)
+    # 达到上限后按固定权重指数遗忘：var' = (1-a)(var + a·delta²)
+    alpha = 1.0 / max_samples
+    var = m2 / n
+    var = (1 - alpha) * (var + alpha * delta * delta)
+    return n, mean + alpha * delta, var * n
+
+
+def welford_z(n: float, mean: float, m2: float, x: float) -> Optional[float]:
+    """样本相对基线的 z 值，方差为 0 或样本不足时返回 None"""
+    if n < 2:
+        return None
+    var = m2 / (n - 1)
+    if var <= 0:
+        return None
+    return (x - mean) / math.sqrt(var)
+
+
+class AnomalyDetector:
+    """增量异常检测器"""
+
+    def __init__(self, path: Optional[str] = None, options: Optional[Dict] = None):
+        """
+        Args:
+            path: 快照文件路径，默认读取 ANOMALY_STATE_PATH
+            options: 覆盖 DEFAULT_OPTIONS，默认读取 ANOMALY_DETECTOR
+        """
+        self.path = path or settings.AI_TRADER_CONFIG['ANOMALY_STATE_PATH']
+        self.options = {**DEFAULT_OPTIONS, **settings.AI_TRADER_CONFIG.get('ANOMALY_DETECTOR', {}), **(options or {})}
+        self.states: Dict[Tuple[str, str], List[float]] = {}
+        # 市场 -> 已读取到的最大 updated_at（epoch 秒）
+        self.cursors: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def detect(self) -> List[Dict]:
+        """
+        读取新K线、更新基线，并对各标的最新一根K线打分
+
+        Returns:
+            List[Dict]: 异常列表 {'type': 'volume_spike' | 'volatility_spike', 'symbol', 'market', 'z_score', ...}
+        """
+        started = time.perf_counter()
+        with self._lock:
+            rows = MarketDataModel.objects.filter(self._pending_rows()).order_by('timestamp').values_list(
+                'market', 'symbol', 'timestamp', 'close', 'volume', 'updated_at'
+            )
+
+            touched = set()
+            for market, symbol, timestamp, close, volume, updated_at in rows.iterator(chunk_size=5000):
+                if self.observe(market, symbol, timestamp.timestamp(), float(close), float(volume or 0)):
+                    touched.add((market, symbol))
+                updated = updated_at.timestamp()
+                if updated > self.cursors.get(market, -math.inf):
+                    self.cursors[market] = updated
+
+            anomalies = []
+            for key in touched:
+                anomalies.extend(self.score(*key))
+            self.save()
+
+        logger.info(
+            f"Anomaly detection: {len(touched)} symbols updated, {len(anomalies)} anomalies "
+            f"in {time.perf_counter() - started:.3f}s"
+        )
+        return anomalies
+
+    def _pending_rows(self) -> Q:
+        """各市场游标之后写入的行；没有游标的市场读取 seed_days 内的历史"""
+        overlap = self.options['cursor_overlap']
+        condition = ~Q(market__in=list(self.cursors)) & Q(
+            timestamp__gte=timezone.now() - timedelta(days=self.options['seed_days'])
+        )
+        for market, cursor in self.cursors.items():
+            condition |= Q(market=market, updated_at__gte=pd.Timestamp(cursor - overlap, unit='s', tz='UTC'))
+        return condition
+
+    def observe(self, market: str, symbol: str, ts: float, close: float, volume: float) -> bool:
+        """
+        接收一根K线（O(1)）
+
+        Args:
+            ts: K线时间戳（epoch 秒）
+
+        Returns:
+            bool: K线是否被接收（早于已并入基线的K线时忽略）
+        """
+        state = self.states.get((market, symbol))
+        if state is None:
+            state = [0.0] * len(STATE_FIELDS)
+            state[F['last_close']] = state[F['last_ts']] = state[F['pending_ts']] = math.nan
+            self.states[(market, symbol)] = state
+
+        if ts <= state[F['last_ts']] or ts < state[F['pending_ts']]:
+            return False
+        if ts > state[F['pending_ts']]:
+            self._commit(state)
+        state[F['pending_ts']] = ts
+        state[F['pending_close']] = close
+        state[F['pending_volume']] = volume
+        return True
+
+    def score(self, market: str, symbol: str) -> List[Dict]:
+        """对标的最新一根（未并入基线的）K线打分"""
+        state = self.states.get((market, symbol))
+        if state is None or math.isnan(state[F['pending_ts']]):
+            return []
+        opts = self.options
+        timestamp = pd.Timestamp(state[F['pending_ts']], unit='s', tz='UTC').isoformat()
+        anomalies = []
+
+        volume = state[F['pending_volume']]
+        if state[F['vol_n']] >= opts['min_samples']:
+            z = welford_z(state[F['vol_n']], state[F['vol_mean']], state[F['vol_m2']], math.log1p(volume))
+            if z is not None and z >= opts['volume_z']:
+                anomalies.append({
+                    'type': 'volume_spike',
+                    'symbol': symbol,
+                    'market': market,
+                    'volume': int(volume),
+                    'baseline_volume': int(math.expm1(state[F['vol_mean']])),
+                    'z_score': round(z, 2),
+                    'timestamp': timestamp,
+                    'severity': 'high' if z >= opts['high_z'] else 'medium'
+                })
+
+        ret = self._log_return(state[F['last_close']], state[F['pending_close']])
+        if ret is not None and state[F['ret_n']] >= opts['min_samples']:
+            z = welford_z(state[F['ret_n']], state[F['ret_mean']], state[F['ret_m2']], ret)
+            if z is not None and abs(z) >= opts['volatility_z']:
+                anomalies.append({
+                    'type': 'volatility_spike',
+                    'symbol': symbol,
+                    'market': market,
+                    'change_pct': round(math.expm1(ret) * 100, 2),
+                    'z_score': round(z, 2),
+                    'timestamp': timestamp,
+                    'severity': 'high' if abs(z) >= opts['high_z'] else 'medium'
+                })
+        return anomalies
+
+    def load(self):
+        """读取快照，文件不存在或损坏时从空状态开始"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as snapshot:
+                keys = snapshot['keys']
+                values = snapshot['state']
+                cursors = dict(zip(snapshot['cursor_markets'].tolist(), snapshot['cursor_values'].tolist()))
+            if values.shape[1] != len(STATE_FIELDS):
+                raise ValueError(f"state has {values.shape[1]} fields, expected {len(STATE_FIELDS)}")
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable anomaly state {self.path}: {e}")
+            return
+        self.states = {
+            (str(market), str(symbol)): row.tolist() for (market, symbol), row in zip(keys, values)
+        }
+        self.cursors = cursors
+        logger.info(f"Loaded anomaly state for {len(self.states)} symbols from {self.path}")
+
+    def save(self):
+        """原子写入快照"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        keys = np.array(list(self.states), dtype=str).reshape(-1, 2)
+        values = np.array(list(self.states.values()), dtype=np.float64).reshape(-1, len(STATE_FIELDS))
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f, keys=keys, state=values,
+                cursor_markets=np.array(list(self.cursors), dtype=str),
+                cursor_values=np.array(list(self.cursors.values()), dtype=np.float64),
+            )
+        os.replace(tmp_path, self.path)
+
+    def _commit(self, state: List[float]):
+        """将待定K线并入基线"""
+        if math.isnan(state[F['pending_ts']]):
+            return
+        max_samples = self.options['max_samples']
+        volume, close = state[F['pending_volume']], state[F['pending_close']]
+        state[F['vol_n']], state[F['vol_mean']], state[F['vol_m2']] = welford_push(
+            state[F['vol_n']], state[F['vol_mean']], state[F['vol_m2']], math.log1p(volume), max_samples
+        )
+        ret = self._log_return(state[F['last_close']], close)
+        if ret is not None:
+            state[F['ret_n']], state[F['ret_mean']], state[F['ret_m2']] = welford_push(
+                state[F['ret_n']], state[F['ret_mean']], state[F['ret_m2']], ret, max_samples
+            )
+        state[F['last_close']] = close
+        state[F['last_ts']] = state[F['pending_ts']]
+        state[F['pending_ts']] = math.nan
+
+    @staticmethod
+    def _log_return(previous: float, close: float) -> Optional[float]:
+        if not previous > 0 or not close > 0:
+            return None
+        return math.log(close / previous)
+
+
+_anomaly_detector: Optional[AnomalyDetector] = None
+
+
+def get_anomaly_detector() -> AnomalyDetector:
+    """获取异常检测器单例"""
+    global _anomaly_detector
+    if _anomaly_detector is None:
+        _anomaly_detector = AnomalyDetector()
+    return _anomaly_detector
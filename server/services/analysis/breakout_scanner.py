@@ -0,0 +1,208 @@
+"""
+全市场突破扫描
+Whole-universe vectorized breakout / new-high / gap scanner
+
+一次读取全部标的最近 N 根日线（列式存储按标的读取文件尾部，未启用时一次 ORM 查询），
+组成 (标的数, N) 的矩阵后用数组运算计算信号，不逐标的查询：
+
+    breakout   最新收盘价高于前 breakout_bars-1 根K线最高价的 (1 + breakout_pct) 倍
+    new_high   最新最高价创 high_bars 根K线新高
+    gap        最新开盘价高于前一根最高价 / 低于前一根最低价超过 gap_pct
+
+价格为前复权（窗口内的除权除息事件一次查询后向量化调整）。
+盘中动量用一次查询读取全部标的最近 minutes 分钟的分钟K线，按标的分组取首开末收。
+"""
+import logging
+import time
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.utils import timezone
+
+from apps.market_data.models import IntradayBarModel, MarketDataModel
+from services.data_collectors.adjustment import adjust_window
+from services.data_collectors.columnar_store import ColumnarStore, get_columnar_store
+
+logger = logging.getLogger(__name__)
+
+WINDOW_COLUMNS = ['open', 'high', 'low', 'close']
+DEFAULT_OPTIONS = {
+    'breakout_bars': 5,
+    'breakout_pct': 0.02,
+    'high_bars': 20,
+    'gap_pct': 0.02,
+    'max_age_days': 1,  # 最新K线早于该天数的标的不参与扫描（停牌/未更新）
+    'intraday_surge_pct': 0.01,
+}
+
+
+class BreakoutScanner:
+    """全市场突破扫描器"""
+
+    def __init__(self, options: Optional[Dict] = None):
+        """
+        Args:
+            options: 覆盖 DEFAULT_OPTIONS，默认读取 BREAKOUT_SCANNER
+        """
+        self.options = {**DEFAULT_OPTIONS, **settings.AI_TRADER_CONFIG.get('BREAKOUT_SCANNER', {}), **(options or {})}
+        self.window = max(self.options['breakout_bars'], self.options['high_bars'])
+
+    def scan(self, universe: Optional[Dict[str, List[str]]] = None) -> List[Dict]:
+        """
+        扫描日线信号
+
+        Args:
+            universe: 市场 -> 标的列表，默认为列式存储中的全部标的
+
+        Returns:
+            List[Dict]: 信号列表 {'type', 'symbol', 'market', ...}
+        """
+        started = time.perf_counter()
+        signals = []
+        total = 0
+        for market, symbols in (universe if universe is not None else self.stored_universe()).items():
+            if not symbols:
+                continue
+            window = self.load_window(symbols, market)
+            total += len(symbols)
+            signals.extend(self.detect(window, symbols, market))
+        logger.info(f"Breakout scan: {total} symbols, {len(signals)} signals in {time.perf_counter() - started:.3f}s")
+        return signals
+
+    def stored_universe(self) -> Dict[str, List[str]]:
+        """各市场已有日线的标的"""
+        if settings.AI_TRADER_CONFIG.get('COLUMNAR_STORE_ENABLED'):
+            store = get_columnar_store()
+            return {market: store.symbols(market) for market in ColumnarStore.MARKETS}
+        cutoff = timezone.now() - timedelta(days=self.options['max_age_days'])
+        universe = {}
+        rows = MarketDataModel.objects.filter(timestamp__gte=cutoff).order_by().values_list('market', 'symbol').distinct()
+        for market, symbol in rows:
+            universe.setdefault(market, []).append(symbol)
+        return universe
+
+    def load_window(self, symbols: List[str], market: str) -> Dict[str, np.ndarray]:
+        """读取最近 window 根日线矩阵（前复权）"""
+        if settings.AI_TRADER_CONFIG.get('COLUMNAR_STORE_ENABLED'):
+            window = get_columnar_store().tail_many(symbols, self.window, market, columns=WINDOW_COLUMNS)
+        else:
+            window = self._load_window_from_db(symbols, market)
+        return adjust_window(window, symbols, market)
+
+    def detect(self, window: Dict[str, np.ndarray], symbols: List[str], market: str) -> List[Dict]:
+        """在K线矩阵上计算信号"""
+        opts = self.options
+        count = window['count']
+        open_, high, low, close = (window[column] for column in WINDOW_COLUMNS)
+        cutoff = (timezone.now() - timedelta(days=opts['max_age_days'])).timestamp() * 1e9
+        fresh = (count >= 2) & (window['timestamp'][:, -1] >= cutoff)
+
+        with np.errstate(invalid='ignore'):
+            last_close = close[:, -1]
+            # 全为 NaN 的行（历史不足）nanmax 会告警，先用 -inf 填充
+            filled_high = np.where(np.isnan(high), -np.inf, high)
+
+            b = opts['breakout_bars']
+            resistance = filled_high[:, -b:-1].max(axis=1)
+            breakout = fresh & (count >= b) & (last_close > resistance * (1 + opts['breakout_pct']))
+
+            h = opts['high_bars']
+            prior_high = filled_high[:, -h:-1].max(axis=1)
+            new_high = fresh & (count >= h) & (high[:, -1] > prior_high)
+
+            prev_high, prev_low = high[:, -2], low[:, -2]
+            gap_up = fresh & (open_[:, -1] > prev_high * (1 + opts['gap_pct']))
+            gap_down = fresh & (open_[:, -1] < prev_low * (1 - opts['gap_pct']))
+
+        signals = []
+        for row in np.flatnonzero(breakout):
+            symbol = symbols[row]
+            signals.append({
+                'type': 'breakout', 'symbol': symbol, 'market': market,
+                'strength': round(float(last_close[row] / resistance[row] - 1), 4),
+                'description': f'{symbol} 价格突破关键阻力位',
+                'confidence': 0.7,
+            })
+        for row in np.flatnonzero(new_high):
+            symbol = symbols[row]
+            signals.append({
+                'type': 'new_high', 'symbol': symbol, 'market': market,
+                'strength': round(float(high[row, -1] / prior_high[row] - 1), 4),
+                'description': f'{symbol} 创{h}日新高',
+                'confidence': 0.65,
+            })
+        for mask, direction, reference, label, confidence in (
+            (gap_up, 'up', prev_high, '向上跳空', 0.6),
+            (gap_down, 'down', prev_low, '向下跳空', 0.5),
+        ):
+            for row in np.flatnonzero(mask):
+                symbol = symbols[row]
+                signals.append({
+                    'type': 'gap', 'direction': direction, 'symbol': symbol, 'market': market,
+                    'strength': round(float(open_[row, -1] / reference[row] - 1), 4),
+                    'description': f'{symbol} {label}开盘',
+                    'confidence': confidence,
+                })
+        return signals
+
+    def scan_intraday_momentum(self, minutes: int, interval: str = '1m') -> List[Dict]:
+        """盘中动量：最近 minutes 分钟内收盘价较窗口首根开盘价上涨超过 intraday_surge_pct（一次查询）"""
+        rows = IntradayBarModel.objects.filter(
+            interval=interval, timestamp__gte=timezone.now() - timedelta(minutes=minutes)
+        ).order_by('symbol', 'timestamp').values_list('symbol', 'market', 'open', 'close')
+        frame = pd.DataFrame(list(rows), columns=['symbol', 'market', 'open', 'close'])
+        if frame.empty:
+            return []
+
+        grouped = frame.groupby('symbol', sort=False)
+        first_open = grouped['open'].first().astype(float)
+        last_close = grouped['close'].last().astype(float)
+        counts = grouped.size()
+        markets = grouped['market'].last()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change = last_close / first_open - 1
+        surging = (counts >= 2) & (first_open > 0) & (change > self.options['intraday_surge_pct'])
+
+        return [
+            {
+                'type': 'intraday_momentum', 'symbol': symbol, 'market': markets[symbol],
+                'strength': round(float(change[symbol]), 4),
+                'description': f'{symbol} 最近{minutes}分钟快速拉升',
+                'confidence': 0.6,
+            }
+            for symbol in surging.index[surging.to_numpy()]
+        ]
+
+    def _load_window_from_db(self, symbols: List[str], market: str) -> Dict[str, np.ndarray]:
+        """未启用列式存储时一次查询读取窗口（按日历天数放宽范围后每个标的取最近 window 根）"""
+        n = self.window
+        since = timezone.now() - timedelta(days=n * 2 + 10)
+        rows = MarketDataModel.objects.filter(market=market, timestamp__gte=since).order_by().values_list(
+            'symbol', 'timestamp', *WINDOW_COLUMNS
+        )
+        frame = pd.DataFrame(list(rows), columns=['symbol', 'timestamp', *WINDOW_COLUMNS])
+
+        window = {'timestamp': np.zeros((len(symbols), n), dtype=np.int64)}
+        for column in WINDOW_COLUMNS:
+            window[column] = np.full((len(symbols), n), np.nan)
+        window['count'] = np.zeros(len(symbols), dtype=np.int64)
+        if frame.empty:
+            return window
+
+        index = {symbol: row for row, symbol in enumerate(symbols)}
+        frame['row'] = frame['symbol'].map(index)
+        frame = frame[frame['row'].notna()].sort_values(['row', 'timestamp'])
+        # 每个标的从最新一根往前编号，只保留最近 n 根
+        frame['back'] = frame.groupby('row').cumcount(ascending=False)
+        frame = frame[frame['back'] < n]
+
+        rows_idx = frame['row'].to_numpy(dtype=np.int64)
+        cols_idx = n - 1 - frame['back'].to_numpy(dtype=np.int64)
+        window['timestamp'][rows_idx, cols_idx] = pd.DatetimeIndex(frame['timestamp']).as_unit('ns').asi8
+        for column in WINDOW_COLUMNS:
+            window[column][rows_idx, cols_idx] = pd.to_numeric(frame[column], errors='coerce').to_numpy(dtype=float)
+        np.add.at(window['count'], rows_idx, 1)
+        return window
@@ -0,0 +1,468 @@
+"""
+技术指标引擎
+Incremental technical indicators with a vectorized batch path and a feature table
+
+指标：EMA(快/慢)、MACD(DIF/信号线/柱)、RSI(Wilder)、ATR(Wilder)、布林带。
+每个标的保存一份流式状态（EMA 值、Wilder 均值、前收、布林窗口内的收盘价），
+新K线到达时按递推公式 O(1) 更新，不回查历史。
+
+两条路径结果一致：
+    update()      流式路径，只读取各市场更新时间游标（market_data.updated_at）之后写入或
+                  改写的K线（一次查询），逐K线递推
+    recompute()   批量路径，用 pandas 向量化计算整段历史（回补、参数变更、新标的），
+                  并从结果中取出流式状态写回特征表
+
+早于标的未定K线的新写入（迟到的K线、补录缺失的交易日、改写已并入状态的K线）无法
+递推，update() 对这些标的改走批量路径。
+
+价格为前复权：除权除息事件只会让事件之前的价格整体乘以一个比例，EMA/ATR/布林带/Wilder
+均值都与价格同比例缩放（RSI 不变），因此遇到新的除权事件时把状态乘以该比例即可继续递推。
+与分钟线/日线写入一致，每个标的最新一根K线视为未定（盘中会被改写），只用于计算特征，
+更新的K线到达后才并入状态。
+"""
+import logging
+import math
+import time
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from apps.market_data.models import AdjustmentFactorModel, IndicatorFeatureModel, MarketDataModel
+from services.data_collectors.columnar_store import ColumnarStore, get_columnar_store, read_recent_bars
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PARAMS = {
+    'ema_fast': 12,
+    'ema_slow': 26,
+    'macd_signal': 9,
+    'rsi': 14,
+    'atr': 14,
+    'boll': 20,
+    'boll_k': 2.0,
+    'history_bars': 250,  # 批量路径读取的历史K线数
+    'cursor_overlap': 60,  # 游标回退秒数，覆盖读取时尚未提交的写入事务
+}
+
+FEATURE_COLUMNS = [
+    'ema_fast', 'ema_slow', 'macd', 'macd_signal', 'macd_hist',
+    'rsi', 'atr', 'boll_mid', 'boll_upper', 'boll_lower',
+]
+# 随价格同比例缩放的状态项
+PRICE_STATE_KEYS = ('ema_fast', 'ema_slow', 'macd_signal', 'avg_gain', 'avg_loss', 'atr', 'prev_close')
+
+
+def get_indicator_params() -> Dict:
+    return {**DEFAULT_PARAMS, **settings.AI_TRADER_CONFIG.get('INDICATOR_ENGINE', {})}
+
+
+def empty_state() -> Dict:
+    """
+    空的流式状态
+
+    ts 为已并入状态的最后一根K线时间戳，basis 为状态已反映的除权事件截止时间（epoch 秒）
+    """
+    return {
+        'bars': 0, 'ts': None, 'basis': None,
+        'ema_fast': None, 'ema_slow': None, 'macd_signal': None,
+        'avg_gain': None, 'avg_loss': None, 'atr': None,
+        'prev_close': None, 'window': [],
+    }
+
+
+def _rsi(avg_gain: Optional[float], avg_loss: Optional[float]) -> Optional[float]:
+    if avg_gain is None:
+        return None
+    if avg_loss == 0:
+        return 100.0 if avg_gain > 0 else 50.0
+    return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+
+def step(state: Dict, high: float, low: float, close: float, params: Dict) -> Tuple[Dict, Dict]:
+    """
+    用一根K线推进流式状态（不修改入参）
+
+    Returns:
+        Tuple: (新状态, 该K线上的指标值)
+    """
+    first = state['bars'] == 0
+    prev = state['prev_close']
+
+    def ema(key: str, value: float, span: int) -> float:
+        return value if first else state[key] + 2.0 / (span + 1) * (value - state[key])
+
+    ema_fast = ema('ema_fast', close, params['ema_fast'])
+    ema_slow = ema('ema_slow', close, params['ema_slow'])
+    macd = ema_fast - ema_slow
+    macd_signal = ema('macd_signal', macd, params['macd_signal'])
+
+    avg_gain, avg_loss = state['avg_gain'], state['avg_loss']
+    if prev is not None:
+        gain, loss = max(close - prev, 0.0), max(prev - close, 0.0)
+        if avg_gain is None:
+            avg_gain, avg_loss = gain, loss
+        else:
+            avg_gain += (gain - avg_gain) / params['rsi']
+            avg_loss += (loss - avg_loss) / params['rsi']
+
+    true_range = high - low if prev is None else max(high - low, abs(high - prev), abs(low - prev))
+    atr = true_range if state['atr'] is None else state['atr'] + (true_range - state['atr']) / params['atr']
+
+    # 布林带只保留固定长度的收盘价窗口，更新代价与历史长度无关
+    window = (state['window'] + [close])[-params['boll']:]
+    boll_mid = boll_upper = boll_lower = None
+    if len(window) == params['boll']:
+        boll_mid = sum(window) / len(window)
+        std = math.sqrt(sum((value - boll_mid) ** 2 for value in window) / len(window))
+        boll_upper = boll_mid + params['boll_k'] * std
+        boll_lower = boll_mid - params['boll_k'] * std
+
+    new_state = {
+        **state,
+        'bars': state['bars'] + 1,
+        'ema_fast': ema_fast, 'ema_slow': ema_slow, 'macd_signal': macd_signal,
+        'avg_gain': avg_gain, 'avg_loss': avg_loss, 'atr': atr,
+        'prev_close': close, 'window': window,
+    }
+    features = {
+        'ema_fast': ema_fast, 'ema_slow': ema_slow,
+        'macd': macd, 'macd_signal': macd_signal, 'macd_hist': macd - macd_signal,
+        'rsi': _rsi(avg_gain, avg_loss), 'atr': atr,
+        'boll_mid': boll_mid, 'boll_upper': boll_upper, 'boll_lower': boll_lower,
+    }
+    return new_state, features
+
+
+def scale_state(state: Dict, ratio: float) -> Dict:
+    """除权事件：事件之前的价格乘以 ratio，状态同比例缩放"""
+    scaled = dict(state)
+    for key in PRICE_STATE_KEYS:
+        if scaled[key] is not None:
+            scaled[key] *= ratio
+    scaled['window'] = [value * ratio for value in state['window']]
+    return scaled
+
+
+def compute_indicators(frame: pd.DataFrame, params: Optional[Dict] = None, with_state: bool = False) -> pd.DataFrame:
+    """
+    批量（向量化）计算指标，与逐K线递推结果一致
+
+    Args:
+        frame: 按时间升序、含 high/low/close 列的K线
+        params: 指标参数，默认读取 INDICATOR_ENGINE
+        with_state: 同时返回 avg_gain/avg_loss 列（用于构造流式状态）
+
+    Returns:
+        pd.DataFrame: 与 frame 同索引的指标列
+    """
+    params = params or get_indicator_params()
+    close = frame['close'].astype(float)
+    high = frame['high'].astype(float).fillna(close)
+    low = frame['low'].astype(float).fillna(close)
+
+    result = pd.DataFrame(index=frame.index)
+    result['ema_fast'] = close.ewm(span=params['ema_fast'], adjust=False).mean()
+    result['ema_slow'] = close.ewm(span=params['ema_slow'], adjust=False).mean()
+    result['macd'] = result['ema_fast'] - result['ema_slow']
+    result['macd_signal'] = result['macd'].ewm(span=params['macd_signal'], adjust=False).mean()
+    result['macd_hist'] = result['macd'] - result['macd_signal']
+
+    # Wilder 平滑即 alpha=1/n 的 EMA，从第二根K线（第一个涨跌）开始
+    change = close.diff()
+    avg_gain = change.clip(lower=0).ewm(alpha=1 / params['rsi'], adjust=False).mean()
+    avg_loss = (-change).clip(lower=0).ewm(alpha=1 / params['rsi'], adjust=False).mean()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+    rsi = rsi.mask(avg_loss == 0, np.where(avg_gain > 0, 100.0, 50.0))
+    result['rsi'] = rsi.where(avg_gain.notna())
+
+    prev_close = close.shift()
+    true_range = np.fmax(high - low, np.fmax((high - prev_close).abs(), (low - prev_close).abs()))
+    result['atr'] = true_range.ewm(alpha=1 / params['atr'], adjust=False).mean()
+
+    rolling = close.rolling(params['boll'])
+    result['boll_mid'] = rolling.mean()
+    std = rolling.std(ddof=0)
+    result['boll_upper'] = result['boll_mid'] + params['boll_k'] * std
+    result['boll_lower'] = result['boll_mid'] - params['boll_k'] * std
+
+    if with_state:
+        result['avg_gain'] = avg_gain
+        result['avg_loss'] = avg_loss
+    return result
+
+
+class IndicatorEngine:
+    """技术指标引擎：维护 indicator_feature 特征表"""
+
+    UPDATE_FIELDS = ['timestamp', 'bars', 'close', *FEATURE_COLUMNS, 'state', 'source_updated_at', 'updated_at']
+
+    def __init__(self, params: Optional[Dict] = None):
+        """
+        Args:
+            params: 覆盖 DEFAULT_PARAMS，默认读取 INDICATOR_ENGINE
+        """
+        self.params = {**get_indicator_params(), **(params or {})}
+
+    def update(self, market: Optional[str] = None) -> Dict:
+        """
+        流式路径：读取各市场游标之后写入的K线，逐根递推
+
+        特征表中还没有标的的市场、特征表中没有的标的（新标的）、以及收到早于未定K线的
+        新写入的标的走批量路径。
+
+        Returns:
+            Dict: {'symbols', 'bars', 'recomputed', 'elapsed'}
+        """
+        started = time.perf_counter()
+        features = IndicatorFeatureModel.objects.all()
+        if market:
+            features = features.filter(market=market)
+        cursors = dict(features.order_by().values_list('market').annotate(cursor=Max('source_updated_at')))
+        markets = [market] if market else [choice for choice, _ in MarketDataModel.MARKET_CHOICES]
+        recomputed = sum(
+            self.recompute(markets=[name])['symbols'] for name in markets
+            if cursors.get(name) is None and MarketDataModel.objects.filter(market=name).exists()
+        )
+
+        overlap = timedelta(seconds=self.params['cursor_overlap'])
+        condition = Q()
+        for name in markets:
+            if cursors.get(name) is not None:
+                condition |= Q(market=name, updated_at__gte=cursors[name] - overlap)
+        rows = list(
+            MarketDataModel.objects.filter(condition).order_by('timestamp').values_list(
+                'market', 'symbol', 'timestamp', 'high', 'low', 'close', 'updated_at'
+            )
+        ) if condition else []
+        keys = {(row[0], row[1]) for row in rows}
+        # 特征表每个标的一行，整表读取比按上千个代码 IN 查询更稳定
+        entries = {
+            (entry.market, entry.symbol): entry
+            for entry in features
+            if (entry.market, entry.symbol) in keys
+        }
+        events = self._load_events(entries.values())
+        # 读取前各标的已消费的位置；同一批中按 timestamp 排序的行 updated_at 不一定递增
+        consumed = {key: entry.source_updated_at for key, entry in entries.items()}
+
+        touched = set()
+        stale = set()
+        for row_market, symbol, timestamp, high, low, close, updated_at in rows:
+            key = (row_market, symbol)
+            entry = entries.get(key)
+            if entry is None or close is None or key in stale:
+                continue
+            if consumed[key] is not None and updated_at <= consumed[key]:
+                continue  # 已消费（游标回退重复读取到的行）
+            bar = {
+                'ts': timestamp.timestamp(),
+                'high': float(high if high is not None else close),
+                'low': float(low if low is not None else close),
+                'close': float(close),
+            }
+            if not self._feed(entry, bar, events.get(key, [])):
+                stale.add(key)
+                continue
+            entry.source_updated_at = max(updated_at, entry.source_updated_at or updated_at)
+            touched.add(key)
+
+        now = timezone.now()
+        changed = []
+        for key in touched - stale:
+            entry = entries[key]
+            state, values = self._advance(entry.state['committed'], entry.state['pending'], events.get(key, []))
+            self._assign(entry, entry.state['pending'], state['bars'], values, now)
+            changed.append(entry)
+        IndicatorFeatureModel.objects.bulk_update(changed, self.UPDATE_FIELDS, batch_size=1000)
+
+        pending = {}
+        for row_market, symbol in (keys - set(entries)) | stale:
+            pending.setdefault(row_market, []).append(symbol)
+        recomputed += sum(
+            self.recompute(symbols, markets=[row_market])['symbols'] for row_market, symbols in pending.items()
+        )
+
+        elapsed = round(time.perf_counter() - started, 3)
+        logger.info(f"Indicator update: {len(changed)} symbols from {len(rows)} bars, {recomputed} recomputed in {elapsed}s")
+        return {'symbols': len(changed), 'bars': len(rows), 'recomputed': recomputed, 'elapsed': elapsed}
+
+    def recompute(self, symbols: Optional[Iterable[str]] = None, markets: Optional[List[str]] = None) -> Dict:
+        """
+        批量路径：按最近 history_bars 根前复权K线向量化重算，并写回流式状态
+
+        Args:
+            symbols: 标的列表，默认为各市场已有日线的全部标的
+            markets: 市场列表，默认全部
+
+        Returns:
+            Dict: {'symbols', 'recomputed', 'elapsed'}
+        """
+        started = time.perf_counter()
+        now = timezone.now()
+        records = []
+        for market in markets or [market for market, _ in MarketDataModel.MARKET_CHOICES]:
+            for symbol in (list(symbols) if symbols is not None else self._stored_symbols(market)):
+                record = self._recompute_symbol(symbol, market, now)
+                if record is not None:
+                    records.append(record)
+
+        IndicatorFeatureModel.objects.bulk_create(
+            records,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['symbol', 'market'],
+            update_fields=self.UPDATE_FIELDS,
+        )
+        elapsed = round(time.perf_counter() - started, 3)
+        logger.info(f"Indicator recompute: {len(records)} symbols in {elapsed}s")
+        return {'symbols': len(records), 'recomputed': len(records), 'elapsed': elapsed}
+
+    def _recompute_symbol(self, symbol: str, market: str, now) -> Optional[IndicatorFeatureModel]:
+        # 先取已入库行的最大 updated_at：读取K线期间写入的行会在下次 update() 中再次读到
+        source_updated_at = MarketDataModel.objects.filter(
+            symbol=symbol, market=market
+        ).aggregate(latest=Max('updated_at'))['latest']
+        bars = read_recent_bars(symbol, self.params['history_bars'], market, adjust='qfq')
+        if not len(bars['close']):
+            return None
+        frame = pd.DataFrame({column: bars[column] for column in ('high', 'low', 'close')})
+        timestamps = bars['timestamp'] / 1e9
+        result = compute_indicators(frame, self.params, with_state=True)
+
+        # 流式状态截止到倒数第二根，最新一根作为未定K线；价格已是最新复权基准
+        committed = empty_state()
+        count = len(frame) - 1
+        if count:
+            last = result.iloc[count - 1]
+            committed.update({
+                'bars': count,
+                'ts': float(timestamps[count - 1]),
+                'prev_close': float(frame['close'].iloc[count - 1]),
+                'window': frame['close'].iloc[max(0, count - self.params['boll']):count].astype(float).tolist(),
+                **{key: self._scalar(last[key]) for key in ('ema_fast', 'ema_slow', 'macd_signal', 'avg_gain', 'avg_loss', 'atr')},
+            })
+        committed['basis'] = float(timestamps[-1])
+        pending = {
+            'ts': float(timestamps[-1]),
+            'high': float(frame['high'].fillna(frame['close']).iloc[-1]),
+            'low': float(frame['low'].fillna(frame['close']).iloc[-1]),
+            'close': float(frame['close'].iloc[-1]),
+        }
+        entry = IndicatorFeatureModel(
+            symbol=symbol, market=market, state={'committed': committed, 'pending': pending},
+            source_updated_at=source_updated_at
+        )
+        values = {column: self._scalar(result[column].iloc[-1]) for column in FEATURE_COLUMNS}
+        self._assign(entry, pending, len(frame), values, now)
+        return entry
+
+    def _feed(self, entry: IndicatorFeatureModel, bar: Dict, events: List[Tuple[float, float]]) -> bool:
+        """
+        接收一根K线：更新未定K线，有更新的K线时先把上一根并入状态
+
+        Returns:
+            bool: 是否可以递推；K线早于未定K线（迟到、补录或改写已并入的K线）时为 False，需要重算
+        """
+        committed, pending = entry.state['committed'], entry.state['pending']
+        if committed['ts'] is not None and bar['ts'] <= committed['ts']:
+            return False
+        if bar['ts'] < pending['ts']:
+            return False
+        if bar['ts'] > pending['ts']:
+            committed, _ = self._advance(committed, pending, events)
+        entry.state = {'committed': committed, 'pending': bar}
+        return True
+
+    def _advance(self, state: Dict, bar: Dict, events: List[Tuple[float, float]]) -> Tuple[Dict, Dict]:
+        """应用状态尚未反映的除权事件后推进一根K线"""
+        basis = state['basis'] if state['basis'] is not None else state['ts']
+        if basis is not None:
+            for ex_ts, ratio in events:
+                if basis < ex_ts <= bar['ts']:
+                    state = scale_state(state, ratio)
+        state, values = step(state, bar['high'], bar['low'], bar['close'], self.params)
+        state['ts'] = state['basis'] = bar['ts']
+        return state, values
+
+    def _load_events(self, entries: Iterable[IndicatorFeatureModel]) -> Dict[Tuple[str, str], List[Tuple[float, float]]]:
+        """一次查询读取各标的状态之后的除权事件"""
+        entries = list(entries)
+        bases = [
+            entry.state['committed']['basis'] or entry.state['committed']['ts']
+            for entry in entries
+        ]
+        bases = [basis for basis in bases if basis is not None]
+        if not bases:
+            return {}
+        # 除权事件很少，按时间过滤即可
+        rows = AdjustmentFactorModel.objects.filter(
+            ex_date__gt=pd.Timestamp(min(bases), unit='s', tz='UTC'),
+        ).order_by('ex_date').values_list('market', 'symbol', 'ex_date', 'ratio')
+        events = {}
+        for market, symbol, ex_date, ratio in rows:
+            events.setdefault((market, symbol), []).append((ex_date.timestamp(), ratio))
+        return events
+
+    def _stored_symbols(self, market: str) -> List[str]:
+        if settings.AI_TRADER_CONFIG.get('COLUMNAR_STORE_ENABLED') and market in ColumnarStore.MARKETS:
+            symbols = get_columnar_store().symbols(market)
+            if symbols:
+                return symbols
+        return list(
+            MarketDataModel.objects.filter(market=market).order_by().values_list('symbol', flat=True).distinct()
+        )
+
+    @staticmethod
+    def _assign(entry: IndicatorFeatureModel, bar: Dict, bars: int, values: Dict, now):
+        entry.timestamp = pd.Timestamp(bar['ts'], unit='s', tz='UTC').to_pydatetime()
+        entry.close = bar['close']
+        entry.bars = bars
+        for column in FEATURE_COLUMNS:
+            setattr(entry, column, values[column])
+        entry.updated_at = now
+
+    @staticmethod
+    def _scalar(value) -> Optional[float]:
+        return None if pd.isna(value) else float(value)
+
+
+def load_features(symbols: Optional[Iterable[str]] = None, market: Optional[str] = None, max_age_days: Optional[int] = None) -> Dict[str, Dict]:
+    """
+    读取特征表
+
+    Args:
+        symbols: 标的列表，默认全部
+        market: 市场类型
+        max_age_days: 只返回最新K线在该天数以内的标的
+
+    Returns:
+        Dict[str, Dict]: 标的 -> {'timestamp', 'close', 'ema_fast', ..., 'boll_lower'}
+    """
+    queryset = IndicatorFeatureModel.objects.all()
+    if symbols is not None:
+        queryset = queryset.filter(symbol__in=list(symbols))
+    if market:
+        queryset = queryset.filter(market=market)
+    if max_age_days is not None:
+        queryset = queryset.filter(timestamp__gte=timezone.now() - timedelta(days=max_age_days))
+    return {
+        row['symbol']: row
+        for row in queryset.values('symbol', 'market', 'timestamp', 'bars', 'close', *FEATURE_COLUMNS)
+    }
+
+
+_indicator_engine: Optional[IndicatorEngine] = None
+
+
+def get_indicator_engine() -> IndicatorEngine:
+    """获取指标引擎单例"""
+    global _indicator_engine
+    if _indicator_engine is None:
+        _indicator_engine = IndicatorEngine()
+    return _indicator_engine
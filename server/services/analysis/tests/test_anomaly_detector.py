@@ -0,0 +1,127 @@
+"""
+增量异常检测测试
+"""
+import math
+import os
+import tempfile
+from datetime import timedelta
+
+import numpy as np
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.market_data.models import MarketDataModel
+from services.analysis.anomaly_detector import F, AnomalyDetector, welford_push, welford_z
+
+OPTIONS = {'min_samples': 20, 'max_samples': 60, 'volume_z': 3.0, 'volatility_z': 3.0, 'high_z': 5.0}
+
+
+class WelfordTest(TestCase):
+
+    def test_push_matches_batch_moments_below_the_cap(self):
+        samples = np.random.default_rng(7).normal(5.0, 2.0, 50)
+        n = mean = m2 = 0.0
+        for x in samples:
+            n, mean, m2 = welford_push(n, mean, m2, x, max_samples=60)
+
+        self.assertEqual(n, 50)
+        self.assertAlmostEqual(mean, samples.mean())
+        self.assertAlmostEqual(m2 / (n - 1), samples.var(ddof=1))
+        self.assertAlmostEqual(welford_z(n, mean, m2, 11.0), (11.0 - samples.mean()) / samples.std(ddof=1))
+
+    def test_push_forgets_exponentially_at_the_cap(self):
+        n, mean, m2 = 10.0, 0.0, 10.0
+        for _ in range(200):
+            n, mean, m2 = welford_push(n, mean, m2, 4.0, max_samples=10)
+
+        self.assertEqual(n, 10)
+        self.assertAlmostEqual(mean, 4.0, places=6)
+        self.assertLess(m2, 1e-6)
+
+    def test_z_is_undefined_without_spread(self):
+        self.assertIsNone(welford_z(1, 0.0, 0.0, 1.0))
+        self.assertIsNone(welford_z(5, 1.0, 0.0, 2.0))
+
+
+class AnomalyDetectorTest(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'anomaly_state.npz')
+        self.start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=40)
+        rng = np.random.default_rng(3)
+        close = 10.0
+        for day in range(30):
+            close *= math.exp(rng.normal(0, 0.01))
+            self.write(day, close, 1000 * math.exp(rng.normal(0, 0.1)))
+
+    def write(self, day: int, close: float, volume: float):
+        MarketDataModel.objects.update_or_create(
+            symbol='AAA', market='US_STOCK', timestamp=self.start + timedelta(days=day),
+            defaults={'open': close, 'high': close, 'low': close, 'close': close, 'volume': int(volume), 'amount': 0},
+        )
+
+    def detector(self) -> AnomalyDetector:
+        return AnomalyDetector(self.path, OPTIONS)
+
+    def test_spike_is_scored_against_the_baseline_without_joining_it(self):
+        detector = self.detector()
+        self.assertEqual(detector.detect(), [])
+        baseline = list(detector.states[('US_STOCK', 'AAA')])
+
+        close = float(MarketDataModel.objects.latest('timestamp').close)
+        self.write(30, close * 1.2, 50000)
+        anomalies = detector.detect()
+
+        self.assertEqual(sorted(a['type'] for a in anomalies), ['volatility_spike', 'volume_spike'])
+        self.assertTrue(all(a['severity'] == 'high' for a in anomalies))
+        # 上一根K线并入基线，异常K线仍是待定的一根
+        state = detector.states[('US_STOCK', 'AAA')]
+        self.assertEqual(state[F['vol_n']], baseline[F['vol_n']] + 1)
+        self.assertEqual(state[F['pending_ts']], (self.start + timedelta(days=30)).timestamp())
+
+    def test_rewritten_pending_bar_replaces_instead_of_joining(self):
+        detector = self.detector()
+        detector.detect()
+        close = float(MarketDataModel.objects.latest('timestamp').close)
+        self.write(29, close, 50000)
+        anomalies = detector.detect()
+        n = detector.states[('US_STOCK', 'AAA')][F['vol_n']]
+
+        self.assertEqual([a['type'] for a in anomalies], ['volume_spike'])
+        self.write(29, close, 1000)
+        self.assertEqual(detector.detect(), [])
+        self.assertEqual(detector.states[('US_STOCK', 'AAA')][F['vol_n']], n)
+
+    def test_cursor_reads_only_rows_written_since_the_last_run(self):
+        detector = self.detector()
+        detector.detect()
+        cursor = detector.cursors['US_STOCK']
+        self.assertEqual(cursor, MarketDataModel.objects.latest('updated_at').updated_at.timestamp())
+
+        # 超出重叠窗口的旧行不再读取；之后写入的行被读取
+        MarketDataModel.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        detector.cursors['US_STOCK'] = timezone.now().timestamp()
+        self.assertFalse(MarketDataModel.objects.filter(detector._pending_rows()).exists())
+        self.write(30, 10.0, 1000)
+        self.assertEqual(MarketDataModel.objects.filter(detector._pending_rows()).count(), 1)
+
+    def test_late_bar_older_than_the_baseline_is_ignored(self):
+        detector = self.detector()
+        detector.detect()
+        state = list(detector.states[('US_STOCK', 'AAA')])
+
+        accepted = detector.observe('US_STOCK', 'AAA', (self.start + timedelta(days=5)).timestamp(), 1.0, 1.0)
+
+        self.assertFalse(accepted)
+        self.assertEqual(detector.states[('US_STOCK', 'AAA')], state)
+
+    def test_state_and_cursors_survive_a_restart(self):
+        detector = self.detector()
+        detector.detect()
+
+        restarted = self.detector()
+
+        self.assertEqual(restarted.cursors, detector.cursors)
+        np.testing.assert_array_equal(restarted.states[('US_STOCK', 'AAA')], detector.states[('US_STOCK', 'AAA')])
@@ -0,0 +1,76 @@
+"""
+全市场突破扫描测试
+"""
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+import pandas as pd
+from django.conf import settings
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.market_data.models import MarketDataModel
+from services.analysis.breakout_scanner import BreakoutScanner
+from services.data_collectors import columnar_store
+from services.data_collectors.adjustment import record_adjustments
+from services.data_collectors.columnar_store import ColumnarStore
+from services.data_collectors.normalizers import localize_dates
+
+OPTIONS = {'breakout_bars': 5, 'breakout_pct': 0.02, 'high_bars': 20, 'gap_pct': 0.02, 'max_age_days': 1}
+
+
+def bars(days_ago_last: int = 0, count: int = 25, **last):
+    """收盘 10、最高 10.1、最低 9.9 的平稳日线，最后一根按 last 覆盖"""
+    today = timezone.localdate()
+    days = localize_dates([today - timedelta(days=days_ago_last + back) for back in range(count - 1, -1, -1)])
+    frame = pd.DataFrame({'timestamp': days, 'open': 10.0, 'high': 10.1, 'low': 9.9, 'close': 10.0, 'volume': 100})
+    for column, value in last.items():
+        frame.loc[frame.index[-1], column] = value
+    return frame
+
+
+UNIVERSE = {
+    'BRK': bars(open=10.0, high=10.6, close=10.5),
+    'GAP': bars(open=9.5, high=9.6, low=9.4, close=9.5),
+    'FLAT': bars(),
+    'STALE': bars(days_ago_last=10, high=10.6, close=10.5),
+    'SHORT': bars(count=1, high=10.6, close=10.5),
+}
+
+
+class BreakoutScannerTest(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.store = ColumnarStore(self.tmp.name)
+        patcher = mock.patch.object(columnar_store, '_columnar_store', self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        for symbol, frame in UNIVERSE.items():
+            self.store.write(symbol, 'A_STOCK', frame)
+            MarketDataModel.objects.bulk_create([
+                MarketDataModel(symbol=symbol, market='A_STOCK', amount=0, **row)
+                for row in frame.assign(timestamp=frame['timestamp'].dt.to_pydatetime()).to_dict('records')
+            ])
+
+    def scan(self, columnar: bool):
+        with mock.patch.dict(settings.AI_TRADER_CONFIG, {'COLUMNAR_STORE_ENABLED': columnar}):
+            signals = BreakoutScanner(OPTIONS).scan({'A_STOCK': list(UNIVERSE)})
+        return sorted((signal['type'], signal['symbol'], signal.get('direction')) for signal in signals)
+
+    def test_signals_are_the_same_from_either_store(self):
+        expected = [('breakout', 'BRK', None), ('gap', 'GAP', 'down'), ('new_high', 'BRK', None)]
+        self.assertEqual(self.scan(columnar=True), expected)
+        self.assertEqual(self.scan(columnar=False), expected)
+
+    def test_ex_rights_inside_the_window_is_not_a_gap(self):
+        record_adjustments(pd.DataFrame({'timestamp': UNIVERSE['GAP']['timestamp'].iloc[[-1]], 'ratio': [0.95]}), 'A_STOCK', 'GAP')
+        self.assertNotIn(('gap', 'GAP', 'down'), self.scan(columnar=True))
+        self.assertNotIn(('gap', 'GAP', 'down'), self.scan(columnar=False))
+
+    def test_stored_universe_lists_fresh_symbols_from_the_database(self):
+        with mock.patch.dict(settings.AI_TRADER_CONFIG, {'COLUMNAR_STORE_ENABLED': False}):
+            universe = BreakoutScanner(OPTIONS).stored_universe()
+        self.assertEqual(sorted(universe['A_STOCK']), ['BRK', 'FLAT', 'GAP', 'SHORT'])
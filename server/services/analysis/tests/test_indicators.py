@@ -0,0 +1,129 @@
+"""
+技术指标引擎测试
+"""
+import math
+from datetime import timedelta
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.market_data.models import IndicatorFeatureModel, MarketDataModel
+from services.analysis.indicators import (
+    DEFAULT_PARAMS, FEATURE_COLUMNS, IndicatorEngine, compute_indicators, empty_state, step,
+)
+from services.data_collectors.adjustment import record_adjustments
+
+
+def random_bars(count: int, seed: int = 5) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, count)))
+    spread = np.abs(rng.normal(0, 0.01, count)) * close
+    return pd.DataFrame({'high': close + spread, 'low': close - spread, 'close': close})
+
+
+class StepTest(TestCase):
+
+    def test_streaming_steps_match_the_batch_path(self):
+        frame = random_bars(80)
+        batch = compute_indicators(frame, DEFAULT_PARAMS)
+
+        state = empty_state()
+        for i, bar in enumerate(frame.itertuples()):
+            state, values = step(state, bar.high, bar.low, bar.close, DEFAULT_PARAMS)
+            for column in FEATURE_COLUMNS:
+                expected = batch[column].iloc[i]
+                if pd.isna(expected):
+                    self.assertIsNone(values[column], (i, column))
+                else:
+                    self.assertAlmostEqual(values[column], expected, places=9, msg=(i, column))
+
+
+class IndicatorEngineTest(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.dict(settings.AI_TRADER_CONFIG, {'COLUMNAR_STORE_ENABLED': False})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.frame = random_bars(60)
+        self.start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=80)
+        self.engine = IndicatorEngine()
+        for day in range(40):
+            self.write(day)
+
+    def write(self, day: int, scale: float = 1.0, symbol: str = 'AAA'):
+        bar = self.frame.iloc[day] * scale
+        MarketDataModel.objects.update_or_create(
+            symbol=symbol, market='US_STOCK', timestamp=self.start + timedelta(days=day),
+            defaults={'open': bar.close, 'high': bar.high, 'low': bar.low, 'close': bar.close, 'volume': 100},
+        )
+
+    def assertMatchesRecompute(self, symbol: str = 'AAA'):
+        streamed = IndicatorFeatureModel.objects.get(symbol=symbol)
+        IndicatorEngine().recompute([symbol], markets=['US_STOCK'])
+        batch = IndicatorFeatureModel.objects.get(symbol=symbol)
+        self.assertEqual((streamed.timestamp, streamed.bars), (batch.timestamp, batch.bars))
+        for column in FEATURE_COLUMNS:
+            self.assertAlmostEqual(float(getattr(streamed, column)), float(getattr(batch, column)), places=4, msg=column)
+
+    def test_first_update_seeds_the_market_with_the_batch_path(self):
+        result = self.engine.update('US_STOCK')
+
+        self.assertEqual(result['recomputed'], 1)
+        feature = IndicatorFeatureModel.objects.get()
+        self.assertEqual(feature.bars, 40)
+        self.assertEqual(feature.source_updated_at, MarketDataModel.objects.latest('updated_at').updated_at)
+
+    def test_streamed_bars_match_a_full_recompute(self):
+        self.engine.update('US_STOCK')
+        for day in range(40, 60):
+            # 盘中先写入一个临时价，再改写为收盘价
+            self.write(day, scale=1.01)
+            self.engine.update('US_STOCK')
+            self.write(day)
+            result = self.engine.update('US_STOCK')
+            self.assertEqual((result['symbols'], result['recomputed']), (1, 0))
+
+        self.assertMatchesRecompute()
+
+    def test_cursor_skips_rows_already_consumed(self):
+        self.engine.update('US_STOCK')
+        result = self.engine.update('US_STOCK')
+
+        # 游标回退会重复读到最后写入的行，但它们已消费，不再推进
+        self.assertEqual(result['symbols'], 0)
+        self.assertEqual(IndicatorFeatureModel.objects.get().bars, 40)
+
+    def test_late_bar_falls_back_to_the_batch_path(self):
+        MarketDataModel.objects.filter(timestamp=self.start + timedelta(days=20)).delete()
+        self.engine.update('US_STOCK')
+
+        self.write(20)
+        result = self.engine.update('US_STOCK')
+
+        self.assertEqual((result['symbols'], result['recomputed']), (0, 1))
+        self.assertEqual(IndicatorFeatureModel.objects.get().bars, 40)
+
+    def test_new_symbol_in_a_seeded_market_is_recomputed(self):
+        self.engine.update('US_STOCK')
+        self.write(0, symbol='BBB')
+
+        result = self.engine.update('US_STOCK')
+
+        self.assertEqual(result['recomputed'], 1)
+        self.assertTrue(IndicatorFeatureModel.objects.filter(symbol='BBB').exists())
+
+    def test_ex_rights_event_scales_the_streaming_state(self):
+        self.engine.update('US_STOCK')
+        # 第 40 根起价格减半（1 拆 2），之前的价格按 0.5 前复权
+        ex_date = self.start + timedelta(days=40)
+        record_adjustments(pd.DataFrame({'timestamp': [pd.Timestamp(ex_date)], 'ratio': [0.5]}), 'US_STOCK', 'AAA')
+        for day in range(40, 50):
+            self.write(day, scale=0.5)
+            self.engine.update('US_STOCK')
+
+        self.assertMatchesRecompute()
+        self.assertTrue(math.isfinite(float(IndicatorFeatureModel.objects.get().rsi)))
@@ -0,0 +1,176 @@
+"""
+复权因子
+Adjustment-factor store with adjusted views computed on read
+
+market_data 与列式存储保存不复权价格。数据源的涨跌幅以除权参考价为昨收计算，
+因此由 收盘价 / (1 + 涨跌幅) 反推的参考价与实际前收盘价不一致的交易日即为
+除权除息日，两者之比记为该事件的复权比例（分红 < 1，送转股远小于 1）。
+
+事件只追加、不改写；读取时按时间戳向量化相乘：
+    前复权(qfq)  价格 × 之后所有事件比例之积
+    后复权(hfq)  价格 ÷ 之前（含当日）所有事件比例之积，以本地首条K线为基准
+"""
+import logging
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from apps.market_data.models import AdjustmentFactorModel
+
+logger = logging.getLogger(__name__)
+
+ADJUSTED_COLUMNS = ['open', 'high', 'low', 'close']
+ADJUST_MODES = ('qfq', 'hfq')
+
+Bars = Union[pd.DataFrame, Dict[str, np.ndarray]]
+
+
+def detect_adjustments(
+    frame: pd.DataFrame,
+    prev_close: Union[float, pd.Series, None] = None,
+    tolerance: Optional[float] = None
+) -> pd.DataFrame:
+    """
+    从不复权标准帧中识别除权除息事件
+
+    Args:
+        frame: 不复权标准帧（单标的按 timestamp 升序；带 symbol 列时为每标的一行的快照）
+        prev_close: 单标的时为帧首行之前的收盘价；快照时为 symbol -> 前收盘价
+        tolerance: 参考价与前收盘价的相对偏差超过该值视为除权，默认读取 ADJUSTMENT_TOLERANCE
+
+    Returns:
+        pd.DataFrame: 事件列 [symbol（快照时）, timestamp, ratio]
+    """
+    if tolerance is None:
+        tolerance = settings.AI_TRADER_CONFIG.get('ADJUSTMENT_TOLERANCE', 0.001)
+    columns = ['symbol', 'timestamp', 'ratio'] if 'symbol' in frame else ['timestamp', 'ratio']
+    if frame.empty or 'change_pct' not in frame:
+        return pd.DataFrame(columns=columns)
+
+    close = frame['close'].to_numpy(dtype=float)
+    if 'symbol' in frame:
+        previous = frame['symbol'].map(prev_close if prev_close is not None else {})
+        previous = pd.to_numeric(previous, errors='coerce').to_numpy(dtype=float)
+    else:
+        first = np.nan if prev_close is None else float(prev_close)
+        previous = np.concatenate([[first], close[:-1]])
+
+    reference = close / (1 + frame['change_pct'].to_numpy(dtype=float, na_value=np.nan) / 100)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = reference / previous
+    events = np.isfinite(ratio) & (ratio > 0) & (np.abs(ratio - 1) > tolerance)
+    # OHLC 不一致的行（将被质量校验隔离）不用于识别事件
+    if 'low' in frame and 'high' in frame:
+        events &= (frame['low'].to_numpy(dtype=float) <= close) & (close <= frame['high'].to_numpy(dtype=float))
+
+    result = frame.loc[events, [column for column in columns if column != 'ratio']].copy()
+    result['ratio'] = ratio[events]
+    return result.reset_index(drop=True)
+
+
+def record_adjustments(events: pd.DataFrame, market: str, symbol: Optional[str] = None, source: str = 'derived') -> int:
+    """追加复权事件（同一事件重复识别时覆盖比例），返回事件数"""
+    if events.empty:
+        return 0
+    symbols = events['symbol'].tolist() if symbol is None else [symbol] * len(events)
+    records = [
+        AdjustmentFactorModel(symbol=sym, market=market, ex_date=ts, ratio=float(ratio), source=source)
+        for sym, ts, ratio in zip(
+            symbols, pd.DatetimeIndex(events['timestamp']).to_pydatetime(), events['ratio'].tolist()
+        )
+    ]
+    AdjustmentFactorModel.objects.bulk_create(
+        records,
+        update_conflicts=True,
+        unique_fields=['symbol', 'market', 'ex_date'],
+        update_fields=['ratio', 'source'],
+    )
+    logger.info(f"Recorded {len(records)} adjustment events in {market}: {sorted(set(symbols))[:10]}")
+    return len(records)
+
+
+def load_factors(symbol: str, market: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    读取标的的复权事件
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (除权日 int64 纳秒升序, 比例)
+    """
+    queryset = AdjustmentFactorModel.objects.filter(symbol=symbol)
+    if market:
+        queryset = queryset.filter(market=market)
+    rows = list(queryset.order_by('ex_date').values_list('ex_date', 'ratio'))
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    ex_dates, ratios = zip(*rows)
+    return pd.DatetimeIndex(ex_dates).as_unit('ns').asi8, np.array(ratios, dtype=np.float64)
+
+
+def adjustment_multipliers(timestamps: np.ndarray, ex_dates: np.ndarray, ratios: np.ndarray, mode: str = 'qfq') -> np.ndarray:
+    """
+    每根K线的复权乘数
+
+    Args:
+        timestamps: K线时间戳（int64 纳秒）
+        mode: 'qfq' 前复权 / 'hfq' 后复权
+    """
+    if mode not in ADJUST_MODES:
+        raise ValueError(f"Unknown adjust mode: {mode}")
+    if len(ratios) == 0:
+        return np.ones(len(timestamps))
+    # 每根K线当日及之前已发生的事件数
+    applied = np.searchsorted(ex_dates, timestamps, side='right')
+    prefix = np.concatenate([[1.0], np.cumprod(ratios)])
+    if mode == 'qfq':
+        return prefix[-1] / prefix[applied]
+    return 1 / prefix[applied]
+
+
+def adjust_bars(bars: Bars, symbol: str, market: Optional[str] = None, mode: str = 'qfq') -> Bars:
+    """
+    对不复权K线（DataFrame 或 read_recent_bars 返回的数组字典）应用复权，返回新对象
+
+    timestamp 可以是 int64 纳秒数组或带时区的时间列。
+    """
+    ex_dates, ratios = load_factors(symbol, market)
+    if len(ratios) == 0:
+        return bars
+
+    timestamps = bars['timestamp']
+    if not (isinstance(timestamps, np.ndarray) and timestamps.dtype == np.int64):
+        timestamps = pd.DatetimeIndex(timestamps).as_unit('ns').asi8
+    multiplier = adjustment_multipliers(timestamps, ex_dates, ratios, mode)
+
+    adjusted = bars.copy()
+    for column in ADJUSTED_COLUMNS:
+        if column in adjusted:
+            adjusted[column] = np.asarray(bars[column], dtype=float) * multiplier
+    return adjusted
+
+
+def adjust_window(window: Dict[str, np.ndarray], symbols, market: str) -> Dict[str, np.ndarray]:
+    """
+    对 ColumnarStore.tail_many 返回的多标的K线矩阵原地应用前复权（一次查询读取窗口内的全部事件）
+
+    窗口之前的事件对窗口内所有K线乘以同一比例，不影响窗口内的相对比较，因此只处理窗口内的事件，
+    窗口内价格与最新价处于同一复权基准。
+    """
+    timestamps = window['timestamp']
+    valid = timestamps[timestamps > 0]
+    if not len(valid):
+        return window
+    start = pd.Timestamp(int(valid.min()), tz='UTC')
+    events = AdjustmentFactorModel.objects.filter(market=market, ex_date__gt=start).values_list('symbol', 'ex_date', 'ratio')
+
+    rows = {symbol: row for row, symbol in enumerate(symbols)}
+    for symbol, ex_date, ratio in events:
+        row = rows.get(symbol)
+        if row is None:
+            continue
+        before = (timestamps[row] > 0) & (timestamps[row] < pd.Timestamp(ex_date).as_unit('ns').value)
+        for column in ADJUSTED_COLUMNS:
+            if column in window:
+                window[column][row, before] *= ratio
+    return window
@@ -0,0 +1,131 @@
+"""
+K线更新事件
+Change detection and "bars updated" notifications for follow-mode collection
+
+collect_market_data --follow 每个周期只写入内容有变化的K线，并通过 Channels
+层向 BARS_UPDATED_GROUP 组广播一条精简的通知（symbol/market/timestamp 列表）。
+智能体进程用 BarsUpdatedSubscriber 等待通知，WebSocket 客户端可订阅
+ws/market/，都不再需要按固定间隔轮询扫表。
+"""
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+logger = logging.getLogger(__name__)
+
+BARS_UPDATED_GROUP = 'market_bars'
+BARS_UPDATED_TYPE = 'bars.updated'
+
+
+class BarChangeTracker:
+    """
+    记录每个 (symbol, market, data_source) 最近写入的K线内容，过滤未变化的行
+
+    只保留每个标的最近 keep 根K线，足以覆盖增量采集每个周期重新拉取的尾部。
+    """
+
+    COMPARE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+    def __init__(self, keep: int = 3):
+        self.keep = keep
+        self._last: Dict[Tuple[str, str, str], Dict[int, tuple]] = {}
+        self._lock = threading.Lock()
+
+    def changed(self, frame: pd.DataFrame, market: str, data_source: str, symbol: Optional[str] = None) -> pd.DataFrame:
+        """
+        返回与上次写入内容不同（或首次出现）的行
+
+        Args:
+            frame: 标准帧
+            symbol: 标的代码；为 None 时取 frame 的 symbol 列（多标的快照）
+        """
+        if frame.empty:
+            return frame
+        with self._lock:
+            mask = [
+                self._last.get((sym, market, data_source), {}).get(ts) != signature
+                for sym, ts, signature in self._rows(frame, symbol)
+            ]
+        return frame[mask]
+
+    def remember(self, frame: pd.DataFrame, market: str, data_source: str, symbol: Optional[str] = None):
+        """记录已写入的行"""
+        with self._lock:
+            for sym, ts, signature in self._rows(frame, symbol):
+                bars = self._last.setdefault((sym, market, data_source), {})
+                bars[ts] = signature
+                if len(bars) > self.keep:
+                    for stale in sorted(bars)[:-self.keep]:
+                        del bars[stale]
+
+    def _rows(self, frame: pd.DataFrame, symbol: Optional[str]):
+        timestamps = pd.DatetimeIndex(frame['timestamp']).as_unit('ns').asi8.tolist()
+        symbols = frame['symbol'].tolist() if symbol is None else [symbol] * len(frame)
+        signatures = zip(*(frame[column].tolist() for column in self.COMPARE_COLUMNS))
+        return zip(symbols, timestamps, signatures)
+
+
+def bar_event(symbol: str, market: str, timestamp: datetime, **extra) -> Dict:
+    """构造一条K线更新通知"""
+    return {'symbol': symbol, 'market': market, 'timestamp': pd.Timestamp(timestamp).isoformat(), **extra}
+
+
+def publish_bars_updated(bars: List[Dict]) -> bool:
+    """
+    广播K线更新通知（通道层不可用时只记录日志，不影响采集）
+
+    Returns:
+        bool: 是否发送成功
+    """
+    if not bars:
+        return False
+    try:
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return False
+        async_to_sync(channel_layer.group_send)(
+            BARS_UPDATED_GROUP, {'type': BARS_UPDATED_TYPE, 'bars': bars}
+        )
+        return True
+    except Exception as e:
+        logger.error(f"Failed to publish bars updated notification: {e}")
+        return False
+
+
+class BarsUpdatedSubscriber:
+    """K线更新通知订阅者（供同步的智能体循环使用）"""
+
+    def __init__(self, group: str = BARS_UPDATED_GROUP):
+        self.group = group
+        self.channel_layer = get_channel_layer()
+        self.channel = async_to_sync(self.channel_layer.new_channel)()
+        async_to_sync(self.channel_layer.group_add)(self.group, self.channel)
+
+    def wait(self, timeout: float) -> List[Dict]:
+        """
+        等待下一条通知，并合并已积压的通知
+
+        Returns:
+            List[Dict]: 更新的K线列表，超时返回空列表
+        """
+        return async_to_sync(self._wait)(timeout)
+
+    def close(self):
+        async_to_sync(self.channel_layer.group_discard)(self.group, self.channel)
+
+    async def _wait(self, timeout: float) -> List[Dict]:
+        bars = []
+        wait = timeout
+        while True:
+            try:
+                message = await asyncio.wait_for(self.channel_layer.receive(self.channel), wait)
+            except asyncio.TimeoutError:
+                return bars
+            bars.extend(message.get('bars', []))
+            wait = 0.05
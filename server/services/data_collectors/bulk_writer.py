@@ -0,0 +1,103 @@
+"""
+市场数据批量写入器
+Bulk upsert of MarketDataModel rows
+"""
+import logging
+import time
+from typing import Dict, List, Optional
+
+from django.db import transaction
+
+from apps.market_data.models import MarketDataModel
+
+logger = logging.getLogger(__name__)
+
+
+class MarketDataBulkWriter:
+    """
+    市场数据批量写入器
+
+    按 unique_together (symbol, market, timestamp) 分块执行
+    bulk_create(update_conflicts=True)，每块只需一次 SELECT（统计新增/更新）
+    加一次 INSERT ... ON CONFLICT DO UPDATE。
+    """
+
+    UNIQUE_FIELDS = ['symbol', 'market', 'timestamp']
+
+    def __init__(self, chunk_size: int = 1000):
+        self.chunk_size = max(1, chunk_size)
+
+    def write(self, records: List[MarketDataModel], update_fields: List[str]) -> Dict:
+        """
+        批量写入行情记录
+
+        Args:
+            records: 未保存的 MarketDataModel 实例
+            update_fields: 冲突时需要更新的字段
+
+        Returns:
+            Dict: {'count', 'inserted', 'updated', 'elapsed', 'rows_per_sec'}
+        """
+        started = time.perf_counter()
+        records = self._deduplicate(records)
+        fields = list(update_fields)
+        if 'updated_at' not in fields:
+            fields.append('updated_at')
+
+        inserted = 0
+        updated = 0
+        for start in range(0, len(records), self.chunk_size):
+            chunk = records[start:start + self.chunk_size]
+            with transaction.atomic():
+                existing = self._count_existing(chunk)
+                MarketDataModel.objects.bulk_create(
+                    chunk,
+                    update_conflicts=True,
+                    unique_fields=self.UNIQUE_FIELDS,
+                    update_fields=fields,
+                )
+            updated += existing
+            inserted += len(chunk) - existing
+
+        elapsed = time.perf_counter() - started
+        return self.build_stats(len(records), inserted, updated, elapsed)
+
+    @staticmethod
+    def build_stats(count: int, inserted: int, updated: int, elapsed: float) -> Dict:
+        """组装写入统计"""
+        return {
+            'count': count,
+            'inserted': inserted,
+            'updated': updated,
+            'elapsed': round(elapsed, 4),
+            'rows_per_sec': round(count / elapsed, 1) if elapsed > 0 else float(count),
+        }
+
+    def _deduplicate(self, records: List[MarketDataModel]) -> List[MarketDataModel]:
+        """同一批次内的重复键只保留最后一条（ON CONFLICT 不允许同一行更新两次）"""
+        unique: Dict[tuple, MarketDataModel] = {}
+        for record in records:
+            unique[(record.symbol, record.market, record.timestamp)] = record
+        return list(unique.values())
+
+    def _count_existing(self, chunk: List[MarketDataModel]) -> int:
+        """统计本块中已存在于数据库的记录数"""
+        keys = {(r.symbol, r.market, r.timestamp) for r in chunk}
+        existing = MarketDataModel.objects.filter(
+            symbol__in={k[0] for k in keys},
+            market__in={k[1] for k in keys},
+            timestamp__in={k[2] for k in keys},
+        ).values_list('symbol', 'market', 'timestamp')
+        return sum(1 for key in existing if key in keys)
+
+
+def merge_write_stats(total: Dict, stats: Optional[Dict]) -> Dict:
+    """累加写入统计（用于批量采集汇总）"""
+    if not stats:
+        return total
+    for key in ('count', 'inserted', 'updated'):
+        total[key] = total.get(key, 0) + stats.get(key, 0)
+    elapsed = round(total.get('elapsed', 0) + stats.get('elapsed', 0), 4)
+    total['elapsed'] = elapsed
+    total['rows_per_sec'] = round(total['count'] / elapsed, 1) if elapsed > 0 else float(total.get('count', 0))
+    return total
@@ -0,0 +1,448 @@
+"""
+列式行情存储
+Columnar on-disk OHLCV store backed by memory-mapped numpy files
+
+布局: <root>/<market>/<symbol>/<column>.bin，每列一个定长小端二进制文件，
+按 timestamp 升序排列。写入只原地改写与新数据重叠的尾部并向后追加，新增K线为
+O(新增行数)；文件从不截断。读取通过 np.memmap 定位所需区间并拷贝出连续数组，
+不经过 ORM。
+
+快照、--follow、--worker 与 build_columnar_store 可能是不同进程写同一标的目录：
+每个标的目录下的 .lock 文件用 fcntl.flock 加锁，写入（读尾部、合并、改写）持排他锁，
+读取持共享锁并在锁内拷贝数据，不会读到改写到一半的尾部（新 close 配旧 timestamp）。
+"""
+import fcntl
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db.models import Count, Max
+
+from apps.market_data.models import MarketDataModel
+from services.data_collectors.adjustment import adjust_bars
+
+logger = logging.getLogger(__name__)
+
+
+class ColumnarStore:
+    """列式行情存储"""
+
+    # 列名 -> numpy dtype（timestamp 为 UTC 纳秒时间戳）
+    COLUMNS = {
+        'timestamp': np.dtype('<i8'),
+        'open': np.dtype('<f8'),
+        'high': np.dtype('<f8'),
+        'low': np.dtype('<f8'),
+        'close': np.dtype('<f8'),
+        'volume': np.dtype('<i8'),
+        'amount': np.dtype('<f8'),
+        'change_pct': np.dtype('<f8'),
+        'turnover_rate': np.dtype('<f8'),
+    }
+    MARKETS = [choice[0] for choice in MarketDataModel.MARKET_CHOICES]
+    LOCK_FILE = '.lock'
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or settings.AI_TRADER_CONFIG['COLUMNAR_STORE_DIR']
+        os.makedirs(self.root, exist_ok=True)
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    # ------------------------------------------------------------------ 写入
+
+    def write(self, symbol: str, market: str, frame: pd.DataFrame) -> int:
+        """
+        写入标准帧（见 normalizers），与已有数据按 timestamp 合并，新数据优先
+
+        Returns:
+            int: 写入（追加或改写）的行数
+        """
+        if frame is None or frame.empty:
+            return 0
+
+        return self._write_arrays(self._symbol_dir(symbol, market), self._frame_to_arrays(frame))
+
+    def write_many(self, market: str, frame: pd.DataFrame) -> int:
+        """
+        写入带 symbol 列的多标的标准帧（如全市场快照），列转换只做一次
+
+        Returns:
+            int: 写入的总行数
+        """
+        if frame is None or frame.empty:
+            return 0
+
+        frame = frame.sort_values(['symbol', 'timestamp'], kind='stable')
+        frame = frame.drop_duplicates(['symbol', 'timestamp'], keep='last')
+        arrays = self._frame_to_arrays(frame, deduplicate=False)
+        symbols = frame['symbol'].to_numpy()
+        boundaries = np.flatnonzero(symbols[1:] != symbols[:-1]) + 1
+        starts = np.concatenate([[0], boundaries])
+        ends = np.concatenate([boundaries, [len(symbols)]])
+
+        written = 0
+        for lo, hi in zip(starts, ends):
+            incoming = {column: values[lo:hi] for column, values in arrays.items()}
+            written += self._write_arrays(self._symbol_dir(str(symbols[lo]), market), incoming)
+        return written
+
+    def _write_arrays(self, path: str, incoming: Dict[str, np.ndarray]) -> int:
+        """按列写入已排序、去重的数组"""
+        os.makedirs(path, exist_ok=True)
+
+        with self._lock_for(path), self._file_lock(path):
+            existing_ts = self._open_column(path, 'timestamp')
+            start = int(np.searchsorted(existing_ts, incoming['timestamp'][0], side='left'))
+            if start < len(existing_ts):
+                # 与已有尾部重叠：合并尾部后从 start 处重写（合并结果不短于原尾部）
+                tail = {column: self._read_from(path, column, start) for column in self.COLUMNS}
+                incoming = self._merge(tail, incoming)
+            del existing_ts
+
+            # 先写数据列，最后写 timestamp，读取时以最短列为准保证一致
+            for column in [c for c in self.COLUMNS if c != 'timestamp'] + ['timestamp']:
+                self._write_column(path, column, start, incoming[column])
+
+        return len(incoming['timestamp'])
+
+    def purge_before(self, market: str, cutoff: datetime, dry_run: bool = False) -> int:
+        """
+        删除市场内各标的早于 cutoff 的K线（与数据保留任务的日线期限一致）
+
+        文件只在尾部改写，删除头部需要重写整列：持排他锁写临时文件后 os.replace。
+
+        Returns:
+            int: 删除（dry_run 时为将删除）的行数
+        """
+        cutoff_ns = self._to_ns(cutoff)
+        removed = 0
+        for symbol in self.symbols(market):
+            path = self._symbol_dir(symbol, market)
+            if not os.path.exists(os.path.join(path, 'timestamp.bin')):
+                continue
+            with self._lock_for(path), self._file_lock(path):
+                timestamps = self._open_column(path, 'timestamp')
+                length = self._consistent_length(path, timestamps)
+                start = int(np.searchsorted(timestamps[:length], cutoff_ns, side='left'))
+                del timestamps
+                if not start:
+                    continue
+                removed += start
+                if dry_run:
+                    continue
+                # 先写完全部临时文件再逐列替换，缩短各列长度不一致的窗口
+                filenames = [os.path.join(path, f'{column}.bin') for column in self.COLUMNS]
+                for column, filename in zip(self.COLUMNS, filenames):
+                    self._read_from(path, column, start)[:length - start].tofile(f'{filename}.tmp')
+                for filename in filenames:
+                    os.replace(f'{filename}.tmp', filename)
+        return removed
+
+    def _merge(self, tail: Dict[str, np.ndarray], incoming: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """合并已有尾部与新数据（相同 timestamp 以新数据为准）"""
+        keep = ~np.isin(tail['timestamp'], incoming['timestamp'])
+        merged = {
+            column: np.concatenate([tail[column][keep], incoming[column]])
+            for column in self.COLUMNS
+        }
+        order = np.argsort(merged['timestamp'], kind='stable')
+        return {column: values[order] for column, values in merged.items()}
+
+    def _write_column(self, path: str, column: str, start: int, values: np.ndarray):
+        """从第 start 行开始原地写入（超出部分即为追加）"""
+        filename = os.path.join(path, f'{column}.bin')
+        dtype = self.COLUMNS[column]
+        with open(filename, 'r+b' if os.path.exists(filename) else 'wb') as f:
+            f.seek(start * dtype.itemsize)
+            f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+
+    def _read_from(self, path: str, column: str, start: int) -> np.ndarray:
+        """读取第 start 行之后的数据（拷贝），只读尾部，不建立内存映射"""
+        filename = os.path.join(path, f'{column}.bin')
+        dtype = self.COLUMNS[column]
+        if not os.path.exists(filename):
+            return np.empty(0, dtype=dtype)
+        return np.fromfile(filename, dtype=dtype, offset=start * dtype.itemsize)
+
+    def _frame_to_arrays(self, frame: pd.DataFrame, deduplicate: bool = True) -> Dict[str, np.ndarray]:
+        """标准帧 -> 按列的 numpy 数组（缺失值为 NaN）"""
+        if deduplicate:
+            frame = frame.sort_values('timestamp').drop_duplicates('timestamp', keep='last')
+        timestamps = pd.DatetimeIndex(frame['timestamp'])
+        timestamps = timestamps.tz_convert('UTC') if timestamps.tz is not None else timestamps.tz_localize('UTC')
+        arrays = {'timestamp': timestamps.as_unit('ns').asi8.astype('<i8')}
+        for column, dtype in self.COLUMNS.items():
+            if column == 'timestamp':
+                continue
+            if column in frame:
+                values = pd.to_numeric(frame[column], errors='coerce')
+            else:
+                values = pd.Series(np.nan, index=frame.index)
+            if dtype.kind == 'i':
+                values = values.fillna(0)
+            arrays[column] = values.to_numpy(dtype=dtype)
+        return arrays
+
+    # ------------------------------------------------------------------ 读取
+
+    def read(
+        self,
+        symbol: str,
+        market: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        columns: Optional[List[str]] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        读取标的在 [start, end] 区间内的数据
+
+        Returns:
+            Dict[str, np.ndarray]: 列名 -> 连续数组（timestamp 为 datetime64[ns, UTC]
+            对应的 int64 纳秒值）；标的不存在时返回空数组
+        """
+        return self._read_range(symbol, market, start, end, None, columns)
+
+    def tail(
+        self,
+        symbol: str,
+        n: int,
+        market: Optional[str] = None,
+        columns: Optional[List[str]] = None,
+        end: Optional[datetime] = None
+    ) -> Dict[str, np.ndarray]:
+        """读取最近 n 根K线（升序），指定 end 时为 end（含）及之前的 n 根"""
+        return self._read_range(symbol, market, None, end, n, columns)
+
+    def _read_range(
+        self,
+        symbol: str,
+        market: Optional[str],
+        start: Optional[datetime],
+        end: Optional[datetime],
+        n: Optional[int],
+        columns: Optional[List[str]]
+    ) -> Dict[str, np.ndarray]:
+        """持共享锁定位区间并拷贝（只拷贝所需的行），锁释放后的改写不影响返回的数组"""
+        columns = columns or list(self.COLUMNS)
+        path = self._resolve_dir(symbol, market)
+        if path is None:
+            return {column: np.empty(0, dtype=self.COLUMNS[column]) for column in columns}
+
+        with self._file_lock(path, shared=True):
+            timestamps = self._open_column(path, 'timestamp')
+            length = self._consistent_length(path, timestamps)
+            timestamps = timestamps[:length]
+            lo = 0 if start is None else int(np.searchsorted(timestamps, self._to_ns(start), side='left'))
+            hi = length if end is None else int(np.searchsorted(timestamps, self._to_ns(end), side='right'))
+            if n is not None:
+                lo = max(lo, hi - n)
+            return {
+                column: np.array((timestamps if column == 'timestamp' else self._open_column(path, column))[lo:hi])
+                for column in columns
+            }
+
+    def tail_many(self, symbols: List[str], n: int, market: str, columns: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        一次读取多个标的最近 n 根K线，右对齐为 (标的数, n) 的矩阵
+
+        每个标的只读取各列文件的尾部（不建立内存映射），历史不足 n 根的左侧以 NaN（timestamp 为 0）填充。
+
+        Returns:
+            Dict[str, np.ndarray]: 列名 -> 矩阵（数值列为 float64），另含 'count' 每个标的的有效K线数
+        """
+        columns = [column for column in (columns or list(self.COLUMNS)) if column != 'timestamp']
+        matrix = {'timestamp': np.zeros((len(symbols), n), dtype=np.int64)}
+        for column in columns:
+            matrix[column] = np.full((len(symbols), n), np.nan)
+        counts = np.zeros(len(symbols), dtype=np.int64)
+
+        itemsize = self.COLUMNS['timestamp'].itemsize
+        for row, symbol in enumerate(symbols):
+            path = self._symbol_dir(symbol, market)
+            try:
+                length = os.path.getsize(os.path.join(path, 'timestamp.bin')) // itemsize
+            except OSError:
+                continue
+            start = max(0, length - n)
+            with self._file_lock(path, shared=True):
+                arrays = [self._read_from(path, 'timestamp', start)]
+                arrays += [self._read_from(path, column, start) for column in columns]
+            # 写入中断时各列长度可能不一致，以最短列为准（均从同一行开始读取，按行对齐）
+            count = min(len(values) for values in arrays)
+            if not count:
+                continue
+            counts[row] = count
+            matrix['timestamp'][row, n - count:] = arrays[0][:count]
+            for column, values in zip(columns, arrays[1:]):
+                matrix[column][row, n - count:] = values[:count]
+
+        matrix['count'] = counts
+        return matrix
+
+    def latest(self, symbol: str, market: Optional[str] = None) -> Optional[Dict[str, float]]:
+        """读取最新一根K线"""
+        data = self.tail(symbol, 1, market)
+        if not len(data['timestamp']):
+            return None
+        return {column: values[-1].item() for column, values in data.items()}
+
+    def symbols(self, market: str) -> List[str]:
+        """列出某市场下已存储的标的"""
+        path = os.path.join(self.root, market)
+        if not os.path.isdir(path):
+            return []
+        return sorted(os.listdir(path))
+
+    def has_symbol(self, symbol: str, market: Optional[str] = None) -> bool:
+        return self._resolve_dir(symbol, market) is not None
+
+    @staticmethod
+    def to_datetime(timestamps: np.ndarray) -> pd.DatetimeIndex:
+        """int64 纳秒时间戳 -> DatetimeIndex(UTC)"""
+        return pd.to_datetime(timestamps, utc=True)
+
+    # ------------------------------------------------------------------ 内部
+
+    def _symbol_dir(self, symbol: str, market: str) -> str:
+        return os.path.join(self.root, market, symbol.replace('/', '_'))
+
+    def _resolve_dir(self, symbol: str, market: Optional[str]) -> Optional[str]:
+        """定位标的目录；未指定市场时依次查找各市场"""
+        for candidate in ([market] if market else self.MARKETS):
+            path = self._symbol_dir(symbol, candidate)
+            if os.path.exists(os.path.join(path, 'timestamp.bin')):
+                return path
+        return None
+
+    def _open_column(self, path: str, column: str) -> np.ndarray:
+        """以只读方式内存映射一列（空文件返回空数组）"""
+        filename = os.path.join(path, f'{column}.bin')
+        dtype = self.COLUMNS[column]
+        if not os.path.exists(filename) or os.path.getsize(filename) < dtype.itemsize:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(filename, dtype=dtype, mode='r')
+
+    def _consistent_length(self, path: str, timestamps: np.ndarray) -> int:
+        """写入中断时各列长度可能不一致，以最短列为准"""
+        length = len(timestamps)
+        for column, dtype in self.COLUMNS.items():
+            filename = os.path.join(path, f'{column}.bin')
+            size = os.path.getsize(filename) if os.path.exists(filename) else 0
+            length = min(length, size // dtype.itemsize)
+        return length
+
+    @contextmanager
+    def _file_lock(self, path: str, shared: bool = False):
+        """标的目录的跨进程锁（写入排他，读取共享）"""
+        fd = os.open(os.path.join(path, self.LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            yield
+        finally:
+            # 关闭描述符即释放锁
+            os.close(fd)
+
+    def _lock_for(self, path: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(path, threading.Lock())
+
+    @staticmethod
+    def _to_ns(value: datetime) -> int:
+        ts = pd.Timestamp(value)
+        ts = ts.tz_convert('UTC') if ts.tzinfo is not None else ts.tz_localize('UTC')
+        return ts.as_unit('ns').value
+
+
+# 全局单例
+_columnar_store = None
+
+
+def get_columnar_store() -> ColumnarStore:
+    """获取列式存储单例"""
+    global _columnar_store
+    if _columnar_store is None:
+        _columnar_store = ColumnarStore()
+    return _columnar_store
+
+
+def read_recent_bars(
+    symbol: str,
+    limit: int,
+    market: Optional[str] = None,
+    adjust: Optional[str] = None,
+    before: Optional[datetime] = None
+) -> Dict[str, np.ndarray]:
+    """
+    读取标的最近 limit 根K线（升序），优先列式存储，列式存储未覆盖 ORM 中的对应区间时回退到 ORM
+
+    Args:
+        adjust: None 不复权；'qfq' 前复权 / 'hfq' 后复权（按复权因子在读取时计算）
+        before: 只读取该时刻之前（不含）的K线
+
+    Returns:
+        Dict[str, np.ndarray]: timestamp/open/high/low/close/volume/change_pct
+    """
+    bars = _read_recent_raw_bars(symbol, limit, market, before)
+    if adjust and len(bars['timestamp']):
+        bars = adjust_bars(bars, symbol, market, adjust)
+    return bars
+
+
+def _read_recent_raw_bars(
+    symbol: str,
+    limit: int,
+    market: Optional[str],
+    before: Optional[datetime] = None
+) -> Dict[str, np.ndarray]:
+    columns = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'change_pct']
+    queryset = MarketDataModel.objects.filter(symbol=symbol)
+    if market:
+        queryset = queryset.filter(market=market)
+    if before is not None:
+        queryset = queryset.filter(timestamp__lt=before)
+
+    if settings.AI_TRADER_CONFIG.get('COLUMNAR_STORE_ENABLED'):
+        store = get_columnar_store()
+        if store.has_symbol(symbol, market):
+            bars = store.tail(symbol, limit + 1, market, columns=columns, end=before)
+            if before is not None:
+                keep = bars['timestamp'] < ColumnarStore._to_ns(before)
+                bars = {column: values[keep] for column, values in bars.items()}
+            bars = {column: values[-limit:] for column, values in bars.items()}
+            if _store_covers(queryset, bars['timestamp'], limit):
+                return bars
+            logger.debug(f"Columnar store does not cover {symbol} history, reading from database")
+
+    rows = list(queryset.order_by('-timestamp').values_list(*columns)[:limit])[::-1]
+    if not rows:
+        return {column: np.empty(0, dtype=ColumnarStore.COLUMNS[column]) for column in columns}
+    values = list(zip(*rows))
+    bars = {'timestamp': pd.DatetimeIndex(values[0]).as_unit('ns').asi8}
+    for column, column_values in zip(columns[1:], values[1:]):
+        bars[column] = np.array(
+            [np.nan if v is None else float(v) for v in column_values],
+            dtype=ColumnarStore.COLUMNS[column] if column != 'volume' else np.float64
+        )
+    return bars
+
+
+def _store_covers(queryset, timestamps: np.ndarray, limit: int) -> bool:
+    """
+    列式存储读到的K线是否与 ORM 一致（一次聚合查询）
+
+    列式存储可能只有部分历史（增量采集、快照写入后未运行 build_columnar_store）：
+    读满 limit 根时要求 ORM 在同一区间内的行数与最新时间戳一致，不足 limit 根时
+    要求 ORM 中也只有这些行。
+    """
+    if len(timestamps) >= limit:
+        queryset = queryset.filter(timestamp__gte=pd.Timestamp(int(timestamps[0]), tz='UTC').to_pydatetime())
+    stats = queryset.aggregate(count=Count('id'), latest=Max('timestamp'))
+    if stats['count'] != len(timestamps):
+        return False
+    return not len(timestamps) or ColumnarStore._to_ns(stats['latest']) == int(timestamps[-1])
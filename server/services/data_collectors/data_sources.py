@@ -0,0 +1,205 @@
+"""
+可插拔行情数据源
+Pluggable offline market data sources for benchmarks and replay
+
+数据源只负责按标的返回标准帧（见 normalizers），写库、水位线、列式存储
+仍由 MarketDataCollector 的同一条管道完成，因此离线数据源可以直接用于
+采集性能基准测试和智能体的可复现回放。
+
+内置数据源:
+    LOCAL      读取 CSV/Parquet 夹具目录（<dir>/<symbol>.csv|.parquet）
+    SYNTHETIC  按标的确定性生成的随机游走 OHLCV，可配置标的数量
+"""
+import logging
+import os
+import zlib
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from services.data_collectors.normalizers import (
+    AKSHARE_COLUMNS, YFINANCE_COLUMNS, finalize_frame, localize_dates
+)
+
+logger = logging.getLogger(__name__)
+
+
+class MarketDataSource(ABC):
+    """行情数据源接口"""
+
+    # 写入 market_data.data_source 与水位线的数据源名称
+    name = 'unknown'
+
+    def __init__(self, market: Optional[str] = None):
+        """
+        Args:
+            market: 写入的市场类型，为 None 时由采集器按代码推断
+        """
+        self.market = market
+
+    @abstractmethod
+    def list_symbols(self) -> List[str]:
+        """数据源可提供的全部标的"""
+
+    @abstractmethod
+    def fetch_daily(self, symbol: str, start: Optional[datetime] = None, end: Optional[datetime] = None) -> pd.DataFrame:
+        """
+        获取 [start, end] 区间的日线标准帧
+
+        Returns:
+            pd.DataFrame: 标准帧，无数据时返回空帧
+        """
+
+    @staticmethod
+    def _slice(frame: pd.DataFrame, start: Optional[datetime], end: Optional[datetime]) -> pd.DataFrame:
+        """按交易日截取区间（与 localize_dates 一致，比较日期而非时刻）"""
+        if start is not None:
+            frame = frame[frame['timestamp'] >= localize_dates([start])[0]]
+        if end is not None:
+            frame = frame[frame['timestamp'] <= localize_dates([end])[0]]
+        return frame.reset_index(drop=True)
+
+
+class LocalFileSource(MarketDataSource):
+    """CSV/Parquet 夹具目录数据源"""
+
+    name = 'local'
+    EXTENSIONS = ('.parquet', '.csv')
+    # 兼容标准列名以及 AKShare / yfinance 导出的列名
+    DATE_COLUMNS = ('timestamp', 'date', 'Date', 'datetime', '日期')
+    COLUMN_ALIASES = {**AKSHARE_COLUMNS, **YFINANCE_COLUMNS, 'Adj Close': 'adj_close'}
+
+    def __init__(self, root: str, market: Optional[str] = None):
+        """
+        Args:
+            root: 夹具目录，每个标的一个 <symbol>.csv 或 <symbol>.parquet 文件
+        """
+        super().__init__(market)
+        self.root = root
+
+    def list_symbols(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted({
+            os.path.splitext(filename)[0]
+            for filename in os.listdir(self.root)
+            if filename.endswith(self.EXTENSIONS)
+        })
+
+    def fetch_daily(self, symbol: str, start: Optional[datetime] = None, end: Optional[datetime] = None) -> pd.DataFrame:
+        path = self._find_file(symbol)
+        if path is None:
+            logger.warning(f"No fixture file for {symbol} in {self.root}")
+            return pd.DataFrame()
+
+        # Parquet 依赖 pyarrow/fastparquet，缺失时 pandas 会给出明确的 ImportError
+        df = pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path)
+        if df.empty:
+            return df
+
+        frame = df.rename(columns=self.COLUMN_ALIASES)
+        date_column = next((c for c in self.DATE_COLUMNS if c in frame), None)
+        if date_column is None:
+            raise ValueError(f"{path} has no date column (expected one of {self.DATE_COLUMNS})")
+        frame['timestamp'] = localize_dates(frame[date_column])
+        return self._slice(finalize_frame(frame), start, end)
+
+    def _find_file(self, symbol: str) -> Optional[str]:
+        for extension in self.EXTENSIONS:
+            path = os.path.join(self.root, f'{symbol}{extension}')
+            if os.path.exists(path):
+                return path
+        return None
+
+
+class SyntheticSource(MarketDataSource):
+    """合成行情数据源：几何随机游走，同一标的在任意区间生成的数据一致"""
+
+    name = 'synthetic'
+
+    def __init__(
+        self,
+        symbols: int = 100,
+        seed: int = 42,
+        start_date: str = '2018-01-01',
+        market: Optional[str] = 'US_STOCK'
+    ):
+        """
+        Args:
+            symbols: 生成的标的数量（SYN00000 ~ SYN{symbols-1}）
+            seed: 随机种子，与标的代码共同决定每个标的的序列
+            start_date: 序列起点，区间之前的K线不生成
+        """
+        super().__init__(market)
+        self.symbol_count = symbols
+        self.seed = seed
+        self.origin = pd.Timestamp(start_date)
+
+    def list_symbols(self) -> List[str]:
+        return [f'SYN{i:05d}' for i in range(self.symbol_count)]
+
+    def fetch_daily(self, symbol: str, start: Optional[datetime] = None, end: Optional[datetime] = None) -> pd.DataFrame:
+        # 始终从 origin 生成完整序列再截取，保证增量采集与全量采集结果一致
+        end_date = pd.Timestamp(end or datetime.now()).tz_localize(None).normalize()
+        dates = pd.bdate_range(self.origin, end_date)
+        n = len(dates)
+        if n == 0:
+            return pd.DataFrame()
+
+        key = zlib.crc32(symbol.encode())
+        rng = np.random.default_rng([self.seed, key])
+        base = rng.uniform(5, 200)
+        drift, vol = rng.uniform(-0.0002, 0.0006), rng.uniform(0.01, 0.035)
+        # 每列使用独立的随机流：序列长度（end）不同时，前缀部分逐列一致
+        close_rng, open_rng, high_rng, low_rng, volume_rng, turnover_rng = (
+            np.random.default_rng([self.seed, key, column]) for column in range(6)
+        )
+
+        close = base * np.exp(np.cumsum(close_rng.normal(drift, vol, n)))
+        prev_close = np.concatenate([[base], close[:-1]])
+        open_ = prev_close * (1 + open_rng.normal(0, vol / 4, n))
+        high = np.maximum(open_, close) * (1 + np.abs(high_rng.normal(0, vol / 2, n)))
+        low = np.minimum(open_, close) * (1 - np.abs(low_rng.normal(0, vol / 2, n)))
+        volume = volume_rng.lognormal(np.log(1e6), 0.5, n).astype('int64')
+
+        frame = pd.DataFrame({
+            'timestamp': localize_dates(dates),
+            'open': open_,
+            'high': high,
+            'low': low,
+            'close': close,
+            'volume': volume,
+            'amount': close * volume,
+            'change_pct': (close / prev_close - 1) * 100,
+            'turnover_rate': turnover_rng.uniform(0.1, 5, n),
+        })
+        return self._slice(finalize_frame(frame), start, end)
+
+
+# 数据源注册表：--market 名称 -> 工厂
+DATA_SOURCES: Dict[str, Callable[..., MarketDataSource]] = {
+    'LOCAL': LocalFileSource,
+    'SYNTHETIC': SyntheticSource,
+}
+
+
+def register_data_source(name: str, factory: Callable[..., MarketDataSource]):
+    """注册自定义数据源，注册后即可通过 collect_market_data --market <name> 使用"""
+    DATA_SOURCES[name] = factory
+
+
+def get_data_source(name: str, **options) -> MarketDataSource:
+    """
+    按名称创建数据源，参数默认读取 AI_TRADER_CONFIG['DATA_SOURCE_OPTIONS'][name]
+
+    Raises:
+        KeyError: 未注册的数据源
+    """
+    if name not in DATA_SOURCES:
+        raise KeyError(f"Unknown data source: {name}")
+    defaults = settings.AI_TRADER_CONFIG.get('DATA_SOURCE_OPTIONS', {}).get(name, {})
+    return DATA_SOURCES[name](**{**defaults, **options})
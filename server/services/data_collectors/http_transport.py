@@ -0,0 +1,209 @@
+"""
+数据源 HTTP 传输层
+Shared pooled HTTP transport for collectors: keep-alive, timeouts, retries
+
+所有采集器共用一个 requests.Session（连接池复用 TCP/TLS），每次请求带
+连接/读取超时；连接错误、超时、429/5xx 以及 Alpha Vantage 的
+Note/Information 限流响应按指数退避 + 抖动重试。
+"""
+import logging
+import random
+import threading
+import time
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitedError(Exception):
+    """数据源限流，重试后仍未恢复"""
+
+
+class HttpTransport:
+    """带连接池与重试的 HTTP 传输层"""
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    # 响应体中出现这些键视为限流（Alpha Vantage 以 200 返回限流提示）
+    RATE_LIMIT_KEYS = ('Note', 'Information')
+    # 限流提示中包含这些字样时为日配额耗尽，重试无意义
+    QUOTA_EXHAUSTED_MARKERS = ('per day', 'daily')
+
+    def __init__(
+        self,
+        connect_timeout: float = 5,
+        read_timeout: float = 30,
+        max_retries: int = 3,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+        rate_limit_backoff: float = 20.0,
+        pool_size: int = 10
+    ):
+        """
+        Args:
+            connect_timeout: 建连超时（秒）
+            read_timeout: 读取超时（秒）
+            max_retries: 最大重试次数（不含首次请求）
+            backoff_base: 指数退避基数（秒），第 n 次重试等待 base * 2^n
+            backoff_max: 单次退避上限（秒）
+            rate_limit_backoff: 识别到限流响应时的退避基数（秒）
+            pool_size: 每个主机的连接池大小（应不小于并发采集线程数）
+        """
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limit_backoff = rate_limit_backoff
+
+        self.adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+
+        self._host_stats: Dict[str, Dict] = {}
+        self._stats_lock = threading.Lock()
+
+    # ------------------------------------------------------------------ 请求
+
+    def get(self, url: str, params: Optional[Dict] = None, **kwargs) -> requests.Response:
+        """
+        GET 请求，连接错误/超时/429/5xx 自动重试
+
+        Raises:
+            requests.RequestException: 重试耗尽后的最后一次错误
+        """
+        return self._request('GET', url, params=params, **kwargs)
+
+    def get_json(
+        self,
+        url: str,
+        params: Optional[Dict] = None,
+        rate_limit_keys: Iterable[str] = RATE_LIMIT_KEYS,
+        **kwargs
+    ) -> Dict:
+        """
+        GET 并解析 JSON；响应体含限流提示时按 rate_limit_backoff 退避重试
+
+        Raises:
+            RateLimitedError: 重试耗尽或日配额耗尽
+        """
+        host = urlsplit(url).netloc
+        for attempt in range(self.max_retries + 1):
+            data = self.get(url, params=params, **kwargs).json()
+            notice = next((data[key] for key in rate_limit_keys if isinstance(data, dict) and key in data), None)
+            if notice is None:
+                return data
+
+            self._record(host, rate_limited=1)
+            exhausted = any(marker in str(notice).lower() for marker in self.QUOTA_EXHAUSTED_MARKERS)
+            if exhausted or attempt == self.max_retries:
+                raise RateLimitedError(str(notice))
+
+            delay = self._backoff(attempt, self.rate_limit_backoff)
+            logger.warning(f"Rate limited by {host}, retrying in {delay:.1f}s: {notice}")
+            time.sleep(delay)
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        host = urlsplit(url).netloc
+        kwargs.setdefault('timeout', self.timeout)
+
+        for attempt in range(self.max_retries + 1):
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._record(host, requests=1, errors=1, elapsed=time.perf_counter() - started)
+                if attempt == self.max_retries:
+                    raise
+                delay = self._backoff(attempt, self.backoff_base)
+                logger.warning(f"{method} {host} failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+                self._record(host, retries=1)
+                time.sleep(delay)
+                continue
+
+            self._record(host, requests=1, elapsed=time.perf_counter() - started)
+            if response.status_code not in self.RETRY_STATUSES or attempt == self.max_retries:
+                response.raise_for_status()
+                return response
+
+            if response.status_code == 429:
+                self._record(host, rate_limited=1)
+            delay = self._retry_after(response) or self._backoff(attempt, self.backoff_base)
+            logger.warning(f"{method} {host} returned {response.status_code}, retrying in {delay:.1f}s")
+            self._record(host, retries=1)
+            response.close()
+            time.sleep(delay)
+
+    def _backoff(self, attempt: int, base: float) -> float:
+        """指数退避 + 抖动：在 [d/2, d] 内随机，d = min(base*2^n, 上限)"""
+        delay = min(max(self.backoff_max, base), base * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _retry_after(self, response: requests.Response) -> Optional[float]:
+        """解析 Retry-After 头（仅支持秒数）"""
+        value = response.headers.get('Retry-After')
+        try:
+            return min(float(value), self.backoff_max) if value else None
+        except ValueError:
+            return None
+
+    # ------------------------------------------------------------------ 统计
+
+    def _record(self, host: str, **counters):
+        with self._stats_lock:
+            stats = self._host_stats.setdefault(host, {
+                'requests': 0, 'retries': 0, 'errors': 0, 'rate_limited': 0, 'elapsed': 0.0,
+            })
+            for key, value in counters.items():
+                stats[key] += value
+
+    def stats(self) -> Dict[str, Dict]:
+        """
+        按主机统计请求、重试、限流次数以及连接池建连数
+
+        Returns:
+            Dict[str, Dict]: host -> {'requests', 'retries', 'errors', 'rate_limited',
+            'avg_latency', 'connections', 'reused'}
+        """
+        pools = {}
+        poolmanager = self.adapter.poolmanager
+        for key in list(poolmanager.pools.keys()):
+            pool = poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            port = key.key_port
+            host = key.key_host if port in (None, 80, 443) else f'{key.key_host}:{port}'
+            pools[host] = (pool.num_connections, pool.num_requests)
+
+        with self._stats_lock:
+            result = {}
+            for host, stats in self._host_stats.items():
+                connections, pooled_requests = pools.get(host, (0, 0))
+                result[host] = {
+                    'requests': stats['requests'],
+                    'retries': stats['retries'],
+                    'errors': stats['errors'],
+                    'rate_limited': stats['rate_limited'],
+                    'avg_latency': round(stats['elapsed'] / stats['requests'], 3) if stats['requests'] else 0,
+                    'connections': connections,
+                    'reused': max(0, pooled_requests - connections),
+                }
+            return result
+
+
+# 全局单例
+_http_transport = None
+_http_transport_lock = threading.Lock()
+
+
+def get_http_transport() -> HttpTransport:
+    """获取共享 HTTP 传输层单例（参数见 AI_TRADER_CONFIG['HTTP_TRANSPORT']）"""
+    global _http_transport
+    with _http_transport_lock:
+        if _http_transport is None:
+            _http_transport = HttpTransport(**settings.AI_TRADER_CONFIG.get('HTTP_TRANSPORT', {}))
+        return _http_transport
@@ -0,0 +1,328 @@
+"""
+分钟K线存储与流式日线聚合
+Intraday bar store with streaming roll-up into daily market_data rows
+
+分钟K线写入独立的 intraday_bar 表；每批新K线到达时，DailyBarAggregator 在
+内存中按 (标的, 市场, 周期, 交易日) 维护当日的开高低收量额，只把新K线折叠
+进运行状态，随后 upsert 一行日线，不需要重新扫描当日全部分钟K线。
+
+进程内首次遇到某个交易日时，从库中读取该日已入库的分钟K线作为初始状态
+（每日每标的至多一次，1m 周期不超过数百行）；交易所当前交易日之前的状态
+在下一批K线到达时淘汰。滚动出的日线同时旁路写入列式存储。
+"""
+import logging
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.utils import timezone
+
+from apps.market_data.models import IntradayBarModel, MarketDataModel
+from services.data_collectors.bulk_writer import MarketDataBulkWriter
+from services.data_collectors.columnar_store import ColumnarStore
+from services.data_collectors.normalizers import build_records, localize_dates
+
+logger = logging.getLogger(__name__)
+
+# 交易日按交易所所在时区划分
+MARKET_TIMEZONES = {
+    'A_STOCK': ZoneInfo('Asia/Shanghai'),
+    'US_STOCK': ZoneInfo('America/New_York'),
+    'HK_STOCK': ZoneInfo('Asia/Hong_Kong'),
+    'CRYPTO': ZoneInfo('UTC'),
+}
+
+BAR_COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'amount']
+DAILY_FIELDS = ['open', 'high', 'low', 'close', 'volume', 'amount', 'change_pct', 'data_source']
+DAILY_FIELDS_WITHOUT_CHANGE = [field for field in DAILY_FIELDS if field != 'change_pct']
+
+StateKey = Tuple[str, str, str, date]
+
+
+class DailyBarAggregator:
+    """
+    流式日线聚合器
+
+    每个交易日维护开高低收量额的运行值，以及当日已折叠的分钟K线（按时间戳，
+    1m 周期每日至多数百根）。新K线直接累加；数据源反复推送的同一根K线
+    （盘中未收盘的最新K线、或事后修正的K线）按差值调整成交量/额，只有当被
+    修正的K线原本就是当日最高/最低点且新值回落时才在当日K线内重新取极值。
+    """
+
+    def __init__(self):
+        self._states: Dict[StateKey, Dict] = {}
+        self._lock = threading.Lock()
+
+    def has_state(self, key: StateKey) -> bool:
+        with self._lock:
+            return key in self._states
+
+    def seed(self, key: StateKey, bars: pd.DataFrame, prev_close: Optional[float]):
+        """用已入库的当日分钟K线（可为空）初始化状态"""
+        state = {
+            'prev_close': prev_close,
+            'bars': {},
+            'first_ts': None,
+            'last_ts': None,
+            'high': -np.inf,
+            'low': np.inf,
+            'volume': 0,
+            'amount': 0.0,
+        }
+        with self._lock:
+            self._states[key] = state
+        if not bars.empty:
+            self.update(key, bars)
+
+    def evict_before(self, market: str, day: date) -> int:
+        """
+        淘汰市场内早于指定交易日的状态（已收盘的交易日不再需要增量聚合）
+
+        Returns:
+            int: 淘汰的状态数
+        """
+        with self._lock:
+            stale = [key for key in self._states if key[1] == market and key[3] < day]
+            for key in stale:
+                del self._states[key]
+        return len(stale)
+
+    def drop(self, key: StateKey):
+        """丢弃状态（写库失败时调用，下次重新从库中初始化）"""
+        with self._lock:
+            self._states.pop(key, None)
+
+    def update(self, key: StateKey, bars: pd.DataFrame) -> Optional[Dict]:
+        """
+        折叠一批同一交易日的分钟K线
+
+        Args:
+            key: (symbol, market, interval, trading_day)
+            bars: 标准帧（timestamp 为 UTC 时刻）
+
+        Returns:
+            Dict: 当日日线 {'open', 'high', 'low', 'close', 'volume', 'amount', 'change_pct'}
+        """
+        timestamps = pd.DatetimeIndex(bars['timestamp']).as_unit('ns').asi8
+        values = np.column_stack([
+            bars[column].to_numpy(dtype=float, na_value=0.0) for column in BAR_COLUMNS
+        ])
+
+        with self._lock:
+            state = self._states[key]
+            known = state['bars']
+            revised = np.fromiter((ts in known for ts in timestamps.tolist()), dtype=bool, count=len(timestamps))
+
+            # 新K线：整体累加
+            fresh = values[~revised]
+            if len(fresh):
+                state['high'] = max(state['high'], fresh[:, 1].max())
+                state['low'] = min(state['low'], fresh[:, 2].min())
+                state['volume'] += int(fresh[:, 4].sum())
+                state['amount'] += float(fresh[:, 5].sum())
+
+            # 已折叠K线的新版本：按差值调整
+            rescan = False
+            for i in np.flatnonzero(revised):
+                old = known[int(timestamps[i])]
+                new = values[i]
+                state['volume'] += int(new[4] - old[4])
+                state['amount'] += float(new[5] - old[5])
+                rescan |= (new[1] < old[1] == state['high']) or (new[2] > old[2] == state['low'])
+                state['high'] = max(state['high'], new[1])
+                state['low'] = min(state['low'], new[2])
+
+            known.update(zip(timestamps.tolist(), values.tolist()))
+            if rescan:
+                stacked = np.array(list(known.values()))
+                state['high'], state['low'] = stacked[:, 1].max(), stacked[:, 2].min()
+            if len(timestamps):
+                state['first_ts'] = min(int(timestamps.min()), state['first_ts'] or int(timestamps.min()))
+                state['last_ts'] = max(int(timestamps.max()), state['last_ts'] or 0)
+
+            return self._daily_bar(state)
+
+    @staticmethod
+    def _daily_bar(state: Dict) -> Optional[Dict]:
+        if state['last_ts'] is None:
+            return None
+        close = state['bars'][state['last_ts']][3]
+        prev_close = state['prev_close']
+        return {
+            'open': state['bars'][state['first_ts']][0],
+            'high': float(state['high']),
+            'low': float(state['low']),
+            'close': close,
+            'volume': state['volume'],
+            'amount': round(state['amount'], 2),
+            'change_pct': round((close / prev_close - 1) * 100, 4) if prev_close else None,
+        }
+
+
+class IntradayBarWriter:
+    """分钟K线写入器：写 intraday_bar，并流式更新对应的日线行"""
+
+    def __init__(self, chunk_size: int = 2000):
+        self.chunk_size = chunk_size
+        self.aggregator = DailyBarAggregator()
+        self.daily_writer = MarketDataBulkWriter(chunk_size=chunk_size)
+
+    def ingest(
+        self,
+        symbol: str,
+        market: str,
+        interval: str,
+        frame: pd.DataFrame,
+        data_source: str,
+        columnar_store: Optional[ColumnarStore] = None
+    ) -> Dict:
+        """
+        写入一批分钟K线并滚动更新日线
+
+        Args:
+            frame: 标准帧（timestamp 为 UTC 时刻）
+            data_source: 数据源名称（分钟K线与滚动出的日线共用）
+            columnar_store: 列式存储，提供时滚动出的日线同时写入（失败不影响数据库写入结果）
+
+        Returns:
+            Dict: {'count', 'inserted', 'updated', 'elapsed', 'rows_per_sec', 'daily_rows'}
+        """
+        if frame.empty:
+            return {**MarketDataBulkWriter.build_stats(0, 0, 0, 0), 'daily_rows': 0}
+
+        frame = frame.drop_duplicates('timestamp', keep='last')
+        tz = MARKET_TIMEZONES.get(market, timezone.get_current_timezone())
+        trading_days = pd.DatetimeIndex(frame['timestamp']).tz_convert(tz).date
+        self.aggregator.evict_before(market, timezone.now().astimezone(tz).date())
+
+        daily_rows = []
+        keys = []
+        for day in sorted(set(trading_days)):
+            key = (symbol, market, interval, day)
+            if not self.aggregator.has_state(key):
+                self._seed(key, tz)
+            keys.append(key)
+            bar = self.aggregator.update(key, frame[trading_days == day])
+            if bar is not None:
+                daily_rows.append({'timestamp': localize_dates([day])[0], **bar})
+
+        try:
+            with transaction.atomic():
+                stats = self._write_bars(symbol, market, interval, frame, data_source)
+                self._write_daily(symbol, market, data_source, daily_rows)
+        except Exception:
+            # 内存状态已领先于数据库，丢弃后下次重新初始化
+            for key in keys:
+                self.aggregator.drop(key)
+            raise
+
+        if columnar_store is not None and daily_rows:
+            try:
+                columnar_store.write(symbol, market, pd.DataFrame(daily_rows))
+            except Exception as e:
+                logger.error(f"Failed to write columnar daily bars for {symbol}: {e}")
+
+        return {**stats, 'daily_rows': len(daily_rows)}
+
+    def _write_daily(self, symbol: str, market: str, data_source: str, daily_rows: List[Dict]):
+        """upsert 日线行；没有前收盘价（change_pct 为 None）时不覆盖已有的涨跌幅"""
+        for has_change, fields in ((True, DAILY_FIELDS), (False, DAILY_FIELDS_WITHOUT_CHANGE)):
+            rows = [row for row in daily_rows if (row['change_pct'] is not None) == has_change]
+            if rows:
+                records = build_records(pd.DataFrame(rows), symbol, market, data_source, fields)
+                self.daily_writer.write(records, fields)
+
+    def _seed(self, key: StateKey, tz):
+        """从库中读取该交易日已入库的分钟K线与前一交易日收盘价"""
+        symbol, market, interval, day = key
+        day_start = timezone.make_aware(datetime.combine(day, datetime.min.time()), tz)
+        rows = IntradayBarModel.objects.filter(
+            symbol=symbol, market=market, interval=interval,
+            timestamp__gte=day_start, timestamp__lt=day_start + timedelta(days=1)
+        ).values_list('timestamp', *BAR_COLUMNS)
+        bars = pd.DataFrame.from_records(list(rows), columns=['timestamp', *BAR_COLUMNS])
+
+        prev_close = MarketDataModel.objects.filter(
+            symbol=symbol, market=market, timestamp__lt=localize_dates([day])[0]
+        ).order_by('-timestamp').values_list('close', flat=True).first()
+
+        self.aggregator.seed(key, bars, float(prev_close) if prev_close is not None else None)
+
+    def _write_bars(self, symbol: str, market: str, interval: str, frame: pd.DataFrame, data_source: str) -> Dict:
+        started = time.perf_counter()
+        timestamps = pd.DatetimeIndex(frame['timestamp']).to_pydatetime()
+        amounts = frame['amount'].astype(object).where(frame['amount'].notna(), None).tolist()
+        records = [
+            IntradayBarModel(
+                symbol=symbol, market=market, interval=interval, timestamp=ts,
+                open=o, high=h, low=l, close=c, volume=v, amount=a, data_source=data_source
+            )
+            for ts, o, h, l, c, v, a in zip(
+                timestamps, frame['open'].tolist(), frame['high'].tolist(), frame['low'].tolist(),
+                frame['close'].tolist(), frame['volume'].tolist(), amounts
+            )
+        ]
+
+        existing = 0
+        for start in range(0, len(records), self.chunk_size):
+            chunk = timestamps[start:start + self.chunk_size]
+            existing += IntradayBarModel.objects.filter(
+                symbol=symbol, market=market, interval=interval, timestamp__in=list(chunk)
+            ).count()
+            IntradayBarModel.objects.bulk_create(
+                records[start:start + self.chunk_size],
+                update_conflicts=True,
+                unique_fields=['symbol', 'market', 'interval', 'timestamp'],
+                update_fields=[*BAR_COLUMNS, 'data_source'],
+            )
+        elapsed = time.perf_counter() - started
+        return MarketDataBulkWriter.build_stats(len(records), len(records) - existing, existing, elapsed)
+
+
+# 全局单例（聚合状态需在进程内共享）
+_intraday_writer = None
+_intraday_writer_lock = threading.Lock()
+
+
+def get_intraday_writer() -> IntradayBarWriter:
+    """获取分钟K线写入器单例"""
+    global _intraday_writer
+    with _intraday_writer_lock:
+        if _intraday_writer is None:
+            _intraday_writer = IntradayBarWriter()
+        return _intraday_writer
+
+
+def read_recent_intraday(
+    symbol: str,
+    minutes: int,
+    interval: str = '1m',
+    market: Optional[str] = None
+) -> Dict[str, np.ndarray]:
+    """
+    读取标的最近 minutes 分钟内的分钟K线（升序），走 (symbol, interval, timestamp) 索引
+
+    Returns:
+        Dict[str, np.ndarray]: timestamp(int64 纳秒)/open/high/low/close/volume
+    """
+    columns = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+    queryset = IntradayBarModel.objects.filter(
+        symbol=symbol, interval=interval,
+        timestamp__gte=timezone.now() - timedelta(minutes=minutes)
+    )
+    if market:
+        queryset = queryset.filter(market=market)
+    rows = list(queryset.order_by('timestamp').values_list(*columns))
+    if not rows:
+        return {column: np.empty(0, dtype=np.int64 if column in ('timestamp', 'volume') else np.float64)
+                for column in columns}
+    values = list(zip(*rows))
+    bars = {'timestamp': pd.DatetimeIndex(values[0]).as_unit('ns').asi8}
+    for column, column_values in zip(columns[1:], values[1:]):
+        bars[column] = np.array(column_values, dtype=np.int64 if column == 'volume' else np.float64)
+    return bars
@@ -3,15 +3,37 @@
 参考 AI-Trader 项目的数据采集逻辑
 """
 import os
-import json
+import time
 import logging
-import requests
-from datetime import datetime, timedelta
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager, nullcontext
+from datetime import date, datetime, time as dt_time, timedelta
+from zoneinfo import ZoneInfo
 from typing import Dict, List, Optional
-from decimal import Decimal
 from django.conf import settings
+from django.db import close_old_connections, connection
 from django.utils import timezone
-from apps.market_data.models import MarketDataModel, StockInfoModel
+import numpy as np
+import pandas as pd
+from apps.market_data.models import MarketDataModel, StockInfoModel, CollectionWatermarkModel
+from services.data_collectors.bulk_writer import MarketDataBulkWriter, merge_write_stats
+from services.data_collectors.rate_limiter import build_source_limiters
+from services.data_collectors.http_transport import RateLimitedError, get_http_transport
+from services.data_collectors.data_sources import DATA_SOURCES, MarketDataSource, get_data_source
+from services.data_collectors.intraday import MARKET_TIMEZONES, get_intraday_writer
+from services.data_collectors.bar_events import BarChangeTracker, bar_event
+from services.data_collectors.quality import build_quality_validator, trading_days
+from services.data_collectors.adjustment import detect_adjustments, record_adjustments
+from services.data_collectors.raw_payload import apply_raw_policy, offload_payloads
+from services.data_collectors.source_router import SourceRouter, is_rate_limited
+from services.data_collectors.universe import a_stock_board
+from services.data_collectors.columnar_store import ColumnarStore, get_columnar_store, read_recent_bars
+from services.data_collectors.normalizers import (
+    build_records, localize_dates, normalize_akshare_daily, normalize_akshare_spot, normalize_sina_daily,
+    normalize_yfinance_daily, normalize_alphavantage_daily,
+    normalize_akshare_intraday, normalize_yfinance_intraday
+)
 import akshare as ak
 import yfinance as yf
 
@@ -21,13 +43,77 @@ logger = logging.getLogger(__name__)
 class MarketDataCollector:
     """市场数据采集器"""
     
-    def __init__(self):
+    # 各采集路径写入的字段（未列出的字段在更新时保持原值）
+    A_STOCK_FIELDS = ['open', 'high', 'low', 'close', 'volume', 'amount', 'change_pct', 'turnover_rate', 'data_source']
+    SINA_FIELDS = ['open', 'high', 'low', 'close', 'volume', 'amount', 'turnover_rate', 'data_source']
+    US_STOCK_FIELDS = ['open', 'high', 'low', 'close', 'volume', 'change_pct', 'data_source']
+    ALPHAVANTAGE_FIELDS = ['open', 'high', 'low', 'close', 'volume', 'data_source', 'raw_data']
+    
+    PRICE_CACHE_DIRNAME = 'daily_prices'
+    ALPHAVANTAGE_URL = 'https://www.alphavantage.co/query'
+    
+    # A股交易日以北京时间为准
+    A_STOCK_TZ = ZoneInfo('Asia/Shanghai')
+    # 开盘前快照仍是上一交易日的行情
+    A_STOCK_SESSION_OPEN = dt_time(9, 30)
+    
+    def __init__(
+        self,
+        bulk: bool = False,
+        chunk_size: int = 1000,
+        source_limits: Optional[Dict[str, Dict]] = None,
+        incremental: bool = False,
+        us_batch_size: int = 0,
+        sources: Optional[Dict[str, MarketDataSource]] = None,
+        skip_unchanged: bool = False,
+        failover: bool = True
+    ):
+        """
+        Args:
+            bulk: 是否使用批量 upsert 写入（默认逐行 update_or_create）
+            chunk_size: 批量写入时每块的行数
+            source_limits: 覆盖 DATA_SOURCE_LIMITS 中的数据源限流配置
+            incremental: 是否按水位线增量采集（仅首次采集的标的使用 days 窗口）
+            us_batch_size: 美股批量下载时每次请求的标的数，<= 1 时逐个请求
+            sources: 预先构建的可插拔数据源（名称 -> 实例），未提供的按 DATA_SOURCE_OPTIONS 创建
+            skip_unchanged: 跳过与本进程上次写入内容相同的K线（持续采集模式）
+            failover: 按 SOURCE_ROUTING 在数据源之间自动切换（A_STOCK/US_STOCK 日线），False 时只使用默认数据源
+        """
         self.config = settings.AI_TRADER_CONFIG
         self.data_dir = self.config.get('MARKET_DATA_DIR')
         self.alphavantage_key = self.config.get('ALPHAVANTAGE_API_KEY')
+        self.http = get_http_transport()
+        self.bulk = bulk
+        self.incremental = incremental
+        self.us_batch_size = us_batch_size
+        self.sources = dict(sources or {})
+        self.change_tracker = BarChangeTracker() if skip_unchanged else None
+        self.quality = build_quality_validator(write_guard=self._db_write_guard)
+        self.columnar_store = get_columnar_store() if self.config.get('COLUMNAR_STORE_ENABLED') else None
+        self.bulk_writer = MarketDataBulkWriter(chunk_size=chunk_size)
+        # 全市场快照约5000行，单条语句写入
+        self.snapshot_writer = MarketDataBulkWriter(chunk_size=10000)
+        self.intraday_writer = get_intraday_writer()
+        # (交易日, 上一交易日的日线 [prev_close, prev_volume]，按 symbol 索引)，见 _record_snapshot_adjustments
+        self._snapshot_prev_bars = (None, pd.DataFrame(columns=['prev_close', 'prev_volume']))
+        
+        limits = {
+            name: dict(conf)
+            for name, conf in self.config.get('DATA_SOURCE_LIMITS', {}).items()
+        }
+        for name, conf in (source_limits or {}).items():
+            limits.setdefault(name, {}).update(conf)
+        self.limiters = build_source_limiters(limits)
+        routes = self.config.get('SOURCE_ROUTING', {})
+        self.router = SourceRouter(routes, self.config.get('SOURCE_ROUTER')) if failover and routes else None
+        # 见 _db_write_guard
+        self._write_lock = threading.Lock()
         
         # 确保数据目录存在
         os.makedirs(self.data_dir, exist_ok=True)
+        
+        # Alpha Vantage 日线价格缓存（替代原 daily_prices_{symbol}.json）
+        self.price_cache = ColumnarStore(os.path.join(self.data_dir, self.PRICE_CACHE_DIRNAME))
     
     def collect_a_stock_data(self, symbol: str, days: int = 30) -> Dict:
         """
@@ -43,54 +129,142 @@ class MarketDataCollector:
         try:
             logger.info(f"Collecting A-stock data for {symbol}")
             
+            watermark = self._get_watermark(symbol, 'A_STOCK', 'akshare')
+            if self._is_up_to_date(watermark):
+                return self._up_to_date_result(symbol)
+            
             # 使用 AKShare 获取历史数据
-            df = ak.stock_zh_a_hist(
-                symbol=symbol,
-                period="daily",
-                start_date=(datetime.now() - timedelta(days=days)).strftime("%Y%m%d"),
-                end_date=datetime.now().strftime("%Y%m%d"),
-                adjust="qfq"  # 前复权
-            )
+            with self._source_slot('akshare'):
+                df = ak.stock_zh_a_hist(
+                    symbol=symbol,
+                    period="daily",
+                    start_date=self._window_start(watermark, days).strftime("%Y%m%d"),
+                    end_date=datetime.now().strftime("%Y%m%d"),
+                    adjust=""  # 不复权，复权因子单独记录（见 adjustment）
+                )
             
             if df.empty:
                 logger.warning(f"No data found for {symbol}")
                 return {'success': False, 'count': 0}
             
-            # 保存到数据库
-            saved_count = 0
-            for _, row in df.iterrows():
+            # 按列标准化后写入
+            frame = normalize_akshare_daily(df)
+            self._record_adjustments(symbol, 'A_STOCK', frame)
+            return self._persist_frame(symbol, 'A_STOCK', 'akshare', frame, self.A_STOCK_FIELDS, watermark)
+            
+        except Exception as e:
+            logger.error(f"Failed to collect A-stock data for {symbol}: {e}")
+            return {'success': False, 'error': str(e)}
+    
+    def collect_a_stock_sina(self, symbol: str, days: int = 30) -> Dict:
+        """
+        采集A股数据（AKShare 新浪日线，东方财富不可用时的备用数据源）
+        
+        新浪不提供涨跌幅，写入时保留已有行的涨跌幅，也不识别除权除息事件。
+        
+        Args:
+            symbol: 股票代码（如 "000001"）
+            days: 采集天数
+            
+        Returns:
+            Dict: 采集结果
+        """
+        try:
+            logger.info(f"Collecting A-stock data for {symbol} from sina")
+            
+            watermark = self._get_watermark(symbol, 'A_STOCK', 'sina')
+            if self._is_up_to_date(watermark):
+                return self._up_to_date_result(symbol)
+            
+            with self._source_slot('sina'):
+                df = ak.stock_zh_a_daily(
+                    symbol=f"{a_stock_board(symbol)['exchange'].lower()}{symbol}",
+                    start_date=self._window_start(watermark, days).strftime("%Y%m%d"),
+                    end_date=datetime.now().strftime("%Y%m%d"),
+                    adjust=""
+                )
+            
+            if df.empty:
+                logger.warning(f"No data found for {symbol}")
+                return {'success': False, 'count': 0}
+            
+            return self._persist_frame(
+                symbol, 'A_STOCK', 'sina', normalize_sina_daily(df), self.SINA_FIELDS, watermark
+            )
+            
+        except Exception as e:
+            logger.error(f"Failed to collect A-stock data for {symbol} from sina: {e}")
+            return {'success': False, 'error': str(e)}
+    
+    def collect_a_stock_snapshot(self) -> Dict:
+        """
+        采集A股全市场快照（一次请求获取全部标的最新行情）
+        
+        每个标的 upsert 当日的一根K线（与日线数据共用同一 timestamp），
+        适合盘中高频刷新。快照不带日期，非交易日或开盘前的快照仍是上一交易日
+        的行情，此时跳过，不写入当日K线。
+        
+        Returns:
+            Dict: 采集结果
+        """
+        try:
+            trade_date = self._a_stock_session_date()
+            if trade_date is None:
+                logger.info("A-stock market is not in session, skipping snapshot")
+                return {
+                    'success': True, 'skipped': True, 'symbols': 0, 'updated_bars': [], 'quality': None,
+                    **MarketDataBulkWriter.build_stats(0, 0, 0, 0)
+                }
+            logger.info("Collecting A-stock market snapshot")
+            
+            with self._source_slot('akshare'):
+                df = ak.stock_zh_a_spot_em()
+            
+            if df.empty:
+                logger.warning("Empty A-stock snapshot")
+                return {'success': False, 'count': 0}
+            
+            frame = normalize_akshare_spot(df, trade_date)
+            symbols = len(frame)
+            self._record_snapshot_adjustments(frame)
+            if self.change_tracker is not None:
+                frame = self.change_tracker.changed(frame, 'A_STOCK', 'akshare_spot')
+            checked = frame
+            if self.quality is not None:
+                frame = self.quality.validate(frame, 'A_STOCK', 'akshare_spot')
+            records = build_records(frame, None, 'A_STOCK', 'akshare_spot', self.A_STOCK_FIELDS)
+            
+            # 全市场一次性批量 upsert
+            with self._db_write_guard():
+                stats = self.snapshot_writer.write(records, self.A_STOCK_FIELDS)
+            if self.change_tracker is not None:
+                self.change_tracker.remember(checked, 'A_STOCK', 'akshare_spot')
+            
+            if self.columnar_store is not None:
                 try:
-                    timestamp = timezone.make_aware(
-                        datetime.strptime(str(row['日期']), '%Y-%m-%d')
-                    )
-                    
-                    MarketDataModel.objects.update_or_create(
-                        symbol=symbol,
-                        market='A_STOCK',
-                        timestamp=timestamp,
-                        defaults={
-                            'open': Decimal(str(row['开盘'])),
-                            'high': Decimal(str(row['最高'])),
-                            'low': Decimal(str(row['最低'])),
-                            'close': Decimal(str(row['收盘'])),
-                            'volume': int(row['成交量']),
-                            'amount': Decimal(str(row.get('成交额', 0))),
-                            'change_pct': Decimal(str(row.get('涨跌幅', 0))),
-                            'turnover_rate': Decimal(str(row.get('换手率', 0))),
-                            'data_source': 'akshare'
-                        }
-                    )
-                    saved_count += 1
+                    self.columnar_store.write_many('A_STOCK', frame)
                 except Exception as e:
-                    logger.error(f"Failed to save data for {symbol} on {row['日期']}: {e}")
+                    logger.error(f"Failed to write columnar snapshot: {e}")
             
-            logger.info(f"Saved {saved_count} records for {symbol}")
-            return {'success': True, 'count': saved_count}
+            logger.info(self._format_stats('A-stock snapshot', stats))
+            updated_bars = [
+                bar_event(symbol, 'A_STOCK', timestamp)
+                for symbol, timestamp in zip(frame['symbol'].tolist(), frame['timestamp'].tolist())
+            ]
+            quality = self.quality.flush('A_STOCK snapshot') if self.quality is not None else None
+            return {'success': True, 'symbols': symbols, 'updated_bars': updated_bars, 'quality': quality, **stats}
             
         except Exception as e:
-            logger.error(f"Failed to collect A-stock data for {symbol}: {e}")
+            logger.error(f"Failed to collect A-stock snapshot: {e}")
             return {'success': False, 'error': str(e)}
     
+    def _a_stock_session_date(self) -> Optional[date]:
+        """当前的A股交易日（北京时间）；非交易日或开盘前返回 None"""
+        now = datetime.now(self.A_STOCK_TZ)
+        if now.time() < self.A_STOCK_SESSION_OPEN or not len(trading_days('A_STOCK', now.date(), now.date())):
+            return None
+        return now.date()
+    
     def collect_us_stock_data(self, symbol: str, days: int = 30) -> Dict:
         """
         采集美股数据（使用 yfinance）
@@ -105,43 +279,26 @@ class MarketDataCollector:
         try:
             logger.info(f"Collecting US stock data for {symbol}")
             
+            watermark = self._get_watermark(symbol, 'US_STOCK', 'yfinance')
+            if self._is_up_to_date(watermark):
+                return self._up_to_date_result(symbol)
+            
             # 使用 yfinance 获取历史数据
             ticker = yf.Ticker(symbol)
-            df = ticker.history(period=f"{days}d")
+            with self._source_slot('yfinance'):
+                if watermark:
+                    df = ticker.history(start=self._window_start(watermark, days).strftime("%Y-%m-%d"))
+                else:
+                    df = ticker.history(period=f"{days}d")
             
             if df.empty:
                 logger.warning(f"No data found for {symbol}")
                 return {'success': False, 'count': 0}
             
-            # 保存到数据库
-            saved_count = 0
-            for date, row in df.iterrows():
-                try:
-                    timestamp = timezone.make_aware(date.to_pydatetime())
-                    
-                    # 计算涨跌幅
-                    change_pct = ((row['Close'] - row['Open']) / row['Open'] * 100) if row['Open'] > 0 else 0
-                    
-                    MarketDataModel.objects.update_or_create(
-                        symbol=symbol,
-                        market='US_STOCK',
-                        timestamp=timestamp,
-                        defaults={
-                            'open': Decimal(str(row['Open'])),
-                            'high': Decimal(str(row['High'])),
-                            'low': Decimal(str(row['Low'])),
-                            'close': Decimal(str(row['Close'])),
-                            'volume': int(row['Volume']),
-                            'change_pct': Decimal(str(change_pct)),
-                            'data_source': 'yfinance'
-                        }
-                    )
-                    saved_count += 1
-                except Exception as e:
-                    logger.error(f"Failed to save data for {symbol} on {date}: {e}")
-            
-            logger.info(f"Saved {saved_count} records for {symbol}")
-            return {'success': True, 'count': saved_count}
+            # 按列标准化后写入
+            return self._persist_frame(
+                symbol, 'US_STOCK', 'yfinance', normalize_yfinance_daily(df), self.US_STOCK_FIELDS, watermark
+            )
             
         except Exception as e:
             logger.error(f"Failed to collect US stock data for {symbol}: {e}")
@@ -164,110 +321,491 @@ class MarketDataCollector:
                 logger.warning("Alpha Vantage API key not configured")
                 return {'success': False, 'error': 'API key not configured'}
             
-            url = (
-                f"https://www.alphavantage.co/query?"
-                f"function=TIME_SERIES_DAILY&symbol={symbol}"
-                f"&outputsize={outputsize}&apikey={self.alphavantage_key}"
-            )
+            market = self._determine_market(symbol)
+            watermark = self._get_watermark(symbol, market, 'alphavantage')
+            if self._is_up_to_date(watermark):
+                return self._up_to_date_result(symbol)
+            if watermark and (timezone.now() - watermark).days < 140:
+                # compact 返回最近100个交易日，足以覆盖水位线之后的缺口
+                outputsize = 'compact'
             
-            response = requests.get(url)
-            data = response.json()
+            params = {
+                'function': 'TIME_SERIES_DAILY',
+                'symbol': symbol,
+                'outputsize': outputsize,
+                'apikey': self.alphavantage_key,
+            }
+            
+            try:
+                with self._source_slot('alphavantage'):
+                    data = self.http.get_json(self.ALPHAVANTAGE_URL, params=params)
+            except RateLimitedError as e:
+                logger.warning(f"Alpha Vantage API rate limit or info: {e}")
+                return {'success': False, 'error': 'Rate limit or API info'}
             
             if 'Error Message' in data:
                 logger.error(f"Alpha Vantage API error: {data['Error Message']}")
                 return {'success': False, 'error': data['Error Message']}
             
-            if 'Note' in data or 'Information' in data:
-                logger.warning(f"Alpha Vantage API rate limit or info: {data}")
-                return {'success': False, 'error': 'Rate limit or API info'}
-            
             time_series = data.get('Time Series (Daily)', {})
             if not time_series:
                 logger.warning(f"No time series data for {symbol}")
                 return {'success': False, 'count': 0}
             
-            # 保存到本地JSON文件
-            output_file = os.path.join(self.data_dir, f"daily_prices_{symbol}.json")
+            # 保存到本地价格缓存（列式追加写入，只改写重叠的尾部）
+            frame = normalize_alphavantage_daily(time_series)
+            self.price_cache.write(symbol, market, frame)
             
-            # 加载已存在的数据
-            existing_data = self._load_existing_data(output_file)
-            merged_data = self._merge_data(existing_data, data)
+            # 写入数据库
+            return self._persist_frame(
+                symbol, market, 'alphavantage', frame, self.ALPHAVANTAGE_FIELDS, watermark
+            )
             
-            # 保存合并后的数据
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(merged_data, f, ensure_ascii=False, indent=4)
+        except Exception as e:
+            logger.error(f"Failed to collect data from Alpha Vantage for {symbol}: {e}")
+            return {'success': False, 'error': str(e)}
+    
+    def collect_intraday_data(self, symbol: str, market: str, interval: str = '1m') -> Dict:
+        """
+        采集当日分钟K线（A股使用 AKShare，美股使用 yfinance），并流式滚动更新日线
+        
+        Args:
+            symbol: 股票代码
+            market: A_STOCK 或 US_STOCK
+            interval: 1m 或 5m
             
-            # 保存到数据库
-            saved_count = 0
-            for date_str, values in time_series.items():
-                try:
-                    timestamp = timezone.make_aware(
-                        datetime.strptime(date_str, '%Y-%m-%d')
-                    )
-                    
-                    market = self._determine_market(symbol)
-                    
-                    MarketDataModel.objects.update_or_create(
+        Returns:
+            Dict: 采集结果（含 daily_rows：本次更新的日线行数）
+        """
+        try:
+            logger.info(f"Collecting {interval} intraday bars for {symbol}")
+            tz = MARKET_TIMEZONES[market]
+            
+            if market == 'A_STOCK':
+                today = datetime.now(tz).strftime('%Y-%m-%d')
+                with self._source_slot('akshare'):
+                    df = ak.stock_zh_a_hist_min_em(
                         symbol=symbol,
-                        market=market,
-                        timestamp=timestamp,
-                        defaults={
-                            'open': Decimal(values['1. open']),
-                            'high': Decimal(values['2. high']),
-                            'low': Decimal(values['3. low']),
-                            'close': Decimal(values['4. close']),
-                            'volume': int(values['5. volume']),
-                            'data_source': 'alphavantage',
-                            'raw_data': values
-                        }
+                        start_date=f'{today} 09:00:00',
+                        end_date=f'{today} 15:30:00',
+                        period=interval.rstrip('m'),
+                        adjust=''
                     )
-                    saved_count += 1
-                except Exception as e:
-                    logger.error(f"Failed to save data for {symbol} on {date_str}: {e}")
+                source = 'akshare'
+                frame = normalize_akshare_intraday(df, tz) if not df.empty else df
+            elif market == 'US_STOCK':
+                with self._source_slot('yfinance'):
+                    df = yf.Ticker(symbol).history(period='1d', interval=interval)
+                source = 'yfinance'
+                frame = normalize_yfinance_intraday(df, tz) if not df.empty else df
+            else:
+                return {'success': False, 'error': f'Intraday bars not supported for {market}'}
+            
+            if frame.empty:
+                logger.warning(f"No intraday data found for {symbol}")
+                return {'success': False, 'count': 0}
+            
+            data_source = f'{source}_{interval}'
+            if self.change_tracker is not None:
+                frame = self.change_tracker.changed(frame, market, data_source, symbol)
+                if frame.empty:
+                    return self._up_to_date_result(symbol)
+            checked = frame
+            if self.quality is not None:
+                frame = self.quality.validate(frame, market, data_source, symbol, daily=False)
             
-            logger.info(f"Saved {saved_count} records for {symbol}")
-            return {'success': True, 'count': saved_count}
+            with self._db_write_guard():
+                stats = self.intraday_writer.ingest(
+                    symbol, market, interval, frame, data_source, columnar_store=self.columnar_store
+                )
+            if self.change_tracker is not None:
+                self.change_tracker.remember(checked, market, data_source, symbol)
+            
+            updated_bars = [bar_event(symbol, market, frame['timestamp'].max(), interval=interval)] if len(frame) else []
+            return {'success': True, 'updated_bars': updated_bars, **stats}
             
         except Exception as e:
-            logger.error(f"Failed to collect data from Alpha Vantage for {symbol}: {e}")
+            logger.error(f"Failed to collect intraday data for {symbol}: {e}")
+            return {'success': False, 'error': str(e)}
+    
+    def collect_from_source(self, source: MarketDataSource, symbol: str, days: int = 30) -> Dict:
+        """
+        从可插拔数据源（本地夹具、合成数据等）采集，走与在线数据源相同的写入管道
+        
+        Args:
+            source: 数据源实例
+            symbol: 股票代码
+            days: 采集天数
+            
+        Returns:
+            Dict: 采集结果
+        """
+        try:
+            market = source.market or self._determine_market(symbol)
+            watermark = self._get_watermark(symbol, market, source.name)
+            if self._is_up_to_date(watermark):
+                return self._up_to_date_result(symbol)
+            
+            with self._source_slot(source.name):
+                frame = source.fetch_daily(symbol, start=self._window_start(watermark, days))
+            
+            if frame.empty:
+                logger.warning(f"No data found for {symbol} in {source.name} source")
+                return {'success': False, 'count': 0}
+            
+            return self._persist_frame(symbol, market, source.name, frame, self.A_STOCK_FIELDS, watermark)
+            
+        except Exception as e:
+            logger.error(f"Failed to collect data from {source.name} source for {symbol}: {e}")
             return {'success': False, 'error': str(e)}
     
-    def _load_existing_data(self, filepath: str) -> Optional[Dict]:
-        """加载已存在的数据文件"""
-        if os.path.exists(filepath):
+    def get_source(self, name: str) -> MarketDataSource:
+        """获取（必要时创建）指定名称的可插拔数据源"""
+        if name not in self.sources:
+            self.sources[name] = get_data_source(name)
+        return self.sources[name]
+    
+    def collect_us_stock_batch(self, symbols: List[str], days: int = 30) -> Dict[str, Dict]:
+        """
+        批量采集美股数据（一次 yf.download 请求多个标的）
+        
+        Args:
+            symbols: 同一批次的股票代码
+            days: 采集天数
+            
+        Returns:
+            Dict[str, Dict]: 标的 -> 采集结果
+        """
+        outcomes = {}
+        watermarks = {}
+        pending = []
+        for symbol in symbols:
+            watermark = self._get_watermark(symbol, 'US_STOCK', 'yfinance')
+            if self._is_up_to_date(watermark):
+                outcomes[symbol] = self._up_to_date_result(symbol)
+            else:
+                watermarks[symbol] = watermark
+                pending.append(symbol)
+        
+        if not pending:
+            return outcomes
+        
+        try:
+            logger.info(f"Collecting US stock data for {len(pending)} symbols in one request")
+            
+            # 只要有一个标的没有水位线就回退到 days 窗口，否则从最早的水位线开始
+            if all(watermarks.values()):
+                window = {'start': min(self._window_start(w, days) for w in watermarks.values()).strftime("%Y-%m-%d")}
+            else:
+                window = {'period': f"{days}d"}
+            
+            with self._source_slot('yfinance'):
+                df = yf.download(
+                    tickers=pending,
+                    group_by='ticker',
+                    auto_adjust=True,  # 与 Ticker.history 默认一致
+                    threads=False,
+                    progress=False,
+                    **window
+                )
+        except Exception as e:
+            logger.error(f"Failed to download US stock batch {pending[0]}..{pending[-1]}: {e}")
+            if self.router is not None and self.router.routes_market('US_STOCK'):
+                # 批量请求失败时逐个标的路由到其他数据源
+                self.router.record_result('yfinance', False)
+                outcomes.update({symbol: self._collect_routed(symbol, 'US_STOCK', days) for symbol in pending})
+            else:
+                outcomes.update({symbol: {'success': False, 'error': str(e)} for symbol in pending})
+            return outcomes
+        
+        # 拆分宽表，按标的分别写入
+        tickers = set(df.columns.get_level_values(0)) if isinstance(df.columns, pd.MultiIndex) else set()
+        for symbol in pending:
             try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                if tickers:
+                    sub = df[symbol] if symbol in tickers else pd.DataFrame()
+                else:
+                    sub = df if len(pending) == 1 else pd.DataFrame()
+                sub = sub.dropna(how='all')
+                
+                if sub.empty:
+                    logger.warning(f"No data found for {symbol}")
+                    outcomes[symbol] = {'success': False, 'count': 0}
+                    continue
+                
+                outcomes[symbol] = self._persist_frame(
+                    symbol, 'US_STOCK', 'yfinance', normalize_yfinance_daily(sub),
+                    self.US_STOCK_FIELDS, watermarks[symbol]
+                )
             except Exception as e:
-                logger.error(f"Failed to load existing data from {filepath}: {e}")
-        return None
+                logger.error(f"Failed to save US stock data for {symbol}: {e}")
+                outcomes[symbol] = {'success': False, 'error': str(e)}
+        
+        return outcomes
+    
+    def _persist_frame(
+        self,
+        symbol: str,
+        market: str,
+        data_source: str,
+        frame: pd.DataFrame,
+        fields: List[str],
+        watermark: Optional[datetime]
+    ) -> Dict:
+        """
+        标准帧写入数据库，并推进水位线、旁路写入列式存储
+        
+        Returns:
+            Dict: 采集结果
+        """
+        frame = self._after_watermark(frame, watermark)
+        if self.change_tracker is not None:
+            frame = self.change_tracker.changed(frame, market, data_source, symbol)
+            if frame.empty:
+                return self._up_to_date_result(symbol)
+        checked = frame
+        if self.quality is not None and not frame.empty:
+            frame = self.quality.validate(
+                frame, market, data_source, symbol,
+                history_close=self._recent_closes(symbol, market, frame['timestamp'].iloc[0]),
+                since=watermark
+            )
+        if self.router is not None and data_source in self.router.health and self.router.should_audit():
+            self._audit_sources(symbol, market, data_source, frame)
+        stored, fields, payloads = apply_raw_policy(frame, fields)
+        records = build_records(stored, symbol, market, data_source, fields)
+        
+        with self._db_write_guard():
+            stats = self._save_records(records, fields)
+            if payloads is not None:
+                offload_payloads(symbol, market, stored['timestamp'], payloads)
+            self._advance_watermark(symbol, market, data_source, records)
+        self._write_columnar(symbol, market, frame)
+        if self.change_tracker is not None:
+            # 记录校验前的帧：被隔离的行内容不变时下个周期不再重复隔离
+            self.change_tracker.remember(checked, market, data_source, symbol)
+        
+        logger.info(self._format_stats(symbol, stats))
+        updated_bars = [bar_event(symbol, market, frame['timestamp'].max())] if records else []
+        return {'success': True, 'updated_bars': updated_bars, **stats}
     
-    def _merge_data(self, existing_data: Optional[Dict], new_data: Dict) -> Dict:
-        """合并数据：保留已存在的日期，只添加新日期"""
-        if not existing_data or 'Time Series (Daily)' not in existing_data:
-            return new_data
+    def _audit_sources(self, symbol: str, market: str, data_source: str, frame: pd.DataFrame):
+        """抽样核对：最近几根K线与其他数据源已写入的收盘价比较，记录分歧比例"""
+        try:
+            tail = frame.tail(self.router.options['audit_bars'])
+            closes = dict(zip(pd.DatetimeIndex(tail['timestamp']).to_pydatetime(), tail['close'].tolist()))
+            rows = MarketDataModel.objects.filter(
+                symbol=symbol, market=market, timestamp__in=list(closes)
+            ).exclude(data_source=data_source).values_list('timestamp', 'close', 'data_source')
+            
+            tolerance = self.router.options['disagreement_tolerance']
+            flags = {}
+            for timestamp, close, other in rows:
+                if close and timestamp in closes:
+                    flags.setdefault(other, []).append(abs(closes[timestamp] / float(close) - 1) > tolerance)
+            for other, disagree in flags.items():
+                self.router.record_disagreement(data_source, other, sum(disagree) / len(disagree))
+        except Exception as e:
+            logger.error(f"Failed to audit {data_source} against other sources for {symbol}: {e}")
+    
+    def _record_adjustments(self, symbol: str, market: str, frame: pd.DataFrame):
+        """识别并记录不复权日线中的除权除息事件（失败不影响行情写入）"""
+        if frame.empty:
+            return
+        try:
+            prev_close = MarketDataModel.objects.filter(
+                symbol=symbol, market=market, timestamp__lt=frame['timestamp'].iloc[0]
+            ).order_by('-timestamp').values_list('close', flat=True).first()
+            events = detect_adjustments(frame, float(prev_close) if prev_close is not None else None)
+            if not events.empty:
+                with self._db_write_guard():
+                    record_adjustments(events, market, symbol)
+        except Exception as e:
+            logger.error(f"Failed to record adjustments for {symbol}: {e}")
+    
+    def _record_snapshot_adjustments(self, frame: pd.DataFrame):
+        """
+        识别全市场快照中的除权除息事件
+        
+        前收盘价只取交易日历中上一交易日的库内日线（每个交易日只查询一次），库中缺少该日
+        日线的标的不识别。收盘价与成交量仍与上一交易日日线相同的行是数据源尚未切换到新交易日
+        的旧行情，其涨跌幅相对的是更早的收盘价，同样跳过。
+        """
+        if frame.empty:
+            return
+        try:
+            trade_day = frame['timestamp'].iloc[0]
+            if self._snapshot_prev_bars[0] != trade_day:
+                self._snapshot_prev_bars = (trade_day, self._previous_session_bars(trade_day))
+            bars = frame.join(self._snapshot_prev_bars[1], on='symbol', how='inner')
+            stale = np.isclose(bars['close'], bars['prev_close']) & (bars['volume'] == bars['prev_volume'])
+            if stale.any():
+                logger.info(f"{int(stale.sum())} snapshot rows still carry the previous session, skipping them")
+            bars = bars[~stale]
+            events = detect_adjustments(bars, dict(zip(bars['symbol'], bars['prev_close'])))
+            if not events.empty:
+                with self._db_write_guard():
+                    record_adjustments(events, 'A_STOCK')
+        except Exception as e:
+            logger.error(f"Failed to record snapshot adjustments: {e}")
+    
+    def _previous_session_bars(self, trade_day) -> pd.DataFrame:
+        """库中上一交易日的全部A股日线 [prev_close, prev_volume]，按 symbol 索引"""
+        days = trading_days('A_STOCK', trade_day - timedelta(days=30), trade_day - timedelta(days=1))
+        rows = []
+        if len(days):
+            rows = MarketDataModel.objects.filter(
+                market='A_STOCK', timestamp=localize_dates([days[-1]])[0]
+            ).values_list('symbol', 'close', 'volume')
+        bars = pd.DataFrame(list(rows), columns=['symbol', 'prev_close', 'prev_volume'])
+        return bars.astype({'prev_close': float, 'prev_volume': float}).set_index('symbol')
+    
+    def _recent_closes(self, symbol: str, market: str, before) -> Optional[np.ndarray]:
+        """
+        读取 before 之前的近期收盘价（异常价格检查的参照）
+        
+        列式存储未启用时返回 None，此时只在批次内部检查；列式存储历史不完整时由
+        read_recent_bars 回退到数据库。
+        """
+        if self.columnar_store is None:
+            return None
+        return read_recent_bars(symbol, self.quality.zscore_window, market, before=before)['close']
+    
+    def _get_watermark(self, symbol: str, market: str, data_source: str) -> Optional[datetime]:
+        """获取增量采集水位线（非增量模式或首次采集时返回 None）"""
+        if not self.incremental:
+            return None
+        return CollectionWatermarkModel.objects.filter(
+            symbol=symbol, market=market, data_source=data_source
+        ).values_list('last_timestamp', flat=True).first()
+    
+    def _is_up_to_date(self, watermark: Optional[datetime]) -> bool:
+        """水位线已到今天则无需请求数据源"""
+        return watermark is not None and timezone.localtime(watermark).date() >= timezone.localdate()
+    
+    def _up_to_date_result(self, symbol: str) -> Dict:
+        """已是最新数据时的采集结果"""
+        logger.info(f"{symbol} is up to date, skipping")
+        return {'success': True, 'skipped': True, **MarketDataBulkWriter.build_stats(0, 0, 0, 0)}
+    
+    def _window_start(self, watermark: Optional[datetime], days: int) -> datetime:
+        """
+        计算采集起始时间
         
-        existing_dates = existing_data['Time Series (Daily)']
-        new_dates = new_data.get('Time Series (Daily)', {})
+        有水位线时从水位线当天开始（重新拉取最后一根K线，以覆盖盘中未完成的数据），
+        否则回退到 days 窗口。
+        """
+        if watermark:
+            return timezone.localtime(watermark).replace(hour=0, minute=0, second=0, microsecond=0)
+        return datetime.now() - timedelta(days=days)
+    
+    def _after_watermark(self, frame: pd.DataFrame, watermark: Optional[datetime]) -> pd.DataFrame:
+        """丢弃水位线之前的行（数据源可能返回超出请求窗口的数据）"""
+        if watermark is None:
+            return frame
+        return frame[frame['timestamp'] >= watermark]
+    
+    def _advance_watermark(
+        self,
+        symbol: str,
+        market: str,
+        data_source: str,
+        records: List[MarketDataModel]
+    ):
+        """写入成功后推进水位线（只前进不后退）"""
+        if not records:
+            return
+        latest = max(record.timestamp for record in records)
+        updated = CollectionWatermarkModel.objects.filter(
+            symbol=symbol, market=market, data_source=data_source, last_timestamp__lt=latest
+        ).update(last_timestamp=latest, updated_at=timezone.now())
+        if not updated:
+            CollectionWatermarkModel.objects.get_or_create(
+                symbol=symbol,
+                market=market,
+                data_source=data_source,
+                defaults={'last_timestamp': latest}
+            )
+    
+    def _write_columnar(self, symbol: str, market: str, frame: pd.DataFrame):
+        """旁路写入列式存储（失败不影响数据库写入结果）"""
+        if self.columnar_store is None:
+            return
+        try:
+            self.columnar_store.write(symbol, market, frame)
+        except Exception as e:
+            logger.error(f"Failed to write columnar data for {symbol}: {e}")
+    
+    @contextmanager
+    def _source_slot(self, source: str):
+        """
+        获取数据源请求槽位（限速 + 限并发），未配置的数据源不限制
         
-        # 合并：保留已存在的日期，添加新日期
-        merged_dates = existing_dates.copy()
-        for date, values in new_dates.items():
-            if date not in merged_dates:
-                merged_dates[date] = values
+        同时为数据源路由测量请求耗时（不含排队等待）并识别限流。
+        """
+        limiter = self.limiters.get(source)
+        with (limiter.slot() if limiter is not None else nullcontext()):
+            started = time.perf_counter()
+            try:
+                yield
+            except Exception as e:
+                if self.router is not None and is_rate_limited(e):
+                    self.router.record_throttled(source)
+                raise
+            if self.router is not None:
+                self.router.observe_latency(source, time.perf_counter() - started)
+    
+    def _db_write_guard(self):
+        """SQLite 不支持并发写入，多线程采集时串行化写库；其他数据库不加锁"""
+        if connection.vendor == 'sqlite':
+            return self._write_lock
+        return nullcontext()
+    
+    def _save_records(self, records: List[MarketDataModel], update_fields: List[str]) -> Dict:
+        """
+        保存行情记录
         
-        # 按日期排序（降序）
-        sorted_dates = dict(sorted(merged_dates.items(), reverse=True))
+        bulk 模式下分块 upsert，否则逐行 update_or_create。
         
-        # 更新数据
-        merged_data = existing_data.copy()
-        merged_data['Time Series (Daily)'] = sorted_dates
+        Args:
+            records: 未保存的行情记录
+            update_fields: 冲突时需要更新的字段
+            
+        Returns:
+            Dict: 写入统计 {'count', 'inserted', 'updated', 'elapsed', 'rows_per_sec'}
+        """
+        if self.bulk:
+            return self.bulk_writer.write(records, update_fields)
         
-        # 更新 Last Refreshed
-        if sorted_dates:
-            merged_data['Meta Data']['3. Last Refreshed'] = list(sorted_dates.keys())[0]
+        started = time.perf_counter()
+        inserted = 0
+        updated = 0
+        for record in records:
+            try:
+                _, created = MarketDataModel.objects.update_or_create(
+                    symbol=record.symbol,
+                    market=record.market,
+                    timestamp=record.timestamp,
+                    defaults={field: getattr(record, field) for field in update_fields}
+                )
+                if created:
+                    inserted += 1
+                else:
+                    updated += 1
+            except Exception as e:
+                logger.error(f"Failed to save data for {record.symbol} on {record.timestamp}: {e}")
         
-        return merged_data
+        return MarketDataBulkWriter.build_stats(
+            inserted + updated, inserted, updated, time.perf_counter() - started
+        )
+    
+    def _format_stats(self, symbol: str, stats: Dict) -> str:
+        """格式化写入统计日志"""
+        return (
+            f"Saved {stats['count']} records for {symbol} "
+            f"({stats['inserted']} inserted, {stats['updated']} updated, "
+            f"{stats['rows_per_sec']} rows/sec)"
+        )
     
     def _determine_market(self, symbol: str) -> str:
         """根据股票代码确定市场类型"""
@@ -278,13 +816,23 @@ class MarketDataCollector:
         else:
             return 'US_STOCK'
     
-    def batch_collect(self, symbols: List[str], market: str = 'US_STOCK') -> Dict:
+    def batch_collect(
+        self,
+        symbols: List[str],
+        market: str = 'US_STOCK',
+        days: int = 30,
+        workers: int = 1,
+        interval: str = '1d'
+    ) -> Dict:
         """
         批量采集数据
         
         Args:
             symbols: 股票代码列表
-            market: 市场类型
+            market: 市场类型（A_STOCK/US_STOCK/ALPHAVANTAGE），或 DATA_SOURCES 中注册的数据源名称
+            days: 采集天数
+            workers: 并发线程数，1 为顺序采集；各数据源仍受 DATA_SOURCE_LIMITS 限流
+            interval: 1d 采集日线；1m/5m 采集当日分钟K线并滚动更新日线
             
         Returns:
             Dict: 采集结果统计
@@ -292,38 +840,143 @@ class MarketDataCollector:
         results = {
             'success_count': 0,
             'fail_count': 0,
+            'skipped_count': 0,
             'total_records': 0,
+            'write_stats': {},
+            'updated_bars': [],
             'details': []
         }
+        started = time.perf_counter()
         
-        for symbol in symbols:
-            try:
-                if market == 'A_STOCK':
-                    result = self.collect_a_stock_data(symbol)
-                elif market == 'US_STOCK':
-                    result = self.collect_us_stock_data(symbol)
-                else:
-                    result = self.collect_alphavantage_data(symbol)
-                
-                if result.get('success'):
-                    results['success_count'] += 1
-                    results['total_records'] += result.get('count', 0)
-                else:
-                    results['fail_count'] += 1
-                
-                results['details'].append({
-                    'symbol': symbol,
-                    'result': result
-                })
-                
-            except Exception as e:
-                logger.error(f"Failed to collect data for {symbol}: {e}")
+        # 采集单元：美股按批次一次请求多个标的（yfinance 为当前最优数据源时），其余按单个标的
+        if market == 'US_STOCK' and self.us_batch_size > 1 and interval == '1d' and self._preferred_source(market) in (None, 'yfinance'):
+            units = [
+                symbols[i:i + self.us_batch_size]
+                for i in range(0, len(symbols), self.us_batch_size)
+            ]
+            
+            def collect(chunk):
+                return self.collect_us_stock_batch(chunk, days=days)
+        else:
+            units = [[symbol] for symbol in symbols]
+            
+            def collect(unit):
+                return {unit[0]: self._collect_symbol(unit[0], market, days, interval)}
+        
+        outcomes = {}
+        if workers > 1 and len(units) > 1:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='collector') as executor:
+                futures = [executor.submit(self._run_in_thread, collect, unit) for unit in units]
+                for future in as_completed(futures):
+                    outcomes.update(future.result())
+        else:
+            for unit in units:
+                outcomes.update(collect(unit))
+        ordered = [(symbol, outcomes.get(symbol)) for symbol in symbols]
+        
+        for symbol, result in ordered:
+            if result is None:
                 results['fail_count'] += 1
+                continue
+            
+            if result.get('success'):
+                results['success_count'] += 1
+                results['skipped_count'] += 1 if result.get('skipped') else 0
+                results['total_records'] += result.get('count', 0)
+                results['updated_bars'].extend(result.get('updated_bars', []))
+                merge_write_stats(results['write_stats'], result)
+            else:
+                results['fail_count'] += 1
+            
+            results['details'].append({
+                'symbol': symbol,
+                'result': result
+            })
+        
+        # 端到端吞吐（含网络请求），write_stats 中为纯写入吞吐
+        wall_time = time.perf_counter() - started
+        results['elapsed'] = round(wall_time, 2)
+        results['rows_per_sec'] = round(results['total_records'] / wall_time, 1) if wall_time > 0 else 0
+        results['source_stats'] = {
+            name: limiter.stats() for name, limiter in self.limiters.items() if limiter.request_count
+        }
+        results['http_stats'] = self.http.stats()
+        results['route_stats'] = self.router.stats() if self.router is not None else {}
+        results['quality'] = self.quality.flush(market) if self.quality is not None else None
         
         logger.info(
             f"Batch collection completed: {results['success_count']} success, "
-            f"{results['fail_count']} failed, {results['total_records']} total records"
+            f"{results['fail_count']} failed, {results['total_records']} total records, "
+            f"{results['rows_per_sec']} rows/sec"
         )
         
         return results
-
+    
+    def _collect_symbol(self, symbol: str, market: str, days: int, interval: str = '1d') -> Optional[Dict]:
+        """采集单个标的，异常时返回 None"""
+        try:
+            if interval != '1d':
+                return self.collect_intraday_data(symbol, market, interval=interval)
+            elif market in DATA_SOURCES:
+                return self.collect_from_source(self.get_source(market), symbol, days=days)
+            elif self.router is not None and self.router.routes_market(market):
+                return self._collect_routed(symbol, market, days)
+            elif market == 'A_STOCK':
+                return self.collect_a_stock_data(symbol, days=days)
+            elif market == 'US_STOCK':
+                return self.collect_us_stock_data(symbol, days=days)
+            else:
+                outputsize = 'full' if days > 100 else 'compact'
+                return self.collect_alphavantage_data(symbol, outputsize=outputsize)
+        except Exception as e:
+            logger.error(f"Failed to collect data for {symbol}: {e}")
+            return None
+    
+    def _collect_routed(self, symbol: str, market: str, days: int) -> Dict:
+        """
+        按数据源评分依次尝试，第一个成功的结果即返回
+        
+        Returns:
+            Dict: 采集结果（带 source 字段），全部失败时返回最后一个失败结果
+        """
+        collectors = self._route_collectors()
+        result = None
+        for source in self.router.rank(market, collectors):
+            result = collectors[source](symbol, days)
+            ok = bool(result and result.get('success'))
+            self.router.record_result(source, ok)
+            if ok:
+                return {**result, 'source': source}
+            logger.warning(f"Source {source} failed for {symbol}, trying next source")
+        return result or {'success': False, 'error': f'No data source available for {market}'}
+    
+    def _route_collectors(self) -> Dict:
+        """可路由的数据源 -> 单标的日线采集方法（未配置 API Key 的数据源不可用）"""
+        collectors = {
+            'akshare': self.collect_a_stock_data,
+            'sina': self.collect_a_stock_sina,
+            'yfinance': self.collect_us_stock_data,
+        }
+        if self.alphavantage_key:
+            collectors['alphavantage'] = lambda symbol, days: self.collect_alphavantage_data(
+                symbol, outputsize='full' if days > 100 else 'compact'
+            )
+        return collectors
+    
+    def _preferred_source(self, market: str) -> Optional[str]:
+        """当前评分最优的数据源，未启用路由时返回 None"""
+        if self.router is None or not self.router.routes_market(market):
+            return None
+        ranked = self.router.rank(market, self._route_collectors())
+        return ranked[0] if ranked else None
+    
+    def _run_in_thread(self, collect, unit: List[str]) -> Dict[str, Optional[Dict]]:
+        """工作线程入口：每个线程使用独立的数据库连接，结束后释放"""
+        close_old_connections()
+        try:
+            return collect(unit)
+        except Exception as e:
+            logger.error(f"Failed to collect data for {unit}: {e}")
+            return {symbol: None for symbol in unit}
+        finally:
+            connection.close()
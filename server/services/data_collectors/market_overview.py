@@ -0,0 +1,276 @@
+"""
+指数、市场宽度与情绪采集
+Batched collectors for market_index and market_sentiment
+
+每个数据源一次批量请求：
+    A股主要指数    akshare stock_zh_index_spot_em('沪深重要指数')
+    市场宽度        akshare stock_market_activity_legu（失败时用当日快照在库内统计）
+    资金流向        akshare stock_market_fund_flow / stock_hsgt_fund_flow_summary_em
+    美股指数与 VIX  yfinance download（一次请求全部代码）
+
+指数历史批量 upsert 到 market_index，同时 upsert market_index_latest（每个指数一行），
+感知层读取最新值不再需要扫描历史表。
+
+A股指数与情绪指标以交易日为时间戳（同一交易日内多次采集覆盖同一行），非交易日和
+开盘前不采集；美股指数使用行情自身的日期。
+"""
+import logging
+from contextlib import nullcontext
+from datetime import date, datetime, time as dt_time
+from typing import Callable, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+
+from apps.market_data.models import (
+    MarketDataModel, MarketIndexLatestModel, MarketIndexModel, MarketSentimentModel
+)
+from services.data_collectors.normalizers import localize_dates
+from services.data_collectors.quality import trading_days
+from services.data_collectors.rate_limiter import build_source_limiters
+import akshare as ak
+import yfinance as yf
+
+logger = logging.getLogger(__name__)
+
+INDEX_FIELDS = ['index_name', 'value', 'change_pct', 'rise_count', 'fall_count', 'limit_up_count', 'limit_down_count']
+BREADTH_FIELDS = ['rise_count', 'fall_count', 'limit_up_count', 'limit_down_count']
+
+
+class MarketOverviewCollector:
+    """主要指数、市场宽度与情绪指标采集器"""
+
+    VIX_SYMBOL = '^VIX'
+    A_STOCK_TZ = ZoneInfo('Asia/Shanghai')
+    A_STOCK_SESSION_OPEN = dt_time(9, 30)
+    # 乐咕乐股赚钱效应分析中的条目 -> 宽度字段
+    BREADTH_ITEMS = {'上涨': 'rise_count', '下跌': 'fall_count', '涨停': 'limit_up_count', '跌停': 'limit_down_count'}
+    # 库内统计宽度时的涨跌停阈值（主板10%，近似）
+    LIMIT_PCT = 9.9
+
+    def __init__(self, limiters: Optional[Dict] = None):
+        """
+        Args:
+            limiters: 数据源限流器（与 MarketDataCollector 共用时传入），默认按 DATA_SOURCE_LIMITS 创建
+        """
+        self.config = settings.AI_TRADER_CONFIG
+        self.indices = self.config.get('MARKET_INDICES', {})
+        if limiters is None:
+            limiters = build_source_limiters(self.config.get('DATA_SOURCE_LIMITS', {}))
+        self.limiters = limiters
+
+    def collect(self) -> Dict:
+        """
+        采集指数、市场宽度与情绪指标，各数据源失败互不影响
+
+        Returns:
+            Dict: {'success', 'session': A股交易日（非交易时段为 None）, 'indices': 写入的指数数,
+                   'breadth', 'sentiment', 'errors'}
+        """
+        errors = []
+        session = self.session_date()
+        breadth = {}
+        frames = []
+        if session is not None:
+            breadth = self._attempt(errors, 'breadth', self.fetch_breadth, session) or {}
+            a_stock = self._attempt(errors, 'A_STOCK indices', self.fetch_a_stock_indices, breadth, session)
+            if a_stock is not None:
+                frames.append(a_stock)
+        else:
+            logger.info("A-stock market is not in session, skipping A-stock indices and sentiment")
+        us_stock, vix = self._attempt(errors, 'US_STOCK indices', self.fetch_us_indices) or (None, None)
+        if us_stock is not None:
+            frames.append(us_stock)
+
+        count = 0
+        if frames:
+            count = self._attempt(errors, 'save indices', self.save_indices, pd.concat(frames, ignore_index=True)) or 0
+
+        sentiment = None
+        if session is not None:
+            sentiment = self._attempt(errors, 'sentiment', self.collect_sentiment, breadth, vix, session, errors)
+        success = bool(count or sentiment) or (session is None and not errors)
+        logger.info(f"Market overview collected: {count} indices, breadth {breadth}, {len(errors)} errors")
+        return {
+            'success': success, 'session': session, 'indices': count, 'breadth': breadth,
+            'sentiment': sentiment, 'errors': errors
+        }
+
+    def session_date(self) -> Optional[date]:
+        """当前的A股交易日（北京时间）；非交易日或开盘前返回 None"""
+        now = datetime.now(self.A_STOCK_TZ)
+        if now.time() < self.A_STOCK_SESSION_OPEN or not len(trading_days('A_STOCK', now.date(), now.date())):
+            return None
+        return now.date()
+
+    def fetch_a_stock_indices(self, breadth: Dict, session: date) -> Optional[pd.DataFrame]:
+        """A股主要指数实时行情（一次请求），以交易日为时间戳，市场宽度附加在每个A股指数上"""
+        codes = self.indices.get('A_STOCK', {})
+        if not codes:
+            return None
+        with self._source_slot('akshare'):
+            df = ak.stock_zh_index_spot_em(symbol='沪深重要指数')
+
+        df = df[df['代码'].astype(str).isin(codes)]
+        code = df['代码'].astype(str)
+        frame = pd.DataFrame({
+            'index_code': code,
+            'index_name': df['名称'].astype(str).where(df['名称'].notna(), code.map(codes)),
+            'market': 'A_STOCK',
+            'timestamp': localize_dates([session])[0],
+            'value': pd.to_numeric(df['最新价'], errors='coerce'),
+            'change_pct': pd.to_numeric(df['涨跌幅'], errors='coerce').fillna(0),
+        })
+        for field in BREADTH_FIELDS:
+            frame[field] = breadth.get(field)
+        return frame[frame['value'].notna()]
+
+    def fetch_us_indices(self) -> Tuple[Optional[pd.DataFrame], Optional[float]]:
+        """美股主要指数与 VIX（一次 yf.download 请求），返回 (指数帧, VIX 最新值)"""
+        names = self.indices.get('US_STOCK', {})
+        symbols = [*names, self.VIX_SYMBOL]
+        with self._source_slot('yfinance'):
+            df = yf.download(
+                tickers=symbols, period='5d', group_by='ticker',
+                auto_adjust=False, threads=False, progress=False
+            )
+
+        tickers = set(df.columns.get_level_values(0)) if isinstance(df.columns, pd.MultiIndex) else set()
+        rows = []
+        vix = None
+        for symbol in symbols:
+            if tickers:
+                close = df[symbol]['Close'].dropna() if symbol in tickers else pd.Series(dtype=float)
+            else:
+                close = df['Close'].dropna() if len(symbols) == 1 else pd.Series(dtype=float)
+            if close.empty:
+                logger.warning(f"No index data for {symbol}")
+                continue
+            if symbol == self.VIX_SYMBOL:
+                vix = float(close.iloc[-1])
+                continue
+            previous = float(close.iloc[-2]) if len(close) > 1 else 0.0
+            rows.append({
+                'index_code': symbol,
+                'index_name': names[symbol],
+                'market': 'US_STOCK',
+                'timestamp': localize_dates([close.index[-1]])[0],
+                'value': float(close.iloc[-1]),
+                'change_pct': (float(close.iloc[-1]) / previous - 1) * 100 if previous else 0.0,
+            })
+        return (pd.DataFrame(rows) if rows else None), vix
+
+    def fetch_breadth(self, session: date) -> Dict[str, int]:
+        """A股涨跌/涨停/跌停家数，外部数据源失败时用当日快照在库内统计"""
+        try:
+            with self._source_slot('akshare'):
+                df = ak.stock_market_activity_legu()
+            values = dict(zip(df['item'].astype(str).str.strip(), pd.to_numeric(df['value'], errors='coerce')))
+            breadth = {
+                field: int(values[item])
+                for item, field in self.BREADTH_ITEMS.items()
+                if item in values and pd.notna(values[item])
+            }
+            if breadth:
+                return breadth
+        except Exception as e:
+            logger.warning(f"Failed to fetch market breadth, counting from snapshot: {e}")
+        return self.breadth_from_snapshot(session)
+
+    def breadth_from_snapshot(self, session: date) -> Dict[str, int]:
+        """用 market_data 中该交易日的A股快照统计市场宽度（一次聚合查询）"""
+        trade_day = localize_dates([session])[0]
+        stats = MarketDataModel.objects.filter(market='A_STOCK', timestamp=trade_day).aggregate(
+            total=Count('id'),
+            rise_count=Count('id', filter=Q(change_pct__gt=0)),
+            fall_count=Count('id', filter=Q(change_pct__lt=0)),
+            limit_up_count=Count('id', filter=Q(change_pct__gte=self.LIMIT_PCT)),
+            limit_down_count=Count('id', filter=Q(change_pct__lte=-self.LIMIT_PCT)),
+        )
+        if not stats.pop('total'):
+            return {}
+        return stats
+
+    def save_indices(self, frame: pd.DataFrame) -> int:
+        """批量 upsert 指数历史与最新值"""
+        frame = frame.astype(object).where(frame.notna(), None)
+        rows = frame.to_dict('records')
+        for row in rows:
+            row['value'] = round(row['value'], 4)
+            row['change_pct'] = round(row['change_pct'], 4)
+
+        with transaction.atomic():
+            MarketIndexModel.objects.bulk_create(
+                [MarketIndexModel(**{k: v for k, v in row.items() if k != 'market'}) for row in rows],
+                update_conflicts=True,
+                unique_fields=['index_code', 'timestamp'],
+                update_fields=INDEX_FIELDS,
+            )
+            MarketIndexLatestModel.objects.bulk_create(
+                [MarketIndexLatestModel(**row) for row in rows],
+                update_conflicts=True,
+                unique_fields=['index_code'],
+                update_fields=[*INDEX_FIELDS, 'market', 'timestamp', 'updated_at'],
+            )
+        return len(rows)
+
+    def collect_sentiment(
+        self, breadth: Dict, vix: Optional[float], session: date, errors: List[str]
+    ) -> Optional[Dict]:
+        """
+        写入交易日的情绪指标（同一交易日覆盖同一行）
+
+        恐慌贪婪指数没有公开数据源，使用上涨家数占比（0-100）作为代理值。
+        """
+        values = {
+            'vix': round(vix, 4) if vix is not None else None,
+            'fear_greed_index': self.breadth_fear_greed(breadth),
+            'main_force_flow': self._attempt(errors, 'main force flow', self.fetch_main_force_flow),
+            'north_money_flow': self._attempt(errors, 'north money flow', self.fetch_north_money_flow),
+        }
+        if all(value is None for value in values.values()):
+            return None
+
+        MarketSentimentModel.objects.update_or_create(
+            timestamp=localize_dates([session])[0], defaults=values
+        )
+        return values
+
+    def fetch_main_force_flow(self) -> Optional[float]:
+        """两市最近一个交易日主力净流入（元）"""
+        with self._source_slot('akshare'):
+            df = ak.stock_market_fund_flow()
+        flow = pd.to_numeric(df['主力净流入-净额'], errors='coerce').dropna()
+        return round(float(flow.iloc[-1]), 2) if not flow.empty else None
+
+    def fetch_north_money_flow(self) -> Optional[float]:
+        """北向资金当日成交净买额（元）"""
+        with self._source_slot('akshare'):
+            df = ak.stock_hsgt_fund_flow_summary_em()
+        north = pd.to_numeric(df.loc[df['资金方向'] == '北向', '成交净买额'], errors='coerce').dropna()
+        # 接口单位为亿元
+        return round(float(north.sum()) * 1e8, 2) if not north.empty else None
+
+    @staticmethod
+    def breadth_fear_greed(breadth: Dict) -> Optional[float]:
+        rise, fall = breadth.get('rise_count'), breadth.get('fall_count')
+        if not rise and not fall:
+            return None
+        return round(float(np.clip(100 * (rise or 0) / ((rise or 0) + (fall or 0)), 0, 100)), 4)
+
+    def _attempt(self, errors: List[str], label: str, func: Callable, *args):
+        """执行一个采集步骤，失败时记录错误并返回 None"""
+        try:
+            return func(*args)
+        except Exception as e:
+            logger.error(f"Failed to collect {label}: {e}")
+            errors.append(f'{label}: {e}')
+            return None
+
+    def _source_slot(self, source: str):
+        limiter = self.limiters.get(source)
+        return limiter.slot() if limiter is not None else nullcontext()
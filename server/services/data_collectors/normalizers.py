@@ -0,0 +1,234 @@
+"""
+行情数据标准化
+Vectorized DataFrame normalization for collector outputs
+
+各数据源的原始 DataFrame 先按列转换为统一格式（标准帧），再一次性生成
+MarketDataModel 记录，避免逐行 iterrows / Decimal(str(...)) / strptime。
+
+标准帧列: timestamp(带时区), open, high, low, close, volume,
+          amount, change_pct, turnover_rate
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from django.utils import timezone
+
+from apps.market_data.models import MarketDataModel
+
+PRICE_COLUMNS = ['open', 'high', 'low', 'close']
+FRAME_COLUMNS = ['timestamp', *PRICE_COLUMNS, 'volume', 'amount', 'change_pct', 'turnover_rate']
+
+# 与 MarketDataModel 字段精度一致
+COLUMN_DECIMALS = {
+    'open': 6, 'high': 6, 'low': 6, 'close': 6,
+    'amount': 2, 'change_pct': 4, 'turnover_rate': 4,
+}
+
+AKSHARE_COLUMNS = {
+    '日期': 'timestamp',
+    '开盘': 'open',
+    '最高': 'high',
+    '最低': 'low',
+    '收盘': 'close',
+    '成交量': 'volume',
+    '成交额': 'amount',
+    '涨跌幅': 'change_pct',
+    '换手率': 'turnover_rate',
+}
+
+YFINANCE_COLUMNS = {
+    'Open': 'open',
+    'High': 'high',
+    'Low': 'low',
+    'Close': 'close',
+    'Volume': 'volume',
+}
+
+AKSHARE_SPOT_COLUMNS = {
+    '代码': 'symbol',
+    '今开': 'open',
+    '最高': 'high',
+    '最低': 'low',
+    '最新价': 'close',
+    '成交量': 'volume',
+    '成交额': 'amount',
+    '涨跌幅': 'change_pct',
+    '换手率': 'turnover_rate',
+}
+
+AKSHARE_MINUTE_COLUMNS = {
+    '时间': 'timestamp',
+    '开盘': 'open',
+    '最高': 'high',
+    '最低': 'low',
+    '收盘': 'close',
+    '成交量': 'volume',
+    '成交额': 'amount',
+}
+
+# 新浪 stock_zh_a_daily：成交量单位为股，换手率为小数
+SINA_COLUMNS = {
+    'date': 'timestamp',
+    'turnover': 'turnover_rate',
+}
+
+ALPHAVANTAGE_COLUMNS = {
+    '1. open': 'open',
+    '2. high': 'high',
+    '3. low': 'low',
+    '4. close': 'close',
+    '5. volume': 'volume',
+}
+
+
+def localize_dates(values) -> pd.DatetimeIndex:
+    """
+    将日期列转换为当前时区的零点时间戳
+
+    带时区的输入（如 yfinance 的交易所时区）取其交易所本地日期，
+    保证同一交易日在不同数据源下落到同一个 timestamp。
+    """
+    index = pd.DatetimeIndex(pd.to_datetime(values))
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.normalize().tz_localize(timezone.get_current_timezone())
+
+
+def localize_times(values, tz) -> pd.DatetimeIndex:
+    """
+    分钟K线时间戳：无时区的输入按交易所时区 tz 解释，统一转换为 UTC
+    """
+    index = pd.DatetimeIndex(pd.to_datetime(values))
+    if index.tz is None:
+        index = index.tz_localize(tz, ambiguous='NaT', nonexistent='NaT')
+    return index.tz_convert('UTC')
+
+
+def finalize_frame(frame: pd.DataFrame, extra_columns: List[str] = ()) -> pd.DataFrame:
+    """
+    统一列类型：缺少必填列（OHLCV）的行丢弃，数值列按模型精度取整
+
+    Args:
+        frame: 已重命名为标准列名的 DataFrame（需含 timestamp）
+        extra_columns: 需要原样保留的附加列（如 raw_data）
+    """
+    frame = frame.reindex(columns=[*FRAME_COLUMNS, *extra_columns])
+    for column in FRAME_COLUMNS[1:]:
+        frame[column] = pd.to_numeric(frame[column], errors='coerce')
+
+    required = [*PRICE_COLUMNS, 'volume']
+    frame = frame[np.isfinite(frame[required]).all(axis=1)]
+    frame = frame.round(COLUMN_DECIMALS)
+    frame['volume'] = frame['volume'].astype('int64')
+    return frame.sort_values('timestamp').reset_index(drop=True)
+
+
+def normalize_akshare_daily(df: pd.DataFrame) -> pd.DataFrame:
+    """AKShare stock_zh_a_hist 日线 -> 标准帧"""
+    frame = df.rename(columns=AKSHARE_COLUMNS)
+    frame['timestamp'] = localize_dates(frame['timestamp'])
+    for column in ('amount', 'change_pct', 'turnover_rate'):
+        if column not in frame:
+            frame[column] = 0
+    return finalize_frame(frame)
+
+
+def normalize_sina_daily(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    AKShare stock_zh_a_daily（新浪）日线 -> 标准帧
+
+    成交量换算为手、换手率换算为百分比，与东方财富日线一致；新浪不提供涨跌幅。
+    """
+    frame = df.rename(columns=SINA_COLUMNS)
+    frame['timestamp'] = localize_dates(frame['timestamp'])
+    frame['volume'] = pd.to_numeric(frame['volume'], errors='coerce') / 100
+    if 'turnover_rate' in frame:
+        frame['turnover_rate'] = pd.to_numeric(frame['turnover_rate'], errors='coerce') * 100
+    return finalize_frame(frame)
+
+
+def normalize_akshare_spot(df: pd.DataFrame, trade_date) -> pd.DataFrame:
+    """
+    AKShare stock_zh_a_spot_em 全市场快照 -> 带 symbol 列的标准帧
+
+    每个标的一行，timestamp 为交易日零点，与日线K线共用同一条记录；
+    停牌（无最新价）的标的被丢弃。
+    """
+    frame = df.rename(columns=AKSHARE_SPOT_COLUMNS)
+    frame['symbol'] = frame['symbol'].astype(str)
+    frame['timestamp'] = localize_dates([trade_date] * len(frame))
+    frame = finalize_frame(frame, extra_columns=['symbol'])
+    return frame.drop_duplicates('symbol', keep='last').reset_index(drop=True)
+
+
+def normalize_akshare_intraday(df: pd.DataFrame, tz) -> pd.DataFrame:
+    """AKShare stock_zh_a_hist_min_em 分钟线 -> 标准帧（timestamp 为 UTC 时刻）"""
+    frame = df.rename(columns=AKSHARE_MINUTE_COLUMNS)
+    frame['timestamp'] = localize_times(frame['timestamp'], tz)
+    return finalize_frame(frame[frame['timestamp'].notna()])
+
+
+def normalize_yfinance_intraday(df: pd.DataFrame, tz) -> pd.DataFrame:
+    """yfinance history(interval='1m'/'5m') 分钟线 -> 标准帧（timestamp 为 UTC 时刻）"""
+    frame = df.rename(columns=YFINANCE_COLUMNS)
+    frame['timestamp'] = localize_times(df.index, tz)
+    frame = frame.reset_index(drop=True)
+    frame['amount'] = frame['close'] * frame['volume']
+    return finalize_frame(frame)
+
+
+def normalize_yfinance_daily(df: pd.DataFrame) -> pd.DataFrame:
+    """yfinance history 日线 -> 标准帧（涨跌幅按当日开收盘计算）"""
+    frame = df.rename(columns=YFINANCE_COLUMNS)
+    frame['timestamp'] = localize_dates(df.index)
+    frame = frame.reset_index(drop=True)
+    open_ = frame['open'].where(frame['open'] > 0)
+    frame['change_pct'] = ((frame['close'] - open_) / open_ * 100).fillna(0)
+    return finalize_frame(frame)
+
+
+def normalize_alphavantage_daily(time_series: Dict[str, Dict]) -> pd.DataFrame:
+    """Alpha Vantage 'Time Series (Daily)' -> 标准帧"""
+    frame = pd.DataFrame.from_dict(time_series, orient='index').rename(columns=ALPHAVANTAGE_COLUMNS)
+    frame['timestamp'] = localize_dates(frame.index)
+    frame['raw_data'] = list(time_series.values())
+    return finalize_frame(frame.reset_index(drop=True), extra_columns=['raw_data'])
+
+
+def build_records(
+    frame: pd.DataFrame,
+    symbol: Optional[str],
+    market: str,
+    data_source: str,
+    fields: List[str]
+) -> List[MarketDataModel]:
+    """
+    由标准帧生成待写入的 MarketDataModel 实例
+
+    Args:
+        frame: 标准帧
+        symbol: 标的代码；为 None 时取 frame 的 symbol 列（多标的快照）
+        fields: 需要写入的字段（与采集路径的 update_fields 一致）
+    """
+    columns = [column for column in frame.columns if column in fields]
+    values = []
+    for column in columns:
+        series = frame[column]
+        if column in PRICE_COLUMNS or column in ('volume', 'raw_data'):
+            values.append(series.tolist())
+        else:
+            values.append(series.astype(object).where(series.notna(), None).tolist())
+    timestamps = pd.DatetimeIndex(frame['timestamp']).to_pydatetime()
+    symbols = frame['symbol'].tolist() if symbol is None else [symbol] * len(frame)
+
+    return [
+        MarketDataModel(
+            symbol=row[0],
+            market=market,
+            timestamp=row[1],
+            data_source=data_source,
+            **dict(zip(columns, row[2:]))
+        )
+        for row in zip(symbols, timestamps, *values)
+    ]
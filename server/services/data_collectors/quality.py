@@ -0,0 +1,325 @@
+"""
+行情数据质量校验
+Vectorized quality checks for ingested market data batches
+
+每批标准帧在写库前做向量化检查：
+    ohlc         low <= open/close <= high
+    volume       成交量 <= 0
+    duplicate    同一标的重复的 timestamp（保留最后一条）
+    outlier      对数收益率的稳健 z-score（中位数/MAD，结合列式存储中的近期收盘价）
+    missing_days 与交易日历相比缺失的交易日（只报告，无行可隔离）
+
+未通过 quarantine_checks 中检查项的行写入 quarantined_bar 而不入库；每次采集
+运行汇总一条 data_quality_report。
+"""
+import logging
+import threading
+import time
+from contextlib import nullcontext
+from functools import lru_cache
+from typing import Callable, ContextManager, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from pandas.tseries.holiday import (
+    AbstractHolidayCalendar, GoodFriday, Holiday, USLaborDay, USMartinLutherKingJr,
+    USMemorialDay, USPresidentsDay, USThanksgivingDay, nearest_workday
+)
+
+from apps.market_data.models import DataQualityReportModel, QuarantinedBarModel
+
+logger = logging.getLogger(__name__)
+
+CHECKS = ['ohlc', 'volume', 'duplicate', 'outlier', 'missing_days']
+
+
+class NYSEHolidayCalendar(AbstractHolidayCalendar):
+    """纽交所休市日（不含临时休市）"""
+    rules = [
+        Holiday('NewYearsDay', month=1, day=1, observance=nearest_workday),
+        USMartinLutherKingJr,
+        USPresidentsDay,
+        GoodFriday,
+        USMemorialDay,
+        Holiday('Juneteenth', month=6, day=19, start_date='2022-06-20', observance=nearest_workday),
+        Holiday('USIndependenceDay', month=7, day=4, observance=nearest_workday),
+        USLaborDay,
+        USThanksgivingDay,
+        Holiday('Christmas', month=12, day=25, observance=nearest_workday),
+    ]
+
+
+# 日历覆盖范围（超出范围的日期按工作日处理）
+CALENDAR_START, CALENDAR_END = '1990-01-01', '2099-12-31'
+
+
+# 获取失败后至少间隔该秒数再重试 A股交易日历
+CALENDAR_RETRY_SECONDS = 3600
+
+# 只缓存成功获取的 A股交易日历；失败时记录时间，冷却期内直接退化为工作日
+_a_stock_calendar: Optional[np.ndarray] = None
+_a_stock_calendar_failed_at: Optional[float] = None
+_a_stock_calendar_lock = threading.Lock()
+
+
+def _a_stock_trade_dates() -> Optional[np.ndarray]:
+    """A股交易日历（新浪），获取失败时返回 None（退化为工作日，冷却期后重试）"""
+    global _a_stock_calendar, _a_stock_calendar_failed_at
+    with _a_stock_calendar_lock:
+        if _a_stock_calendar is not None:
+            return _a_stock_calendar
+        if _a_stock_calendar_failed_at is not None and \
+                time.monotonic() - _a_stock_calendar_failed_at < CALENDAR_RETRY_SECONDS:
+            return None
+        try:
+            import akshare as ak
+            dates = ak.tool_trade_date_hist_sina()['trade_date']
+            _a_stock_calendar = np.unique(pd.to_datetime(dates).to_numpy().astype('datetime64[D]'))
+            return _a_stock_calendar
+        except Exception as e:
+            _a_stock_calendar_failed_at = time.monotonic()
+            logger.warning(f"Failed to load A-stock trade calendar, falling back to weekdays: {e}")
+            return None
+
+
+def _trading_calendar(market: str) -> np.ndarray:
+    """市场交易日（升序 datetime64[D]）"""
+    if market == 'A_STOCK':
+        calendar = _a_stock_trade_dates()
+        if calendar is not None:
+            return calendar
+    return _weekday_calendar(market)
+
+
+@lru_cache(maxsize=None)
+def _weekday_calendar(market: str) -> np.ndarray:
+    """按工作日（美股另去除纽交所休市日）生成的交易日，每个市场只生成一次"""
+    holidays = []
+    if market == 'US_STOCK':
+        holidays = NYSEHolidayCalendar().holidays(CALENDAR_START, CALENDAR_END).to_numpy().astype('datetime64[D]')
+    days = np.arange(np.datetime64(CALENDAR_START), np.datetime64(CALENDAR_END) + 1)
+    return days[np.is_busday(days, holidays=holidays)]
+
+
+def trading_days(market: str, start, end) -> np.ndarray:
+    """
+    [start, end] 内的交易日（datetime64[D]）
+
+    A股使用交易所日历，美股使用纽交所节假日规则，其余市场按工作日。
+    """
+    calendar = _trading_calendar(market)
+    start = np.datetime64(pd.Timestamp(start).tz_localize(None).date(), 'D')
+    end = np.datetime64(pd.Timestamp(end).tz_localize(None).date(), 'D')
+    return calendar[np.searchsorted(calendar, start):np.searchsorted(calendar, end, side='right')]
+
+
+class QualityValidator:
+    """批次质量校验器：累计一次采集运行内的检查结果，flush 时写入报告"""
+
+    # 报告中每个检查项最多列出的标的数
+    MAX_REPORTED_SYMBOLS = 50
+
+    def __init__(
+        self,
+        zscore_threshold: float = 8.0,
+        zscore_window: int = 60,
+        min_history: int = 20,
+        quarantine_checks: Optional[List[str]] = None,
+        write_guard: Optional[Callable[[], ContextManager]] = None
+    ):
+        """
+        Args:
+            zscore_threshold: 稳健 z-score 超过该值视为异常价格
+            zscore_window: 计算 z-score 时参考的近期K线数
+            min_history: 收益率样本少于该数量时不做异常价格检查
+            quarantine_checks: 未通过时隔离（不入库）的检查项，默认 ohlc/volume/duplicate，为 [] 时只报告；
+                异常价格可能是真实的涨跌停，默认只报告
+            write_guard: 返回写库锁的函数（与采集器的 _db_write_guard 相同，SQLite 下串行化写库）
+        """
+        self.zscore_threshold = zscore_threshold
+        self.zscore_window = zscore_window
+        self.min_history = min_history
+        self.quarantine_checks = set(
+            ['ohlc', 'volume', 'duplicate'] if quarantine_checks is None else quarantine_checks
+        )
+        self.write_guard = write_guard or nullcontext
+        self._lock = threading.Lock()
+        self._reset()
+
+    def validate(
+        self,
+        frame: pd.DataFrame,
+        market: str,
+        data_source: str,
+        symbol: Optional[str] = None,
+        history_close: Optional[np.ndarray] = None,
+        since=None,
+        daily: bool = True
+    ) -> pd.DataFrame:
+        """
+        校验一批标准帧，返回可以入库的行
+
+        Args:
+            frame: 标准帧（单标的按 timestamp 升序；symbol 为 None 时为带 symbol 列的多标的帧）
+            history_close: 该标的批次之前的近期收盘价（升序），用于异常价格检查
+            since: 上次入库的时间戳（水位线），用于缺失交易日检查；单标的时有效
+            daily: 为 False 时（分钟K线）跳过异常价格与缺失交易日检查
+        """
+        if frame.empty:
+            return frame
+        started = time.perf_counter()
+
+        o, h, l, c = (frame[column].to_numpy(dtype=float) for column in ('open', 'high', 'low', 'close'))
+        failed = {
+            'ohlc': ~((l <= np.minimum(o, c)) & (np.maximum(o, c) <= h)),
+            'volume': frame['volume'].to_numpy() <= 0,
+            'duplicate': frame.duplicated(['timestamp'] if symbol else ['symbol', 'timestamp'], keep='last').to_numpy(),
+        }
+        series_checks = symbol is not None and daily
+        if series_checks:
+            failed['outlier'] = self._outliers(c, history_close)
+
+        quarantine = np.zeros(len(frame), dtype=bool)
+        for check, mask in failed.items():
+            if check in self.quarantine_checks:
+                quarantine |= mask
+
+        missing = self._missing_days(frame, market, since) if series_checks else 0
+        symbols = frame['symbol'].to_numpy() if symbol is None else None
+
+        if quarantine.any():
+            self._quarantine(frame[quarantine], failed, quarantine, market, data_source, symbol)
+
+        with self._lock:
+            self._rows_checked += len(frame)
+            self._rows_quarantined += int(quarantine.sum())
+            for check, mask in failed.items():
+                count = int(mask.sum())
+                if count:
+                    self._issues[check] += count
+                    offenders = [symbol] if symbol is not None else np.unique(symbols[mask]).tolist()
+                    self._note_symbols(check, offenders, count if symbol is not None else 1)
+            if missing:
+                self._issues['missing_days'] += missing
+                self._note_symbols('missing_days', [symbol], missing)
+            self._elapsed += time.perf_counter() - started
+
+        return frame[~quarantine] if quarantine.any() else frame
+
+    def flush(self, scope: str) -> Optional[Dict]:
+        """
+        写入本次运行的质量报告并清空累计结果
+
+        Returns:
+            Dict: 报告内容；没有检查任何行时返回 None
+        """
+        with self._lock:
+            if not self._rows_checked:
+                return None
+            report = {
+                'scope': scope,
+                'rows_checked': self._rows_checked,
+                'rows_quarantined': self._rows_quarantined,
+                'issues': {check: count for check, count in self._issues.items() if count},
+                'symbols': self._symbols,
+                'elapsed': round(self._elapsed, 4),
+            }
+            self._reset()
+
+        try:
+            with self.write_guard():
+                DataQualityReportModel.objects.create(**report)
+        except Exception as e:
+            logger.error(f"Failed to save data quality report: {e}")
+        if report['issues']:
+            logger.warning(f"Data quality issues in {scope}: {report['issues']}")
+        return report
+
+    def _reset(self):
+        self._rows_checked = 0
+        self._rows_quarantined = 0
+        self._issues = {check: 0 for check in CHECKS}
+        self._symbols: Dict[str, Dict[str, int]] = {}
+        self._elapsed = 0.0
+
+    def _note_symbols(self, check: str, symbols: List[str], count: int):
+        noted = self._symbols.setdefault(check, {})
+        for symbol in symbols:
+            if symbol in noted or len(noted) < self.MAX_REPORTED_SYMBOLS:
+                noted[symbol] = noted.get(symbol, 0) + count
+
+    def _outliers(self, close: np.ndarray, history_close: Optional[np.ndarray]) -> np.ndarray:
+        """批次内各行对数收益率的稳健 z-score 是否超过阈值"""
+        flags = np.zeros(len(close), dtype=bool)
+        history = np.asarray(history_close if history_close is not None else [], dtype=float)[-self.zscore_window:]
+        series = np.concatenate([history, close])
+        if len(series) <= self.min_history or (series <= 0).any():
+            return flags
+
+        returns = np.diff(np.log(series))
+        median = np.median(returns)
+        mad = np.median(np.abs(returns - median)) * 1.4826
+        if mad == 0:
+            return flags
+        z = np.abs(returns - median) / mad
+        # 批次第 j 行的收益率为 returns[len(history) + j - 1]，无历史时第一行没有收益率
+        index = np.arange(len(history), len(series)) - 1
+        valid = index >= 0
+        flags[valid] = z[index[valid]] > self.zscore_threshold
+        return flags
+
+    def _missing_days(self, frame: pd.DataFrame, market: str, since) -> int:
+        """批次覆盖区间（自上次入库起）内缺失的交易日数"""
+        dates = pd.DatetimeIndex(frame['timestamp']).tz_localize(None).to_numpy().astype('datetime64[D]')
+        if since is not None:
+            start = np.datetime64(pd.Timestamp(since).tz_localize(None).date(), 'D') + 1
+        else:
+            start = dates.min()
+        expected = trading_days(market, start, dates.max())
+        return int(len(expected) - np.isin(expected, dates).sum())
+
+    def _quarantine(
+        self,
+        rows: pd.DataFrame,
+        failed: Dict[str, np.ndarray],
+        quarantine: np.ndarray,
+        market: str,
+        data_source: str,
+        symbol: Optional[str]
+    ):
+        checks = [check for check in failed if check in self.quarantine_checks]
+        reasons = zip(*(failed[check][quarantine] for check in checks))
+        payloads = rows.reindex(columns=['open', 'high', 'low', 'close', 'volume', 'amount', 'change_pct', 'turnover_rate'])
+        payloads = payloads.astype(object).where(payloads.notna(), None)
+        records = [
+            QuarantinedBarModel(
+                symbol=symbol or row_symbol,
+                market=market,
+                timestamp=timestamp,
+                data_source=data_source,
+                reasons=[check for check, hit in zip(checks, hits) if hit],
+                payload=payload,
+            )
+            for row_symbol, timestamp, hits, payload in zip(
+                rows['symbol'] if symbol is None else [symbol] * len(rows),
+                pd.DatetimeIndex(rows['timestamp']).to_pydatetime(),
+                reasons,
+                payloads.to_dict('records'),
+            )
+        ]
+        try:
+            with self.write_guard():
+                QuarantinedBarModel.objects.bulk_create(records)
+        except Exception as e:
+            logger.error(f"Failed to quarantine {len(records)} bars: {e}")
+
+
+def build_quality_validator(
+    write_guard: Optional[Callable[[], ContextManager]] = None
+) -> Optional[QualityValidator]:
+    """按 AI_TRADER_CONFIG['DATA_QUALITY'] 创建校验器；未启用时返回 None"""
+    config = dict(settings.AI_TRADER_CONFIG.get('DATA_QUALITY', {}))
+    if not config.pop('enabled', False):
+        return None
+    return QualityValidator(**config, write_guard=write_guard)
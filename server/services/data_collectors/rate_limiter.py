@@ -0,0 +1,104 @@
+"""
+数据源限流器
+Per-source token bucket rate limiting and concurrency caps
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+
+class TokenBucket:
+    """线程安全的令牌桶"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate: 每秒补充的令牌数，<= 0 表示不限速
+            capacity: 桶容量（允许的突发请求数），默认为 max(1, rate)
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        获取令牌，不足时阻塞等待
+
+        Returns:
+            float: 实际等待的秒数
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class SourceLimiter:
+    """单个数据源的限流器：令牌桶限速 + 信号量限制并发"""
+
+    def __init__(self, name: str, rate: float = 0, max_concurrency: int = 0):
+        """
+        Args:
+            name: 数据源名称
+            rate: 每秒请求数，<= 0 表示不限速
+            max_concurrency: 最大并发请求数，<= 0 表示不限制
+        """
+        self.name = name
+        self.bucket = TokenBucket(rate)
+        self.semaphore = threading.BoundedSemaphore(max_concurrency) if max_concurrency > 0 else None
+        self.total_wait = 0.0
+        self.request_count = 0
+        self._stats_lock = threading.Lock()
+
+    @contextmanager
+    def slot(self):
+        """占用一个请求槽位（先限并发，再取令牌）"""
+        if self.semaphore:
+            self.semaphore.acquire()
+        try:
+            waited = self.bucket.acquire()
+            with self._stats_lock:
+                self.total_wait += waited
+                self.request_count += 1
+            yield
+        finally:
+            if self.semaphore:
+                self.semaphore.release()
+
+    def stats(self) -> Dict:
+        """限流统计"""
+        return {
+            'requests': self.request_count,
+            'total_wait': round(self.total_wait, 2),
+        }
+
+
+def build_source_limiters(limits: Dict[str, Dict]) -> Dict[str, SourceLimiter]:
+    """
+    根据配置构建各数据源的限流器
+
+    Args:
+        limits: {'akshare': {'rate': 5, 'max_concurrency': 4}, ...}
+    """
+    return {
+        name: SourceLimiter(
+            name,
+            rate=float(conf.get('rate', 0)),
+            max_concurrency=int(conf.get('max_concurrency', 0)),
+        )
+        for name, conf in limits.items()
+    }
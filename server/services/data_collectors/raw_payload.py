@@ -0,0 +1,125 @@
+"""
+行情原始数据存储策略
+Raw provider payload policy for market_data
+
+RAW_PAYLOAD_POLICY:
+    keep      原样保存在 market_data.raw_data（JSON）（默认）
+    drop      不保存
+    compress  zlib 压缩后保存在 market_data.raw_blob，raw_data 置空（适合较大的原始数据）
+    offload   保存到旁路表 market_data_raw（按行主键），raw_data 置空
+
+各策略写入时都会清空其他位置的旧值，切换策略后新采集的行只保留一种形式；
+已有数据由 compact_raw_data 命令迁移。
+"""
+import json
+import logging
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+from django.conf import settings
+
+from apps.market_data.models import MarketDataModel, MarketDataRawModel
+
+logger = logging.getLogger(__name__)
+
+RAW_POLICIES = ('keep', 'drop', 'compress', 'offload')
+# raw_blob 首字节：压缩 / 原文
+BLOB_ZLIB = b'z'
+BLOB_PLAIN = b'j'
+
+
+def get_raw_policy() -> str:
+    """当前原始数据存储策略"""
+    policy = settings.AI_TRADER_CONFIG.get('RAW_PAYLOAD_POLICY', 'keep')
+    if policy not in RAW_POLICIES:
+        raise ValueError(f"Unknown RAW_PAYLOAD_POLICY: {policy}")
+    return policy
+
+
+def compress_payload(payload: Dict) -> bytes:
+    """
+    压缩原始数据：首字节为格式标记，短小的数据压缩后反而变大时保存原文
+    """
+    text = json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    compressed = zlib.compress(text, 9)
+    if len(compressed) < len(text):
+        return BLOB_ZLIB + compressed
+    return BLOB_PLAIN + text
+
+
+def decompress_payload(blob) -> Dict:
+    blob = bytes(blob)
+    body = zlib.decompress(blob[1:]) if blob[:1] == BLOB_ZLIB else blob[1:]
+    return json.loads(body.decode('utf-8'))
+
+
+def apply_raw_policy(
+    frame: pd.DataFrame,
+    fields: List[str],
+    policy: Optional[str] = None
+) -> Tuple[pd.DataFrame, List[str], Optional[List[Dict]]]:
+    """
+    按策略改写标准帧中的 raw_data 列
+
+    Args:
+        frame: 带 raw_data 列的标准帧
+        fields: 采集路径的写入字段
+        policy: 存储策略，默认读取 RAW_PAYLOAD_POLICY
+
+    Returns:
+        Tuple: (写入用的帧, 写入字段, offload 策略下待写入旁路表的原始数据（与帧行对应），其他策略为 None)
+    """
+    if 'raw_data' not in fields or 'raw_data' not in frame:
+        return frame, fields, None
+    policy = policy or get_raw_policy()
+    payloads = frame['raw_data'].tolist()
+
+    frame = frame.copy()
+    if policy == 'keep':
+        frame['raw_blob'] = None
+    else:
+        frame['raw_data'] = [{} for _ in payloads]
+        frame['raw_blob'] = [compress_payload(p) for p in payloads] if policy == 'compress' else None
+    fields = [*fields, 'raw_blob'] if 'raw_blob' not in fields else fields
+    return frame, fields, (payloads if policy == 'offload' else None)
+
+
+def offload_payloads(symbol: str, market: str, timestamps, payloads: List[Dict]) -> int:
+    """
+    将原始数据写入旁路表（行情行写入之后调用）
+
+    Args:
+        timestamps: 与 payloads 对应的K线时间戳
+
+    Returns:
+        int: 写入行数
+    """
+    by_timestamp = dict(zip(pd.DatetimeIndex(timestamps).to_pydatetime(), payloads))
+    if not by_timestamp:
+        return 0
+    ids = MarketDataModel.objects.filter(
+        symbol=symbol, market=market, timestamp__in=list(by_timestamp)
+    ).values_list('id', 'timestamp')
+    records = [
+        MarketDataRawModel(market_data_id=pk, payload=by_timestamp[timestamp])
+        for pk, timestamp in ids
+        if timestamp in by_timestamp
+    ]
+    MarketDataRawModel.objects.bulk_create(
+        records,
+        update_conflicts=True,
+        unique_fields=['market_data'],
+        update_fields=['payload'],
+    )
+    return len(records)
+
+
+def load_raw_payload(row: MarketDataModel) -> Dict:
+    """读取一行行情的原始数据（无论以何种策略保存），没有时返回空字典"""
+    if row.raw_data:
+        return row.raw_data
+    if row.raw_blob is not None:
+        return decompress_payload(row.raw_blob)
+    side = MarketDataRawModel.objects.filter(market_data_id=row.pk).values_list('payload', flat=True).first()
+    return side or {}
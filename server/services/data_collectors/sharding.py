@@ -0,0 +1,186 @@
+"""
+分片采集
+Sharded, lease-based collection across processes and nodes
+
+标的按代码的稳定哈希（crc32）划分到固定数量的分片，各进程对同一标的列表得到相同的划分。
+采集进程通过 collection_shard 表抢占分片租约：
+
+    抢占    条件更新（无持有者或租约已过期）成功即持有，适用于 PostgreSQL 与 SQLite
+    心跳    采集期间后台线程按 lease/3 续约，进程卡死或退出后租约自然过期
+    接管    过期分片可被任意进程重新抢占；失去租约的进程完成本轮后不再记录完成状态
+    调度    每个分片在 cadence 内只采集一次，优先抢占最久未完成的分片
+
+各节点时钟偏差应远小于租约时长。
+"""
+import logging
+import os
+import socket
+import threading
+import uuid
+import zlib
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Dict, Iterator, List, Optional
+
+from django.db import close_old_connections, connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from apps.market_data.models import CollectionShardModel
+
+logger = logging.getLogger(__name__)
+
+
+def shard_of(symbol: str, shard_count: int) -> int:
+    """标的所属分片（跨进程、跨节点稳定）"""
+    return zlib.crc32(symbol.encode('utf-8')) % shard_count
+
+
+def partition_symbols(symbols: List[str], shard_count: int) -> Dict[int, List[str]]:
+    """按分片划分标的列表，保持原有顺序"""
+    shards = {shard: [] for shard in range(shard_count)}
+    for symbol in symbols:
+        shards[shard_of(symbol, shard_count)].append(symbol)
+    return shards
+
+
+def default_worker_id() -> str:
+    """主机名:进程号:随机后缀"""
+    return f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}'
+
+
+class ShardLeaseManager:
+    """采集分片租约管理"""
+
+    def __init__(
+        self,
+        job: str,
+        shard_count: int,
+        lease_seconds: float = 120,
+        cadence: float = 0,
+        worker_id: Optional[str] = None
+    ):
+        """
+        Args:
+            job: 采集任务标识（市场:K线周期），同一任务的进程共享分片
+            shard_count: 分片数量
+            lease_seconds: 租约时长，超过该时长未续约的分片可被其他进程接管
+            cadence: 同一分片两次采集的最小间隔（秒）
+            worker_id: 租约持有者标识，默认 主机名:进程号:随机后缀
+        """
+        if shard_count < 1:
+            raise ValueError('shard_count must be >= 1')
+        self.job = job
+        self.shard_count = shard_count
+        self.lease = timedelta(seconds=lease_seconds)
+        self.cadence = timedelta(seconds=cadence)
+        self.worker_id = worker_id or default_worker_id()
+
+    def ensure_shards(self):
+        """创建缺失的分片行，并移除分片数调小后多余的分片"""
+        CollectionShardModel.objects.bulk_create(
+            [CollectionShardModel(job=self.job, shard=shard) for shard in range(self.shard_count)],
+            ignore_conflicts=True,
+        )
+        CollectionShardModel.objects.filter(job=self.job, shard__gte=self.shard_count).delete()
+
+    def claim(self) -> Optional[int]:
+        """
+        抢占一个到期的分片
+
+        Returns:
+            Optional[int]: 抢占到的分片序号，没有可抢占的分片时返回 None
+        """
+        now = timezone.now()
+        claimable = Q(owner__isnull=True) | Q(lease_expires_at__lt=now)
+        due = Q(last_completed_at__isnull=True) | Q(last_completed_at__lte=now - self.cadence)
+        candidates = CollectionShardModel.objects.filter(
+            claimable, due, job=self.job, shard__lt=self.shard_count
+        ).order_by(F('last_completed_at').asc(nulls_first=True), 'shard')
+
+        for candidate in candidates.values('id', 'shard', 'owner'):
+            # 条件更新：并发抢占同一分片时只有一个进程更新成功
+            claimed = CollectionShardModel.objects.filter(claimable, pk=candidate['id']).update(
+                owner=self.worker_id,
+                lease_expires_at=now + self.lease,
+                heartbeat_at=now,
+                updated_at=now,
+            )
+            if claimed:
+                if candidate['owner'] and candidate['owner'] != self.worker_id:
+                    logger.warning(f"Reassigned stalled shard {self.job}#{candidate['shard']} from {candidate['owner']}")
+                return candidate['shard']
+        return None
+
+    def renew(self, shard: int) -> bool:
+        """续约，返回是否仍持有租约"""
+        now = timezone.now()
+        return bool(
+            CollectionShardModel.objects.filter(job=self.job, shard=shard, owner=self.worker_id).update(
+                lease_expires_at=now + self.lease, heartbeat_at=now, updated_at=now
+            )
+        )
+
+    def release(self, shard: int, stats: Optional[Dict] = None) -> bool:
+        """
+        释放租约；提供 stats 时记录本轮完成状态
+
+        Args:
+            stats: {'symbols', 'records', 'failed', 'elapsed'}，为 None 时表示本轮未完成，分片立即可被重新抢占
+
+        Returns:
+            bool: 释放时是否仍持有租约
+        """
+        now = timezone.now()
+        values = {'owner': None, 'lease_expires_at': None, 'updated_at': now}
+        if stats is not None:
+            values.update(
+                last_completed_at=now,
+                last_symbols=stats.get('symbols', 0),
+                last_records=stats.get('records', 0),
+                last_failed=stats.get('failed', 0),
+                last_elapsed=stats.get('elapsed'),
+            )
+        return bool(
+            CollectionShardModel.objects.filter(job=self.job, shard=shard, owner=self.worker_id).update(**values)
+        )
+
+    def release_all(self):
+        """释放本进程持有的全部租约（进程退出时调用）"""
+        CollectionShardModel.objects.filter(job=self.job, owner=self.worker_id).update(
+            owner=None, lease_expires_at=None, updated_at=timezone.now()
+        )
+
+    @contextmanager
+    def heartbeat(self, shard: int) -> Iterator[threading.Event]:
+        """
+        采集期间在后台线程中续约
+
+        Yields:
+            threading.Event: 失去租约（已被其他进程接管）时置位
+        """
+        stop = threading.Event()
+        lost = threading.Event()
+        interval = max(self.lease.total_seconds() / 3, 1)
+
+        def beat():
+            close_old_connections()
+            try:
+                while not stop.wait(interval):
+                    try:
+                        if not self.renew(shard):
+                            logger.warning(f"Lost lease on shard {self.job}#{shard}")
+                            lost.set()
+                            return
+                    except Exception as e:
+                        logger.error(f"Failed to renew lease on shard {self.job}#{shard}: {e}")
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=beat, name=f'lease-{self.job}-{shard}', daemon=True)
+        thread.start()
+        try:
+            yield lost
+        finally:
+            stop.set()
+            thread.join()
@@ -0,0 +1,202 @@
+"""
+数据源路由
+Route each symbol to the currently best data source using measured quality
+
+每个数据源记录三项指标（指数加权移动平均）：
+    延迟        请求耗时（由采集器的数据源槽位测量）
+    错误率      采集结果失败/为空的比例
+    分歧率      与其他数据源写入的同一根K线收盘价偏差超过阈值的比例（抽样核对）
+
+评分 = 延迟 × (1 + 错误权重×错误率) × (1 + 分歧权重×分歧率) × (1 + 优先级步长×配置顺序)，越低越好。
+错误率与分歧率随时间按半衰期衰减，恢复的数据源会重新被选中。
+限流或连续失败的数据源进入冷却期（指数退避），冷却中的数据源只在没有其他可用数据源时使用。
+"""
+import logging
+import random
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OPTIONS = {
+    'latency_alpha': 0.2,  # 延迟/错误率/分歧率的 EWMA 系数
+    'prior_latency': 1.0,  # 没有样本时的假定延迟（秒）
+    'error_weight': 10.0,
+    'disagreement_weight': 10.0,
+    'priority_step': 0.5,  # 配置顺序每靠后一位评分增加的比例
+    'half_life': 600,  # 错误率/分歧率衰减半衰期（秒）
+    'failure_threshold': 3,  # 连续失败次数达到该值后进入冷却
+    'cooldown': 30,  # 冷却基数（秒），每次连续触发翻倍
+    'max_cooldown': 600,
+    'audit_rate': 0.1,  # 写入时核对分歧的抽样比例
+    'audit_bars': 5,  # 每次核对的最近K线数
+    'disagreement_tolerance': 0.005,  # 收盘价相对偏差超过该值视为分歧
+}
+
+RATE_LIMIT_MARKERS = ('rate limit', 'ratelimit', 'too many requests', '429')
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """判断异常是否为数据源限流"""
+    text = f'{type(error).__name__} {error}'.lower()
+    return any(marker in text for marker in RATE_LIMIT_MARKERS)
+
+
+class SourceHealth:
+    """单个数据源的质量指标"""
+
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.disagreement = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.throttled = 0
+        self.served = 0
+        self.consecutive_failures = 0
+        self.cooldown_streak = 0
+        self.cooldown_until = 0.0
+        self.errors_at = 0.0
+        self.disagreement_at = 0.0
+
+
+class SourceRouter:
+    """按实测质量为每个标的选择数据源"""
+
+    def __init__(self, routes: Dict[str, List[str]], options: Optional[Dict] = None):
+        """
+        Args:
+            routes: 市场 -> 按优先级排列的数据源名称（见 SOURCE_ROUTING）
+            options: 覆盖 DEFAULT_OPTIONS（见 SOURCE_ROUTER）
+        """
+        self.routes = {market: list(sources) for market, sources in routes.items()}
+        self.options = {**DEFAULT_OPTIONS, **(options or {})}
+        self.health: Dict[str, SourceHealth] = {
+            source: SourceHealth() for sources in self.routes.values() for source in sources
+        }
+        self._lock = threading.Lock()
+
+    def routes_market(self, market: str) -> bool:
+        return len(self.routes.get(market, [])) > 0
+
+    def rank(self, market: str, available: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        当前市场的数据源，按评分从优到劣排列；冷却中的数据源排在最后
+
+        Args:
+            available: 可用的数据源（如未配置 API Key 的数据源不在其中），默认全部
+        """
+        sources = self.routes.get(market, [])
+        if available is not None:
+            available = set(available)
+            sources = [source for source in sources if source in available]
+        now = time.monotonic()
+        with self._lock:
+            scored = [
+                (self.health[source].cooldown_until > now, self._score(source, position, now), source)
+                for position, source in enumerate(sources)
+            ]
+        return [source for _, _, source in sorted(scored)]
+
+    def observe_latency(self, source: str, seconds: float):
+        """记录一次成功请求的耗时"""
+        health = self.health.get(source)
+        if health is None:
+            return
+        with self._lock:
+            alpha = self.options['latency_alpha']
+            health.requests += 1
+            health.latency = seconds if health.latency is None else (1 - alpha) * health.latency + alpha * seconds
+
+    def record_result(self, source: str, ok: bool):
+        """记录一次采集结果（失败或无数据计为错误），连续失败时进入冷却"""
+        health = self.health.get(source)
+        if health is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            alpha = self.options['latency_alpha']
+            health.error_rate = (1 - alpha) * self._decayed(health.error_rate, health.errors_at, now) + alpha * (0.0 if ok else 1.0)
+            health.errors_at = now
+            if ok:
+                health.served += 1
+                health.consecutive_failures = 0
+                health.cooldown_streak = 0
+                return
+            health.failures += 1
+            health.consecutive_failures += 1
+            if health.consecutive_failures >= self.options['failure_threshold']:
+                self._cool_down(source, health, now, 'consecutive failures')
+                health.consecutive_failures = 0
+
+    def record_throttled(self, source: str):
+        """数据源限流：立即进入冷却"""
+        health = self.health.get(source)
+        if health is None:
+            return
+        with self._lock:
+            health.throttled += 1
+            self._cool_down(source, health, time.monotonic(), 'rate limited')
+
+    def should_audit(self) -> bool:
+        return random.random() < self.options['audit_rate']
+
+    def record_disagreement(self, source: str, other: str, share: float):
+        """
+        记录两个数据源在同一批K线上的分歧比例
+
+        无法判断哪一方有误，双方都计入；不在路由中的数据源（如全市场快照）只计入路由中的一方。
+        """
+        now = time.monotonic()
+        with self._lock:
+            alpha = self.options['latency_alpha']
+            for name in (source, other):
+                health = self.health.get(name)
+                if health is None:
+                    continue
+                health.disagreement = (1 - alpha) * self._decayed(health.disagreement, health.disagreement_at, now) + alpha * share
+                health.disagreement_at = now
+        if share > 0:
+            logger.warning(f"Data sources {source} and {other} disagree on {share:.0%} of audited bars")
+
+    def stats(self) -> Dict[str, Dict]:
+        """各数据源的指标（只包含有过请求或结果的数据源）"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                source: {
+                    'served': health.served,
+                    'failures': health.failures,
+                    'throttled': health.throttled,
+                    'avg_latency': round(health.latency, 3) if health.latency is not None else None,
+                    'error_rate': round(self._decayed(health.error_rate, health.errors_at, now), 3),
+                    'disagreement': round(self._decayed(health.disagreement, health.disagreement_at, now), 3),
+                    'cooling': max(0.0, round(health.cooldown_until - now, 1)),
+                }
+                for source, health in self.health.items()
+                if health.requests or health.served or health.failures or health.throttled
+            }
+
+    def _score(self, source: str, position: int, now: float) -> float:
+        health = self.health[source]
+        latency = health.latency if health.latency is not None else self.options['prior_latency']
+        error_rate = self._decayed(health.error_rate, health.errors_at, now)
+        disagreement = self._decayed(health.disagreement, health.disagreement_at, now)
+        return (
+            max(latency, 1e-3)
+            * (1 + self.options['error_weight'] * error_rate)
+            * (1 + self.options['disagreement_weight'] * disagreement)
+            * (1 + self.options['priority_step'] * position)
+        )
+
+    def _decayed(self, value: float, since: float, now: float) -> float:
+        if not value or not since:
+            return value
+        return value * 0.5 ** ((now - since) / self.options['half_life'])
+
+    def _cool_down(self, source: str, health: SourceHealth, now: float, reason: str):
+        seconds = min(self.options['cooldown'] * 2 ** health.cooldown_streak, self.options['max_cooldown'])
+        health.cooldown_streak += 1
+        health.cooldown_until = now + seconds
+        logger.warning(f"Data source {source} cooling down for {seconds:.0f}s ({reason})")
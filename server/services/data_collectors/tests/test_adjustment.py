@@ -0,0 +1,65 @@
+"""
+复权因子测试
+"""
+import numpy as np
+import pandas as pd
+from django.test import TestCase
+
+from apps.market_data.models import AdjustmentFactorModel
+from services.data_collectors.adjustment import (
+    adjust_bars, adjustment_multipliers, detect_adjustments, record_adjustments
+)
+from services.data_collectors.normalizers import localize_dates
+
+DAYS = ['2026-10-12', '2026-10-13', '2026-10-14', '2026-10-15']
+
+
+def raw_frame(closes, change_pct):
+    closes = np.asarray(closes, dtype=float)
+    return pd.DataFrame({
+        'timestamp': localize_dates(DAYS[:len(closes)]), 'open': closes, 'high': closes, 'low': closes,
+        'close': closes, 'volume': 100, 'change_pct': change_pct,
+    })
+
+
+class DetectAdjustmentsTest(TestCase):
+
+    def test_reference_price_gap_marks_the_ex_date(self):
+        # 10-14 除权：参考价 10.0 / 前收盘 20.0 = 0.5
+        frame = raw_frame([20.0, 20.0, 10.5, 10.5], [0.0, 0.0, 5.0, 0.0])
+        events = detect_adjustments(frame, prev_close=20.0, tolerance=0.001)
+        self.assertEqual(events['timestamp'].tolist(), [localize_dates(['2026-10-14'])[0]])
+        self.assertAlmostEqual(events['ratio'].iloc[0], 0.5)
+
+    def test_no_previous_close_means_no_event_on_the_first_row(self):
+        frame = raw_frame([10.5], [5.0])
+        self.assertTrue(detect_adjustments(frame, prev_close=None, tolerance=0.001).empty)
+
+    def test_recording_the_same_event_twice_overwrites_it(self):
+        events = pd.DataFrame({'timestamp': localize_dates(['2026-10-14']), 'ratio': [0.5]})
+        record_adjustments(events, 'A_STOCK', '600000')
+        record_adjustments(events.assign(ratio=0.52), 'A_STOCK', '600000')
+        self.assertEqual(list(AdjustmentFactorModel.objects.values_list('ratio', flat=True)), [0.52])
+
+
+class AdjustBarsTest(TestCase):
+
+    def test_multipliers(self):
+        timestamps = localize_dates(DAYS).as_unit('ns').asi8
+        ex_dates = timestamps[[2]]
+        qfq = adjustment_multipliers(timestamps, ex_dates, np.array([0.5]), 'qfq')
+        hfq = adjustment_multipliers(timestamps, ex_dates, np.array([0.5]), 'hfq')
+        self.assertEqual(qfq.tolist(), [0.5, 0.5, 1.0, 1.0])
+        self.assertEqual(hfq.tolist(), [1.0, 1.0, 2.0, 2.0])
+        with self.assertRaises(ValueError):
+            adjustment_multipliers(timestamps, ex_dates, np.array([0.5]), 'none')
+
+    def test_raw_history_is_adjusted_on_read(self):
+        record_adjustments(pd.DataFrame({'timestamp': localize_dates(['2026-10-14']), 'ratio': [0.5]}), 'A_STOCK', '600000')
+        bars = raw_frame([20.0, 20.4, 10.5, 10.6], [0.0, 2.0, 5.0, 1.0])
+
+        adjusted = adjust_bars(bars, '600000', 'A_STOCK')
+        self.assertEqual(adjusted['close'].tolist(), [10.0, 10.2, 10.5, 10.6])
+        self.assertEqual(adjusted['volume'].tolist(), bars['volume'].tolist())
+        self.assertEqual(bars['close'].iloc[0], 20.0)
+        self.assertIs(adjust_bars(bars, '000001', 'A_STOCK'), bars)
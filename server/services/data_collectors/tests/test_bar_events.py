@@ -0,0 +1,66 @@
+"""
+K线更新事件测试
+"""
+import pandas as pd
+from django.test import SimpleTestCase, override_settings
+
+from services.data_collectors.bar_events import (
+    BarChangeTracker, BarsUpdatedSubscriber, bar_event, publish_bars_updated
+)
+
+
+def daily_frame(closes, symbols=None):
+    frame = pd.DataFrame({
+        'timestamp': pd.date_range('2026-10-12', periods=len(closes), freq='D', tz='Asia/Shanghai'),
+        'open': closes, 'high': closes, 'low': closes, 'close': closes, 'volume': 100,
+    })
+    if symbols is not None:
+        frame['symbol'] = symbols
+    return frame
+
+
+class BarChangeTrackerTest(SimpleTestCase):
+
+    def test_only_changed_or_new_rows_pass(self):
+        tracker = BarChangeTracker()
+        first = daily_frame([10.0, 10.1, 10.2])
+        tracker.remember(tracker.changed(first, 'A_STOCK', 'akshare', '600000'), 'A_STOCK', 'akshare', '600000')
+
+        again = daily_frame([10.0, 10.1, 10.3, 10.4])
+        changed = tracker.changed(again, 'A_STOCK', 'akshare', '600000')
+        self.assertEqual(changed['close'].tolist(), [10.3, 10.4])
+        # 其他数据源写入的同一标的互不影响
+        self.assertEqual(len(tracker.changed(again, 'A_STOCK', 'sina', '600000')), 4)
+
+    def test_keeps_only_the_latest_bars_per_symbol(self):
+        tracker = BarChangeTracker(keep=2)
+        frame = daily_frame([10.0, 10.1, 10.2])
+        tracker.remember(frame, 'A_STOCK', 'akshare', '600000')
+        self.assertEqual(tracker.changed(frame, 'A_STOCK', 'akshare', '600000')['close'].tolist(), [10.0])
+
+    def test_snapshot_rows_are_tracked_per_symbol(self):
+        tracker = BarChangeTracker()
+        snapshot = daily_frame([10.0, 20.0], symbols=['600000', '000001'])
+        snapshot['timestamp'] = pd.Timestamp('2026-10-16', tz='Asia/Shanghai')
+        tracker.remember(snapshot, 'A_STOCK', 'akshare_spot')
+        moved = snapshot.assign(close=[10.0, 20.5])
+        self.assertEqual(tracker.changed(moved, 'A_STOCK', 'akshare_spot')['symbol'].tolist(), ['000001'])
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class BarsUpdatedTest(SimpleTestCase):
+
+    def test_subscriber_receives_and_merges_notifications(self):
+        subscriber = BarsUpdatedSubscriber()
+        self.addCleanup(subscriber.close)
+        first = bar_event('600000', 'A_STOCK', pd.Timestamp('2026-10-16', tz='Asia/Shanghai'))
+        self.assertTrue(publish_bars_updated([first]))
+        self.assertTrue(publish_bars_updated([bar_event('AAPL', 'US_STOCK', pd.Timestamp('2026-10-15', tz='UTC'))]))
+
+        bars = subscriber.wait(timeout=1)
+        self.assertEqual([bar['symbol'] for bar in bars], ['600000', 'AAPL'])
+        self.assertEqual(bars[0]['timestamp'], '2026-10-16T00:00:00+08:00')
+        self.assertEqual(subscriber.wait(timeout=0.05), [])
+
+    def test_nothing_to_publish(self):
+        self.assertFalse(publish_bars_updated([]))
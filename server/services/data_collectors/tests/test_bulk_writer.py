@@ -0,0 +1,36 @@
+"""
+批量写入器测试
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from django.test import TestCase
+
+from apps.market_data.models import MarketDataModel
+from services.data_collectors.bulk_writer import MarketDataBulkWriter
+
+FIELDS = ['open', 'high', 'low', 'close', 'volume', 'amount', 'data_source']
+
+
+def bar(day: int, close: float, symbol: str = '600000') -> MarketDataModel:
+    return MarketDataModel(
+        symbol=symbol, market='A_STOCK', timestamp=datetime(2026, 10, day, tzinfo=dt_timezone.utc),
+        open=close, high=close, low=close, close=close, volume=100, amount=close * 100, data_source='akshare'
+    )
+
+
+class BulkWriterTest(TestCase):
+
+    def test_counts_inserted_and_updated_rows_across_chunks(self):
+        writer = MarketDataBulkWriter(chunk_size=2)
+        self.assertEqual(writer.write([bar(12, 10.0), bar(13, 10.5)], FIELDS)['inserted'], 2)
+
+        stats = writer.write([bar(13, 11.0), bar(14, 11.5), bar(15, 12.0)], FIELDS)
+        self.assertEqual((stats['count'], stats['inserted'], stats['updated']), (3, 2, 1))
+        self.assertEqual(MarketDataModel.objects.count(), 4)
+        self.assertEqual(float(MarketDataModel.objects.get(timestamp__day=13).close), 11.0)
+
+    def test_duplicate_keys_in_one_batch_keep_the_last_record(self):
+        stats = MarketDataBulkWriter().write([bar(12, 10.0), bar(12, 10.8), bar(12, 9.0, symbol='000001')], FIELDS)
+        self.assertEqual((stats['count'], stats['inserted']), (2, 2))
+        self.assertEqual(float(MarketDataModel.objects.get(symbol='600000').close), 10.8)
+
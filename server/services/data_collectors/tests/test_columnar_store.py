@@ -0,0 +1,66 @@
+"""
+列式存储读取测试
+"""
+import tempfile
+from unittest import mock
+
+import pandas as pd
+from django.conf import settings
+from django.test import TestCase
+
+from apps.market_data.models import MarketDataModel
+from services.data_collectors import columnar_store
+from services.data_collectors.columnar_store import ColumnarStore, read_recent_bars
+
+
+def bar_frame(days, closes):
+    return pd.DataFrame({
+        'timestamp': pd.DatetimeIndex(days),
+        'open': closes, 'high': closes, 'low': closes, 'close': closes,
+        'volume': [100] * len(closes),
+    })
+
+
+class ReadRecentBarsTest(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.store = ColumnarStore(self.tmp.name)
+        for patcher in (
+            mock.patch.object(columnar_store, '_columnar_store', self.store),
+            mock.patch.dict(settings.AI_TRADER_CONFIG, {'COLUMNAR_STORE_ENABLED': True}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.days = pd.date_range('2026-03-02', periods=3, freq='D', tz='UTC')
+        self.closes = [10.0, 11.0, 12.0]
+        MarketDataModel.objects.bulk_create([
+            MarketDataModel(symbol='600000', market='A_STOCK', timestamp=day, open=close,
+                            high=close, low=close, close=close, volume=100)
+            for day, close in zip(self.days, self.closes)
+        ])
+
+    def test_partial_store_falls_back_to_database(self):
+        # 增量采集后列式存储只有最新一根
+        self.store.write('600000', 'A_STOCK', bar_frame(self.days[-1:], self.closes[-1:]))
+        bars = read_recent_bars('600000', 3, 'A_STOCK')
+        self.assertEqual(bars['close'].tolist(), self.closes)
+
+    def test_store_missing_newer_rows_falls_back_to_database(self):
+        self.store.write('600000', 'A_STOCK', bar_frame(self.days[:2], self.closes[:2]))
+        bars = read_recent_bars('600000', 2, 'A_STOCK')
+        self.assertEqual(bars['close'].tolist(), self.closes[1:])
+
+    def test_complete_store_is_used(self):
+        self.store.write('600000', 'A_STOCK', bar_frame(self.days, [20.0, 21.0, 22.0]))
+        # 价格不同以区分数据来源
+        MarketDataModel.objects.update(close=0)
+        self.assertEqual(read_recent_bars('600000', 2, 'A_STOCK')['close'].tolist(), [21.0, 22.0])
+        self.assertEqual(read_recent_bars('600000', 5, 'A_STOCK')['close'].tolist(), [20.0, 21.0, 22.0])
+
+    def test_before_excludes_later_bars(self):
+        self.store.write('600000', 'A_STOCK', bar_frame(self.days, self.closes))
+        bars = read_recent_bars('600000', 5, 'A_STOCK', before=self.days[2])
+        self.assertEqual(bars['close'].tolist(), self.closes[:2])
@@ -0,0 +1,73 @@
+"""
+HTTP 传输层测试
+"""
+import io
+from types import SimpleNamespace
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase
+
+from services.data_collectors import http_transport
+from services.data_collectors.http_transport import HttpTransport, RateLimitedError
+
+URL = 'https://www.alphavantage.co/query'
+
+
+def response(status: int, payload=None, headers=None) -> requests.Response:
+    result = requests.Response()
+    result.status_code = status
+    result._content = requests.compat.json.dumps(payload or {}).encode()
+    result.headers.update(headers or {})
+    result.url = URL
+    result.raw = io.BytesIO()
+    return result
+
+
+class HttpTransportTest(SimpleTestCase):
+
+    def setUp(self):
+        self.sleeps = []
+        patcher = mock.patch.object(http_transport, 'time', SimpleNamespace(
+            perf_counter=lambda: 0.0, sleep=self.sleeps.append
+        ))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.transport = HttpTransport(max_retries=2, backoff_base=1.0, backoff_max=8.0, rate_limit_backoff=4.0)
+
+    def respond(self, *results):
+        return mock.patch.object(self.transport.session, 'request', side_effect=list(results))
+
+    def test_connection_errors_and_5xx_are_retried_with_backoff(self):
+        with self.respond(requests.ConnectionError('reset'), response(503), response(200, {'ok': 1})):
+            self.assertEqual(self.transport.get_json(URL), {'ok': 1})
+        self.assertEqual(len(self.sleeps), 2)
+        self.assertTrue(0.5 <= self.sleeps[0] <= 1.0 and 1.0 <= self.sleeps[1] <= 2.0)
+        stats = self.transport.stats()['www.alphavantage.co']
+        self.assertEqual((stats['requests'], stats['retries'], stats['errors']), (3, 2, 1))
+
+    def test_retry_after_header_is_honoured_up_to_the_cap(self):
+        with self.respond(response(429, headers={'Retry-After': '60'}), response(200)):
+            self.transport.get(URL)
+        self.assertEqual(self.sleeps, [8.0])
+        self.assertEqual(self.transport.stats()['www.alphavantage.co']['rate_limited'], 1)
+
+    def test_exhausted_retries_raise_the_last_error(self):
+        with self.respond(response(500), response(500), response(500)):
+            with self.assertRaises(requests.HTTPError):
+                self.transport.get(URL)
+
+    def test_rate_limit_notice_is_retried_then_raised(self):
+        notice = {'Note': 'Our standard API call frequency is 5 calls per minute'}
+        with self.respond(response(200, notice), response(200, {'Time Series (Daily)': {}})):
+            self.assertIn('Time Series (Daily)', self.transport.get_json(URL))
+        self.assertEqual(len(self.sleeps), 1)
+
+        with self.respond(*[response(200, notice)] * 3), self.assertRaises(RateLimitedError):
+            self.transport.get_json(URL)
+
+    def test_daily_quota_is_not_retried(self):
+        notice = {'Information': 'You have reached the 25 requests per day limit'}
+        with self.respond(response(200, notice)) as request, self.assertRaises(RateLimitedError):
+            self.transport.get_json(URL)
+        request.assert_called_once()
@@ -0,0 +1,84 @@
+"""
+分钟K线流式日线聚合测试
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from django.test import TestCase
+
+from apps.market_data.models import IntradayBarModel, MarketDataModel
+from services.data_collectors.intraday import DailyBarAggregator, IntradayBarWriter
+from services.data_collectors.normalizers import localize_dates
+
+DAY = date(2026, 10, 16)
+KEY = ('600000', 'A_STOCK', '1m', DAY)
+
+
+def minute_bars(start: str, closes, highs=None, lows=None, volume=100):
+    """从 start（北京时间）起的连续 1m K线，timestamp 为 UTC"""
+    timestamps = pd.date_range(start, periods=len(closes), freq='min', tz='Asia/Shanghai').tz_convert('UTC')
+    closes = np.asarray(closes, dtype=float)
+    return pd.DataFrame({
+        'timestamp': timestamps, 'open': closes,
+        'high': closes + 0.1 if highs is None else highs, 'low': closes - 0.1 if lows is None else lows,
+        'close': closes, 'volume': volume, 'amount': closes * volume,
+    })
+
+
+class DailyBarAggregatorTest(TestCase):
+
+    def setUp(self):
+        self.aggregator = DailyBarAggregator()
+        self.aggregator.seed(KEY, pd.DataFrame(), prev_close=10.0)
+
+    def test_streaming_batches_match_one_shot_aggregate(self):
+        bars = minute_bars('2026-10-16 09:30', [10.0, 10.4, 9.8, 10.2, 10.1])
+        self.aggregator.update(KEY, bars.iloc[:2])
+        daily = self.aggregator.update(KEY, bars.iloc[2:])
+
+        self.assertEqual(daily['open'], 10.0)
+        self.assertEqual(daily['close'], 10.1)
+        self.assertAlmostEqual(daily['high'], bars['high'].max())
+        self.assertAlmostEqual(daily['low'], bars['low'].min())
+        self.assertEqual(daily['volume'], 500)
+        self.assertAlmostEqual(daily['change_pct'], 1.0)
+
+    def test_revised_bar_adjusts_totals_and_rescans_extremes(self):
+        bars = minute_bars('2026-10-16 09:30', [10.0, 10.5, 10.2])
+        self.aggregator.update(KEY, bars)
+
+        # 数据源修正了当日最高的那根K线
+        revised = bars.iloc[[1]].assign(high=10.25, close=10.2, volume=150, amount=1530.0)
+        daily = self.aggregator.update(KEY, revised)
+        self.assertAlmostEqual(daily['high'], 10.3)
+        self.assertEqual(daily['volume'], 350)
+        self.assertEqual(daily['close'], 10.2)
+
+    def test_evicts_only_earlier_days_of_the_market(self):
+        self.aggregator.seed(('AAPL', 'US_STOCK', '1m', date(2026, 10, 15)), pd.DataFrame(), None)
+        self.assertEqual(self.aggregator.evict_before('A_STOCK', date(2026, 10, 17)), 1)
+        self.assertFalse(self.aggregator.has_state(KEY))
+        self.assertTrue(self.aggregator.has_state(('AAPL', 'US_STOCK', '1m', date(2026, 10, 15))))
+
+
+class IntradayBarWriterTest(TestCase):
+
+    def daily(self):
+        return MarketDataModel.objects.get(symbol='600000', timestamp=localize_dates([DAY])[0])
+
+    def test_new_process_seeds_from_stored_bars(self):
+        MarketDataModel.objects.create(
+            symbol='600000', market='A_STOCK', timestamp=localize_dates([date(2026, 10, 15)])[0],
+            open=10, high=10, low=10, close=10, volume=1, amount=10
+        )
+        bars = minute_bars('2026-10-16 09:30', [10.0, 10.4, 9.8, 10.2])
+        IntradayBarWriter().ingest('600000', 'A_STOCK', '1m', bars.iloc[:2], 'akshare')
+        # 另一个进程没有内存状态，从库中读取已入库的分钟K线继续聚合
+        result = IntradayBarWriter().ingest('600000', 'A_STOCK', '1m', bars.iloc[1:], 'akshare')
+
+        self.assertEqual((result['inserted'], result['updated'], result['daily_rows']), (2, 1, 1))
+        self.assertEqual(IntradayBarModel.objects.count(), 4)
+        daily = self.daily()
+        self.assertEqual((float(daily.open), float(daily.close), daily.volume), (10.0, 10.2, 400))
+        self.assertAlmostEqual(float(daily.change_pct), 2.0)
@@ -0,0 +1,95 @@
+"""
+指数、市场宽度与情绪采集测试
+"""
+from datetime import datetime
+from unittest import mock
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.test import TestCase
+
+from apps.market_data.models import MarketIndexLatestModel, MarketIndexModel, MarketSentimentModel
+from services.data_collectors import market_overview, quality
+from services.data_collectors.market_overview import MarketOverviewCollector
+from services.data_collectors.normalizers import localize_dates
+
+SHANGHAI = ZoneInfo('Asia/Shanghai')
+
+
+def frozen_datetime(moment: datetime):
+    """替换采集器模块中的 datetime，固定 now()"""
+    class FrozenDateTime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return moment.astimezone(tz) if tz else moment
+    return mock.patch.object(market_overview, 'datetime', FrozenDateTime)
+
+
+class MarketOverviewTest(TestCase):
+
+    def setUp(self):
+        for patcher in (
+            mock.patch.dict(settings.AI_TRADER_CONFIG, {
+                'MARKET_INDICES': {'A_STOCK': {'000001': '上证指数'}, 'US_STOCK': {}},
+            }),
+            mock.patch.object(quality, '_a_stock_trade_dates', return_value=self.calendar()),
+            mock.patch.object(market_overview.yf, 'download', return_value=pd.DataFrame(
+                {'Close': [18.0, 19.5]}, index=pd.to_datetime(['2026-10-14', '2026-10-15'])
+            )),
+            mock.patch.object(market_overview.ak, 'stock_market_fund_flow', return_value=pd.DataFrame(
+                {'主力净流入-净额': [-1.5e9, 2.0e9]}
+            )),
+            mock.patch.object(market_overview.ak, 'stock_hsgt_fund_flow_summary_em', return_value=pd.DataFrame(
+                {'资金方向': ['北向', '南向'], '成交净买额': [12.5, 3.0]}
+            )),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.collector = MarketOverviewCollector(limiters={})
+
+    @staticmethod
+    def calendar():
+        days = np.arange(np.datetime64('2026-09-01'), np.datetime64('2026-12-31'))
+        days = days[np.is_busday(days)]
+        return days[days != np.datetime64('2026-10-08')]
+
+    def collect(self, moment: datetime, price: float, rise: int):
+        breadth = pd.DataFrame({'item': ['上涨', '下跌', '涨停', '跌停'], 'value': [rise, 1000, 30, 5]})
+        quotes = pd.DataFrame({'代码': ['000001'], '名称': ['上证指数'], '最新价': [price], '涨跌幅': [0.5]})
+        with frozen_datetime(moment), \
+                mock.patch.object(market_overview.ak, 'stock_market_activity_legu', return_value=breadth) as legu, \
+                mock.patch.object(market_overview.ak, 'stock_zh_index_spot_em', return_value=quotes) as spot:
+            result = self.collector.collect()
+        return result, legu, spot
+
+    def test_repeated_cycles_upsert_one_row_per_session(self):
+        self.collect(datetime(2026, 10, 16, 10, 0, tzinfo=SHANGHAI), 3000.0, 3000)
+        result, _, _ = self.collect(datetime(2026, 10, 16, 10, 1, tzinfo=SHANGHAI), 3010.0, 4000)
+
+        self.assertTrue(result['success'])
+        session = localize_dates([datetime(2026, 10, 16).date()])[0]
+        index = MarketIndexModel.objects.get()
+        self.assertEqual((index.timestamp, float(index.value), index.rise_count), (session, 3010.0, 4000))
+        self.assertEqual(float(MarketIndexLatestModel.objects.get().value), 3010.0)
+        sentiment = MarketSentimentModel.objects.get()
+        self.assertEqual(sentiment.timestamp, session)
+        self.assertEqual(float(sentiment.fear_greed_index), 80.0)
+        self.assertEqual(float(sentiment.vix), 19.5)
+
+    def test_weekend_skips_a_stock_indices_and_sentiment(self):
+        result, legu, spot = self.collect(datetime(2026, 10, 17, 10, 0, tzinfo=SHANGHAI), 3000.0, 3000)
+
+        self.assertTrue(result['success'])
+        self.assertIsNone(result['session'])
+        legu.assert_not_called()
+        spot.assert_not_called()
+        self.assertFalse(MarketIndexModel.objects.exists())
+        self.assertFalse(MarketSentimentModel.objects.exists())
+
+    def test_pre_open_is_not_in_session(self):
+        with frozen_datetime(datetime(2026, 10, 16, 8, 45, tzinfo=SHANGHAI)):
+            self.assertIsNone(self.collector.session_date())
+        with frozen_datetime(datetime(2026, 10, 16, 15, 30, tzinfo=SHANGHAI)):
+            self.assertEqual(self.collector.session_date(), datetime(2026, 10, 16).date())
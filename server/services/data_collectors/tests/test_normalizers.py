@@ -0,0 +1,55 @@
+"""
+行情数据标准化测试
+"""
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from services.data_collectors.normalizers import (
+    build_records, localize_dates, normalize_akshare_daily, normalize_sina_daily, normalize_yfinance_daily
+)
+
+
+class NormalizerTest(SimpleTestCase):
+
+    def test_exchange_timezones_map_to_the_same_trade_day(self):
+        new_york = pd.DatetimeIndex(['2026-10-15 00:00'], tz='America/New_York')
+        self.assertEqual(localize_dates(new_york)[0], localize_dates(['2026-10-15'])[0])
+        self.assertEqual(localize_dates(['2026-10-15'])[0].tz.key, timezone.get_current_timezone().key)
+
+    def test_rows_missing_ohlcv_are_dropped_and_volume_is_integer(self):
+        frame = normalize_akshare_daily(pd.DataFrame({
+            '日期': ['2026-10-15', '2026-10-14'], '开盘': [10.0, None], '最高': [10.5, 10.0], '最低': [9.9, 9.5],
+            '收盘': [10.2, 9.8], '成交量': [1200.0, 900.0], '成交额': [12240.0, 8820.0],
+        }))
+        self.assertEqual(len(frame), 1)
+        self.assertEqual(frame['volume'].dtype, np.int64)
+        self.assertEqual((frame['change_pct'].iloc[0], frame['turnover_rate'].iloc[0]), (0, 0))
+
+    def test_sina_units_match_eastmoney(self):
+        frame = normalize_sina_daily(pd.DataFrame({
+            'date': ['2026-10-15'], 'open': [10.0], 'high': [10.5], 'low': [9.9], 'close': [10.2],
+            'volume': [120000], 'amount': [1224000.0], 'turnover': [0.0123],
+        }))
+        self.assertEqual(frame['volume'].iloc[0], 1200)
+        self.assertAlmostEqual(frame['turnover_rate'].iloc[0], 1.23)
+
+    def test_yfinance_frame_is_sorted_with_intraday_change(self):
+        index = pd.DatetimeIndex(['2026-10-15', '2026-10-14'], tz='America/New_York')
+        frame = normalize_yfinance_daily(pd.DataFrame(
+            {'Open': [100.0, 0.0], 'High': [103.0, 99.0], 'Low': [99.0, 97.0], 'Close': [102.0, 98.0], 'Volume': [10, 20]},
+            index=index
+        ))
+        self.assertEqual(frame['close'].tolist(), [98.0, 102.0])
+        self.assertEqual(frame['change_pct'].tolist(), [0.0, 2.0])
+
+    def test_build_records_maps_missing_values_to_none(self):
+        frame = normalize_akshare_daily(pd.DataFrame({
+            '日期': ['2026-10-15'], '开盘': [10.0], '最高': [10.5], '最低': [9.9], '收盘': [10.2],
+            '成交量': [1200], '成交额': [None], '涨跌幅': [1.5],
+        }))
+        [record] = build_records(frame, '600000', 'A_STOCK', 'akshare', ['close', 'volume', 'amount', 'change_pct'])
+        self.assertEqual((record.symbol, record.market, record.data_source), ('600000', 'A_STOCK', 'akshare'))
+        self.assertEqual((record.close, record.volume, record.amount, record.change_pct), (10.2, 1200, None, 1.5))
+        self.assertIsNone(record.turnover_rate)
@@ -0,0 +1,62 @@
+"""
+Alpha Vantage 列式价格缓存测试
+"""
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase
+
+from apps.market_data.models import MarketDataModel
+from services.data_collectors.market_data_collector import MarketDataCollector
+
+
+def time_series(closes):
+    """Alpha Vantage 'Time Series (Daily)'：{日期: 收盘价}"""
+    return {
+        day: {'1. open': str(close), '2. high': str(close), '3. low': str(close), '4. close': str(close), '5. volume': '1000'}
+        for day, close in closes.items()
+    }
+
+
+class PriceCacheTest(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        patcher = mock.patch.dict(settings.AI_TRADER_CONFIG, {
+            'MARKET_DATA_DIR': self.tmp.name,
+            'ALPHAVANTAGE_API_KEY': 'test',
+            'COLUMNAR_STORE_ENABLED': False,
+            'DATA_QUALITY': {'enabled': False},
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # 不限速：Alpha Vantage 默认每分钟 5 次
+        self.collector = MarketDataCollector(bulk=True, failover=False, source_limits={'alphavantage': {'rate': 0}})
+
+    def collect(self, closes):
+        payload = {'Time Series (Daily)': time_series(closes)}
+        with mock.patch.object(self.collector.http, 'get_json', return_value=payload):
+            return self.collector.collect_alphavantage_data('AAPL')
+
+    def test_overlapping_responses_rewrite_only_the_tail(self):
+        self.collect({'2026-10-13': 100.0, '2026-10-14': 101.0, '2026-10-15': 102.0})
+        self.collect({'2026-10-15': 102.5, '2026-10-16': 103.0})
+
+        cached = self.collector.price_cache.read('AAPL', 'US_STOCK')
+        self.assertEqual(cached['close'].tolist(), [100.0, 101.0, 102.5, 103.0])
+        self.assertEqual(MarketDataModel.objects.filter(symbol='AAPL').count(), 4)
+
+    def test_migrate_command_converts_json_files(self):
+        path = os.path.join(self.tmp.name, 'daily_prices_MSFT.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'Time Series (Daily)': time_series({'2026-10-14': 400.0, '2026-10-15': 401.0})}, f)
+
+        call_command('migrate_price_cache', '--delete', stdout=StringIO())
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(self.collector.price_cache.read('MSFT', 'US_STOCK')['close'].tolist(), [400.0, 401.0])
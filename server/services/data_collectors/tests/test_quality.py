@@ -0,0 +1,100 @@
+"""
+行情数据质量校验测试
+"""
+from datetime import date
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from django.test import TestCase
+
+from apps.market_data.models import DataQualityReportModel, QuarantinedBarModel
+from services.data_collectors import quality
+from services.data_collectors.normalizers import localize_dates
+from services.data_collectors.quality import QualityValidator, trading_days
+
+
+def daily_frame(days, closes, **columns):
+    closes = np.asarray(closes, dtype=float)
+    frame = pd.DataFrame({
+        'timestamp': localize_dates(days), 'open': closes, 'high': closes + 0.1, 'low': closes - 0.1,
+        'close': closes, 'volume': 100, 'amount': closes * 100,
+    })
+    return frame.assign(**columns)
+
+
+class QualityValidatorTest(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(quality, '_a_stock_trade_dates', return_value=self.calendar())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def calendar():
+        return np.array(['2026-10-09', '2026-10-12', '2026-10-13', '2026-10-14', '2026-10-15', '2026-10-16'], dtype='datetime64[D]')
+
+    def test_bad_rows_are_quarantined_and_reported(self):
+        validator = QualityValidator()
+        frame = daily_frame(['2026-10-12', '2026-10-13', '2026-10-14'], [10.0, 10.1, 10.2], volume=[100, 0, 100])
+        frame.loc[2, 'high'] = 9.0
+
+        kept = validator.validate(frame, 'A_STOCK', 'akshare', '600000')
+        self.assertEqual(kept['close'].tolist(), [10.0])
+        reasons = dict(QuarantinedBarModel.objects.values_list('payload__close', 'reasons'))
+        self.assertEqual(reasons, {10.1: ['volume'], 10.2: ['ohlc']})
+
+        report = validator.flush('A_STOCK')
+        self.assertEqual((report['rows_checked'], report['rows_quarantined']), (3, 2))
+        self.assertEqual(report['issues'], {'ohlc': 1, 'volume': 1})
+        self.assertTrue(DataQualityReportModel.objects.filter(scope='A_STOCK').exists())
+        self.assertIsNone(validator.flush('A_STOCK'))
+
+    def test_snapshot_duplicates_keep_the_last_row(self):
+        validator = QualityValidator()
+        frame = daily_frame(['2026-10-16'] * 3, [10.0, 10.5, 20.0], symbol=['600000', '600000', '000001'])
+        kept = validator.validate(frame, 'A_STOCK', 'akshare_spot')
+        self.assertEqual(kept['close'].tolist(), [10.5, 20.0])
+
+    def test_outlier_uses_history_and_is_only_reported_by_default(self):
+        validator = QualityValidator(min_history=20)
+        history = 10 * np.exp(np.cumsum(np.random.default_rng(1).normal(0, 0.01, 40)))
+        frame = daily_frame(['2026-10-15', '2026-10-16'], [history[-1] * 1.005, history[-1] * 3])
+
+        kept = validator.validate(frame, 'A_STOCK', 'akshare', '600000', history_close=history)
+        self.assertEqual(len(kept), 2)
+        self.assertEqual(validator.flush('A_STOCK')['issues'], {'outlier': 1})
+
+        # 历史不足时不检查
+        validator.validate(frame, 'A_STOCK', 'akshare', '600000', history_close=history[:5])
+        self.assertEqual(validator.flush('A_STOCK')['issues'], {})
+
+    def test_missing_days_follow_the_calendar_since_the_watermark(self):
+        validator = QualityValidator()
+        frame = daily_frame(['2026-10-13', '2026-10-15'], [10.0, 10.1])
+        validator.validate(frame, 'A_STOCK', 'akshare', '600000', since=localize_dates(['2026-10-09'])[0])
+        # 10-12 与 10-14 缺失
+        self.assertEqual(validator.flush('A_STOCK')['issues'], {'missing_days': 2})
+
+
+class TradingCalendarTest(TestCase):
+
+    def test_us_calendar_skips_weekends_and_nyse_holidays(self):
+        days = trading_days('US_STOCK', date(2026, 11, 23), date(2026, 11, 29))
+        self.assertEqual([str(day) for day in days], ['2026-11-23', '2026-11-24', '2026-11-25', '2026-11-27'])
+
+    def test_failed_a_stock_calendar_load_falls_back_to_weekdays_and_retries_later(self):
+        clock = [0.0]
+        with mock.patch.object(quality, '_a_stock_calendar', None), \
+                mock.patch.object(quality, '_a_stock_calendar_failed_at', None), \
+                mock.patch.object(quality.time, 'monotonic', lambda: clock[0]), \
+                mock.patch('akshare.tool_trade_date_hist_sina', side_effect=ConnectionError('down')) as load:
+            self.assertEqual(len(trading_days('A_STOCK', date(2026, 10, 5), date(2026, 10, 9))), 5)
+            trading_days('A_STOCK', date(2026, 10, 5), date(2026, 10, 9))
+            self.assertEqual(load.call_count, 1)
+
+            clock[0] = quality.CALENDAR_RETRY_SECONDS + 1
+            load.side_effect = None
+            load.return_value = pd.DataFrame({'trade_date': ['2026-10-09', '2026-10-12']})
+            self.assertEqual(len(trading_days('A_STOCK', date(2026, 10, 5), date(2026, 10, 9))), 1)
+            self.assertEqual(load.call_count, 2)
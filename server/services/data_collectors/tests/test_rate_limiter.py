@@ -0,0 +1,77 @@
+"""
+数据源限流器测试
+"""
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from services.data_collectors import rate_limiter
+from services.data_collectors.rate_limiter import SourceLimiter, TokenBucket, build_source_limiters
+
+
+class FakeClock:
+    """替换 rate_limiter 模块中的 time：sleep 直接推进时钟"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TokenBucketTest(SimpleTestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch.object(rate_limiter, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst_up_to_capacity_then_waits_for_refill(self):
+        bucket = TokenBucket(rate=2, capacity=2)
+        self.assertEqual([bucket.acquire(), bucket.acquire()], [0.0, 0.0])
+        self.assertAlmostEqual(bucket.acquire(), 0.5)
+        self.assertEqual(self.clock.sleeps, [0.5])
+
+    def test_idle_time_refills_but_not_beyond_capacity(self):
+        bucket = TokenBucket(rate=1)
+        bucket.acquire()
+        self.clock.now += 10
+        self.assertEqual(bucket.acquire(), 0.0)
+        self.assertAlmostEqual(bucket.acquire(), 1.0)
+
+    def test_non_positive_rate_never_waits(self):
+        bucket = TokenBucket(rate=0)
+        self.assertEqual(sum(bucket.acquire() for _ in range(100)), 0.0)
+        self.assertEqual(self.clock.sleeps, [])
+
+
+class SourceLimiterTest(SimpleTestCase):
+
+    def test_concurrency_cap_blocks_extra_slots(self):
+        limiter = SourceLimiter('akshare', max_concurrency=1)
+        entered = threading.Event()
+
+        def worker():
+            with limiter.slot():
+                entered.set()
+
+        with limiter.slot():
+            thread = threading.Thread(target=worker)
+            thread.start()
+            self.assertFalse(entered.wait(0.1))
+        thread.join(1)
+        self.assertTrue(entered.is_set())
+        self.assertEqual(limiter.stats()['requests'], 2)
+
+    def test_build_from_config(self):
+        limiters = build_source_limiters({'akshare': {'rate': 5, 'max_concurrency': 4}, 'yfinance': {}})
+        self.assertEqual(limiters['akshare'].bucket.rate, 5.0)
+        self.assertIsNotNone(limiters['akshare'].semaphore)
+        self.assertIsNone(limiters['yfinance'].semaphore)
@@ -0,0 +1,53 @@
+"""
+原始数据存储策略测试
+"""
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.test import TestCase
+
+from apps.market_data.models import MarketDataModel, MarketDataRawModel
+from services.data_collectors.market_data_collector import MarketDataCollector
+from services.data_collectors.raw_payload import (
+    BLOB_PLAIN, BLOB_ZLIB, compress_payload, decompress_payload, load_raw_payload
+)
+
+PAYLOAD = {'1. open': '100.0', '2. high': '101.0', '3. low': '99.0', '4. close': '100.5', '5. volume': '1000'}
+
+
+class RawPayloadPolicyTest(TestCase):
+
+    def collect(self, policy: str) -> MarketDataModel:
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.dict(settings.AI_TRADER_CONFIG, {
+            'MARKET_DATA_DIR': tmp,
+            'ALPHAVANTAGE_API_KEY': 'test',
+            'RAW_PAYLOAD_POLICY': policy,
+            'COLUMNAR_STORE_ENABLED': False,
+            'DATA_QUALITY': {'enabled': False},
+        }):
+            collector = MarketDataCollector(bulk=True, failover=False, source_limits={'alphavantage': {'rate': 0}})
+            payload = {'Time Series (Daily)': {'2026-10-15': PAYLOAD}}
+            with mock.patch.object(collector.http, 'get_json', return_value=payload):
+                self.assertTrue(collector.collect_alphavantage_data('AAPL')['success'])
+        return MarketDataModel.objects.get(symbol='AAPL')
+
+    def test_every_policy_round_trips_through_load(self):
+        for policy in ('keep', 'compress', 'offload'):
+            with self.subTest(policy=policy):
+                row = self.collect(policy)
+                self.assertEqual(load_raw_payload(row), PAYLOAD)
+                self.assertEqual(bool(row.raw_data), policy == 'keep')
+                self.assertEqual(row.raw_blob is not None, policy == 'compress')
+                self.assertEqual(MarketDataRawModel.objects.filter(market_data=row).exists(), policy == 'offload')
+                MarketDataRawModel.objects.all().delete()
+
+    def test_drop_stores_nothing(self):
+        self.assertEqual(load_raw_payload(self.collect('drop')), {})
+
+    def test_small_payloads_are_stored_plain(self):
+        self.assertEqual(compress_payload({'a': 1})[:1], BLOB_PLAIN)
+        large = {f'field_{i}': 'value' for i in range(50)}
+        blob = compress_payload(large)
+        self.assertEqual(blob[:1], BLOB_ZLIB)
+        self.assertEqual(decompress_payload(blob), large)
@@ -0,0 +1,66 @@
+"""
+分片采集租约测试
+"""
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.market_data.models import CollectionShardModel
+from services.data_collectors.sharding import ShardLeaseManager, partition_symbols, shard_of
+
+
+class PartitionTest(TestCase):
+
+    def test_partition_is_stable_and_complete(self):
+        symbols = [f'{code:06d}' for code in range(200)]
+        shards = partition_symbols(symbols, 8)
+        self.assertEqual(sorted(sum(shards.values(), [])), symbols)
+        self.assertTrue(all(shard_of(symbol, 8) == shard for shard, members in shards.items() for symbol in members))
+        self.assertEqual(partition_symbols(list(reversed(symbols)), 8)[3], list(reversed(shards[3])))
+
+
+class ShardLeaseTest(TestCase):
+
+    def manager(self, worker_id: str, **options) -> ShardLeaseManager:
+        manager = ShardLeaseManager('A_STOCK:1d', shard_count=2, worker_id=worker_id, **options)
+        manager.ensure_shards()
+        return manager
+
+    def test_each_shard_is_held_by_one_worker(self):
+        first, second = self.manager('a'), self.manager('b')
+        claimed = {first.claim(), second.claim()}
+        self.assertEqual(claimed, {0, 1})
+        self.assertIsNone(self.manager('c').claim())
+
+    def test_expired_lease_is_taken_over_and_old_owner_cannot_complete(self):
+        stalled, rescuer = self.manager('a', lease_seconds=60), self.manager('b')
+        shard = stalled.claim()
+        CollectionShardModel.objects.filter(shard=shard).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(rescuer.claim(), shard)
+        self.assertFalse(stalled.renew(shard))
+        self.assertFalse(stalled.release(shard, {'symbols': 10}))
+        self.assertTrue(rescuer.release(shard, {'symbols': 10, 'records': 10, 'failed': 0, 'elapsed': 1.0}))
+        self.assertEqual(CollectionShardModel.objects.get(shard=shard).last_symbols, 10)
+
+    def test_cadence_and_oldest_first(self):
+        manager = self.manager('a', cadence=300)
+        first = manager.claim()
+        manager.release(first, {'symbols': 1})
+        # 刚完成的分片在 cadence 内不再被抢占，先轮到另一个分片
+        second = manager.claim()
+        self.assertNotEqual(first, second)
+        manager.release(second, {'symbols': 1})
+        self.assertIsNone(manager.claim())
+
+        # 未完成的释放立即可被重新抢占
+        CollectionShardModel.objects.filter(shard=first).update(last_completed_at=timezone.now() - timedelta(seconds=301))
+        self.assertEqual(manager.claim(), first)
+        manager.release(first)
+        self.assertEqual(manager.claim(), first)
+
+    def test_shrinking_shard_count_removes_extra_rows(self):
+        ShardLeaseManager('A_STOCK:1d', shard_count=4, worker_id='a').ensure_shards()
+        self.manager('a')
+        self.assertEqual(sorted(CollectionShardModel.objects.values_list('shard', flat=True)), [0, 1])
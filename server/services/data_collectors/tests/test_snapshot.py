@@ -0,0 +1,132 @@
+"""
+A股全市场快照测试
+"""
+import tempfile
+from datetime import date, datetime
+from unittest import mock
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.test import TestCase
+
+from apps.market_data.models import AdjustmentFactorModel, MarketDataModel
+from services.data_collectors import market_data_collector, quality
+from services.data_collectors.market_data_collector import MarketDataCollector
+from services.data_collectors.normalizers import localize_dates
+
+SHANGHAI = ZoneInfo('Asia/Shanghai')
+
+
+def frozen_datetime(moment: datetime):
+    """替换采集器模块中的 datetime，固定 now()"""
+    class FrozenDateTime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return moment.astimezone(tz) if tz else moment
+    return mock.patch.object(market_data_collector, 'datetime', FrozenDateTime)
+
+
+def spot_table(rows):
+    """stock_zh_a_spot_em 格式的快照：[(代码, 最新价, 昨收), ...]"""
+    return pd.DataFrame([
+        {'代码': code, '今开': close, '最高': close, '最低': close, '最新价': close,
+         '成交量': 1000, '成交额': close * 1000, '涨跌幅': round((close / prev - 1) * 100, 2),
+         '换手率': 1.0, '昨收': prev}
+        for code, close, prev in rows
+    ])
+
+
+class SnapshotTestCase(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        for patcher in (
+            mock.patch.dict(settings.AI_TRADER_CONFIG, {
+                'MARKET_DATA_DIR': self.tmp.name,
+                'COLUMNAR_STORE_ENABLED': False,
+                'DATA_QUALITY': {'enabled': False},
+            }),
+            # 交易日历：2026-10 国庆假期后按工作日，10-08 休市
+            mock.patch.object(quality, '_a_stock_trade_dates', return_value=self.calendar()),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.collector = MarketDataCollector(bulk=True, failover=False)
+
+    @staticmethod
+    def calendar():
+        days = np.arange(np.datetime64('2026-09-01'), np.datetime64('2026-12-31'))
+        days = days[np.is_busday(days)]
+        return days[days != np.datetime64('2026-10-08')]
+
+    def collect(self, moment: datetime, rows):
+        with frozen_datetime(moment), \
+                mock.patch.object(market_data_collector.ak, 'stock_zh_a_spot_em', return_value=spot_table(rows)) as spot:
+            return self.collector.collect_a_stock_snapshot(), spot
+
+
+class SnapshotSessionTest(SnapshotTestCase):
+
+    def test_weekend_snapshot_is_skipped(self):
+        result, spot = self.collect(datetime(2026, 10, 17, 11, 0, tzinfo=SHANGHAI), [('600000', 10.5, 10.0)])
+        self.assertTrue(result['success'])
+        self.assertTrue(result['skipped'])
+        spot.assert_not_called()
+        self.assertFalse(MarketDataModel.objects.exists())
+
+    def test_holiday_snapshot_is_skipped(self):
+        result, _ = self.collect(datetime(2026, 10, 8, 11, 0, tzinfo=SHANGHAI), [('600000', 10.5, 10.0)])
+        self.assertTrue(result['skipped'])
+        self.assertFalse(MarketDataModel.objects.exists())
+
+    def test_snapshot_before_open_is_skipped(self):
+        result, _ = self.collect(datetime(2026, 10, 16, 8, 45, tzinfo=SHANGHAI), [('600000', 10.5, 10.0)])
+        self.assertTrue(result['skipped'])
+        self.assertFalse(MarketDataModel.objects.exists())
+
+    def test_session_snapshot_writes_todays_bar(self):
+        result, _ = self.collect(datetime(2026, 10, 16, 10, 0, tzinfo=SHANGHAI), [('600000', 10.5, 10.0)])
+        self.assertTrue(result['success'])
+        self.assertNotIn('skipped', result)
+        bar = MarketDataModel.objects.get(symbol='600000')
+        self.assertEqual(bar.timestamp.astimezone(SHANGHAI).date().isoformat(), '2026-10-16')
+        self.assertEqual(float(bar.close), 10.5)
+
+
+class SnapshotAdjustmentTest(SnapshotTestCase):
+
+    def daily_bar(self, day: date, close: float, volume: int = 5000):
+        MarketDataModel.objects.create(
+            symbol='600000', market='A_STOCK', timestamp=localize_dates([day])[0],
+            open=close, high=close, low=close, close=close, volume=volume, amount=close * volume
+        )
+
+    def ratios(self):
+        return list(AdjustmentFactorModel.objects.values_list('ex_date', 'ratio'))
+
+    def test_ex_rights_against_previous_session_is_recorded(self):
+        self.daily_bar(date(2026, 10, 15), 10.0)
+        self.collect(datetime(2026, 10, 16, 10, 0, tzinfo=SHANGHAI), [('600000', 9.0, 9.5)])
+        [(ex_date, ratio)] = self.ratios()
+        self.assertEqual(ex_date, localize_dates([date(2026, 10, 16)])[0])
+        self.assertAlmostEqual(ratio, 0.95, places=4)
+
+    def test_previous_session_follows_the_calendar_across_holidays(self):
+        # 10-08 休市，10-09 的上一交易日为 10-07
+        self.daily_bar(date(2026, 10, 7), 10.0)
+        self.collect(datetime(2026, 10, 9, 10, 0, tzinfo=SHANGHAI), [('600000', 9.0, 9.5)])
+        self.assertEqual(len(self.ratios()), 1)
+
+    def test_stale_snapshot_does_not_create_events(self):
+        # 数据源仍返回 10-15 的行情（昨收为 10-14 的收盘价）
+        self.daily_bar(date(2026, 10, 15), 10.5, volume=1000)
+        self.collect(datetime(2026, 10, 16, 9, 31, tzinfo=SHANGHAI), [('600000', 10.5, 10.0)])
+        self.assertEqual(self.ratios(), [])
+
+    def test_missing_previous_session_bar_is_not_compared(self):
+        self.daily_bar(date(2026, 10, 14), 10.0)
+        self.collect(datetime(2026, 10, 16, 10, 0, tzinfo=SHANGHAI), [('600000', 9.0, 9.5)])
+        self.assertEqual(self.ratios(), [])
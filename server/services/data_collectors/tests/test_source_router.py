@@ -0,0 +1,86 @@
+"""
+数据源路由测试
+"""
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+import pandas as pd
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase
+
+from apps.market_data.models import MarketDataModel
+from services.data_collectors import market_data_collector, source_router
+from services.data_collectors.market_data_collector import MarketDataCollector
+from services.data_collectors.source_router import SourceRouter, is_rate_limited
+
+ROUTES = {'A_STOCK': ['akshare', 'sina']}
+
+
+class SourceRouterTest(SimpleTestCase):
+
+    def setUp(self):
+        self.clock = SimpleNamespace(now=1000.0)
+        patcher = mock.patch.object(source_router.time, 'monotonic', lambda: self.clock.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router = SourceRouter(ROUTES, {'failure_threshold': 2, 'cooldown': 30, 'half_life': 600})
+
+    def test_priority_order_until_latency_is_measured(self):
+        self.assertEqual(self.router.rank('A_STOCK'), ['akshare', 'sina'])
+        for _ in range(10):
+            self.router.observe_latency('akshare', 3.0)
+            self.router.observe_latency('sina', 0.5)
+        self.assertEqual(self.router.rank('A_STOCK'), ['sina', 'akshare'])
+        self.assertEqual(self.router.rank('A_STOCK', available=['akshare']), ['akshare'])
+
+    def test_latency_is_an_ewma(self):
+        self.router.observe_latency('akshare', 1.0)
+        self.router.observe_latency('akshare', 2.0)
+        self.assertAlmostEqual(self.router.health['akshare'].latency, 0.8 * 1.0 + 0.2 * 2.0)
+
+    def test_consecutive_failures_cool_down_with_backoff(self):
+        for _ in range(2):
+            self.router.record_result('akshare', False)
+        self.assertEqual(self.router.rank('A_STOCK'), ['sina', 'akshare'])
+        self.assertEqual(self.router.stats()['akshare']['cooling'], 30)
+
+        self.clock.now += 31
+        for _ in range(2):
+            self.router.record_result('akshare', False)
+        self.assertEqual(self.router.stats()['akshare']['cooling'], 60)
+
+    def test_error_rate_decays_and_source_recovers(self):
+        self.router.record_result('akshare', False)
+        self.assertEqual(self.router.rank('A_STOCK'), ['sina', 'akshare'])
+        self.clock.now += 600 * 10
+        self.assertEqual(self.router.rank('A_STOCK'), ['akshare', 'sina'])
+
+    def test_throttling_and_disagreement(self):
+        self.router.record_throttled('sina')
+        self.assertGreater(self.router.stats()['sina']['cooling'], 0)
+        self.router.record_disagreement('akshare', 'akshare_spot', 1.0)
+        self.assertAlmostEqual(self.router.health['akshare'].disagreement, 0.2)
+        self.assertTrue(is_rate_limited(RuntimeError('HTTP 429 Too Many Requests')))
+        self.assertFalse(is_rate_limited(RuntimeError('connection reset')))
+
+
+class FailoverTest(TestCase):
+
+    def test_failed_source_falls_over_to_the_next(self):
+        sina = pd.DataFrame({
+            'date': ['2026-10-15'], 'open': [10.0], 'high': [10.5], 'low': [9.9], 'close': [10.2],
+            'volume': [120000], 'amount': [1224000.0], 'turnover': [0.01],
+        })
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.dict(settings.AI_TRADER_CONFIG, {
+            'MARKET_DATA_DIR': tmp, 'COLUMNAR_STORE_ENABLED': False, 'DATA_QUALITY': {'enabled': False},
+            'SOURCE_ROUTING': ROUTES, 'SOURCE_ROUTER': {'audit_rate': 0},
+        }), mock.patch.object(market_data_collector.ak, 'stock_zh_a_hist', side_effect=ConnectionError('reset')), \
+                mock.patch.object(market_data_collector.ak, 'stock_zh_a_daily', return_value=sina):
+            collector = MarketDataCollector(bulk=True)
+            result = collector.batch_collect(['600000'], market='A_STOCK')
+
+        self.assertEqual(MarketDataModel.objects.get(symbol='600000').data_source, 'sina')
+        self.assertEqual(collector.router.stats()['akshare']['failures'], 1)
+        self.assertEqual(collector.router.stats()['sina']['served'], 1)
+        self.assertEqual((result['success_count'], result['fail_count']), (1, 0))
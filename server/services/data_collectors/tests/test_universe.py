@@ -0,0 +1,67 @@
+"""
+标的池同步与缓存测试
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from django.test import TestCase
+
+from apps.market_data.models import StockInfoModel
+from services.data_collectors.universe import UniverseLookup, a_stock_board, get_universe, sync_universe
+
+
+def universe_frame(rows):
+    """[(代码, 名称, 行业, 市值), ...]"""
+    return pd.DataFrame([
+        {'symbol': symbol, 'name': name, 'market': 'A_STOCK', 'industry': industry, 'sector': None,
+         'list_date': date(2000, 1, 1), 'market_cap': cap, 'pe_ratio': np.nan, 'pb_ratio': None,
+         'metadata': a_stock_board(symbol)}
+        for symbol, name, industry, cap in rows
+    ])
+
+
+class SyncUniverseTest(TestCase):
+
+    def test_only_changed_rows_are_written(self):
+        spdb = ('600000', '浦发银行', '银行', 1e11)
+        first = sync_universe(universe_frame([spdb, ('300750', '宁德时代', '电池', 1e12)]), 'A_STOCK')
+        self.assertEqual((first['created'], first['updated']), (2, 0))
+
+        second = sync_universe(universe_frame([spdb, ('300750', '宁德时代', None, 1.1e12)]), 'A_STOCK')
+        self.assertEqual((second['created'], second['updated'], second['unchanged']), (0, 1, 1))
+        catl = StockInfoModel.objects.get(symbol='300750')
+        # 数据源未提供的字段保留原值
+        self.assertEqual((catl.industry, float(catl.market_cap)), ('电池', 1.1e12))
+        self.assertEqual(catl.metadata, {'exchange': 'SZ', 'board': '创业板'})
+
+    def test_missing_symbols_are_deactivated_and_revived(self):
+        spdb, pingan = ('600000', '浦发银行', '银行', 1e11), ('000001', '平安银行', '银行', 1e11)
+        sync_universe(universe_frame([spdb, pingan]), 'A_STOCK')
+        stats = sync_universe(universe_frame([spdb]), 'A_STOCK', deactivate_missing=True)
+        self.assertEqual(stats['deactivated'], 1)
+        self.assertEqual(get_universe().symbols('A_STOCK'), ['600000'])
+
+        sync_universe(universe_frame([pingan]), 'A_STOCK')
+        self.assertTrue(StockInfoModel.objects.get(symbol='000001').is_active)
+
+
+class UniverseLookupTest(TestCase):
+
+    def test_one_query_serves_every_lookup_until_invalidated(self):
+        sync_universe(universe_frame([('600000', '浦发银行', '银行', 1e11)]), 'A_STOCK')
+        lookup = UniverseLookup(ttl=600)
+        with self.assertNumQueries(1):
+            self.assertEqual(lookup.sector_of('600000'), '银行')
+            self.assertEqual(lookup.industry_of('600000'), '银行')
+            self.assertIsNone(lookup.get('999999'))
+
+        StockInfoModel.objects.filter(symbol='600000').update(sector='金融')
+        self.assertEqual(lookup.sector_of('600000'), '银行')
+        lookup.invalidate()
+        self.assertEqual(lookup.sector_of('600000'), '金融')
+
+    def test_board_by_prefix(self):
+        self.assertEqual(a_stock_board('688981')['board'], '科创板')
+        self.assertEqual(a_stock_board('430047')['exchange'], 'BJ')
+        self.assertEqual(a_stock_board('002594'), {'exchange': 'SZ', 'board': '主板'})
@@ -0,0 +1,53 @@
+"""
+美股批量下载测试
+"""
+import tempfile
+from unittest import mock
+
+import pandas as pd
+from django.conf import settings
+from django.test import TestCase
+
+from apps.market_data.models import MarketDataModel
+from services.data_collectors import market_data_collector
+from services.data_collectors.market_data_collector import MarketDataCollector
+
+
+def wide_table(closes):
+    """yf.download(group_by='ticker') 格式的宽表：{代码: [收盘价, ...]}"""
+    index = pd.DatetimeIndex(['2026-10-14', '2026-10-15'], tz='America/New_York')
+    return pd.concat({
+        symbol: pd.DataFrame({'Open': values, 'High': values, 'Low': values, 'Close': values, 'Volume': 100}, index=index)
+        for symbol, values in closes.items()
+    }, axis=1)
+
+
+class UsBatchTest(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        patcher = mock.patch.dict(settings.AI_TRADER_CONFIG, {
+            'MARKET_DATA_DIR': self.tmp.name,
+            'COLUMNAR_STORE_ENABLED': False,
+            'DATA_QUALITY': {'enabled': False},
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.collector = MarketDataCollector(bulk=True, failover=False)
+
+    def test_one_request_is_split_per_symbol(self):
+        table = wide_table({'AAPL': [100.0, 101.0], 'MSFT': [400.0, float('nan')]})
+        with mock.patch.object(market_data_collector.yf, 'download', return_value=table) as download:
+            outcomes = self.collector.collect_us_stock_batch(['AAPL', 'MSFT', 'NVDA'])
+
+        download.assert_called_once()
+        self.assertEqual(download.call_args.kwargs['tickers'], ['AAPL', 'MSFT', 'NVDA'])
+        self.assertEqual((outcomes['AAPL']['count'], outcomes['MSFT']['count']), (2, 1))
+        self.assertFalse(outcomes['NVDA']['success'])
+        self.assertEqual(MarketDataModel.objects.filter(market='US_STOCK').count(), 3)
+
+    def test_failed_request_marks_every_symbol(self):
+        with mock.patch.object(market_data_collector.yf, 'download', side_effect=ConnectionError('reset')):
+            outcomes = self.collector.collect_us_stock_batch(['AAPL', 'MSFT'])
+        self.assertEqual({symbol: outcome['success'] for symbol, outcome in outcomes.items()}, {'AAPL': False, 'MSFT': False})
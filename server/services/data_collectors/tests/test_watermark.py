@@ -0,0 +1,71 @@
+"""
+增量采集水位线测试
+"""
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+import pandas as pd
+from django.conf import settings
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.market_data.models import CollectionWatermarkModel, MarketDataModel
+from services.data_collectors import market_data_collector
+from services.data_collectors.market_data_collector import MarketDataCollector
+from services.data_collectors.normalizers import localize_dates
+
+
+def hist_table(days, closes):
+    """stock_zh_a_hist 格式的日线"""
+    return pd.DataFrame({
+        '日期': days, '开盘': closes, '最高': closes, '最低': closes, '收盘': closes,
+        '成交量': 1000, '成交额': [close * 1000 for close in closes], '涨跌幅': 0.0, '换手率': 1.0,
+    })
+
+
+class WatermarkTest(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        patcher = mock.patch.dict(settings.AI_TRADER_CONFIG, {
+            'MARKET_DATA_DIR': self.tmp.name,
+            'COLUMNAR_STORE_ENABLED': False,
+            'DATA_QUALITY': {'enabled': False},
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.collector = MarketDataCollector(bulk=True, incremental=True, failover=False)
+
+    def collect(self, table):
+        with mock.patch.object(market_data_collector.ak, 'stock_zh_a_hist', return_value=table) as hist:
+            return self.collector.collect_a_stock_data('600000', days=30), hist
+
+    def watermark(self):
+        return CollectionWatermarkModel.objects.get(symbol='600000', market='A_STOCK', data_source='akshare')
+
+    def test_watermark_advances_to_latest_bar_and_narrows_the_next_request(self):
+        self.collect(hist_table(['2026-09-01', '2026-09-02'], [10.0, 10.5]))
+        self.assertEqual(self.watermark().last_timestamp, localize_dates(['2026-09-02'])[0])
+
+        # 数据源多返回了水位线之前的K线：只写水位线当天及之后
+        result, hist = self.collect(hist_table(['2026-09-01', '2026-09-02', '2026-09-03'], [9.0, 10.6, 11.0]))
+        self.assertEqual(hist.call_args.kwargs['start_date'], '20260902')
+        self.assertEqual(result['count'], 2)
+        self.assertEqual(float(MarketDataModel.objects.get(timestamp=localize_dates(['2026-09-01'])[0]).close), 10.0)
+        self.assertEqual(self.watermark().last_timestamp, localize_dates(['2026-09-03'])[0])
+
+    def test_watermark_never_moves_backwards(self):
+        self.collect(hist_table(['2026-09-03'], [11.0]))
+        self.collector.incremental = False
+        self.collect(hist_table(['2026-09-01'], [10.0]))
+        self.assertEqual(self.watermark().last_timestamp, localize_dates(['2026-09-03'])[0])
+
+    def test_up_to_date_symbol_skips_the_request(self):
+        CollectionWatermarkModel.objects.create(
+            symbol='600000', market='A_STOCK', data_source='akshare', last_timestamp=timezone.now() - timedelta(minutes=1)
+        )
+        result, hist = self.collect(hist_table(['2026-09-01'], [10.0]))
+        self.assertTrue(result['skipped'])
+        hist.assert_not_called()
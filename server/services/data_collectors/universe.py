@@ -0,0 +1,337 @@
+"""
+标的池管理
+Universe sync into StockInfoModel and a cached in-process lookup
+
+同步流程：批量拉取一个市场的标的元数据 -> 与 stock_info 已有行比对 -> 只新增/更新有变化的行。
+数据源：
+    A_STOCK   akshare 全市场快照（名称、市值、市盈率、市净率，一次请求）
+              + 东方财富行业板块成分（每个行业一次请求）+ 沪深北交易所列表（上市日期）
+    US_STOCK  yfinance Ticker.info（每个标的一次请求，需提供标的列表）
+    CSV       本地文件（symbol,name[,industry,sector,list_date,market_cap,pe_ratio,pb_ratio]）
+
+A股 industry 为东方财富行业板块，sector 留空；美股 sector/industry 取 yfinance 分类。
+智能体通过 get_universe() 读取 symbol -> 行业/板块，整个标的池一次查询加载并按 TTL 刷新。
+"""
+import logging
+import threading
+import time
+from contextlib import nullcontext
+from datetime import date, datetime, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+from django.conf import settings
+from django.utils import timezone
+
+from apps.market_data.models import StockInfoModel
+from services.data_collectors.rate_limiter import build_source_limiters
+import akshare as ak
+import yfinance as yf
+
+logger = logging.getLogger(__name__)
+
+SYNC_FIELDS = ['name', 'market', 'industry', 'sector', 'list_date', 'market_cap', 'pe_ratio', 'pb_ratio']
+DECIMAL_LIMITS = {'market_cap': Decimal('1e28'), 'pe_ratio': Decimal('1e8'), 'pb_ratio': Decimal('1e8')}
+
+
+def a_stock_board(symbol: str) -> Dict[str, str]:
+    """按代码前缀判断A股交易所与上市板块"""
+    if symbol.startswith(('688', '689')):
+        return {'exchange': 'SH', 'board': '科创板'}
+    if symbol.startswith('6'):
+        return {'exchange': 'SH', 'board': '主板'}
+    if symbol.startswith(('300', '301')):
+        return {'exchange': 'SZ', 'board': '创业板'}
+    if symbol.startswith(('4', '8', '92')):
+        return {'exchange': 'BJ', 'board': '北交所'}
+    return {'exchange': 'SZ', 'board': '主板'}
+
+
+class UniverseFetcher:
+    """标的元数据批量拉取"""
+
+    def __init__(self, limiters: Optional[Dict] = None):
+        """
+        Args:
+            limiters: 数据源限流器，默认按 DATA_SOURCE_LIMITS 创建
+        """
+        if limiters is None:
+            limiters = build_source_limiters(settings.AI_TRADER_CONFIG.get('DATA_SOURCE_LIMITS', {}))
+        self.limiters = limiters
+        self.errors: List[str] = []
+
+    def fetch_a_stock(self, industries: bool = True) -> pd.DataFrame:
+        """
+        A股全市场标的元数据
+
+        Args:
+            industries: 是否拉取行业板块成分（约90次请求）
+        """
+        with self._source_slot('akshare'):
+            spot = ak.stock_zh_a_spot_em()
+        symbols = spot['代码'].astype(str)
+        frame = pd.DataFrame({
+            'symbol': symbols,
+            'name': spot['名称'].astype(str).str.strip(),
+            'market': 'A_STOCK',
+            'market_cap': pd.to_numeric(spot.get('总市值'), errors='coerce'),
+            'pe_ratio': pd.to_numeric(spot.get('市盈率-动态'), errors='coerce'),
+            'pb_ratio': pd.to_numeric(spot.get('市净率'), errors='coerce'),
+        })
+        frame['metadata'] = [a_stock_board(symbol) for symbol in frame['symbol']]
+
+        industry = self._attempt('industry boards', self._a_stock_industries) if industries else None
+        frame['industry'] = frame['symbol'].map(industry) if industry else None
+        frame['sector'] = None
+        list_dates = self._attempt('listing dates', self._a_stock_list_dates) or {}
+        frame['list_date'] = frame['symbol'].map(list_dates)
+        return frame.drop_duplicates('symbol', keep='last').reset_index(drop=True)
+
+    def fetch_us_stock(self, symbols: List[str]) -> pd.DataFrame:
+        """美股标的元数据（逐个请求 Ticker.info，失败的标的跳过）"""
+        rows = []
+        for symbol in symbols:
+            info = self._attempt(f'{symbol} info', self._us_stock_info, symbol)
+            if not info:
+                continue
+            first_trade = info.get('firstTradeDateEpochUtc') or (info.get('firstTradeDateMilliseconds') or 0) / 1000
+            rows.append({
+                'symbol': symbol,
+                'name': info.get('longName') or info.get('shortName') or symbol,
+                'market': 'US_STOCK',
+                'industry': info.get('industry'),
+                'sector': info.get('sector'),
+                'list_date': datetime.fromtimestamp(first_trade, tz=dt_timezone.utc).date() if first_trade else None,
+                'market_cap': info.get('marketCap'),
+                'pe_ratio': info.get('trailingPE'),
+                'pb_ratio': info.get('priceToBook'),
+                'metadata': {k: info[k] for k in ('exchange', 'quoteType', 'currency') if info.get(k)},
+            })
+        return pd.DataFrame(rows)
+
+    @staticmethod
+    def read_csv(path: str, market: str) -> pd.DataFrame:
+        """从本地文件读取标的元数据（至少包含 symbol,name 列）"""
+        frame = pd.read_csv(path, dtype={'symbol': str})
+        missing = {'symbol', 'name'} - set(frame.columns)
+        if missing:
+            raise ValueError(f"Universe file is missing columns: {sorted(missing)}")
+        frame = frame.reindex(columns=[*SYNC_FIELDS, 'symbol', 'metadata'])
+        frame['market'] = frame['market'].fillna(market)
+        frame['list_date'] = pd.to_datetime(frame['list_date'], errors='coerce').dt.date
+        frame['metadata'] = None
+        return frame
+
+    def _a_stock_industries(self) -> Dict[str, str]:
+        """symbol -> 东方财富行业板块"""
+        with self._source_slot('akshare'):
+            boards = ak.stock_board_industry_name_em()
+        industry = {}
+        for board in boards['板块名称'].astype(str):
+            members = self._attempt(f'industry {board}', self._board_members, board)
+            for symbol in members or []:
+                industry.setdefault(symbol, board)
+        return industry
+
+    def _board_members(self, board: str) -> List[str]:
+        with self._source_slot('akshare'):
+            df = ak.stock_board_industry_cons_em(symbol=board)
+        return df['代码'].astype(str).tolist()
+
+    def _a_stock_list_dates(self) -> Dict[str, date]:
+        """symbol -> 上市日期（上交所主板/科创板、深交所、北交所列表）"""
+        listings = [
+            ('SH main board', lambda: ak.stock_info_sh_name_code(symbol='主板A股'), '证券代码', '上市日期'),
+            ('SH STAR market', lambda: ak.stock_info_sh_name_code(symbol='科创板'), '证券代码', '上市日期'),
+            ('SZ', lambda: ak.stock_info_sz_name_code(symbol='A股列表'), 'A股代码', 'A股上市日期'),
+            ('BJ', ak.stock_info_bj_name_code, '证券代码', '上市日期'),
+        ]
+        list_dates = {}
+        for label, fetch, code_column, date_column in listings:
+            with self._source_slot('akshare'):
+                df = self._attempt(f'{label} listing', fetch)
+            if df is None or code_column not in df or date_column not in df:
+                continue
+            dates = pd.to_datetime(df[date_column], errors='coerce')
+            for symbol, listed in zip(df[code_column].astype(str).str.zfill(6), dates):
+                if pd.notna(listed):
+                    list_dates[symbol] = listed.date()
+        return list_dates
+
+    def _us_stock_info(self, symbol: str) -> Dict:
+        with self._source_slot('yfinance'):
+            return yf.Ticker(symbol).info or {}
+
+    def _attempt(self, label: str, func: Callable, *args):
+        """执行一个拉取步骤，失败时记录错误并返回 None"""
+        try:
+            return func(*args)
+        except Exception as e:
+            logger.warning(f"Failed to fetch {label}: {e}")
+            self.errors.append(f'{label}: {e}')
+            return None
+
+    def _source_slot(self, source: str):
+        limiter = self.limiters.get(source)
+        return limiter.slot() if limiter is not None else nullcontext()
+
+
+def sync_universe(frame: pd.DataFrame, market: str, deactivate_missing: bool = False) -> Dict:
+    """
+    将标的元数据与 stock_info 比对，只写入有变化的行
+
+    数据源未提供（为空）的字段保留原值；metadata 按键合并。
+
+    Args:
+        frame: UniverseFetcher 返回的标的元数据
+        market: 市场类型
+        deactivate_missing: 将该市场中本次未出现的标的标记为不活跃（数据源为全市场列表时使用）
+
+    Returns:
+        Dict: {'fetched', 'created', 'updated', 'unchanged', 'deactivated', 'elapsed'}
+    """
+    started = time.perf_counter()
+    now = timezone.now()
+    existing = {row['symbol']: row for row in StockInfoModel.objects.values('id', 'symbol', 'metadata', 'is_active', *SYNC_FIELDS)}
+
+    created, changed, changed_fields = [], [], set()
+    seen = set()
+    for row in frame.to_dict('records'):
+        symbol = str(row['symbol']).strip()
+        if not symbol or symbol in seen:
+            continue
+        seen.add(symbol)
+        values = _clean_values(row)
+        metadata = row.get('metadata') if isinstance(row.get('metadata'), dict) else {}
+
+        current = existing.get(symbol)
+        if current is None:
+            created.append(StockInfoModel(symbol=symbol, metadata=metadata, **{'market': market, **values}))
+            continue
+
+        updates = {field: value for field, value in values.items() if value != current[field]}
+        merged = {**(current['metadata'] or {}), **metadata}
+        if merged != (current['metadata'] or {}):
+            updates['metadata'] = merged
+        if not current['is_active']:
+            updates['is_active'] = True
+        if updates:
+            changed_fields.update(updates)
+            changed.append((current, updates))
+
+    fields = sorted(changed_fields)
+    updated = [
+        StockInfoModel(id=current['id'], updated_at=now, **{field: updates.get(field, current[field]) for field in fields})
+        for current, updates in changed
+    ]
+    StockInfoModel.objects.bulk_create(created, batch_size=1000)
+    if updated:
+        StockInfoModel.objects.bulk_update(updated, [*fields, 'updated_at'], batch_size=500)
+
+    deactivated = 0
+    if deactivate_missing and seen:
+        stale = [row['id'] for symbol, row in existing.items() if row['market'] == market and row['is_active'] and symbol not in seen]
+        for start in range(0, len(stale), 500):
+            deactivated += StockInfoModel.objects.filter(id__in=stale[start:start + 500]).update(is_active=False, updated_at=now)
+
+    get_universe().invalidate()
+    stats = {
+        'fetched': len(seen),
+        'created': len(created),
+        'updated': len(updated),
+        'unchanged': len(seen) - len(created) - len(updated),
+        'deactivated': deactivated,
+        'elapsed': round(time.perf_counter() - started, 2),
+    }
+    logger.info(f"Universe sync for {market}: {stats}")
+    return stats
+
+
+def _clean_values(row: Dict) -> Dict:
+    """统一类型（Decimal 按模型精度取整，超出范围视为缺失），并去掉缺失的字段"""
+    values = {}
+    for field in SYNC_FIELDS:
+        value = row.get(field)
+        if value is None or (not isinstance(value, (str, date)) and pd.isna(value)):
+            continue
+        if field in DECIMAL_LIMITS:
+            try:
+                value = Decimal(str(value)).quantize(Decimal('0.01'))
+            except (InvalidOperation, ValueError):
+                continue
+            if not value.is_finite() or abs(value) >= DECIMAL_LIMITS[field]:
+                continue
+        elif isinstance(value, str):
+            value = value.strip()
+            if not value:
+                continue
+        elif isinstance(value, pd.Timestamp):
+            value = value.date()
+        values[field] = value
+    return values
+
+
+class UniverseLookup:
+    """
+    标的池缓存：symbol -> 名称/市场/行业/板块
+
+    首次访问时一次查询加载全部标的，超过 ttl 秒后下次访问时重新加载；同步命令写入后主动失效。
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl if ttl is not None else settings.AI_TRADER_CONFIG.get('UNIVERSE_CACHE_TTL', 600)
+        self._entries: Optional[Dict[str, Dict]] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, symbol: str) -> Optional[Dict]:
+        """标的信息 {'name', 'market', 'industry', 'sector', 'is_active'}，不在标的池中时返回 None"""
+        return self._load().get(symbol)
+
+    def industry_of(self, symbol: str) -> Optional[str]:
+        entry = self.get(symbol)
+        return entry['industry'] if entry else None
+
+    def sector_of(self, symbol: str) -> Optional[str]:
+        """板块，缺失时回退到行业（A股只有行业分类）"""
+        entry = self.get(symbol)
+        if not entry:
+            return None
+        return entry['sector'] or entry['industry']
+
+    def symbols(self, market: Optional[str] = None, active_only: bool = True) -> List[str]:
+        """标的池中的代码"""
+        return [
+            symbol for symbol, entry in self._load().items()
+            if (market is None or entry['market'] == market) and (entry['is_active'] or not active_only)
+        ]
+
+    def invalidate(self):
+        with self._lock:
+            self._entries = None
+
+    def _load(self) -> Dict[str, Dict]:
+        entries = self._entries
+        if entries is not None and time.monotonic() - self._loaded_at < self.ttl:
+            return entries
+        with self._lock:
+            if self._entries is None or time.monotonic() - self._loaded_at >= self.ttl:
+                rows = StockInfoModel.objects.values_list('symbol', 'name', 'market', 'industry', 'sector', 'is_active')
+                self._entries = {
+                    symbol: {'name': name, 'market': market, 'industry': industry, 'sector': sector, 'is_active': is_active}
+                    for symbol, name, market, industry, sector, is_active in rows
+                }
+                self._loaded_at = time.monotonic()
+            return self._entries
+
+
+_universe = None
+
+
+def get_universe() -> UniverseLookup:
+    """获取标的池缓存单例"""
+    global _universe
+    if _universe is None:
+        _universe = UniverseLookup()
+    return _universe
@@ -0,0 +1,152 @@
+"""
+行情原始数据压缩迁移
+Move existing market_data raw payloads to the configured RAW_PAYLOAD_POLICY
+
+按主键分块处理存储形式与目标策略不一致的行（见 services.data_collectors.raw_payload），
+每块一个短事务；不修改 updated_at。迁移后 PostgreSQL/SQLite 需要 VACUUM 才会归还空间。
+"""
+import json
+import logging
+import time
+from typing import Dict, Optional
+
+from django.db import transaction
+from django.db.models import Q
+
+from apps.market_data.models import MarketDataModel, MarketDataRawModel
+from services.data_collectors.raw_payload import (
+    RAW_POLICIES, compress_payload, decompress_payload, get_raw_policy
+)
+
+logger = logging.getLogger(__name__)
+
+INLINE = ~Q(raw_data={})
+BLOB = Q(raw_blob__isnull=False)
+OFFLOADED = Q(raw_payload__isnull=False)
+
+# 目标策略 -> 需要迁移的行
+PENDING = {
+    'keep': BLOB | OFFLOADED,
+    'drop': INLINE | BLOB | OFFLOADED,
+    'compress': INLINE | OFFLOADED,
+    'offload': INLINE | BLOB,
+}
+
+
+class RawPayloadCompactor:
+    """原始数据迁移任务"""
+
+    def __init__(
+        self,
+        policy: Optional[str] = None,
+        chunk_size: int = 2000,
+        pause: float = 0.0,
+        dry_run: bool = False
+    ):
+        """
+        Args:
+            policy: 目标策略，默认读取 RAW_PAYLOAD_POLICY
+            chunk_size: 每个事务处理的行数
+            pause: 每块之间的停顿（秒），让出数据库给在线读写
+            dry_run: 只统计需要迁移的行数，不做修改
+        """
+        self.policy = policy or get_raw_policy()
+        if self.policy not in RAW_POLICIES:
+            raise ValueError(f"Unknown raw payload policy: {self.policy}")
+        self.chunk_size = max(1, chunk_size)
+        self.pause = pause
+        self.dry_run = dry_run
+
+    def run(self) -> Dict:
+        """
+        执行迁移
+
+        Returns:
+            Dict: {'policy', 'rows', 'heap_bytes_before', 'heap_bytes_after', 'elapsed'}
+                  heap_bytes 为 market_data 行内原始数据（JSON 文本与压缩块）的字节数估算
+        """
+        started = time.perf_counter()
+        queryset = MarketDataModel.objects.filter(PENDING[self.policy])
+        report = {'policy': self.policy, 'rows': 0, 'heap_bytes_before': 0, 'heap_bytes_after': 0}
+
+        last_pk = 0
+        while True:
+            chunk = list(
+                queryset.filter(pk__gt=last_pk).order_by('pk').values('pk', 'raw_data', 'raw_blob')[:self.chunk_size]
+            )
+            if not chunk:
+                break
+            last_pk = chunk[-1]['pk']
+            report['rows'] += len(chunk)
+
+            ids = [row['pk'] for row in chunk]
+            offloaded = dict(
+                MarketDataRawModel.objects.filter(market_data_id__in=ids).values_list('market_data_id', 'payload')
+            )
+            payloads = {}
+            for row in chunk:
+                report['heap_bytes_before'] += self._heap_bytes(row['raw_data'], row['raw_blob'])
+                if row['raw_data']:
+                    payloads[row['pk']] = row['raw_data']
+                elif row['raw_blob'] is not None:
+                    payloads[row['pk']] = decompress_payload(row['raw_blob'])
+                else:
+                    payloads[row['pk']] = offloaded.get(row['pk']) or {}
+
+            report['heap_bytes_after'] += self._store(ids, payloads)
+            if len(chunk) < self.chunk_size:
+                break
+            if self.pause:
+                time.sleep(self.pause)
+
+        report['elapsed'] = round(time.perf_counter() - started, 2)
+        logger.info(
+            f"Raw payload compaction ({self.policy}{', dry run' if self.dry_run else ''}): {report['rows']} rows, "
+            f"heap payload {report['heap_bytes_before']} -> {report['heap_bytes_after']} bytes"
+        )
+        return report
+
+    def _store(self, ids, payloads: Dict[int, Dict]) -> int:
+        """按目标策略写入一块，返回写入后行内原始数据的字节数"""
+        blobs = {}
+        if self.policy == 'compress':
+            blobs = {pk: compress_payload(payload) for pk, payload in payloads.items() if payload}
+        heap_bytes = sum(len(blob) for blob in blobs.values())
+        if self.policy == 'keep':
+            heap_bytes = sum(self._heap_bytes(payload, None) for payload in payloads.values())
+        if self.dry_run:
+            return heap_bytes
+
+        with transaction.atomic():
+            if self.policy == 'keep':
+                MarketDataModel.objects.bulk_update(
+                    [MarketDataModel(pk=pk, raw_data=payload, raw_blob=None) for pk, payload in payloads.items()],
+                    ['raw_data', 'raw_blob'],
+                    batch_size=500,
+                )
+            elif self.policy == 'compress':
+                MarketDataModel.objects.bulk_update(
+                    [MarketDataModel(pk=pk, raw_data={}, raw_blob=blobs.get(pk)) for pk in ids],
+                    ['raw_data', 'raw_blob'],
+                    batch_size=500,
+                )
+            else:
+                MarketDataModel.objects.filter(pk__in=ids).update(raw_data={}, raw_blob=None)
+
+            if self.policy == 'offload':
+                MarketDataRawModel.objects.bulk_create(
+                    [MarketDataRawModel(market_data_id=pk, payload=payload) for pk, payload in payloads.items() if payload],
+                    update_conflicts=True,
+                    unique_fields=['market_data'],
+                    update_fields=['payload'],
+                )
+            else:
+                MarketDataRawModel.objects.filter(market_data_id__in=ids).delete()
+        return heap_bytes
+
+    @staticmethod
+    def _heap_bytes(raw_data, raw_blob) -> int:
+        size = len(raw_blob) if raw_blob is not None else 0
+        if raw_data:
+            size += len(json.dumps(raw_data, separators=(',', ':'), ensure_ascii=False).encode('utf-8'))
+        return size
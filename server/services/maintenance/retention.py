@@ -0,0 +1,379 @@
+"""
+数据保留与降采样
+Retention and downsampling job driven by DATATRACEHUB_CONFIG['DATA_RETENTION']
+
+保留策略（天数，-1 表示永久保留）:
+    raw_events   分钟K线，以及风控日志、未执行的决策记录、已遗忘的记忆、
+                 隔离K线、数据质量报告、指数与情绪历史等事件类数据
+    daily_agg    market_data 日线（及列式存储），不短于分析模块读取的历史（见 required_history_days）
+    weekly_agg   周聚合
+    monthly_agg  月聚合
+
+过期数据先降采样再删除：分钟K线补齐缺失的日线，日线合并进周/月聚合。聚合记录
+已并入的日线区间，重新采集的已聚合日线在下次运行时直接删除，不会重复计入。
+删除按主键分块进行，每块一个短事务，避免长时间锁表影响智能体读写。
+"""
+import logging
+import math
+import time
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from apps.agents.models import DecisionRecordModel
+from apps.market_data.models import (
+    DataQualityReportModel, IntradayBarModel, MarketDataModel, MarketDataRollupModel, MarketIndexModel,
+    MarketSentimentModel, QuarantinedBarModel
+)
+from apps.memory.models import AgentMemoryModel
+from apps.trades.models import RiskControlLogModel
+from services.analysis.anomaly_detector import DEFAULT_OPTIONS as ANOMALY_OPTIONS
+from services.analysis.breakout_scanner import BreakoutScanner
+from services.analysis.indicators import get_indicator_params
+from services.data_collectors.columnar_store import ColumnarStore, get_columnar_store
+from services.data_collectors.intraday import BAR_COLUMNS, MARKET_TIMEZONES
+from services.data_collectors.normalizers import build_records, localize_dates
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_PERIODS = {'week': 'W', 'month': 'M'}
+ROLLUP_FIELDS = ['open', 'high', 'low', 'close', 'volume', 'amount', 'bar_count', 'first_bar', 'last_bar']
+DAILY_FIELDS = ['open', 'high', 'low', 'close', 'volume', 'amount', 'data_source']
+
+# 每根日线对应的日历天数（按每年约 240 个交易日折算，偏保守）
+CALENDAR_DAYS_PER_BAR = 365 / 240
+
+# 事件类数据：(模型, 时间字段, 附加过滤条件)，统一按 raw_events 期限清理
+EVENT_TABLES = [
+    (RiskControlLogModel, 'created_at', {}),
+    (DecisionRecordModel, 'decision_time', {'is_executed': False}),  # 已执行的决策由交易记录引用，保留
+    (AgentMemoryModel, 'created_at', {'is_forgotten': True}),  # 只清理已遗忘的记忆
+    (QuarantinedBarModel, 'created_at', {}),
+    (DataQualityReportModel, 'created_at', {}),
+    (MarketIndexModel, 'timestamp', {}),  # 最新值在 market_index_latest，不受影响
+    (MarketSentimentModel, 'timestamp', {}),
+]
+
+
+def required_history_days() -> int:
+    """分析模块读取的最长日线历史（日历天数）：指标引擎 history_bars、突破扫描窗口、异常检测种子窗口"""
+    bars = max(get_indicator_params()['history_bars'], BreakoutScanner().window)
+    seed_days = {**ANOMALY_OPTIONS, **settings.AI_TRADER_CONFIG.get('ANOMALY_DETECTOR', {})}['seed_days']
+    return max(math.ceil(bars * CALENDAR_DAYS_PER_BAR), seed_days)
+
+
+class RetentionJob:
+    """数据保留任务"""
+
+    def __init__(
+        self,
+        retention: Optional[Dict[str, int]] = None,
+        chunk_size: int = 5000,
+        pause: float = 0.0,
+        dry_run: bool = False
+    ):
+        """
+        Args:
+            retention: 保留天数配置，默认读取 DATATRACEHUB_CONFIG['DATA_RETENTION']
+            chunk_size: 每个删除/聚合事务处理的行数
+            pause: 每块之间的停顿（秒），让出数据库给在线读写
+            dry_run: 只统计将被清理的行数，不做任何修改
+        """
+        self.retention = retention or settings.DATATRACEHUB_CONFIG.get('DATA_RETENTION', {})
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self.dry_run = dry_run
+        self.now = timezone.now()
+        self._row_bytes: Dict[str, Optional[float]] = {}
+
+    def run(self) -> Dict:
+        """
+        执行保留策略
+
+        Returns:
+            Dict: {
+                'tables': {表名: {'rows': 删除行数, 'bytes': 估算回收字节数}},
+                'daily_backfilled': 由分钟K线补齐的日线数,
+                'rollups': {'week': 写入的周聚合数, 'month': 写入的月聚合数},
+                'elapsed': 耗时
+            }
+        """
+        started = time.perf_counter()
+        report = {'tables': {}, 'daily_backfilled': 0, 'rollups': {period: 0 for period in ROLLUP_PERIODS}}
+
+        raw_cutoff = self._cutoff('raw_events')
+        if raw_cutoff is not None:
+            old_bars = IntradayBarModel.objects.filter(timestamp__lt=raw_cutoff)
+            report['daily_backfilled'] = self._downsample_intraday(old_bars)
+            self._apply(report, old_bars, self._purge)
+
+        daily_cutoff = self._daily_cutoff()
+        if daily_cutoff is not None:
+            old_rows = MarketDataModel.objects.filter(timestamp__lt=daily_cutoff)
+            self._apply(report, old_rows, lambda rows: self._rollup_daily(rows, report['rollups']))
+            self._purge_columnar(report, daily_cutoff)
+
+        for period, key in (('week', 'weekly_agg'), ('month', 'monthly_agg')):
+            cutoff = self._cutoff(key)
+            if cutoff is not None:
+                expired = MarketDataRollupModel.objects.filter(period=period, period_start__lt=cutoff)
+                self._apply(report, expired, self._purge)
+
+        if raw_cutoff is not None:
+            for model, field, filters in EVENT_TABLES:
+                expired = model.objects.filter(**{f'{field}__lt': raw_cutoff, **filters})
+                self._apply(report, expired, self._purge)
+
+        report['elapsed'] = round(time.perf_counter() - started, 2)
+        logger.info(
+            f"Retention {'dry run' if self.dry_run else 'completed'}: "
+            f"{sum(t['rows'] for t in report['tables'].values())} rows in {report['elapsed']}s"
+        )
+        return report
+
+    def _cutoff(self, key: str):
+        days = self.retention.get(key, -1)
+        if days is None or days < 0:
+            return None
+        return self.now - timedelta(days=days)
+
+    def _daily_cutoff(self):
+        """日线期限，短于分析模块读取的历史时按后者保留"""
+        days = self.retention.get('daily_agg', -1)
+        if days is None or days < 0:
+            return None
+        required = required_history_days()
+        if days < required:
+            logger.warning(f"daily_agg of {days} days is shorter than the {required} days analysis reads, keeping {required}")
+            days = required
+        return self.now - timedelta(days=days)
+
+    def _purge_columnar(self, report: Dict, cutoff):
+        """列式存储与 market_data 日线使用同一期限"""
+        if not settings.AI_TRADER_CONFIG.get('COLUMNAR_STORE_ENABLED'):
+            return
+        store = get_columnar_store()
+        rows = sum(store.purge_before(market, cutoff, dry_run=self.dry_run) for market in store.MARKETS)
+        entry = report['tables'].setdefault('columnar_store', {'rows': 0, 'bytes': 0})
+        entry['rows'] += rows
+        entry['bytes'] += rows * sum(dtype.itemsize for dtype in ColumnarStore.COLUMNS.values())
+
+    def _purge(self, queryset) -> int:
+        """按主键分块删除"""
+        if self.dry_run:
+            return queryset.count()
+
+        model = queryset.model
+        pks = queryset.order_by().values_list('pk', flat=True)
+        deleted = 0
+        while True:
+            chunk = list(pks[:self.chunk_size])
+            if not chunk:
+                break
+            model.objects.filter(pk__in=chunk).delete()
+            deleted += len(chunk)
+            if len(chunk) < self.chunk_size:
+                break
+            if self.pause:
+                time.sleep(self.pause)
+        return deleted
+
+    def _downsample_intraday(self, old_bars) -> int:
+        """为过期分钟K线补齐缺失的日线（已有的日线不覆盖）"""
+        backfilled = 0
+        pairs = old_bars.order_by().values_list('symbol', 'market').distinct()
+        for symbol, market in list(pairs):
+            rows = old_bars.filter(symbol=symbol, market=market).order_by('timestamp').values_list(
+                'interval', 'timestamp', 'data_source', *BAR_COLUMNS
+            )
+            frame = pd.DataFrame.from_records(list(rows), columns=['interval', 'timestamp', 'data_source', *BAR_COLUMNS])
+            if frame.empty:
+                continue
+            # 同时存在多个周期时使用最细的周期
+            frame = frame[frame['interval'] == frame['interval'].min()]
+
+            tz = MARKET_TIMEZONES.get(market, timezone.get_current_timezone())
+            days = pd.DatetimeIndex(frame['timestamp']).tz_convert(tz).date
+            daily = frame.groupby(days).agg(
+                open=('open', 'first'), high=('high', 'max'), low=('low', 'min'), close=('close', 'last'),
+                volume=('volume', 'sum'), amount=('amount', 'sum'), data_source=('data_source', 'last'),
+            )
+            daily['timestamp'] = localize_dates(daily.index)
+
+            existing = set(MarketDataModel.objects.filter(
+                symbol=symbol, market=market, timestamp__in=daily['timestamp'].dt.to_pydatetime().tolist()
+            ).values_list('timestamp', flat=True))
+            missing = daily[~daily['timestamp'].isin(existing)]
+            if missing.empty:
+                continue
+
+            backfilled += len(missing)
+            if self.dry_run:
+                continue
+            for source, group in missing.groupby('data_source'):
+                records = build_records(
+                    group.drop(columns='data_source').reset_index(drop=True), symbol, market, source, DAILY_FIELDS
+                )
+                MarketDataModel.objects.bulk_create(records, ignore_conflicts=True)
+        return backfilled
+
+    def _rollup_daily(self, old_rows, rollups: Dict[str, int]) -> int:
+        """
+        把过期日线合并进周/月聚合后删除
+
+        每个标的按时间升序分块处理，聚合与删除在同一事务内，中断后重跑不会重复计数；
+        已并入聚合区间的日线（重新采集的数据）只删除，不再计入。
+        """
+        if self.dry_run:
+            return old_rows.count()
+
+        columns = ['pk', 'timestamp', 'open', 'high', 'low', 'close', 'volume', 'amount']
+        # 已超过自身保留期限的聚合不再写入（写入后也会被立即清理）
+        floors = {
+            period: self._cutoff(key) for period, key in (('week', 'weekly_agg'), ('month', 'monthly_agg'))
+        }
+        deleted = 0
+        pairs = old_rows.order_by().values_list('symbol', 'market').distinct()
+        for symbol, market in list(pairs):
+            queryset = old_rows.filter(symbol=symbol, market=market).order_by('timestamp')
+            while True:
+                rows = list(queryset.values_list(*columns)[:self.chunk_size])
+                if not rows:
+                    break
+                frame = pd.DataFrame.from_records(rows, columns=columns)
+                with transaction.atomic():
+                    for period in ROLLUP_PERIODS:
+                        records = self._rollup(symbol, market, period, frame, floors[period])
+                        MarketDataRollupModel.objects.bulk_create(
+                            records,
+                            update_conflicts=True,
+                            unique_fields=['symbol', 'market', 'period', 'period_start'],
+                            update_fields=ROLLUP_FIELDS,
+                        )
+                        rollups[period] += len(records)
+                    MarketDataModel.objects.filter(pk__in=frame['pk'].tolist()).delete()
+                deleted += len(rows)
+                if len(rows) < self.chunk_size:
+                    break
+                if self.pause:
+                    time.sleep(self.pause)
+        return deleted
+
+    @staticmethod
+    def _rollup(symbol: str, market: str, period: str, frame: pd.DataFrame, floor) -> List[MarketDataRollupModel]:
+        """
+        把一块日线（按时间升序）并入周期聚合
+
+        已有聚合 [first_bar, last_bar] 区间内的日线视为已并入；没有区间记录的旧聚合整个周期
+        视为已并入。其余日线与已有聚合合并：开盘价取更早的一方，收盘价取更晚的一方，
+        高低取极值，量额与日线数累加。
+
+        Args:
+            floor: 早于该时刻的周期已超过自身保留期限，不再写入
+        """
+        tz = timezone.get_current_timezone()
+        local = pd.DatetimeIndex(frame['timestamp']).tz_convert(tz).tz_localize(None)
+        periods = local.to_period(ROLLUP_PERIODS[period]).start_time
+        keep = np.ones(len(frame), dtype=bool)
+        if floor is not None:
+            keep &= periods >= pd.Timestamp(floor).tz_convert(tz).tz_localize(None).normalize()
+        if not keep.any():
+            return []
+
+        starts = dict(zip(periods[keep].unique(), localize_dates(periods[keep].unique()).to_pydatetime()))
+        existing = {
+            rollup.period_start: rollup
+            for rollup in MarketDataRollupModel.objects.filter(
+                symbol=symbol, market=market, period=period, period_start__in=list(starts.values())
+            )
+        }
+        timestamps = pd.DatetimeIndex(frame['timestamp'])
+        for naive, start in starts.items():
+            current = existing.get(start)
+            if current is None:
+                continue
+            covered = periods == naive
+            if current.first_bar is not None:
+                covered &= (timestamps >= current.first_bar) & (timestamps <= current.last_bar)
+            keep &= ~covered
+
+        records = []
+        rows = frame[keep]
+        for naive, group in rows.groupby(periods[keep], sort=True):
+            start, current = starts[naive], existing.get(starts[naive])
+            prices = group[['open', 'high', 'low', 'close']].astype(float)
+            first_bar, last_bar = group['timestamp'].iloc[0], group['timestamp'].iloc[-1]
+            amount = group['amount'].astype(float).sum(min_count=1)
+            rollup = MarketDataRollupModel(
+                symbol=symbol, market=market, period=period, period_start=start,
+                open=prices['open'].iloc[0], high=prices['high'].max(), low=prices['low'].min(),
+                close=prices['close'].iloc[-1], volume=int(group['volume'].sum()),
+                amount=None if pd.isna(amount) else float(amount), bar_count=len(group),
+                first_bar=first_bar, last_bar=last_bar,
+            )
+            if current is not None:
+                if first_bar > current.first_bar:
+                    rollup.open = current.open
+                if last_bar < current.last_bar:
+                    rollup.close = current.close
+                rollup.high = max(float(current.high), rollup.high)
+                rollup.low = min(float(current.low), rollup.low)
+                rollup.volume += current.volume
+                if current.amount is not None:
+                    rollup.amount = float(current.amount) + (rollup.amount or 0)
+                rollup.bar_count += current.bar_count
+                rollup.first_bar = min(first_bar, current.first_bar)
+                rollup.last_bar = max(last_bar, current.last_bar)
+            records.append(rollup)
+        return records
+
+    def _apply(self, report: Dict, queryset, action: Callable[..., int]):
+        """对过期数据执行清理动作，并按删除前的平均行大小估算回收空间"""
+        table = queryset.model._meta.db_table
+        entry = report['tables'].setdefault(table, {'rows': 0, 'bytes': None})
+        if not queryset.exists():
+            return
+        row_bytes = self._average_row_bytes(table)
+        rows = action(queryset)
+        entry['rows'] += rows
+        if row_bytes is not None:
+            entry['bytes'] = (entry['bytes'] or 0) + int(rows * row_bytes)
+
+    def _average_row_bytes(self, table: str) -> Optional[float]:
+        """表（含索引）平均每行占用字节数，数据库不支持统计时返回 None"""
+        if table in self._row_bytes:
+            return self._row_bytes[table]
+
+        size = None
+        try:
+            with connection.cursor() as cursor:
+                if connection.vendor == 'postgresql':
+                    cursor.execute(
+                        'SELECT pg_total_relation_size(c.oid), c.reltuples FROM pg_class c WHERE c.oid = %s::regclass',
+                        [table]
+                    )
+                    total, count = cursor.fetchone()
+                elif connection.vendor == 'sqlite':
+                    # dbstat 需要 SQLITE_ENABLE_DBSTAT_VTAB，表与其索引按 tbl_name 汇总
+                    cursor.execute(
+                        'SELECT SUM(pgsize) FROM dbstat WHERE name IN '
+                        '(SELECT name FROM sqlite_master WHERE tbl_name = %s)', [table]
+                    )
+                    total, count = cursor.fetchone()[0], None
+                else:
+                    total, count = None, None
+                if total:
+                    if not count or count <= 0:
+                        cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}')
+                        count = cursor.fetchone()[0]
+                    size = total / count if count else None
+        except DatabaseError as e:
+            logger.debug(f"Table size unavailable for {table}: {e}")
+
+        self._row_bytes[table] = size
+        return size
@@ -0,0 +1,45 @@
+"""
+原始数据迁移任务测试
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from django.test import TestCase
+
+from apps.market_data.models import MarketDataModel, MarketDataRawModel
+from services.data_collectors.raw_payload import load_raw_payload
+from services.maintenance.raw_compaction import RawPayloadCompactor
+
+
+class RawCompactionTest(TestCase):
+
+    def setUp(self):
+        MarketDataModel.objects.bulk_create([
+            MarketDataModel(
+                symbol='AAPL', market='US_STOCK', timestamp=datetime(2026, 10, day, tzinfo=dt_timezone.utc),
+                open=1, high=1, low=1, close=1, volume=1, raw_data={'day': day, 'note': 'x' * 200}
+            )
+            for day in range(12, 17)
+        ])
+
+    def payloads(self):
+        return [load_raw_payload(row)['day'] for row in MarketDataModel.objects.order_by('timestamp')]
+
+    def test_migrates_between_policies_in_chunks(self):
+        dry = RawPayloadCompactor(policy='compress', chunk_size=2, dry_run=True).run()
+        self.assertEqual(dry['rows'], 5)
+        self.assertFalse(MarketDataModel.objects.filter(raw_blob__isnull=False).exists())
+
+        report = RawPayloadCompactor(policy='compress', chunk_size=2).run()
+        self.assertEqual(report['rows'], 5)
+        self.assertLess(report['heap_bytes_after'], report['heap_bytes_before'])
+        self.assertEqual(self.payloads(), [12, 13, 14, 15, 16])
+        self.assertEqual(RawPayloadCompactor(policy='compress').run()['rows'], 0)
+
+        RawPayloadCompactor(policy='offload', chunk_size=2).run()
+        self.assertEqual(MarketDataRawModel.objects.count(), 5)
+        self.assertFalse(MarketDataModel.objects.filter(raw_blob__isnull=False).exists())
+        self.assertEqual(self.payloads(), [12, 13, 14, 15, 16])
+
+    def test_unknown_policy_is_rejected(self):
+        with self.assertRaises(ValueError):
+            RawPayloadCompactor(policy='archive')
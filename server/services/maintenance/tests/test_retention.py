@@ -0,0 +1,167 @@
+"""
+数据保留任务测试
+"""
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+
+import pandas as pd
+from django.conf import settings
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.market_data.models import MarketDataModel, MarketDataRollupModel, MarketIndexModel, MarketSentimentModel
+from services.data_collectors import columnar_store
+from services.data_collectors.columnar_store import ColumnarStore
+from services.maintenance.retention import RetentionJob, required_history_days
+
+RETENTION = {'raw_events': -1, 'daily_agg': 400, 'weekly_agg': -1, 'monthly_agg': -1}
+NOW = datetime(2026, 10, 16, tzinfo=dt_timezone.utc)
+
+
+def create_daily(days, symbol='600000'):
+    """创建日线：收盘价为 10 + 序号"""
+    MarketDataModel.objects.bulk_create([
+        MarketDataModel(
+            symbol=symbol, market='A_STOCK', timestamp=timestamp,
+            open=10 + i, high=11 + i, low=9 + i, close=10 + i, volume=100, amount=1000
+        )
+        for i, timestamp in enumerate(days)
+    ])
+
+
+def run_retention(retention=None):
+    job = RetentionJob(retention=retention or RETENTION)
+    job.now = NOW
+    return job.run()
+
+
+class RollupTest(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.dict(settings.AI_TRADER_CONFIG, {'COLUMNAR_STORE_ENABLED': False})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # 2024-06-03 ~ 2024-06-07 为一个完整的周
+        self.week = pd.date_range('2024-06-03', periods=5, freq='D', tz=timezone.get_current_timezone())
+
+    def weekly(self):
+        return MarketDataRollupModel.objects.get(period='week')
+
+    def test_rollup_aggregates_and_deletes_expired_daily_rows(self):
+        create_daily(self.week)
+        report = run_retention()
+
+        self.assertEqual(report['tables']['market_data']['rows'], 5)
+        self.assertFalse(MarketDataModel.objects.exists())
+        weekly = self.weekly()
+        self.assertEqual(weekly.bar_count, 5)
+        self.assertEqual(weekly.volume, 500)
+        self.assertEqual((float(weekly.open), float(weekly.close)), (10.0, 14.0))
+        self.assertEqual((float(weekly.high), float(weekly.low)), (15.0, 9.0))
+
+    def test_recollected_rows_are_not_counted_twice(self):
+        create_daily(self.week)
+        run_retention()
+        # 回补历史（如 --days 365）重新写入已聚合的日线
+        create_daily(self.week)
+        run_retention()
+
+        weekly = self.weekly()
+        self.assertEqual(weekly.bar_count, 5)
+        self.assertEqual(weekly.volume, 500)
+        self.assertEqual(float(weekly.amount), 5000)
+        self.assertEqual(MarketDataRollupModel.objects.get(period='month').bar_count, 5)
+        self.assertFalse(MarketDataModel.objects.exists())
+
+    def test_later_and_earlier_rows_merge_into_existing_rollup(self):
+        create_daily(self.week[1:4])
+        run_retention()
+        create_daily(self.week)
+        run_retention()
+
+        weekly = self.weekly()
+        self.assertEqual(weekly.bar_count, 5)
+        self.assertEqual(weekly.volume, 500)
+        # 开盘价来自更早的周一，收盘价来自更晚的周五
+        self.assertEqual((float(weekly.open), float(weekly.close)), (10.0, 14.0))
+        self.assertEqual(weekly.first_bar, self.week[0])
+        self.assertEqual(weekly.last_bar, self.week[-1])
+
+    def test_recent_rows_are_kept(self):
+        create_daily(pd.date_range('2026-10-12', periods=5, freq='D', tz=timezone.get_current_timezone()))
+        run_retention()
+        self.assertEqual(MarketDataModel.objects.count(), 5)
+        self.assertFalse(MarketDataRollupModel.objects.exists())
+
+
+class DailyCutoffTest(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.store = ColumnarStore(self.tmp.name)
+        for patcher in (
+            mock.patch.object(columnar_store, '_columnar_store', self.store),
+            mock.patch.dict(settings.AI_TRADER_CONFIG, {'COLUMNAR_STORE_ENABLED': True}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_daily_cutoff_keeps_history_read_by_indicators(self):
+        self.assertGreaterEqual(required_history_days(), 250)
+        kept = NOW - timedelta(days=required_history_days() - 5)
+        expired = NOW - timedelta(days=required_history_days() + 5)
+        create_daily([kept], symbol='KEPT')
+        create_daily([expired], symbol='EXPIRED')
+
+        run_retention({**RETENTION, 'daily_agg': 90})
+        self.assertEqual(list(MarketDataModel.objects.values_list('symbol', flat=True)), ['KEPT'])
+
+    def test_columnar_store_is_purged_with_daily_rows(self):
+        days = pd.DatetimeIndex([NOW - timedelta(days=500), NOW - timedelta(days=450), NOW - timedelta(days=10)])
+        create_daily(days)
+        self.store.write('600000', 'A_STOCK', pd.DataFrame({
+            'timestamp': days, 'open': [1.0, 2.0, 3.0], 'high': [1.0, 2.0, 3.0], 'low': [1.0, 2.0, 3.0],
+            'close': [1.0, 2.0, 3.0], 'volume': [1, 2, 3],
+        }))
+
+        report = run_retention()
+        self.assertEqual(report['tables']['columnar_store']['rows'], 2)
+        bars = self.store.read('600000', 'A_STOCK')
+        self.assertEqual(bars['close'].tolist(), [3.0])
+        self.assertEqual(bars['volume'].tolist(), [3])
+        self.assertEqual(MarketDataModel.objects.count(), 1)
+
+    def test_dry_run_leaves_columnar_store_untouched(self):
+        days = pd.DatetimeIndex([NOW - timedelta(days=500), NOW - timedelta(days=10)])
+        self.store.write('600000', 'A_STOCK', pd.DataFrame({
+            'timestamp': days, 'open': [1.0, 2.0], 'high': [1.0, 2.0], 'low': [1.0, 2.0],
+            'close': [1.0, 2.0], 'volume': [1, 2],
+        }))
+        job = RetentionJob(retention=RETENTION, dry_run=True)
+        job.now = NOW
+        self.assertEqual(job.run()['tables']['columnar_store']['rows'], 1)
+        self.assertEqual(len(self.store.read('600000', 'A_STOCK')['close']), 2)
+
+
+class EventTableTest(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.dict(settings.AI_TRADER_CONFIG, {'COLUMNAR_STORE_ENABLED': False})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_index_and_sentiment_history_expire_with_raw_events(self):
+        old, recent = NOW - timedelta(days=120), NOW - timedelta(days=10)
+        for timestamp in (old, recent):
+            MarketIndexModel.objects.create(
+                index_code='000001', index_name='上证指数', timestamp=timestamp, value=3000, change_pct=0
+            )
+            MarketSentimentModel.objects.create(timestamp=timestamp, fear_greed_index=50)
+
+        report = run_retention({**RETENTION, 'raw_events': 90})
+        self.assertEqual(report['tables']['market_index']['rows'], 1)
+        self.assertEqual(report['tables']['market_sentiment']['rows'], 1)
+        self.assertEqual(list(MarketIndexModel.objects.values_list('timestamp', flat=True)), [recent])
+        self.assertEqual(list(MarketSentimentModel.objects.values_list('timestamp', flat=True)), [recent])